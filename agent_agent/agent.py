@@ -1,21 +1,27 @@
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.tools import agent_tool
-
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
 
-from .sub_agents.planning_engine import *
-
-settings = get_settings()
 
 # --- Main Manager Agent Definition ---
-root_agent = Agent(
-    name="MainManagerAgent",
-    model=settings.MODEL_GEMINI_2_0_FLASH,
-    description="""Orchestrates the end-to-end creation of new AI agents using the Google Agent Development Kit (ADK).
+@register_agent("MainManagerAgent")
+def build_main_manager_agent():
+    from google.adk.agents import Agent
+    from google.adk.tools import agent_tool
+
+    from llm.models import build_model
+    from workflows.agent_tool import StateResultAgentTool
+
+    from .sub_agents.planning_engine import planning_agent, requirements_agent
+
+    return Agent(
+        name="MainManagerAgent",
+        model=build_model(
+            get_settings().MODEL_GEMINI_2_0_FLASH, agent_name="MainManagerAgent"
+        ),
+        description="""Orchestrates the end-to-end creation of new AI agents using the Google Agent Development Kit (ADK).
     This manager understands ADK principles and guides the agent generation process from requirements elicitation
     through planning, coding, and QA, incorporating user feedback at each major step.""",
-    instruction="""You are the Main Manager Agent, an expert orchestrator for building new AI agents using the Google Agent Development Kit (ADK).
+        instruction="""You are the Main Manager Agent, an expert orchestrator for building new AI agents using the Google Agent Development Kit (ADK).
     Your primary responsibility is to oversee a sophisticated, multi-stage process that transforms a user's request into a deployable ADK-based AI agent,
     actively involving the user for feedback and approval throughout the lifecycle. You will maintain and update a status of key artifacts as they are produced.
 
@@ -97,20 +103,25 @@ root_agent = Agent(
 
     Ensure all interactions and outputs are consistent with the goal of generating robust, well-structured, and user-validated ADK agent code.
     """,
-    tools=[
-        agent_tool.AgentTool(agent=requirements_agent),
-        agent_tool.AgentTool(agent=planning_agent),
-        # agent_tool.AgentTool(agent=project_initializer_agent),
-        # agent_tool.AgentTool(agent=tools_coding_engine_loop_agent),
-        # agent_tool.AgentTool(agent=agents_coding_engine_loop_agent),
-        # agent_tool.AgentTool(agent=conversational_qa_engine_loop_agent),
-    ],
-    sub_agents=[
-        requirements_agent,
-        planning_agent,
-        # project_initializer_agent,
-        # tools_coding_engine_loop_agent,
-        # agents_coding_engine_loop_agent,
-        # conversational_qa_engine_loop_agent,
-    ],
-)
+        tools=[
+            agent_tool.AgentTool(agent=requirements_agent),
+            # The planning loop ends with a bookkeeping event; the plan is
+            # read from state.
+            StateResultAgentTool(agent=planning_agent, result_key="planning_document"),
+            # agent_tool.AgentTool(agent=project_initializer_agent),
+            # agent_tool.AgentTool(agent=tools_coding_engine_loop_agent),
+            # agent_tool.AgentTool(agent=agents_coding_engine_loop_agent),
+            # agent_tool.AgentTool(agent=conversational_qa_engine_loop_agent),
+        ],
+        sub_agents=[
+            requirements_agent,
+            planning_agent,
+            # project_initializer_agent,
+            # tools_coding_engine_loop_agent,
+            # agents_coding_engine_loop_agent,
+            # conversational_qa_engine_loop_agent,
+        ],
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="MainManagerAgent")
@@ -1,24 +1,119 @@
-from google.adk.agents import Agent, LoopAgent, SequentialAgent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.tools import FunctionTool, ToolContext, agent_tool, google_search
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Mapping, Optional
 
-from config import get_settings
+from agent_registry import get_agent, lazy_agents, register_agent
+from config import CriticMode, SearchBackendType, get_settings
 
-settings = get_settings()
+if TYPE_CHECKING:
+    from google.adk.agents import Agent
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.tools import ToolContext
 
+    from workflows.context import IncrementalContext
 
-def exit_loop(tool_context: ToolContext):
+
+def exit_loop(tool_context: "ToolContext"):
     """Call this function ONLY when the critique indicates no further changes are needed, signaling the iterative process should end."""
     print(f"  [Tool Call] exit_loop triggered by {tool_context.agent_name}")
     tool_context.actions.escalate = True  # Escalation signals the LoopAgent to exit
     return "Exiting refinement loop as plan is considered complete."
 
 
-requirements_agent = Agent(
-    model=LiteLlm(model=settings.MODEL_GPT_4O),
-    name="RequirementsAgent",
-    description="Elicits detailed functional and non-functional requirements from the user for the AI agent to be built. Engages in a dialogue to clarify needs and constraints.",
-    instruction="""You are the Requirements Agent. Your goal is to have a detailed conversation with the user to understand exactly what kind of AI agent they want to build using the Google Agent Development Kit (ADK).
+@lru_cache()
+def get_planning_context() -> Optional["IncrementalContext"]:
+    """Returns the planning loop's context compactor, or None when disabled."""
+    from workflows.context import IncrementalContext
+
+    settings = get_settings()
+    if not settings.PLANNING_CONTEXT_COMPACTION_ENABLED:
+        return None
+    return IncrementalContext(
+        document_key="planning_document",
+        reference_key="requirements_document",
+        feedback_key="criticism",
+        document_context_key="plan_context",
+        reference_context_key="requirements_context",
+        max_change_ratio=settings.PLANNING_CONTEXT_MAX_CHANGE_RATIO,
+        summary_chars=settings.PLANNING_CONTEXT_SUMMARY_CHARS,
+        state_key="planning_context",
+        report_key="planning_context_report",
+    )
+
+
+def _document_placeholders() -> tuple[str, str]:
+    """Returns the state placeholders for the requirements and the plan."""
+    context = get_planning_context()
+    if context is None:
+        return "{requirements_document}", "{planning_document}"
+    return (
+        f"{{{context.reference_context_key}}}",
+        f"{{{context.document_context_key}}}",
+    )
+
+
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+\.)\s+(.+)")
+
+
+def _search_tool():
+    """Returns the search tool selected by `SEARCH_BACKEND`."""
+    if get_settings().SEARCH_BACKEND == SearchBackendType.HTTP:
+        from tools.search import search_web
+
+        return search_web
+    from google.adk.tools import google_search
+
+    return google_search
+
+
+def prefetch_queries(requirements: str, base: list[str], limit: int) -> list[str]:
+    """Returns the searches the planner is likely to make for `requirements`.
+
+    These are `base` followed by an MCP server query for every item listed
+    in the requirements' tools and integrations sections.
+    """
+    from workflows.context import split_sections
+
+    queries = list(base)
+    for section in split_sections(requirements):
+        title = section.title.casefold()
+        if "tool" not in title and "integration" not in title:
+            continue
+        for line in section.text.splitlines()[1:]:
+            item = _LIST_ITEM_RE.match(line)
+            if item:
+                name = re.split(r"[:(]", item.group(1).replace("*", ""), 1)[0]
+                if name.split():
+                    queries.append("MCP server for " + " ".join(name.split()[:6]))
+    return list(dict.fromkeys(queries))[:limit]
+
+
+def prefetch_planning_searches(callback_context: "CallbackContext") -> None:
+    """Starts fetching the planner's likely searches into the shared cache."""
+    from tools.search_provider import get_search_provider
+
+    settings = get_settings()
+    queries = prefetch_queries(
+        str(callback_context.state.get("requirements_document") or ""),
+        settings.SEARCH_PREFETCH_QUERIES,
+        settings.SEARCH_PREFETCH_MAX_QUERIES,
+    )
+    if queries:
+        get_search_provider().prefetch_in_background(queries)
+    return None
+
+
+@register_agent("RequirementsAgent")
+def build_requirements_agent():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+
+    return Agent(
+        model=build_model(get_settings().MODEL_GPT_4O, agent_name="RequirementsAgent"),
+        name="RequirementsAgent",
+        description="Elicits detailed functional and non-functional requirements from the user for the AI agent to be built. Engages in a dialogue to clarify needs and constraints.",
+        instruction="""You are the Requirements Agent. Your goal is to have a detailed conversation with the user to understand exactly what kind of AI agent they want to build using the Google Agent Development Kit (ADK).
 
     Focus on:
     1.  **Core Functionality:** What are the primary tasks the agent should perform?
@@ -32,16 +127,22 @@ requirements_agent = Agent(
     Ask clarifying questions. Be thorough. Your final output should be a comprehensive 'requirements_document' that clearly outlines all gathered information, structured in a way that the PlannerAgent can use it to design the agent.
     Confirm with the user that your understanding, as captured in the 'requirements_document', is complete and accurate before concluding.
     """,
-    output_key="requirements_document",
-)
+        output_key="requirements_document",
+    )
 
-planner_agent = Agent(  # This is the initial planner
-    model="gemini-2.5-pro-preview-05-06",
-    name="PlannerAgent",
-    description="Generates an initial comprehensive agent development plan based on the provided requirements document. This plan outlines the agent's architecture, ADK components, tools (prioritizing MCP tools), and overall structure.",
-    instruction="""You are the Planner Agent. Your task is to create a detailed 'agent_plan_document' based on the 'requirements_document' provided.
-    The 'requirements_document' is:
-    {{requirements_document}}
+
+@register_agent("PlannerAgent")
+def build_planner_agent():
+    from llm.models import build_model
+    from llm.prefix_cache import cacheable_instruction
+    from workflows.artifacts import output_agent_class
+
+    return output_agent_class()(  # This is the initial planner
+        model=build_model("gemini-2.5-pro-preview-05-06", agent_name="PlannerAgent"),
+        name="PlannerAgent",
+        description="Generates an initial comprehensive agent development plan based on the provided requirements document. This plan outlines the agent's architecture, ADK components, tools (prioritizing MCP tools), and overall structure.",
+        instruction=cacheable_instruction(
+            """You are the Planner Agent. Your task is to create a detailed 'agent_plan_document' based on the 'requirements_document' provided.
 
     Your 'agent_plan_document' must be comprehensive and cover the following aspects, keeping Google ADK best practices in mind:
     1.  **Agent Name & Description:** A clear name and high-level description for the new agent.
@@ -66,22 +167,39 @@ planner_agent = Agent(  # This is the initial planner
 
     Your output must be the 'planning_document'. Use Google Search extensively to find MCP tools before resorting to custom tool definitions.
     """,
-    output_key="planning_document",
-    tools=[google_search],
-)
+            """The 'requirements_document' is:
+    {{requirements_document}}
+    """,
+        ),
+        output_key="planning_document",
+        tools=[_search_tool()],
+        before_agent_callback=(
+            prefetch_planning_searches
+            if get_settings().SEARCH_BACKEND == SearchBackendType.HTTP
+            else None
+        ),
+    )
 
 
-plan_critic_agent = Agent(
-    model="gemini-2.5-flash-preview-05-20",
-    name="PlanCriticAgent",
-    description="Critically evaluates an agent plan against the original requirements, identifying potential issues, gaps, inconsistencies, or areas for improvement. Specifically checks if MCP tools were prioritized.",
-    instruction="""You are the Plan Critic Agent. Your role is to meticulously review the 'planning_document' against the original 'requirements_document' and provide constructive criticism.
+@register_agent("PlanCriticAgent")
+def build_plan_critic_agent():
+    from google.adk.agents import Agent
 
-    The 'requirements_document' is:
-    {{requirements_document}}
+    from llm.models import build_model
+    from llm.prefix_cache import cacheable_instruction
+    from workflows.artifacts import state_instruction
 
-    The 'planning_document' to review is:
-    {{planning_document}}
+    requirements, plan = _document_placeholders()
+    context = get_planning_context()
+    return Agent(
+        model=build_model(
+            "gemini-2.5-flash-preview-05-20", agent_name="PlanCriticAgent"
+        ),
+        name="PlanCriticAgent",
+        description="Critically evaluates an agent plan against the original requirements, identifying potential issues, gaps, inconsistencies, or areas for improvement. Specifically checks if MCP tools were prioritized.",
+        instruction=state_instruction(
+            cacheable_instruction(
+                """You are the Plan Critic Agent. Your role is to meticulously review the 'planning_document' against the original 'requirements_document' and provide constructive criticism.
 
     Your critique should focus on:
     1.  **MCP Tool Prioritization:** CRITICAL: Did the planner adequately search for and prioritize MCP (Managed Component Platform) tools before suggesting custom tools? If custom tools are proposed, is there a justification for why an MCP tool couldn't be used?
@@ -96,24 +214,147 @@ plan_critic_agent = Agent(
     Your output must be a 'criticism' document. Be specific in your feedback. If there are no issues and the plan is excellent (especially regarding MCP tool usage), clearly state that no changes are needed.
     Use Google Search if you need to verify ADK best practices or alternative approaches, including the availability of MCP tools.
     """,
-    tools=[google_search],
-    output_key="criticism",
-)
+                f"""The 'requirements_document' is:
+    {requirements}
 
-plan_refiner_agent = Agent(
-    model="gemini-2.5-pro-preview-05-06",
-    name="PlanRefinerAgent",
-    description="Refines an agent plan based on provided criticism, aiming to address all identified issues and improve the plan's quality and alignment with requirements, with special attention to MCP tool prioritization. Can decide to exit the refinement loop if the plan is deemed satisfactory.",
-    instruction="""You are the Plan Refiner Agent. Your task is to revise and improve the 'planning_document' based on the 'criticism' it received, ensuring it aligns perfectly with the 'requirements_document'. Pay close attention to feedback regarding MCP tool usage.
+    The 'planning_document' to review is:
+    {plan}
+    """,
+            )
+        ),
+        tools=[_search_tool()],
+        output_key="criticism",
+        before_agent_callback=context.before_review if context else None,
+        after_agent_callback=context.after_review if context else None,
+    )
 
-    The original 'requirements_document' is:
-    {{requirements_document}}
 
-    The 'planning_document' to refine is:
-    {{planning_document}}
+# --- Parallel critic panel ---
+# Splits the eight criteria above across narrower critics that run concurrently.
+# Their outputs are merged, in a fixed order, into the same 'criticism' key.
+CRITIC_DIMENSIONS = [
+    (
+        "MCPToolCritic",
+        "MCP Tool Prioritization & Tool Definitions",
+        """1.  **MCP Tool Prioritization:** CRITICAL: Did the planner adequately search for and prioritize MCP (Managed Component Platform) tools before suggesting custom tools? If custom tools are proposed, is there a justification for why an MCP tool couldn't be used?
+    2.  **Tool Definitions:** If custom tools are proposed, are their descriptions and intended functionalities clear and sufficient for a developer to implement them?""",
+        True,
+    ),
+    (
+        "CoverageCritic",
+        "Completeness & Clarity",
+        """1.  **Completeness:** Does the plan address all aspects of the requirements? Are there any missing functionalities or features?
+    2.  **Clarity & Ambiguity:** Is the plan clear and unambiguous? Are there parts that could be misinterpreted?""",
+        False,
+    ),
+    (
+        "ArchitectureCritic",
+        "Correctness & Feasibility",
+        """1.  **Correctness:** Is the proposed architecture suitable for the requirements? Are the ADK components (agent types, tools) chosen appropriately?
+    2.  **Feasibility:** Is the plan realistic to implement with ADK? Are there any overly complex or impractical suggestions?""",
+        False,
+    ),
+    (
+        "ADKPracticesCritic",
+        "Efficiency & ADK Alignment",
+        """1.  **Efficiency/Best Practices:** Does the plan follow ADK best practices? Are there more efficient ways to achieve the same goals?
+    2.  **Alignment with ADK Capabilities:** Does the plan leverage ADK features effectively?""",
+        True,
+    ),
+]
 
-    The 'criticism' received is:
-    {{criticism}}
+
+def _dimension_critic(
+    name: str, title: str, criteria: str, uses_search: bool
+) -> "Agent":
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from llm.prefix_cache import cacheable_instruction
+    from workflows.artifacts import state_instruction
+    from workflows.merge import NO_CHANGES_NEEDED
+
+    requirements, plan = _document_placeholders()
+    return Agent(
+        model=build_model("gemini-2.5-flash-preview-05-20", agent_name=name),
+        name=name,
+        description=f"Reviews an agent plan for {title} only, as one member of the plan critic panel.",
+        instruction=state_instruction(
+            cacheable_instruction(
+                f"""You are a member of the Plan Critic panel responsible for **{title}**. Review the 'planning_document' against the original 'requirements_document' ONLY for the criteria below; other reviewers cover everything else.
+
+    Your criteria:
+    {criteria}
+
+    Be specific and concise: output a bulleted list of issues for your criteria only.
+    If you find no issues for your criteria, respond with exactly: "{NO_CHANGES_NEEDED}"
+    """,
+                f"""The 'requirements_document' is:
+    {requirements}
+
+    The 'planning_document' to review is:
+    {plan}
+    """,
+            )
+        ),
+        tools=[_search_tool()] if uses_search else [],
+        output_key=f"criticism_{name}",
+    )
+
+
+@register_agent("PlanCriticPanel")
+def build_plan_critic_panel():
+    from google.adk.agents import ParallelAgent, SequentialAgent
+
+    from workflows.merge import CritiqueMergeAgent
+
+    context = get_planning_context()
+    merger = CritiqueMergeAgent(
+        name="PlanCritiqueMerger",
+        sections={
+            f"criticism_{name}": title for name, title, _, _ in CRITIC_DIMENSIONS
+        },
+        output_key="criticism",
+    )
+    return SequentialAgent(
+        name="PlanCriticPanel",
+        description="Reviews the plan with parallel per-dimension critics and merges their findings into a single 'criticism'.",
+        sub_agents=[
+            ParallelAgent(
+                name="PlanCriticFanOut",
+                sub_agents=[
+                    _dimension_critic(name, title, criteria, uses_search)
+                    for name, title, criteria, uses_search in CRITIC_DIMENSIONS
+                ],
+            ),
+            merger,
+        ],
+        before_agent_callback=(
+            [merger.clear_sections, context.before_review]
+            if context
+            else merger.clear_sections
+        ),
+        after_agent_callback=context.after_review if context else None,
+    )
+
+
+@register_agent("PlanRefinerAgent")
+def build_plan_refiner_agent():
+    from llm.models import build_model
+    from llm.prefix_cache import cacheable_instruction
+    from workflows.artifacts import output_agent_class, state_instruction
+
+    requirements, plan = _document_placeholders()
+    context = get_planning_context()
+    return output_agent_class()(
+        model=build_model(
+            "gemini-2.5-pro-preview-05-06", agent_name="PlanRefinerAgent"
+        ),
+        name="PlanRefinerAgent",
+        description="Refines an agent plan based on provided criticism, aiming to address all identified issues and improve the plan's quality and alignment with requirements, with special attention to MCP tool prioritization. Can decide to exit the refinement loop if the plan is deemed satisfactory.",
+        instruction=state_instruction(
+            cacheable_instruction(
+                """You are the Plan Refiner Agent. Your task is to revise and improve the 'planning_document' based on the 'criticism' it received, ensuring it aligns perfectly with the 'requirements_document'. Pay close attention to feedback regarding MCP tool usage.
 
     Your goal is to produce an updated 'planning_document'.
     1.  **Address all points in the 'criticism'**: Systematically go through each piece of feedback and modify the plan accordingly. If the criticism points out a lack of MCP tool consideration, actively use Google Search to find suitable MCP tools before proposing custom ones.
@@ -127,17 +368,104 @@ plan_refiner_agent = Agent(
     Use Google Search extensively to find MCP tools if indicated by the criticism or if you identify opportunities to replace custom tools with MCP alternatives.
     Your output is the refined 'planning_document'. If you call `exit_loop`, that will be your primary action and you should return a message indicating this.
     """,
-    tools=[google_search, exit_loop],
-    output_key="planning_document",
-)
+                f"""The original 'requirements_document' is:
+    {requirements}
 
+    The 'planning_document' to refine is:
+    {plan}
+
+    The 'criticism' received is:
+    {{criticism}}
+    """,
+            )
+        ),
+        tools=[_search_tool(), exit_loop],
+        output_key="planning_document",
+        before_agent_callback=context.before_refine if context else None,
+        after_model_callback=context.merge_revision if context else None,
+    )
+
+
+def plan_critic_stage_name() -> str:
+    """Returns the name of the critic stage selected by `PLAN_CRITIC_MODE`."""
+    if get_settings().PLAN_CRITIC_MODE == CriticMode.PARALLEL:
+        return "PlanCriticPanel"
+    return "PlanCriticAgent"
+
+
+@register_agent("PlanningRefinementLoop")
+def build_planning_loop_agent():
+    from workflows.convergence import ConvergenceLoopAgent
+
+    settings = get_settings()
+    return ConvergenceLoopAgent(
+        name="PlanningRefinementLoop",
+        sub_agents=[get_agent(plan_critic_stage_name()), get_agent("PlanRefinerAgent")],
+        document_key="planning_document",
+        feedback_key="criticism",
+        max_iterations=settings.PLANNING_LOOP_MAX_ITERATIONS,
+        min_change_ratio=settings.PLANNING_LOOP_MIN_CHANGE_RATIO,
+        min_feedback_novelty=settings.PLANNING_LOOP_MIN_CRITICISM_NOVELTY,
+        max_seconds=settings.PLANNING_LOOP_MAX_SECONDS,
+        max_tokens=settings.PLANNING_LOOP_MAX_TOKENS,
+        report_key="planning_loop_report",
+    )
 
-planning_loop_agent = LoopAgent(
-    name="PlanningRefinementLoop", sub_agents=[plan_critic_agent, plan_refiner_agent]
-)
 
-planning_agent = SequentialAgent(
-    name="PlanningAgent",
-    description="Orchestrates the overall agent planning process, including initial plan generation and iterative refinement based on criticism (with a focus on MCP tool prioritization), using the requirements provided.",
-    sub_agents=[planner_agent, planning_loop_agent],
+def missing_requirements(state: Mapping[str, Any]) -> bool:
+    """True when there is no requirements document to plan from."""
+    return not str(state.get("requirements_document") or "").strip()
+
+
+@register_agent("PlanningAgent")
+def build_planning_agent():
+    from google.adk.agents import SequentialAgent
+
+    description = "Orchestrates the overall agent planning process, including initial plan generation and iterative refinement based on criticism (with a focus on MCP tool prioritization), using the requirements provided."
+    stages = [get_agent("PlannerAgent"), get_agent("PlanningRefinementLoop")]
+    if not get_settings().WORKFLOW_GATES_ENABLED:
+        return SequentialAgent(
+            name="PlanningAgent", description=description, sub_agents=stages
+        )
+
+    from sessions.artifacts import resolve
+    from workflows.gated import Gate, GatedSequentialAgent
+
+    # Re-invoking the planner with the same requirements and request reuses
+    # the refined plan instead of planning and refining it again.
+    return GatedSequentialAgent(
+        name="PlanningAgent",
+        description=description,
+        sub_agents=stages,
+        gates={
+            "PlannerAgent": Gate(
+                stop_if=missing_requirements, unchanged=("requirements_document",)
+            ),
+            "PlanningRefinementLoop": Gate(
+                unchanged=("requirements_document",),
+                done_key="planning_loop_report",
+                skip_output=lambda state: str(
+                    resolve(state.get("planning_document")) or ""
+                ),
+            ),
+        },
+        report_key="planning_gates",
+    )
+
+
+_lazy_agents = lazy_agents(
+    __name__,
+    requirements_agent="RequirementsAgent",
+    planner_agent="PlannerAgent",
+    plan_critic_agent="PlanCriticAgent",
+    plan_critic_panel="PlanCriticPanel",
+    plan_refiner_agent="PlanRefinerAgent",
+    planning_loop_agent="PlanningRefinementLoop",
+    planning_agent="PlanningAgent",
 )
+
+
+def __getattr__(name: str):
+    if name == "plan_critic_stage":
+        return get_agent(plan_critic_stage_name())
+    return _lazy_agents(name)
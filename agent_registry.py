@@ -0,0 +1,132 @@
+"""Lazy registry of agent factories.
+
+Agents are declared as factories with `register_agent` and built the first time
+they are requested. Agent modules expose their agents through a module-level
+`__getattr__` created by `lazy_agents`, so `import coding_agent.agent` stays
+cheap while `coding_agent.agent.root_agent` (as used by `adk web`) builds the
+agent tree on first access. With `TELEMETRY_ENABLED`, every built agent is
+instrumented before it is returned.
+"""
+
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+
+logger = logging.getLogger(__name__)
+
+AgentFactory = Callable[[], "BaseAgent"]
+
+
+class AgentRegistry:
+    """Maps agent names to factories and caches the built agents."""
+
+    def __init__(self):
+        self._factories: dict[str, AgentFactory] = {}
+        self._agents: dict[str, "BaseAgent"] = {}
+        self._build_seconds: dict[str, float] = {}
+        # Re-entrant so that a factory can request its sub-agents.
+        self._lock = threading.RLock()
+
+    def register(
+        self, name: str, factory: Optional[AgentFactory] = None
+    ) -> Callable[[AgentFactory], AgentFactory]:
+        """Registers `factory` under `name`; usable as a decorator.
+
+        Args:
+            name (str): The agent name the factory builds.
+            factory (AgentFactory, optional): Zero-argument callable returning
+                the agent. When omitted, a decorator is returned.
+
+        Returns:
+            Callable: The decorator, or the factory itself when given.
+        """
+
+        def decorator(func: AgentFactory) -> AgentFactory:
+            with self._lock:
+                self._factories[name] = func
+                self._agents.pop(name, None)
+            return func
+
+        return decorator(factory) if factory is not None else decorator
+
+    def get(self, name: str) -> "BaseAgent":
+        """Returns the agent registered as `name`, building it on first use."""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        with self._lock:
+            if name in self._agents:
+                return self._agents[name]
+            if name not in self._factories:
+                raise KeyError(f"No agent factory registered for '{name}'.")
+            started = time.perf_counter()
+            try:
+                agent = self._factories[name]()
+            except Exception:
+                logger.exception("❌ Could not create agent '%s'.", name)
+                raise
+            if get_settings().TELEMETRY_ENABLED:
+                from telemetry.instrument import get_instrumentation
+
+                get_instrumentation().attach(agent)
+            self._build_seconds[name] = time.perf_counter() - started
+            self._agents[name] = agent
+            logger.info(
+                "✅ Agent '%s' created using model '%s' in %.1f ms.",
+                name,
+                getattr(agent, "model", None) or type(agent).__name__,
+                self._build_seconds[name] * 1000,
+            )
+            return agent
+
+    def is_built(self, name: str) -> bool:
+        return name in self._agents
+
+    def names(self) -> list[str]:
+        return sorted(self._factories)
+
+    def build_report(self) -> dict[str, float]:
+        """Returns the build time in seconds of every agent built so far.
+
+        Times are inclusive: a parent's time contains its sub-agents' builds.
+        """
+        return dict(self._build_seconds)
+
+    def reset(self) -> None:
+        """Drops every built agent so that the next `get` rebuilds it."""
+        with self._lock:
+            self._agents.clear()
+            self._build_seconds.clear()
+
+
+registry = AgentRegistry()
+register_agent = registry.register
+get_agent = registry.get
+
+
+def lazy_agents(module_name: str, **attributes: str) -> Callable[[str], "BaseAgent"]:
+    """Builds a module `__getattr__` that resolves attributes from the registry.
+
+    Example:
+        __getattr__ = lazy_agents(__name__, root_agent="code_pipeline_agent")
+
+    Args:
+        module_name (str): The module's `__name__`, used in error messages.
+        **attributes (str): Attribute name to registered agent name.
+
+    Returns:
+        Callable: A function suitable as a module-level `__getattr__`.
+    """
+
+    def __getattr__(name: str) -> "BaseAgent":
+        if name in attributes:
+            return registry.get(attributes[name])
+        raise AttributeError(f"module '{module_name}' has no attribute '{name}'")
+
+    return __getattr__
@@ -0,0 +1,215 @@
+"""Artifact store benchmark: session state and event log size per session.
+
+Runs the code and planning pipelines against the fake model server
+(`benchmarks.fake_llm_server`), once with `ARTIFACT_STORE_ENABLED` and once
+without, and measures every session afterwards: the size of its state and of
+its event log as JSON. The scripted writer produces a module of
+`--code-lines` lines and the refactor returns it unchanged; the planner
+produces a plan of `--plan-sections` sections that the refiner returns
+unchanged, as happens when a pipeline converges. Artifact sizes are reported
+next to the session sizes, as they are stored once for all sessions, and
+`unresolved_references` counts prompts that contained a reference instead of
+its content (expected to be 0).
+
+Usage:
+    python -m benchmarks.artifacts --sessions 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.fake_llm_server import (
+    DEFAULT_SCRIPT,
+    FakeLlmServer,
+    LatencyProfile,
+    ScriptRule,
+)
+
+
+def _module(lines: int) -> str:
+    body = []
+    for index in range(max(1, lines // 4)):
+        body += [
+            f"def step_{index}(value: int) -> int:",
+            f'    """Applies step {index} to `value`."""',
+            f"    return value * {index + 2} + {index}",
+            "",
+        ]
+    return "```python\n" + "\n".join(body) + "```"
+
+
+def _plan(sections: int) -> str:
+    parts = ["# Plan"]
+    for index in range(sections):
+        parts += [
+            f"## {index + 1}. Component {index + 1}",
+            f"The agent uses component {index + 1} to answer weather questions "
+            "for any city, calls the MCP weather server and retries once on "
+            "errors before apologising to the user.",
+        ]
+    return "\n".join(parts)
+
+
+def _script(code_lines: int, plan_sections: int) -> list[ScriptRule]:
+    code, plan = _module(code_lines), _plan(plan_sections)
+    return [
+        ScriptRule(name="unresolved_reference", system=r"artifact:sha256:", reply="?"),
+        ScriptRule(name="code_writer", system=r"Python Code Generator", reply=code),
+        ScriptRule(name="code_refactor", system=r"Python Code Refactoring", reply=code),
+        ScriptRule(name="planner", system=r"You are the Planner Agent", reply=plan),
+        ScriptRule(name="plan_refiner", system=r"Plan Refiner Agent", reply=plan),
+        *DEFAULT_SCRIPT,
+    ]
+
+
+PIPELINES = {
+    "code": ("code_pipeline_agent", "Write the data processing steps.", {}),
+    "planning": (
+        "PlanningAgent",
+        "Plan the agent from the requirements.",
+        {
+            "requirements_document": (
+                "# Requirements\n1. Answer weather questions for any city."
+            )
+        },
+    ),
+}
+
+
+async def _run_sessions(name: str, sessions: int) -> list:
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    from agent_registry import get_agent
+
+    agent_name, message, state = PIPELINES[name]
+    runner = InMemoryRunner(agent=get_agent(agent_name), app_name=f"benchmark_{name}")
+    results = []
+    for _ in range(sessions):
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name,
+            user_id="benchmark",
+            session_id=uuid.uuid4().hex,
+            state=dict(state),
+        )
+        async for _ in runner.run_async(
+            user_id=session.user_id,
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+        ):
+            pass
+        results.append(
+            await runner.session_service.get_session(
+                app_name=runner.app_name, user_id=session.user_id, session_id=session.id
+            )
+        )
+    return results
+
+
+def _run_mode(enabled: bool, args: argparse.Namespace, directory: str) -> dict:
+    import agent_agent.sub_agents.planning_engine  # noqa: F401 (registers agents)
+    import coding_agent.agent  # noqa: F401
+    from agent_registry import registry
+    from config import get_settings
+    from sessions.artifacts import get_artifact_store
+
+    os.environ["ARTIFACT_STORE_ENABLED"] = str(enabled).lower()
+    os.environ["ARTIFACT_STORE_DIR"] = directory
+    get_settings.cache_clear()
+    get_artifact_store.cache_clear()
+    registry.reset()
+
+    results = {}
+    for name in args.pipeline:
+        sessions = asyncio.run(_run_sessions(name, args.sessions))
+        state_bytes = [
+            len(json.dumps(session.state, default=str)) for session in sessions
+        ]
+        event_bytes = [
+            sum(
+                len(event.model_dump_json(exclude_none=True))
+                for event in session.events
+            )
+            for session in sessions
+        ]
+        results[name] = {
+            "state_bytes_per_session": sum(state_bytes) / len(sessions),
+            "event_log_bytes_per_session": sum(event_bytes) / len(sessions),
+        }
+    results["store"] = get_artifact_store().stats.as_dict() if enabled else {}
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--pipeline", nargs="+", choices=sorted(PIPELINES), default=list(PIPELINES)
+    )
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--code-lines", type=int, default=200)
+    parser.add_argument("--plan-sections", type=int, default=20)
+    parser.add_argument(
+        "--backend", choices=["memory", "file"], default="file", help="Store backend."
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/artifacts.json")
+    )
+    args = parser.parse_args(argv)
+
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    script = _script(args.code_lines, args.plan_sections)
+    latency = LatencyProfile(5.0, 0, 0.0)
+    with (
+        FakeLlmServer(script, latency=latency) as server,
+        tempfile.TemporaryDirectory(prefix="artifacts_") as directory,
+    ):
+        os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        os.environ["ARTIFACT_STORE_BACKEND"] = args.backend
+        inline = _run_mode(False, args, directory)
+        stored = _run_mode(True, args, directory)
+        unresolved = server.stats.rules["unresolved_reference"]
+
+    pipelines = {}
+    for name in args.pipeline:
+        pipelines[name] = {"inline": inline[name], "artifacts": stored[name]}
+        for key in ("state_bytes_per_session", "event_log_bytes_per_session"):
+            before, after = inline[name][key], stored[name][key]
+            print(
+                f"{name:<9} {key:<28} inline {before:>10,.0f}  "
+                f"artifacts {after:>10,.0f}  ({1 - after / before:6.1%} smaller)"
+            )
+    store = stored["store"]
+    print(
+        f"store: {store['saves']} saves, {store['deduplicated']} deduplicated, "
+        f"{store['stored_bytes']:,} bytes stored for {store['saved_bytes']:,} "
+        f"saved; unresolved references in prompts: {unresolved}"
+    )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "config": vars(args) | {"output": str(args.output)},
+                "pipelines": pipelines,
+                "store": store,
+                "unresolved_references": unresolved,
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Code candidate benchmark: time to an accepted result, single vs. N drafts.
+
+Runs the code pipeline against the fake model server
+(`benchmarks.fake_llm_server`) with `CODE_CANDIDATES` set to each of
+`--candidates` in turn (1 is the single-writer pipeline). Every draft is weak
+with probability `--weak-rate`: it has a syntax error, so the reviewer asks
+for changes and the refactor stage has to fix it. A good draft gets a clean
+review and, with the workflow gates, skips the refactor.
+
+A session's result is accepted when the final `refactored_code` passes the
+static checks; its time to accepted result is the pipeline's wall time. For
+each setting the benchmark reports those times, the acceptance rate and the
+model requests per session, which is what the extra drafts cost.
+
+Usage:
+    python -m benchmarks.code_candidates --candidates 1 3 --sessions 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.fake_llm_server import (
+    DEFAULT_SCRIPT,
+    Conversation,
+    FakeLlmServer,
+    LatencyProfile,
+    ScriptRule,
+)
+from benchmarks.runner import percentile
+
+GOOD_CODE = (
+    "```python\ndef subtract(a: int, b: int) -> int:\n"
+    '    """Returns a minus b."""\n    return a - b\n```'
+)
+WEAK_CODE = "```python\ndef subtract(a, b)\n    return a - b\n```"
+REQUEST = "Write a function to subtract two integers."
+
+
+@dataclass
+class WeakDraftRule(ScriptRule):
+    """Matches a share `rate` of the requests its other fields match."""
+
+    rate: float = 0.5
+    seed: int = 0
+    _rng: random.Random = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def matches(self, conversation: Conversation) -> bool:
+        return super().matches(conversation) and self._rng.random() < self.rate
+
+
+def _script(weak_rate: float, seed: int) -> list[ScriptRule]:
+    return [
+        WeakDraftRule(
+            name="weak_draft",
+            system=r"Python Code Generator",
+            reply=WEAK_CODE,
+            tokens=120,
+            rate=weak_rate,
+            seed=seed,
+        ),
+        ScriptRule(
+            name="good_draft",
+            system=r"Python Code Generator",
+            reply=GOOD_CODE,
+            tokens=120,
+        ),
+        ScriptRule(
+            name="clean_review",
+            system=r"Python Code Reviewer.*def subtract\(a: int, b: int\) -> int:",
+            reply="No major issues found.",
+        ),
+        ScriptRule(
+            name="review_comments",
+            system=r"Python Code Reviewer",
+            reply="* The function definition is missing a colon.",
+            tokens=80,
+        ),
+        ScriptRule(
+            name="refactor",
+            system=r"Python Code Refactoring",
+            reply=GOOD_CODE,
+            tokens=140,
+        ),
+        *DEFAULT_SCRIPT,
+    ]
+
+
+async def _run_session(runner) -> tuple[float, bool]:
+    from google.genai import types
+
+    from sessions.artifacts import resolve
+    from workflows.static_check import check_code
+
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="benchmark", session_id=uuid.uuid4().hex
+    )
+    started = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id=session.user_id,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=REQUEST)]),
+    ):
+        pass
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    final = await runner.session_service.get_session(
+        app_name=runner.app_name, user_id=session.user_id, session_id=session.id
+    )
+    code = resolve(final.state.get("refactored_code"))
+    findings = await check_code(code)
+    return elapsed_ms, not any(finding.severity == "error" for finding in findings)
+
+
+async def _run_sessions(runner, sessions: int) -> list[tuple[float, bool]]:
+    # Warm-up session: starts the static check workers.
+    await _run_session(runner)
+    return [await _run_session(runner) for _ in range(sessions)]
+
+
+def _run_mode(server: FakeLlmServer, candidates: int, sessions: int) -> dict:
+    from google.adk.runners import InMemoryRunner
+
+    import coding_agent.agent  # noqa: F401 (registers agents)
+    from agent_registry import get_agent, registry
+    from config import get_settings
+
+    os.environ["CODE_CANDIDATES"] = str(candidates)
+    get_settings.cache_clear()
+    registry.reset()
+
+    runner = InMemoryRunner(
+        agent=get_agent("code_pipeline_agent"), app_name="benchmark_candidates"
+    )
+    before = server.stats.requests
+    results = asyncio.run(_run_sessions(runner, sessions))
+    requests = server.stats.requests - before
+    times = [elapsed for elapsed, _ in results]
+    accepted = [elapsed for elapsed, ok in results if ok]
+    result = {
+        "candidates": candidates,
+        "sessions": sessions,
+        "accepted_rate": round(len(accepted) / sessions, 3),
+        "time_to_accept_ms": {
+            f"p{q}": round(percentile(accepted, q) or 0.0, 1) for q in (50, 95)
+        },
+        "pipeline_ms": {
+            f"p{q}": round(percentile(times, q) or 0.0, 1) for q in (50, 95)
+        },
+        "requests_per_session": round(requests / (sessions + 1), 2),
+    }
+    print(
+        f"candidates {candidates:>2}  accepted {result['accepted_rate']:6.1%}  "
+        f"time to accept p50 {result['time_to_accept_ms']['p50']:8.1f} ms  "
+        f"p95 {result['time_to_accept_ms']['p95']:8.1f} ms  "
+        f"requests/session {result['requests_per_session']:5.2f}"
+    )
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", nargs="+", type=int, default=[1, 3])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--weak-rate", type=float, default=0.5)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--jitter", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/code_candidates.json")
+    )
+    args = parser.parse_args(argv)
+
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    latency = LatencyProfile(args.first_token_ms, args.tokens_per_second, args.jitter)
+    results = []
+    for candidates in args.candidates:
+        # A fresh script per setting, so every setting sees the same draws.
+        script = _script(args.weak_rate, args.seed)
+        with FakeLlmServer(script, latency=latency, seed=args.seed) as server:
+            os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+            os.environ["LLM_CACHE_ENABLED"] = "false"
+            results.append(_run_mode(server, candidates, args.sessions))
+
+    from workflows.candidates import candidate_stats
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "config": vars(args) | {"output": str(args.output)},
+                "results": results,
+                "candidate_agents": candidate_stats(),
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,738 @@
+"""Local stand-in for an OpenAI-compatible model server.
+
+The server answers `POST /v1/chat/completions` from a script of rules instead of
+a model, so agent workflows can be driven end to end without calling paid APIs.
+The first rule whose conditions match the conversation decides the reply, which
+is either text or a single tool call. Latency is simulated from a time to first
+token plus a token rate, both configurable. An optional `RateLimitProfile`
+makes it reject requests over a requests-per-minute, tokens-per-minute or
+concurrency limit with 429 and Retry-After, as hosted providers do. With
+`prefix_cache_min_tokens`, it caches prompt prefixes the way OpenAI does
+automatically, reports the cached tokens in the usage and, with
+`LatencyProfile.prefill_ms_per_1k_tokens`, answers sooner the more of the
+prompt was cached.
+
+Run it standalone and point the agents at it:
+
+    python -m benchmarks.fake_llm_server --port 8765
+    LLM_ENDPOINT_OVERRIDE=http://127.0.0.1:8765/v1 adk web
+
+or start it in-process with `FakeLlmServer` (see `benchmarks.runner`).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from benchmarks.servers import BackgroundServer
+
+# Prompt prefixes are cached in blocks of this many characters.
+_PREFIX_BLOCK_CHARS = 512
+
+_FILLER = (
+    "The implementation keeps each step small, validates its inputs and reports "
+    "errors with clear messages so that callers can recover."
+).split()
+
+
+def count_tokens(text: str) -> int:
+    """Approximates the token count of `text` (about four characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return "\n".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    return content or ""
+
+
+@dataclass
+class Conversation:
+    """The parts of a chat completion request that script rules match on."""
+
+    model: str
+    system: str
+    last_user: str
+    last_tool: Optional[str]
+    prompt_tokens: int
+
+    @classmethod
+    def from_request(cls, body: dict) -> "Conversation":
+        messages = body.get("messages") or []
+        system = "\n".join(
+            _message_text(m)
+            for m in messages
+            if m.get("role") in ("system", "developer")
+        )
+        # ADK replays other agents' turns as user messages starting with
+        # "For context:"; they are not what the user said.
+        last_user = next(
+            (
+                text
+                for text in (
+                    _message_text(m)
+                    for m in reversed(messages)
+                    if m.get("role") == "user"
+                )
+                if not text.startswith("For context:")
+            ),
+            "",
+        )
+        last_tool = None
+        if messages and messages[-1].get("role") == "tool":
+            call_id = messages[-1].get("tool_call_id")
+            for message in reversed(messages):
+                for call in message.get("tool_calls") or []:
+                    if call.get("id") == call_id:
+                        last_tool = call["function"]["name"]
+                        break
+                if last_tool:
+                    break
+        prompt = json.dumps(messages) + json.dumps(body.get("tools") or [])
+        return cls(
+            model=body.get("model", ""),
+            system=system,
+            last_user=last_user,
+            last_tool=last_tool,
+            prompt_tokens=count_tokens(prompt),
+        )
+
+
+@dataclass
+class ScriptRule:
+    """One scripted reply.
+
+    Attributes:
+        name: Label used in the server statistics.
+        system: Regex searched in the system instruction.
+        last_message: Regex searched in the latest message from the user.
+        after_tool: Matches only when the latest message is the result of this
+            tool; "*" matches any tool result and "" only non-tool messages.
+        model: Regex matched against the requested model name.
+        reply: Text of the reply.
+        tool_call: Tool call to return instead of text, as
+            `{"name": ..., "arguments": {...}}`.
+        tokens: Pad the text reply with filler to this many tokens.
+    """
+
+    name: str = ""
+    system: Optional[str] = None
+    last_message: Optional[str] = None
+    after_tool: Optional[str] = None
+    model: Optional[str] = None
+    reply: str = ""
+    tool_call: Optional[dict] = None
+    tokens: Optional[int] = None
+
+    def matches(self, conversation: Conversation) -> bool:
+        if self.model and not re.search(self.model, conversation.model):
+            return False
+        if self.system and not re.search(self.system, conversation.system, re.S):
+            return False
+        if self.last_message and not re.search(
+            self.last_message, conversation.last_user, re.I | re.S
+        ):
+            return False
+        if self.after_tool is not None:
+            if self.after_tool == "":
+                return conversation.last_tool is None
+            if self.after_tool == "*":
+                return conversation.last_tool is not None
+            return conversation.last_tool == self.after_tool
+        return True
+
+    def text(self) -> str:
+        if not self.tokens or count_tokens(self.reply) >= self.tokens:
+            return self.reply
+        words = [self.reply] if self.reply else []
+        index = 0
+        while count_tokens(" ".join(words)) < self.tokens:
+            words.append(_FILLER[index % len(_FILLER)])
+            index += 1
+        return " ".join(words)
+
+
+# Rules covering the agents driven by `benchmarks.runner`.
+DEFAULT_SCRIPT = [
+    # coding_agent
+    ScriptRule(
+        name="code_writer",
+        system=r"Python Code Generator",
+        reply="```python\ndef add(a: int, b: int) -> int:\n    return a + b\n```",
+        tokens=120,
+    ),
+    ScriptRule(
+        name="code_reviewer",
+        system=r"Python Code Reviewer",
+        reply="* Add a docstring.\n* Add type checks for non-integer input.",
+        tokens=80,
+    ),
+    ScriptRule(
+        name="code_refactor",
+        system=r"Python Code Refactoring",
+        reply='```python\ndef add(a: int, b: int) -> int:\n    """Adds two integers."""\n    return a + b\n```',
+        tokens=140,
+    ),
+    # agent_agent
+    ScriptRule(
+        name="manager_done",
+        system=r"Main Manager Agent",
+        after_tool="PlanningAgent",
+        reply="Stage 1 complete: the agent plan is ready for your review.",
+        tokens=60,
+    ),
+    ScriptRule(
+        name="manager_plan",
+        system=r"Main Manager Agent",
+        after_tool="RequirementsAgent",
+        tool_call={
+            "name": "PlanningAgent",
+            "arguments": {"request": "Plan the agent from the requirements."},
+        },
+    ),
+    ScriptRule(
+        name="manager_requirements",
+        system=r"Main Manager Agent",
+        tool_call={
+            "name": "RequirementsAgent",
+            "arguments": {"request": "Collect requirements for the requested agent."},
+        },
+    ),
+    ScriptRule(
+        name="requirements",
+        system=r"You are the Requirements Agent",
+        reply="# Requirements\n1. Answer weather questions for any city.\n2. Use an MCP weather tool.",
+        tokens=200,
+    ),
+    ScriptRule(
+        name="planner",
+        system=r"You are the Planner Agent",
+        reply="# Plan\n* Agent: WeatherAgent (LlmAgent)\n* Tools: MCP weather server",
+        tokens=400,
+    ),
+    ScriptRule(
+        name="plan_critic",
+        system=r"Plan Critic",
+        reply="* Name the MCP weather server explicitly.\n* Describe error handling.",
+        tokens=80,
+    ),
+    ScriptRule(
+        name="plan_refiner",
+        system=r"Plan Refiner Agent",
+        reply="# Plan\n* Agent: WeatherAgent (LlmAgent)\n* Tools: MCP weather server (mcp-weather)\n* Errors: retry once, then apologise",
+        tokens=420,
+    ),
+    # test_weather_multi_agent
+    ScriptRule(
+        name="greeting_reply",
+        system=r"Greeting Agent",
+        after_tool="say_hello",
+        reply="Hello there! How can I help you today?",
+    ),
+    ScriptRule(
+        name="greeting_to_weather",
+        system=r"Greeting Agent",
+        last_message=r"\bweather\b",
+        tool_call={
+            "name": "transfer_to_agent",
+            "arguments": {"agent_name": "weather_agent_v2"},
+        },
+    ),
+    ScriptRule(
+        name="greeting_to_farewell",
+        system=r"Greeting Agent",
+        last_message=r"\b(bye|goodbye|see you)\b",
+        tool_call={
+            "name": "transfer_to_agent",
+            "arguments": {"agent_name": "farewell_agent"},
+        },
+    ),
+    ScriptRule(
+        name="greeting_tool",
+        system=r"Greeting Agent",
+        tool_call={"name": "say_hello", "arguments": {"name": "Alex"}},
+    ),
+    ScriptRule(
+        name="farewell_reply",
+        system=r"Farewell Agent",
+        after_tool="say_goodbye",
+        reply="Goodbye! Have a great day.",
+    ),
+    ScriptRule(
+        name="farewell_tool",
+        system=r"Farewell Agent",
+        tool_call={"name": "say_goodbye", "arguments": {}},
+    ),
+    ScriptRule(
+        name="weather_reply",
+        system=r"main Weather Agent",
+        after_tool="get_weather",
+        reply="It's cloudy in London with a temperature of 15°C.",
+    ),
+    ScriptRule(
+        name="weather_many_reply",
+        system=r"main Weather Agent",
+        after_tool="get_weather_many",
+        reply="London is cloudy at 15°C and Tokyo has light rain at 18°C.",
+    ),
+    ScriptRule(
+        name="weather_greeting",
+        system=r"main Weather Agent",
+        last_message=r"\b(hi|hello|hey)\b",
+        tool_call={
+            "name": "transfer_to_agent",
+            "arguments": {"agent_name": "greeting_agent"},
+        },
+    ),
+    ScriptRule(
+        name="weather_farewell",
+        system=r"main Weather Agent",
+        last_message=r"\b(bye|goodbye|see you)\b",
+        tool_call={
+            "name": "transfer_to_agent",
+            "arguments": {"agent_name": "farewell_agent"},
+        },
+    ),
+    ScriptRule(
+        name="weather_many_tool",
+        system=r"main Weather Agent",
+        last_message=r"\band\b",
+        tool_call={
+            "name": "get_weather_many",
+            "arguments": {"cities": ["London", "Tokyo"]},
+        },
+    ),
+    ScriptRule(
+        name="weather_tool",
+        system=r"main Weather Agent",
+        tool_call={"name": "get_weather", "arguments": {"city": "London"}},
+    ),
+    ScriptRule(name="fallback", reply="OK.", tokens=40),
+]
+
+
+def load_script(path: Path) -> list[ScriptRule]:
+    """Loads script rules from a JSON file holding a list of rule objects."""
+    return [ScriptRule(**rule) for rule in json.loads(path.read_text())]
+
+
+@dataclass
+class LatencyProfile:
+    """Simulated model latency.
+
+    Attributes:
+        first_token_ms: Delay before the first token.
+        tokens_per_second: Generation rate for the remaining tokens; 0 disables
+            the per-token delay.
+        jitter: Relative random variation applied to both delays.
+        slow_fraction: Share of requests whose first token takes
+            `slow_first_token_ms` instead, for a heavy latency tail.
+        slow_first_token_ms: Delay before the first token of a slow request.
+        prefill_ms_per_1k_tokens: Extra delay before the first token per 1,000
+            prompt tokens that were not served from the prefix cache.
+    """
+
+    first_token_ms: float = 200.0
+    tokens_per_second: float = 100.0
+    jitter: float = 0.1
+    slow_fraction: float = 0.0
+    slow_first_token_ms: float = 0.0
+    prefill_ms_per_1k_tokens: float = 0.0
+
+    def _vary(self, seconds: float, rng: random.Random) -> float:
+        if not self.jitter:
+            return seconds
+        return max(0.0, seconds * rng.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def first_token_seconds(self, rng: random.Random) -> float:
+        if self.slow_fraction and rng.random() < self.slow_fraction:
+            return self._vary(self.slow_first_token_ms / 1000, rng)
+        return self._vary(self.first_token_ms / 1000, rng)
+
+    def prefill_seconds(self, tokens: int, rng: random.Random) -> float:
+        return self._vary(tokens * self.prefill_ms_per_1k_tokens / 1e6, rng)
+
+    def token_seconds(self, tokens: int, rng: random.Random) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return self._vary(tokens / self.tokens_per_second, rng)
+
+
+@dataclass
+class RateLimitProfile:
+    """Simulated provider rate limits; `None` disables a limit.
+
+    Attributes:
+        rpm: Requests accepted in any 60-second window.
+        tpm: Tokens (prompt plus completion) accepted in any 60-second window.
+        max_concurrency: Requests answered at the same time.
+        overload_ms: Extra latency per request already in flight, so that
+            latency rises with load.
+    """
+
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    overload_ms: float = 0.0
+
+
+@dataclass
+class ServerStats:
+    """Request counters of a running server."""
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    first_token_seconds: float = 0.0
+    simulated_seconds: float = 0.0
+    rate_limited: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    rules: Counter = field(default_factory=Counter)
+    clients: set = field(default_factory=set)
+
+    @property
+    def connections(self) -> int:
+        """Distinct client addresses seen, i.e. TCP connections opened to the server."""
+        return len(self.clients)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "first_token_seconds": round(self.first_token_seconds, 3),
+            "simulated_seconds": round(self.simulated_seconds, 3),
+            "rate_limited": self.rate_limited,
+            "max_in_flight": self.max_in_flight,
+            "connections": self.connections,
+            "rules": dict(self.rules),
+        }
+
+
+def create_app(
+    script: Optional[list[ScriptRule]] = None,
+    latency: Optional[LatencyProfile] = None,
+    seed: Optional[int] = None,
+    rate_limits: Optional[RateLimitProfile] = None,
+    prefix_cache_min_tokens: Optional[int] = None,
+) -> Starlette:
+    """Builds the ASGI app of the fake model server.
+
+    Args:
+        script (list[ScriptRule], optional): Rules tried in order. Defaults to
+            `DEFAULT_SCRIPT`.
+        latency (LatencyProfile, optional): Simulated latency.
+        seed (int, optional): Seed for the latency jitter.
+        rate_limits (RateLimitProfile, optional): Simulated rate limits.
+        prefix_cache_min_tokens (int, optional): Cache the prefixes of prompts
+            of at least this many tokens; None disables the prefix cache.
+
+    Returns:
+        Starlette: The app; its statistics are available as `app.state.stats`.
+    """
+    script = script if script is not None else DEFAULT_SCRIPT
+    latency = latency or LatencyProfile()
+    rng = random.Random(seed)
+    stats = ServerStats()
+    rate_limits = rate_limits or RateLimitProfile()
+    window: deque[tuple[float, int]] = deque()
+    prefixes: set[str] = set()
+
+    def cached_tokens(body: dict) -> int:
+        # Tools come first, then the messages, as in the providers' prompts.
+        prompt = json.dumps(body.get("tools") or []) + json.dumps(
+            body.get("messages") or []
+        )
+        if prefix_cache_min_tokens is None or (
+            count_tokens(prompt) < prefix_cache_min_tokens
+        ):
+            return 0
+        digest = hashlib.sha256()
+        cached = 0
+        for end in range(_PREFIX_BLOCK_CHARS, len(prompt) + 1, _PREFIX_BLOCK_CHARS):
+            digest.update(prompt[end - _PREFIX_BLOCK_CHARS : end].encode("utf-8"))
+            key = digest.hexdigest()
+            if cached == end - _PREFIX_BLOCK_CHARS and key in prefixes:
+                cached = end
+            prefixes.add(key)
+        return count_tokens(prompt[:cached])
+
+    def throttle(tokens: int) -> Optional[JSONResponse]:
+        now = time.monotonic()
+        while window and window[0][0] <= now - 60:
+            window.popleft()
+        if rate_limits.max_concurrency is not None and (
+            stats.in_flight >= rate_limits.max_concurrency
+        ):
+            kind = "concurrency"
+        elif rate_limits.rpm is not None and len(window) >= rate_limits.rpm:
+            kind = "requests"
+        elif rate_limits.tpm is not None and (
+            sum(used for _, used in window) + tokens > rate_limits.tpm
+        ):
+            kind = "tokens"
+        else:
+            window.append((now, tokens))
+            return None
+        if kind == "concurrency":
+            retry_after = 1.0
+        else:
+            retry_after = window[0][0] + 60 - now if window else 60.0
+        stats.rate_limited += 1
+        return JSONResponse(
+            {
+                "error": {
+                    "message": f"Rate limit reached for {kind}.",
+                    "type": kind,
+                    "code": "rate_limit_exceeded",
+                }
+            },
+            status_code=429,
+            headers={"retry-after": str(max(1, round(retry_after)))},
+        )
+
+    def choose(conversation: Conversation) -> ScriptRule:
+        return next(
+            (rule for rule in script if rule.matches(conversation)),
+            ScriptRule(name="unmatched", reply="OK."),
+        )
+
+    def message_for(rule: ScriptRule) -> tuple[dict, str, int]:
+        if rule.tool_call:
+            arguments = json.dumps(rule.tool_call.get("arguments", {}))
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{uuid.uuid4().hex[:24]}",
+                        "type": "function",
+                        "function": {
+                            "name": rule.tool_call["name"],
+                            "arguments": arguments,
+                        },
+                    }
+                ],
+            }
+            return message, "tool_calls", count_tokens(arguments) + 5
+        text = rule.text()
+        return {"role": "assistant", "content": text}, "stop", count_tokens(text)
+
+    async def chat_completions(request: Request):
+        stats.clients.add(request.client)
+        body = await request.json()
+        conversation = Conversation.from_request(body)
+        rule = choose(conversation)
+        message, finish_reason, completion_tokens = message_for(rule)
+        usage = {
+            "prompt_tokens": conversation.prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": conversation.prompt_tokens + completion_tokens,
+        }
+        rejection = throttle(usage["total_tokens"])
+        if rejection is not None:
+            return rejection
+        cached = min(cached_tokens(body), conversation.prompt_tokens)
+        if prefix_cache_min_tokens is not None:
+            usage["prompt_tokens_details"] = {"cached_tokens": cached}
+        first_token = (
+            latency.first_token_seconds(rng)
+            + latency.prefill_seconds(conversation.prompt_tokens - cached, rng)
+            + rate_limits.overload_ms * stats.in_flight / 1000
+        )
+        generation = latency.token_seconds(completion_tokens, rng)
+
+        stats.requests += 1
+        stats.prompt_tokens += usage["prompt_tokens"]
+        stats.cached_tokens += cached
+        stats.completion_tokens += completion_tokens
+        stats.first_token_seconds += first_token
+        stats.simulated_seconds += first_token + generation
+        stats.rules[rule.name] += 1
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+
+        def enter() -> None:
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+        if not body.get("stream"):
+            enter()
+            try:
+                await asyncio.sleep(first_token + generation)
+            finally:
+                stats.in_flight -= 1
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": message,
+                            "finish_reason": finish_reason,
+                        }
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        def chunk(delta: dict, finish: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def stream():
+            try:
+                await asyncio.sleep(first_token)
+                if message.get("tool_calls"):
+                    calls = [dict(call, index=0) for call in message["tool_calls"]]
+                    await asyncio.sleep(generation)
+                    yield chunk({"role": "assistant", "tool_calls": calls})
+                else:
+                    words = message["content"].split(" ")
+                    pause = generation / max(1, len(words))
+                    for index, word in enumerate(words):
+                        if index:
+                            await asyncio.sleep(pause)
+                        prefix = " " if index else ""
+                        delta = {"content": prefix + word}
+                        if index == 0:
+                            delta["role"] = "assistant"
+                        yield chunk(delta)
+                yield chunk({}, finish_reason, usage=usage)
+                yield "data: [DONE]\n\n"
+            finally:
+                stats.in_flight -= 1
+
+        enter()
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    async def models(_: Request):
+        return JSONResponse(
+            {"object": "list", "data": [{"id": "fake", "object": "model"}]}
+        )
+
+    async def server_stats(_: Request):
+        return JSONResponse(stats.to_dict())
+
+    app = Starlette(
+        routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/models", models),
+            Route("/stats", server_stats),
+        ]
+    )
+    app.state.stats = stats
+    return app
+
+
+class FakeLlmServer(BackgroundServer):
+    """Runs the fake model server in a background thread.
+
+    Example:
+        with FakeLlmServer(latency=LatencyProfile(first_token_ms=50)) as server:
+            os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+    """
+
+    def __init__(
+        self,
+        script: Optional[list[ScriptRule]] = None,
+        latency: Optional[LatencyProfile] = None,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        seed: Optional[int] = None,
+        rate_limits: Optional[RateLimitProfile] = None,
+        prefix_cache_min_tokens: Optional[int] = None,
+    ):
+        super().__init__(
+            create_app(script, latency, seed, rate_limits, prefix_cache_min_tokens),
+            host,
+            port,
+        )
+
+    @property
+    def api_base(self) -> str:
+        """Base URL to use as `LLM_ENDPOINT_OVERRIDE`."""
+        return f"{self.url}/v1"
+
+    @property
+    def stats(self) -> ServerStats:
+        return self.app.state.stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", type=Path, help="JSON file with script rules.")
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-first-token-ms", type=float, default=0.0)
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=0.0)
+    parser.add_argument(
+        "--prefix-cache-min-tokens",
+        type=int,
+        help="Cache prompt prefixes of prompts with at least this many tokens.",
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--rpm", type=int, help="Requests per minute to accept.")
+    parser.add_argument("--tpm", type=int, help="Tokens per minute to accept.")
+    parser.add_argument("--max-concurrency", type=int)
+    parser.add_argument("--overload-ms", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    app = create_app(
+        load_script(args.script) if args.script else None,
+        LatencyProfile(
+            args.first_token_ms,
+            args.tokens_per_second,
+            args.jitter,
+            args.slow_fraction,
+            args.slow_first_token_ms,
+            args.prefill_ms_per_1k_tokens,
+        ),
+        args.seed,
+        RateLimitProfile(args.rpm, args.tpm, args.max_concurrency, args.overload_ms),
+        args.prefix_cache_min_tokens,
+    )
+    print(f"Fake LLM server on http://{args.host}:{args.port}/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Workflow gate benchmark: model calls saved by `GatedSequentialAgent`.
+
+Runs the code and planning pipelines against the fake model server
+(`benchmarks.fake_llm_server`), once with `WORKFLOW_GATES_ENABLED` and once
+without, and counts the model requests per run. The scenarios cover each
+gate:
+
+* `review_comments`: the reviewer asks for changes, so every stage runs.
+* `clean_review`: the review is clean, so the refactor stage is skipped.
+* `no_code`: the writer answers without code, so the pipeline stops before
+  the review.
+* `planning_repeat`: the planning pipeline is asked the same thing twice in
+  one session, so the second run skips the planner and the refinement loop.
+
+Usage:
+    python -m benchmarks.gated_pipeline --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.fake_llm_server import (
+    DEFAULT_SCRIPT,
+    FakeLlmServer,
+    LatencyProfile,
+    ScriptRule,
+)
+
+SCRIPT = [
+    ScriptRule(
+        name="code_writer_clean",
+        system=r"Python Code Generator",
+        last_message=r"\bsubtract\b",
+        reply="```python\ndef subtract(a: int, b: int) -> int:\n    return a - b\n```",
+    ),
+    ScriptRule(
+        name="code_writer_no_code",
+        system=r"Python Code Generator",
+        last_message=r"\bsomething\b",
+        reply="Which function should I write, and what should it return?",
+    ),
+    ScriptRule(
+        name="code_reviewer_clean",
+        system=r"Python Code Reviewer.*def subtract",
+        reply="No major issues found.",
+    ),
+    *DEFAULT_SCRIPT,
+]
+
+
+@dataclass
+class GateScenario:
+    agent: str
+    turns: list[str]
+    state: dict = field(default_factory=dict)
+
+
+SCENARIOS = {
+    "review_comments": GateScenario(
+        "code_pipeline_agent", ["Write a function that adds two integers."]
+    ),
+    "clean_review": GateScenario(
+        "code_pipeline_agent", ["Write a function to subtract two integers."]
+    ),
+    "no_code": GateScenario("code_pipeline_agent", ["Write something useful."]),
+    "planning_repeat": GateScenario(
+        "PlanningAgent",
+        ["Plan the agent from the requirements."] * 2,
+        state={
+            "requirements_document": (
+                "# Requirements\n1. Answer weather questions for any city."
+            )
+        },
+    ),
+}
+
+
+async def _run_session(runner, scenario: GateScenario) -> None:
+    from google.genai import types
+
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id="benchmark",
+        session_id=uuid.uuid4().hex,
+        state=dict(scenario.state),
+    )
+    for turn in scenario.turns:
+        async for _ in runner.run_async(
+            user_id=session.user_id,
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=turn)]),
+        ):
+            pass
+
+
+def _run_mode(server: FakeLlmServer, gated: bool, names: list[str], runs: int) -> dict:
+    from google.adk.runners import InMemoryRunner
+
+    import agent_agent.sub_agents.planning_engine  # noqa: F401 (registers agents)
+    import coding_agent.agent  # noqa: F401
+    from agent_registry import get_agent, registry
+    from config import get_settings
+
+    os.environ["WORKFLOW_GATES_ENABLED"] = str(gated).lower()
+    get_settings.cache_clear()
+    registry.reset()
+
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        runner = InMemoryRunner(
+            agent=get_agent(scenario.agent), app_name=f"benchmark_{name}"
+        )
+        before = server.stats.requests
+        for _ in range(runs):
+            asyncio.run(_run_session(runner, scenario))
+        results[name] = (server.stats.requests - before) / runs
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Sessions per scenario.")
+    parser.add_argument("--first-token-ms", type=float, default=20.0)
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/gated_pipeline.json")
+    )
+    args = parser.parse_args(argv)
+
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    latency = LatencyProfile(args.first_token_ms, args.tokens_per_second, 0.0)
+    with FakeLlmServer(SCRIPT, latency=latency) as server:
+        os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        ungated = _run_mode(server, False, args.scenario, args.runs)
+        gated = _run_mode(server, True, args.scenario, args.runs)
+
+    from workflows.gated import gate_stats
+
+    scenarios = {}
+    for name in args.scenario:
+        saved = ungated[name] - gated[name]
+        scenarios[name] = {
+            "requests_per_run": {"ungated": ungated[name], "gated": gated[name]},
+            "saved_per_run": saved,
+        }
+        print(
+            f"{name:<16} ungated {ungated[name]:5.1f}  gated {gated[name]:5.1f}  "
+            f"saved {saved:5.1f} model calls per run"
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {
+                "config": vars(args) | {"output": str(args.output)},
+                "scenarios": scenarios,
+                "gates": gate_stats(),
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
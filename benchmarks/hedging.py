@@ -0,0 +1,149 @@
+"""Hedging benchmark: tail latency and extra spend of `HedgedLlm`.
+
+Sends the same requests to a primary model with a heavy latency tail, once
+directly and once through `HedgedLlm` with a secondary model that is slower
+on average but has no tail. Both models are fake model servers
+(`benchmarks.fake_llm_server`). Reports the p50/p95/p99 time to the first
+response of both modes and the extra requests hedging sent.
+
+Usage:
+    python -m benchmarks.hedging --requests 400 --concurrency 8 \\
+        --slow-fraction 0.05 --slow-ms 3000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from google.adk.models import BaseLlm, LlmRequest
+from google.genai import types
+
+from benchmarks.fake_llm_server import FakeLlmServer, LatencyProfile
+from benchmarks.runner import percentile
+from llm.endpoint import EndpointLlm
+from llm.hedge import HedgedLlm, HedgeStats
+
+
+def _request(index: int) -> LlmRequest:
+    return LlmRequest(
+        model="openai/gpt-4o",
+        contents=[
+            types.Content(
+                role="user", parts=[types.Part(text=f"Hello, I am user {index}.")]
+            )
+        ],
+        config=types.GenerateContentConfig(),
+    )
+
+
+async def _run(llm: BaseLlm, requests: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            async for _ in llm.generate_content_async(_request(index)):
+                break
+            return (time.perf_counter() - started) * 1000
+
+    return list(await asyncio.gather(*(one(index) for index in range(requests))))
+
+
+def _summary(name: str, latencies: list[float], requests_sent: int, **extra) -> dict:
+    result = {
+        "mode": name,
+        "requests": len(latencies),
+        "requests_sent": requests_sent,
+        "first_response_ms": {
+            q: percentile(latencies, value)
+            for q, value in (("p50", 50), ("p95", 95), ("p99", 99))
+        },
+        **extra,
+    }
+    latency = result["first_response_ms"]
+    print(
+        f"{name:<7} p50 {latency['p50']:7.1f} ms  p95 {latency['p95']:7.1f} ms  "
+        f"p99 {latency['p99']:7.1f} ms  requests sent {requests_sent}"
+    )
+    return result
+
+
+def _benchmark(args: argparse.Namespace) -> list[dict]:
+    primary_latency = LatencyProfile(
+        args.primary_ms, 0, 0.2, args.slow_fraction, args.slow_ms
+    )
+    secondary_latency = LatencyProfile(args.secondary_ms, 0, 0.2)
+    with (
+        FakeLlmServer(latency=primary_latency, seed=1) as primary_server,
+        FakeLlmServer(latency=secondary_latency, seed=2) as secondary_server,
+    ):
+        primary = EndpointLlm.for_endpoint(
+            "openai/gpt-4o", primary_server.api_base, "fake"
+        )
+        secondary = EndpointLlm.for_endpoint(
+            "anthropic/claude-sonnet", secondary_server.api_base, "fake"
+        )
+        direct = asyncio.run(_run(primary, args.requests, args.concurrency))
+        direct_sent = primary_server.stats.requests
+
+        hedged = HedgedLlm(
+            model=primary.model,
+            primary=primary,
+            secondary=secondary,
+            stats=HedgeStats(
+                percentile=args.percentile,
+                initial_delay_ms=args.initial_delay_ms,
+                max_rate=args.max_rate,
+            ),
+        )
+        raced = asyncio.run(_run(hedged, args.requests, args.concurrency))
+        raced_sent = (
+            primary_server.stats.requests
+            - direct_sent
+            + secondary_server.stats.requests
+        )
+    return [
+        _summary("primary", direct, direct_sent),
+        _summary("hedged", raced, raced_sent, hedge=hedged.stats.as_dict()),
+    ]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--primary-ms", type=float, default=150.0)
+    parser.add_argument("--secondary-ms", type=float, default=300.0)
+    parser.add_argument(
+        "--slow-fraction",
+        type=float,
+        default=0.05,
+        help="Share of primary requests that take --slow-ms.",
+    )
+    parser.add_argument("--slow-ms", type=float, default=3000.0)
+    parser.add_argument("--percentile", type=float, default=90.0)
+    parser.add_argument("--initial-delay-ms", type=float, default=500.0)
+    parser.add_argument("--max-rate", type=float, default=0.1)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/hedging.json")
+    )
+    args = parser.parse_args(argv)
+
+    results = _benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"config": vars(args) | {"output": str(args.output)}, "results": results},
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
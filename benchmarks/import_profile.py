@@ -0,0 +1,203 @@
+"""Import-time profile of the agent packages.
+
+Each root module is imported in a fresh interpreter with `python -X importtime`
+so results are not skewed by modules cached from an earlier import. For every
+module the report records the import time, the heaviest top-level packages it
+pulled in, whether provider SDKs were loaded, and the time to build its
+`root_agent` through the registry.
+
+Usage:
+    python -m benchmarks.import_profile --output .cache/import_profile.json
+    python -m benchmarks.import_profile --baseline .cache/import_profile.json
+
+With `--baseline`, the run exits with status 1 when a module's import time
+regresses by more than `--threshold` (relative) and `--min-regression-ms`
+(absolute) against the baseline report.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT_MODULES = [
+    "agent_agent.agent",
+    "coding_agent.agent",
+    "test_weather_multi_agent.agent",
+    "test_weather_agent.agent",
+    "test_weather_agent_non_gemini.agent",
+    "test_google_search_agent.agent",
+    "test_mcp_agent.agent",
+]
+
+# Packages that should only be imported once an agent is built.
+HEAVY_PACKAGES = ["google.adk", "google.genai", "litellm", "mcp"]
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+module = __import__({module!r}, fromlist=["root_agent"])
+imported = time.perf_counter()
+heavy = [name for name in {heavy!r} if name in sys.modules]
+build_ms = None
+if {build!r}:
+    module.root_agent
+    build_ms = (time.perf_counter() - imported) * 1000
+print("IMPORT_PROFILE " + json.dumps({{
+    "wall_ms": (imported - started) * 1000,
+    "heavy_packages_loaded": heavy,
+    "root_agent_build_ms": build_ms,
+}}))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, str, int]]:
+    """Parses `-X importtime` output.
+
+    Returns:
+        list[tuple[int, str, int]]: (nesting depth, module name, cumulative
+            microseconds) for every imported module, in output order.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        # Output is " " + two spaces per nesting level + module name.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative_us)))
+    return entries
+
+
+def top_packages(entries: list[tuple[int, str, int]], limit: int) -> list[dict]:
+    """Returns the top-level packages with the largest cumulative import time."""
+    totals = defaultdict(int)
+    for depth, name, micros in entries:
+        # Only outermost entries carry a package's full cumulative time;
+        # nested entries are already included in them.
+        if depth == 0:
+            totals[name.split(".")[0]] += micros
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [
+        {"package": package, "cumulative_ms": round(micros / 1000, 1)}
+        for package, micros in ranked[:limit]
+    ]
+
+
+def profile_module(module: str, *, build: bool, top: int) -> dict:
+    """Imports `module` in a fresh interpreter and returns its profile."""
+    probe = _PROBE.format(module=module, heavy=HEAVY_PACKAGES, build=build)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+    )
+    marker = next(
+        (
+            line
+            for line in result.stdout.splitlines()
+            if line.startswith("IMPORT_PROFILE ")
+        ),
+        None,
+    )
+    if result.returncode != 0 or marker is None:
+        return {"module": module, "error": result.stderr.strip().splitlines()[-1:]}
+
+    probe_result = json.loads(marker.removeprefix("IMPORT_PROFILE "))
+    entries = parse_importtime(result.stderr)
+    own = next((micros for _, name, micros in entries if name == module), None)
+    return {
+        "module": module,
+        "import_ms": round(own / 1000, 1) if own is not None else None,
+        "wall_ms": round(probe_result["wall_ms"], 1),
+        "heavy_packages_loaded": probe_result["heavy_packages_loaded"],
+        "root_agent_build_ms": (
+            round(probe_result["root_agent_build_ms"], 1)
+            if probe_result["root_agent_build_ms"] is not None
+            else None
+        ),
+        "top_packages": top_packages(entries, top),
+    }
+
+
+def find_regressions(
+    report: dict, baseline: dict, threshold: float, min_regression_ms: float
+) -> list[str]:
+    """Lists modules whose import time regressed against `baseline`."""
+    previous = {entry["module"]: entry for entry in baseline.get("modules", [])}
+    regressions = []
+    for entry in report["modules"]:
+        before = previous.get(entry["module"], {}).get("wall_ms")
+        after = entry.get("wall_ms")
+        if before is None or after is None:
+            continue
+        if after - before > min_regression_ms and after > before * (1 + threshold):
+            regressions.append(f"{entry['module']}: {before:.1f} ms -> {after:.1f} ms")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=ROOT_MODULES)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here.")
+    parser.add_argument("--baseline", type=Path, help="Compare against this report.")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-regression-ms", type=float, default=20.0)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--no-build",
+        action="store_true",
+        help="Only import the modules; do not build root_agent.",
+    )
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "modules": [
+            profile_module(module, build=not args.no_build, top=args.top)
+            for module in args.modules
+        ],
+    }
+
+    for entry in report["modules"]:
+        if "error" in entry:
+            print(f"❌ {entry['module']}: {entry['error']}")
+            continue
+        build = entry["root_agent_build_ms"]
+        print(
+            f"{entry['module']:<40} import {entry['wall_ms']:>8.1f} ms"
+            + (f"   build root_agent {build:>8.1f} ms" if build is not None else "")
+        )
+        if entry["heavy_packages_loaded"]:
+            print(
+                f"    ⚠️ loaded at import: {', '.join(entry['heavy_packages_loaded'])}"
+            )
+        for package in entry["top_packages"][:3]:
+            print(f"    {package['package']:<30} {package['cumulative_ms']:>8.1f} ms")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = find_regressions(
+            report,
+            json.loads(args.baseline.read_text()),
+            args.threshold,
+            args.min_regression_ms,
+        )
+        for regression in regressions:
+            print(f"❌ Import time regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Load test of the agent server against the fake model server.
+
+Starts `benchmarks.fake_llm_server` and the agent server (`server.app`) in the
+background, then drives many concurrent sessions of a benchmark scenario over
+`POST /apps/{app}/run_sse` with real HTTP clients. For every concurrency level
+it reports time to first streamed event and full-turn latency percentiles,
+throughput, and rejected (503) or failed turns, followed by the server's own
+`/metrics`.
+
+Usage:
+    python -m benchmarks.load_test --scenario weather_multi --concurrency 8 64 256 \\
+        --sessions 256 --max-concurrent-runs 32
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.fake_llm_server import FakeLlmServer, LatencyProfile
+from benchmarks.runner import SCENARIOS, Scenario, percentile
+from benchmarks.servers import BackgroundServer
+
+
+async def _turn(
+    client: httpx.AsyncClient,
+    app: str,
+    user_id: str,
+    session_id: str,
+    message: str,
+    stream_tokens: bool,
+) -> dict:
+    started = time.perf_counter()
+    first_event = None
+    outcome = "ok"
+    async with client.stream(
+        "POST",
+        f"/apps/{app}/run_sse",
+        json={
+            "user_id": user_id,
+            "session_id": session_id,
+            "message": message,
+            "stream_tokens": stream_tokens,
+        },
+    ) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return {"outcome": f"http_{response.status_code}"}
+        async for line in response.aiter_lines():
+            if line.startswith("event: ") and first_event is None:
+                first_event = time.perf_counter() - started
+            if line == "event: error":
+                outcome = "error"
+    return {
+        "outcome": outcome,
+        "first_event_ms": first_event * 1000 if first_event is not None else None,
+        "turn_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+async def _session(
+    client: httpx.AsyncClient, app: str, scenario: Scenario, index: int, stream: bool
+) -> list[dict]:
+    user_id = f"load_user_{index}"
+    response = await client.post(
+        f"/apps/{app}/users/{user_id}/sessions",
+        json={} if not scenario.state else {"state": scenario.state},
+    )
+    if response.status_code != 201:
+        return [{"outcome": f"http_{response.status_code}"}]
+    session_id = response.json()["session_id"]
+    results = []
+    for message in scenario.turns:
+        result = await _turn(client, app, user_id, session_id, message, stream)
+        results.append(result)
+        if result["outcome"] != "ok":
+            break
+    return results
+
+
+async def run_level(
+    base_url: str,
+    app: str,
+    scenario: Scenario,
+    concurrency: int,
+    sessions: int,
+    stream_tokens: bool,
+) -> dict:
+    """Runs `sessions` sessions with at most `concurrency` in flight."""
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    gate = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=httpx.Timeout(120.0)
+    ) as client:
+
+        async def one(index: int) -> list[dict]:
+            async with gate:
+                return await _session(client, app, scenario, index, stream_tokens)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(index) for index in range(sessions)))
+        elapsed = time.perf_counter() - started
+
+    turns = [turn for session in results for turn in session]
+    ok = [turn for turn in turns if turn["outcome"] == "ok"]
+    outcomes: dict[str, int] = {}
+    for turn in turns:
+        outcomes[turn["outcome"]] = outcomes.get(turn["outcome"], 0) + 1
+    first_event = [t["first_event_ms"] for t in ok if t["first_event_ms"] is not None]
+    turn_ms = [t["turn_ms"] for t in ok]
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "turns": len(turns),
+        "outcomes": outcomes,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_second": round(len(ok) / elapsed, 2) if elapsed else None,
+        "first_event_ms": {f"p{q}": percentile(first_event, q) for q in (50, 95, 99)},
+        "turn_ms": {f"p{q}": percentile(turn_ms, q) for q in (50, 95, 99)},
+    }
+
+
+def _print_level(name: str, level: dict) -> None:
+    first, turn = level["first_event_ms"], level["turn_ms"]
+    failed = level["turns"] - level["outcomes"].get("ok", 0)
+
+    def ms(value: Optional[float]) -> str:
+        return f"{value:8.1f}" if value is not None else "       -"
+
+    print(
+        f"{name:<16} c={level['concurrency']:<4} first event p50 {ms(first['p50'])} ms "
+        f"p95 {ms(first['p95'])} ms  turn p50 {ms(turn['p50'])} ms p95 {ms(turn['p95'])} ms "
+        f"p99 {ms(turn['p99'])} ms  {level['turns_per_second']:8.2f} turns/s  "
+        f"not ok {failed}"
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), default="weather_multi"
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[8, 64])
+    parser.add_argument("--sessions", type=int, default=64, help="Sessions per level.")
+    parser.add_argument("--stream-tokens", action="store_true")
+    parser.add_argument("--max-concurrent-runs", type=int, default=32)
+    parser.add_argument("--max-queued-runs", type=int, default=1024)
+    parser.add_argument("--queue-timeout-seconds", type=float, default=30.0)
+    parser.add_argument("--first-token-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/load_test.json")
+    )
+    args = parser.parse_args(argv)
+
+    scenario = SCENARIOS[args.scenario]
+    app = scenario.module.split(".")[0]
+    latency = LatencyProfile(args.first_token_ms, args.tokens_per_second, args.jitter)
+    with FakeLlmServer(latency=latency, seed=args.seed) as fake_server:
+        os.environ["LLM_ENDPOINT_OVERRIDE"] = fake_server.api_base
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        from config import get_settings
+
+        get_settings.cache_clear()
+
+        from server.app import create_app
+        from server.service import AgentService
+
+        service = AgentService(
+            apps=[app],
+            max_concurrent_runs=args.max_concurrent_runs,
+            max_queued_runs=args.max_queued_runs,
+            queue_timeout_seconds=args.queue_timeout_seconds,
+        )
+        # Build the agent before the first request, as a warm server would.
+        service.runner(app)
+        for logger_name in ("LiteLLM", "httpx"):
+            logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+        levels = []
+        with BackgroundServer(create_app(service)) as agent_server:
+            for concurrency in args.concurrency:
+                level = asyncio.run(
+                    run_level(
+                        agent_server.url,
+                        app,
+                        scenario,
+                        concurrency,
+                        args.sessions,
+                        args.stream_tokens,
+                    )
+                )
+                _print_level(args.scenario, level)
+                levels.append(level)
+            server_metrics = httpx.get(f"{agent_server.url}/metrics").json()
+        fake_stats = fake_server.stats.to_dict()
+
+    report = {
+        "scenario": args.scenario,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "latency_profile": vars(latency),
+        "levels": levels,
+        "server_metrics": server_metrics,
+        "fake_server": fake_stats,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""MCP pool benchmark: time to first tool call, cold vs. warm.
+
+Simulates sessions that each list the tools of an MCP stdio server and make
+one call. "cold" builds a fresh `MCPToolset` per session, paying for the
+process spawn, the handshake and `list_tools` every time. "warm" uses
+`PooledMCPToolset` after the pool has started, so a session only leases a
+handshaken process and reuses the cached tool listing. The server is
+`benchmarks.mcp_stub_server` with a simulated start-up delay.
+
+Usage:
+    python -m benchmarks.mcp_pool --sessions 20 --concurrency 4 --startup-ms 800
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset
+from mcp import StdioServerParameters
+
+from benchmarks.runner import percentile
+from config import get_settings
+from tools.mcp_pool import MCPServerPool, PooledMCPToolset, get_mcp_pool
+
+
+def _server(startup_ms: float, call_ms: float) -> StdioServerParameters:
+    return StdioServerParameters(
+        command=sys.executable,
+        args=[
+            "-m",
+            "benchmarks.mcp_stub_server",
+            "--startup-ms",
+            str(startup_ms),
+            "--call-ms",
+            str(call_ms),
+        ],
+        cwd=str(Path(__file__).resolve().parent.parent),
+    )
+
+
+async def _first_tool_call(toolset: BaseToolset, close: bool) -> float:
+    started = time.perf_counter()
+    try:
+        tools = {tool.name: tool for tool in await toolset.get_tools()}
+        await tools["list_directory"].run_async(
+            args={"path": os.getcwd()}, tool_context=None
+        )
+        return (time.perf_counter() - started) * 1000
+    finally:
+        if close:
+            await toolset.close()
+
+
+async def _run(
+    make_toolset: Callable[[], BaseToolset],
+    sessions: int,
+    concurrency: int,
+    close: bool,
+) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def session() -> float:
+        async with semaphore:
+            return await _first_tool_call(make_toolset(), close)
+
+    return list(await asyncio.gather(*(session() for _ in range(sessions))))
+
+
+def _summary(name: str, latencies: list[float], **extra) -> dict:
+    result = {
+        "mode": name,
+        "sessions": len(latencies),
+        "first_call_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+        },
+        **extra,
+    }
+    print(
+        f"{name:<5} first tool call p50 {result['first_call_ms']['p50']:8.1f} ms  "
+        f"p95 {result['first_call_ms']['p95']:8.1f} ms  "
+        f"max {result['first_call_ms']['max']:8.1f} ms"
+    )
+    return result
+
+
+async def _benchmark(args: argparse.Namespace) -> list[dict]:
+    params = _server(args.startup_ms, args.call_ms)
+    cold = await _run(
+        lambda: MCPToolset(connection_params=params),
+        args.sessions,
+        args.concurrency,
+        close=True,
+    )
+
+    pool: MCPServerPool = get_mcp_pool(params)
+    warm_up_started = time.perf_counter()
+    await pool.warm_up()
+    await pool.list_tools()
+    warm_up_ms = (time.perf_counter() - warm_up_started) * 1000
+    warm = await _run(
+        lambda: PooledMCPToolset(connection_params=params),
+        args.sessions,
+        args.concurrency,
+        close=False,
+    )
+    stats = pool.as_dict()
+    await PooledMCPToolset(connection_params=params).close()
+    return [
+        _summary("cold", cold),
+        _summary("warm", warm, pool_warm_up_ms=round(warm_up_ms, 1), pool=stats),
+    ]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument(
+        "--startup-ms",
+        type=float,
+        default=800.0,
+        help="Simulated server start-up (npx resolve and Node start).",
+    )
+    parser.add_argument("--call-ms", type=float, default=5.0)
+    parser.add_argument(
+        "--pool-size",
+        type=int,
+        help="Warm processes in the pool (default: --concurrency).",
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/mcp_pool.json")
+    )
+    args = parser.parse_args(argv)
+    os.environ["MCP_POOL_SIZE"] = str(args.pool_size or args.concurrency)
+    get_settings.cache_clear()
+
+    results = asyncio.run(_benchmark(args))
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"config": vars(args) | {"output": str(args.output)}, "results": results},
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Stub MCP stdio server for the MCP pool benchmark.
+
+Sleeps for `--startup-ms` before answering, standing in for an `npx -y`
+package resolve and a Node start-up, then serves a few filesystem-like tools
+over stdio:
+
+    python -m benchmarks.mcp_stub_server --startup-ms 800 --call-ms 5
+"""
+
+import argparse
+import os
+import time
+from typing import Optional
+
+from mcp.server.fastmcp import FastMCP
+
+
+def create_server(call_ms: float = 5.0) -> FastMCP:
+    server = FastMCP("stub-filesystem")
+
+    @server.tool()
+    def list_directory(path: str) -> list[str]:
+        """Lists the entries of a directory."""
+        time.sleep(call_ms / 1000)
+        return sorted(os.listdir(path))[:50]
+
+    @server.tool()
+    def get_file_info(path: str) -> dict:
+        """Returns the size and modification time of a file."""
+        time.sleep(call_ms / 1000)
+        stat = os.stat(path)
+        return {"size": stat.st_size, "modified": stat.st_mtime}
+
+    @server.tool()
+    def echo(text: str) -> str:
+        """Returns its input."""
+        return text
+
+    return server
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--startup-ms", type=float, default=800.0)
+    parser.add_argument("--call-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    time.sleep(args.startup_ms / 1000)
+    create_server(args.call_ms).run("stdio")
+
+
+if __name__ == "__main__":
+    main()
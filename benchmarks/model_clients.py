@@ -0,0 +1,186 @@
+"""Model client benchmark: per-agent model instances vs. the shared registry.
+
+Two comparisons, both offline:
+
+* `endpoint`: `--agents` agents send `--requests` requests with at most
+  `--concurrency` in flight to the fake model server
+  (`benchmarks.fake_llm_server`), once with a model instance per agent (as
+  built before `llm.clients`) and once with the shared, pooled instance from
+  `ModelClientRegistry`. Reports the connections the server saw, request
+  latency percentiles and the memory allocated while building the models and
+  sending the requests.
+* `gemini`: ADK resolves a Gemini model name to a new `Gemini` and API client
+  on every model call. Reports the time and memory of `--requests` such
+  resolutions against the shared `PooledGemini`. No requests are sent; each
+  new client would also open new connections (and TLS handshakes) to the
+  Gemini API.
+
+Usage:
+    python -m benchmarks.model_clients --agents 8 --requests 400 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+from google.adk.models import BaseLlm, LLMRegistry
+
+from benchmarks.fake_llm_server import FakeLlmServer, LatencyProfile
+from benchmarks.hedging import _request
+from benchmarks.runner import percentile
+from llm.clients import ModelClientRegistry
+from llm.endpoint import EndpointLlm
+
+MODEL = "openai/gpt-4o"
+
+
+async def _send(models: list[BaseLlm], requests: int, concurrency: int) -> list[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            async for _ in models[index % len(models)].generate_content_async(
+                _request(index)
+            ):
+                pass
+            return (time.perf_counter() - started) * 1000
+
+    return list(await asyncio.gather(*(one(index) for index in range(requests))))
+
+
+def _traced(func: Callable):
+    """Runs `func` and returns its result and the bytes it left allocated."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return result, allocated
+
+
+def _endpoint_mode(
+    name: str, server: FakeLlmServer, build: Callable, args: argparse.Namespace
+) -> dict:
+    connections = server.stats.connections
+
+    def run():
+        models = [build(index) for index in range(args.agents)]
+        return models, asyncio.run(_send(models, args.requests, args.concurrency))
+
+    (models, latencies), allocated = _traced(run)
+    result = {
+        "mode": name,
+        "model_instances": len({id(model) for model in models}),
+        "connections": server.stats.connections - connections,
+        "latency_ms": {
+            f"p{q}": round(percentile(latencies, q), 2) for q in (50, 95, 99)
+        },
+        "allocated_kb": round(allocated / 1024, 1),
+    }
+    print(
+        f"endpoint {name:<9} instances {result['model_instances']:>3}  "
+        f"connections {result['connections']:>4}  "
+        f"p50 {result['latency_ms']['p50']:7.1f} ms  "
+        f"p99 {result['latency_ms']['p99']:7.1f} ms  "
+        f"allocated {result['allocated_kb']:9.1f} KiB"
+    )
+    return result
+
+
+def _gemini_mode(name: str, resolve: Callable, requests: int) -> dict:
+    def run():
+        started = time.perf_counter()
+        # Keep every client alive, as in-flight calls would.
+        clients = [resolve().api_client for _ in range(requests)]
+        return clients, (time.perf_counter() - started) * 1000
+
+    (clients, elapsed_ms), allocated = _traced(run)
+    result = {
+        "mode": name,
+        "api_clients": len({id(client) for client in clients}),
+        "setup_ms_per_call": round(elapsed_ms / requests, 3),
+        "allocated_kb": round(allocated / 1024, 1),
+    }
+    print(
+        f"gemini   {name:<9} api clients {result['api_clients']:>4}  "
+        f"setup {result['setup_ms_per_call']:7.3f} ms/call  "
+        f"allocated {result['allocated_kb']:9.1f} KiB"
+    )
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--agents", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--first-token-ms", type=float, default=20.0)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/model_clients.json")
+    )
+    args = parser.parse_args(argv)
+
+    results = {}
+    latency = LatencyProfile(args.first_token_ms, 0, 0.1)
+    with FakeLlmServer(latency=latency) as server:
+        # Warm-up so that lazy imports are not measured in the first mode.
+        warm_up = [EndpointLlm.for_endpoint(MODEL, server.api_base, "fake")]
+        asyncio.run(_send(warm_up, args.concurrency, args.concurrency))
+        registry = ModelClientRegistry()
+        results["endpoint"] = [
+            _endpoint_mode(
+                "per_agent",
+                server,
+                lambda _: EndpointLlm.for_endpoint(MODEL, server.api_base, "fake"),
+                args,
+            ),
+            _endpoint_mode(
+                "shared",
+                server,
+                lambda _: registry.model(
+                    MODEL,
+                    EndpointLlm,
+                    api_base=server.api_base,
+                    api_key="fake",
+                    custom_llm_provider="openai",
+                ),
+                args,
+            ),
+        ]
+        results["endpoint_pools"] = registry.as_dict()["pools"]
+
+    # Clients are only built, not used; a placeholder key is enough.
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    LLMRegistry.new_llm("gemini-2.0-flash").api_client
+    results["gemini"] = [
+        _gemini_mode(
+            "per_call", lambda: LLMRegistry.new_llm("gemini-2.0-flash"), args.requests
+        ),
+        _gemini_mode(
+            "shared",
+            lambda: registry.model("gemini-2.0-flash"),
+            args.requests,
+        ),
+    ]
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"config": vars(args) | {"output": str(args.output)}, **results},
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
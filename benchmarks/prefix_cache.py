@@ -0,0 +1,178 @@
+"""Prefix cache benchmark: cached input tokens and time to first token.
+
+Runs the agent builder (`MainManagerAgent`: requirements, then the planning
+pipeline) against the fake model server (`benchmarks.fake_llm_server`), once
+with `LLM_PREFIX_CACHE_ENABLED` and once without. The server caches prompt
+prefixes the way OpenAI does automatically (from `--min-tokens` tokens, in
+blocks) and adds `--prefill-ms-per-1k-tokens` to the first-token delay for
+every 1,000 prompt tokens it did not serve from its cache. Every session asks
+for a different agent, so the requirements and plans in the prompts differ
+between sessions while the instructions and tools do not.
+
+For each mode the benchmark reports the prompt tokens, the share served from
+the server's cache, the mean time to first token and the input cost relative
+to uncached tokens (cached tokens at `--cached-price`). With the prefix cache
+enabled it also reports the local prefix tracker's expected hit rate per
+model.
+
+Usage:
+    python -m benchmarks.prefix_cache --sessions 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.fake_llm_server import (
+    DEFAULT_SCRIPT,
+    FakeLlmServer,
+    LatencyProfile,
+    ScriptRule,
+)
+
+CITIES = ["London", "Tokyo", "Lagos", "Lima", "Oslo", "Pune", "Quito", "Sydney"]
+
+
+@dataclass
+class SessionRule(ScriptRule):
+    """A rule whose reply names the city of the latest request it was sent."""
+
+    def text(self) -> str:
+        return f"{super().text()}\nCity: {uuid.uuid4().hex[:8]}"
+
+
+def _script() -> list[ScriptRule]:
+    rules = []
+    for rule in DEFAULT_SCRIPT:
+        if rule.name in ("requirements", "planner", "plan_refiner"):
+            rule = SessionRule(**vars(rule))
+        rules.append(rule)
+    return rules
+
+
+async def _run_sessions(sessions: int) -> None:
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    from agent_registry import get_agent
+
+    runner = InMemoryRunner(
+        agent=get_agent("MainManagerAgent"), app_name="benchmark_prefix_cache"
+    )
+    for index in range(sessions):
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name, user_id="benchmark", session_id=uuid.uuid4().hex
+        )
+        city = CITIES[index % len(CITIES)]
+        message = f"Build me an agent that answers weather questions for {city}."
+        async for _ in runner.run_async(
+            user_id=session.user_id,
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+        ):
+            pass
+
+
+def _run_mode(enabled: bool, args: argparse.Namespace) -> dict:
+    import agent_agent.agent  # noqa: F401 (registers agents)
+    from agent_registry import registry
+    from config import get_settings
+    from llm.prefix_cache import get_prefix_caches
+
+    latency = LatencyProfile(
+        args.first_token_ms,
+        0,
+        0.0,
+        prefill_ms_per_1k_tokens=args.prefill_ms_per_1k_tokens,
+    )
+    with FakeLlmServer(
+        _script(), latency=latency, prefix_cache_min_tokens=args.min_tokens
+    ) as server:
+        os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        os.environ["LLM_PREFIX_CACHE_ENABLED"] = str(enabled).lower()
+        os.environ["LLM_PREFIX_CACHE_MIN_TOKENS"] = str(args.min_tokens)
+        get_settings.cache_clear()
+        get_prefix_caches.cache_clear()
+        registry.reset()
+        asyncio.run(_run_sessions(args.sessions))
+        stats = server.stats
+
+    cached_share = stats.cached_tokens / stats.prompt_tokens
+    result = {
+        "requests": stats.requests,
+        "prompt_tokens": stats.prompt_tokens,
+        "cached_tokens": stats.cached_tokens,
+        "cached_token_share": round(cached_share, 4),
+        "mean_ttft_ms": round(stats.first_token_seconds / stats.requests * 1000, 1),
+        "relative_input_cost": round(1 - cached_share * (1 - args.cached_price), 4),
+    }
+    if enabled:
+        result["prefix_caches"] = {
+            name: {
+                key: pool[key]
+                for key in (
+                    "requests",
+                    "expected_hit_rate",
+                    "cached_token_share",
+                    "mean_ttft_ms_hit",
+                    "mean_ttft_ms_miss",
+                )
+            }
+            for name, pool in get_prefix_caches().as_dict().items()
+        }
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--first-token-ms", type=float, default=100.0)
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=150.0)
+    parser.add_argument("--min-tokens", type=int, default=1024)
+    parser.add_argument("--cached-price", type=float, default=0.25)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/prefix_cache.json")
+    )
+    args = parser.parse_args(argv)
+
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    results = {
+        "inline": _run_mode(False, args),
+        "prefix_cache": _run_mode(True, args),
+    }
+    for mode, result in results.items():
+        print(
+            f"{mode:<13} {result['prompt_tokens']:>9,} prompt tokens  "
+            f"cached {result['cached_token_share']:6.1%}  "
+            f"mean ttft {result['mean_ttft_ms']:7.1f} ms  "
+            f"input cost {result['relative_input_cost']:6.1%}"
+        )
+    for name, pool in results["prefix_cache"]["prefix_caches"].items():
+        print(
+            f"  {name:<40} {pool['requests']:>4} requests  "
+            f"expected hit rate {pool['expected_hit_rate']:6.1%}  "
+            f"cached {pool['cached_token_share']:6.1%}"
+        )
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"config": vars(args) | {"output": str(args.output)}, "results": results},
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""Record sessions as traces and replay them offline under load.
+
+`record` runs benchmark scenarios (`benchmarks.runner.SCENARIOS`) through a
+`TraceRecorder` and writes one trace per session, against the configured
+models or, with `--fake-server`, the fake model server. Traces recorded by the
+agent server (`TRACE_RECORD_DIR`) can be replayed the same way.
+
+`replay` plays traces back through the real agent trees with `TraceReplayer`
+(see `telemetry.traces`): models and tools answer from the trace, everything
+else runs. For every session service and concurrency level it reports turn
+latency percentiles next to the recorded ones, throughput, errors and calls
+that diverged from or were missing in the trace. With `--time-scale 0` (the
+default) no recorded delays are kept, so turn latency is the framework's and
+the session service's own cost; `--time-scale 1` replays at the original
+speed. `--profile` writes cProfile statistics of the replays.
+
+Usage:
+    python -m benchmarks.replay record --scenario agent_builder weather_multi \\
+        --sessions 4 --fake-server
+    python -m benchmarks.replay replay .cache/traces --concurrency 1 16 64 \\
+        --repeat 8 --session-service memory sqlite_diff
+"""
+
+import argparse
+import asyncio
+import cProfile
+import importlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Optional
+
+from benchmarks.fake_llm_server import FakeLlmServer, LatencyProfile
+from benchmarks.runner import SCENARIOS, percentile
+
+TRACE_PATTERN = "*.trace.jsonl.gz"
+
+
+def _quiet() -> None:
+    # Agent modules may configure INFO logging; keep per-call logs out.
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+
+
+def _root_agent(app: str):
+    return importlib.import_module(f"{app}.agent").root_agent
+
+
+async def _record(args: argparse.Namespace) -> list[Path]:
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    from telemetry.traces import TraceRecorder
+
+    recorder = TraceRecorder(args.output_dir)
+    paths = []
+    for name in args.scenario:
+        scenario = SCENARIOS[name]
+        app = scenario.module.split(".")[0]
+        root_agent = _root_agent(app)
+        _quiet()
+        recorder.attach(root_agent)
+        runner = InMemoryRunner(agent=root_agent, app_name=app)
+        for _ in range(args.sessions):
+            session = await runner.session_service.create_session(
+                app_name=app,
+                user_id="recorder",
+                session_id=uuid.uuid4().hex,
+                state=dict(scenario.state),
+            )
+            for turn in scenario.turns:
+                async for _ in recorder.run(
+                    runner,
+                    user_id=session.user_id,
+                    session_id=session.id,
+                    new_message=types.Content(
+                        role="user", parts=[types.Part(text=turn)]
+                    ),
+                ):
+                    pass
+            paths.append(recorder.path_for(app, session.id))
+            print(f"Recorded {paths[-1]}")
+    return paths
+
+
+def record(args: argparse.Namespace) -> int:
+    with ExitStack() as stack:
+        if args.fake_server:
+            latency = LatencyProfile(args.first_token_ms, args.tokens_per_second, 0.1)
+            server = stack.enter_context(FakeLlmServer(latency=latency))
+            os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+            os.environ["LLM_CACHE_ENABLED"] = "false"
+            from config import get_settings
+
+            get_settings.cache_clear()
+        paths = asyncio.run(_record(args))
+    print(f"{len(paths)} traces written to {args.output_dir}")
+    return 0
+
+
+def _trace_paths(paths: list[Path]) -> list[Path]:
+    found = []
+    for path in paths:
+        found.extend(sorted(path.rglob(TRACE_PATTERN)) if path.is_dir() else [path])
+    return found
+
+
+def _session_service(name: str, directory: Path):
+    if name == "sqlite_diff":
+        from sessions.diff_session_service import DiffSessionService
+
+        return DiffSessionService(directory / f"{uuid.uuid4().hex}.sqlite3")
+    from google.adk.sessions import InMemorySessionService
+
+    return InMemorySessionService()
+
+
+async def _replay_level(
+    replayer,
+    runners: dict,
+    traces: dict,
+    concurrency: int,
+    repeat: int,
+    time_scale: float,
+) -> dict:
+    from telemetry.traces import ReplayStats
+
+    started = time.perf_counter()
+    results = []
+    for app, runner in runners.items():
+        results += await replayer.replay_all(
+            runner, traces[app], concurrency, repeat, time_scale
+        )
+    elapsed = time.perf_counter() - started
+
+    stats = ReplayStats()
+    for result in results:
+        stats.add(result.stats)
+    turn_ms = [ms for result in results for ms in result.turn_ms]
+    recorded_ms = [ms for result in results for ms in result.recorded_ms]
+    return {
+        "concurrency": concurrency,
+        "sessions": len(results),
+        "turns": len(turn_ms),
+        "errors": sum(result.errors for result in results),
+        "event_mismatches": sum(
+            replayed != recorded
+            for result in results
+            for replayed, recorded in zip(result.events, result.recorded_events)
+        ),
+        "turn_ms": {
+            f"p{q}": round(percentile(turn_ms, q) or 0.0, 2) for q in (50, 95, 99)
+        },
+        "recorded_turn_ms": {
+            f"p{q}": round(percentile(recorded_ms, q) or 0.0, 2) for q in (50, 95, 99)
+        },
+        "throughput_turns_per_s": round(len(turn_ms) / elapsed, 2),
+        "elapsed_s": round(elapsed, 3),
+        **stats.as_dict(),
+    }
+
+
+async def _replay(args: argparse.Namespace, directory: Path) -> dict:
+    from google.adk.runners import Runner
+
+    from telemetry.traces import SessionTrace, TraceReplayer
+
+    traces = defaultdict(list)
+    for path in _trace_paths(args.traces):
+        trace = SessionTrace.load(path)
+        traces[trace.app].append(trace)
+    if not traces:
+        raise SystemExit(f"No traces found in {[str(p) for p in args.traces]}.")
+
+    replayer = TraceReplayer()
+    agents = {}
+    for app in traces:
+        agents[app] = _root_agent(app)
+        replayer.attach(agents[app])
+    _quiet()
+
+    report = {}
+    for service_name in args.session_service:
+        service = _session_service(service_name, directory)
+        runners = {
+            app: Runner(app_name=app, agent=agent, session_service=service)
+            for app, agent in agents.items()
+        }
+        # Warm-up replay so that lazy imports are not measured.
+        await _replay_level(replayer, runners, traces, 1, 1, 0.0)
+        levels = []
+        for concurrency in args.concurrency:
+            level = await _replay_level(
+                replayer, runners, traces, concurrency, args.repeat, args.time_scale
+            )
+            print(
+                f"{service_name:<12} c={concurrency:<3} "
+                f"p50 {level['turn_ms']['p50']:>8.1f} ms  "
+                f"p99 {level['turn_ms']['p99']:>8.1f} ms  "
+                f"(recorded p50 {level['recorded_turn_ms']['p50']:>8.1f} ms)  "
+                f"{level['throughput_turns_per_s']:>8.2f} turns/s  "
+                f"errors {level['errors']}  misses "
+                f"{level['model_misses'] + level['tool_misses']}  "
+                f"diverged {level['diverged_requests'] + level['diverged_args']}"
+            )
+            levels.append(level)
+        report[service_name] = levels
+    return {
+        "apps": {app: len(app_traces) for app, app_traces in traces.items()},
+        "session_services": report,
+    }
+
+
+def replay(args: argparse.Namespace) -> int:
+    directory = Path(tempfile.mkdtemp(prefix="replay_sessions_"))
+    profiler = cProfile.Profile() if args.profile else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        report = asyncio.run(_replay(args, directory))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        shutil.rmtree(directory, ignore_errors=True)
+    if profiler is not None:
+        args.profile.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+
+    report = {
+        "config": {
+            key: [str(v) for v in value] if key == "traces" else value
+            for key, value in vars(args).items()
+            if key not in ("func", "output", "profile")
+        },
+        **report,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(required=True)
+
+    record_parser = commands.add_parser("record", help="Record scenario sessions.")
+    record_parser.add_argument(
+        "--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS)
+    )
+    record_parser.add_argument("--sessions", type=int, default=1)
+    record_parser.add_argument(
+        "--fake-server",
+        action="store_true",
+        help="Record against the fake model server instead of the configured models.",
+    )
+    record_parser.add_argument("--first-token-ms", type=float, default=100.0)
+    record_parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    record_parser.add_argument("--output-dir", type=Path, default=Path(".cache/traces"))
+    record_parser.set_defaults(func=record)
+
+    replay_parser = commands.add_parser("replay", help="Replay recorded traces.")
+    replay_parser.add_argument(
+        "traces", nargs="+", type=Path, help="Trace files or directories."
+    )
+    replay_parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 16])
+    replay_parser.add_argument(
+        "--repeat", type=int, default=4, help="Replays of every trace per level."
+    )
+    replay_parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.0,
+        help="Multiplier of recorded delays: 1 is the original speed, 0 none.",
+    )
+    replay_parser.add_argument(
+        "--session-service",
+        nargs="+",
+        choices=["memory", "sqlite_diff"],
+        default=["memory"],
+    )
+    replay_parser.add_argument("--profile", type=Path, help="cProfile output file.")
+    replay_parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/replay.json")
+    )
+    replay_parser.set_defaults(func=replay)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
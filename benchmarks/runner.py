@@ -0,0 +1,376 @@
+"""Offline end-to-end benchmarks of the agent workflows.
+
+Starts `benchmarks.fake_llm_server` in-process, points every agent at it through
+`LLM_ENDPOINT_OVERRIDE` and drives the root agents through an ADK `Runner`.
+For every scenario and concurrency level the report contains latency
+percentiles per user turn and throughput; per stage (agent) it contains the
+wall time split into model, tool and framework overhead.
+
+Usage:
+    python -m benchmarks.runner
+    python -m benchmarks.runner --scenario coding_pipeline --concurrency 1 8 32 \\
+        --runs 64 --first-token-ms 50 --output .cache/benchmarks/latest.json
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+
+from benchmarks.fake_llm_server import FakeLlmServer, LatencyProfile
+from telemetry.instrument import append_callback, walk_agents
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+
+
+@dataclass
+class Scenario:
+    """A root agent and the conversation sent to it in every run.
+
+    Attributes:
+        module: Module exposing `root_agent`.
+        turns: User messages sent in order within one session.
+        state: Initial session state.
+    """
+
+    module: str
+    turns: list[str]
+    state: dict[str, Any] = field(default_factory=dict)
+
+
+SCENARIOS = {
+    "coding_pipeline": Scenario(
+        module="coding_agent.agent",
+        turns=["Write a Python function that adds two integers."],
+    ),
+    "agent_builder": Scenario(
+        module="agent_agent.agent",
+        turns=["Build me an agent that answers weather questions."],
+    ),
+    "weather_multi": Scenario(
+        module="test_weather_multi_agent.agent",
+        turns=[
+            "Hello!",
+            "What's the weather in London?",
+            "And in London and Tokyo?",
+            "Thanks, bye!",
+        ],
+    ),
+}
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    """Returns the `q`-th percentile (0-100) of `values` by linear interpolation."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _covered_seconds(intervals: list[tuple[float, float]]) -> float:
+    """Returns the total length of the union of `intervals`."""
+    total = 0.0
+    end = float("-inf")
+    for start, stop in sorted(intervals):
+        if stop <= end:
+            continue
+        total += stop - max(start, end)
+        end = stop
+    return total
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    wall: float = 0.0
+    model: float = 0.0
+    tool: float = 0.0
+    overhead: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        per_call = max(1, self.calls)
+        return {
+            "calls": self.calls,
+            "wall_ms": round(self.wall * 1000 / per_call, 2),
+            "model_ms": round(self.model * 1000 / per_call, 2),
+            "tool_ms": round(self.tool * 1000 / per_call, 2),
+            "overhead_ms": round(self.overhead * 1000 / per_call, 2),
+        }
+
+
+class StageTimer:
+    """Splits each agent run into model, tool, sub-agent and overhead time.
+
+    Agent, model and tool callbacks are appended to every agent in the tree.
+    Overhead is the part of an agent's wall time not covered by its own model
+    calls, tool calls or sub-agents running in the same invocation.
+    """
+
+    def __init__(self):
+        self.stages: dict[str, StageStats] = defaultdict(StageStats)
+        self._started: dict[tuple, float] = {}
+        self._covered: dict[tuple, list[tuple[float, float]]] = defaultdict(list)
+        self._model: dict[tuple, float] = defaultdict(float)
+        self._tool: dict[tuple, float] = defaultdict(float)
+
+    def reset(self) -> None:
+        self.stages.clear()
+
+    def attach(self, agent: "BaseAgent") -> None:
+        """Instruments `agent`, its sub-agents and agents used as tools."""
+        from google.adk.agents import LlmAgent
+
+        for current in walk_agents(agent):
+            append_callback(current, "before_agent_callback", self._before_agent)
+            append_callback(current, "after_agent_callback", self._after_agent(current))
+            if isinstance(current, LlmAgent):
+                append_callback(current, "before_model_callback", self._before_model)
+                append_callback(current, "after_model_callback", self._after_model)
+                append_callback(current, "before_tool_callback", self._before_tool)
+                append_callback(current, "after_tool_callback", self._after_tool)
+
+    def _before_agent(self, callback_context):
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        self._started[key] = time.perf_counter()
+        return None
+
+    def _after_agent(self, agent: "BaseAgent"):
+        def callback(callback_context):
+            ended = time.perf_counter()
+            key = (callback_context.invocation_id, callback_context.agent_name)
+            started = self._started.pop(key, None)
+            if started is None:
+                return None
+            stage = self.stages[agent.name]
+            stage.calls += 1
+            stage.wall += ended - started
+            stage.model += self._model.pop(key, 0.0)
+            stage.tool += self._tool.pop(key, 0.0)
+            stage.overhead += (ended - started) - _covered_seconds(
+                self._covered.pop(key, [])
+            )
+            enclosing = self._enclosing_agent(agent, callback_context.invocation_id)
+            if enclosing is not None:
+                self._covered[enclosing].append((started, ended))
+            return None
+
+        return callback
+
+    def _enclosing_agent(self, agent: "BaseAgent", invocation_id: str):
+        """Returns the key of the running agent that `agent` ran inside of.
+
+        That is the parent when it is running in the same invocation (sequential,
+        parallel and loop agents), otherwise the most recently started agent of
+        the invocation (the agent that transferred control).
+        """
+        running = [
+            key
+            for key in self._started
+            if len(key) == 2 and key[0] == invocation_id and key[1] != agent.name
+        ]
+        parent = agent.parent_agent
+        if parent is not None and (invocation_id, parent.name) in running:
+            return (invocation_id, parent.name)
+        return max(running, key=self._started.get, default=None)
+
+    def _before_model(self, callback_context, llm_request):
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        self._started[key] = time.perf_counter()
+        return None
+
+    def _after_model(self, callback_context, llm_response):
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        started = self._started.pop(key, None)
+        if started is not None:
+            self._record(key[1:], "_model", started)
+        return None
+
+    def _before_tool(self, tool, args, tool_context):
+        key = (
+            "tool",
+            tool_context.invocation_id,
+            tool_context.agent_name,
+            tool_context.function_call_id,
+        )
+        self._started[key] = time.perf_counter()
+        return None
+
+    def _after_tool(self, tool, args, tool_context, tool_response):
+        key = (
+            "tool",
+            tool_context.invocation_id,
+            tool_context.agent_name,
+            tool_context.function_call_id,
+        )
+        started = self._started.pop(key, None)
+        if started is not None:
+            self._record(key[1:3], "_tool", started)
+        return None
+
+    def _record(self, agent_key: tuple, kind: str, started: float) -> None:
+        ended = time.perf_counter()
+        getattr(self, kind)[agent_key] += ended - started
+        self._covered[agent_key].append((started, ended))
+
+
+async def _run_session(runner, scenario: Scenario) -> tuple[list[float], int]:
+    from google.genai import types
+
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name,
+        user_id="benchmark",
+        session_id=uuid.uuid4().hex,
+        state=dict(scenario.state),
+    )
+    latencies = []
+    errors = 0
+    for turn in scenario.turns:
+        started = time.perf_counter()
+        try:
+            async for event in runner.run_async(
+                user_id=session.user_id,
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text=turn)]),
+            ):
+                if event.error_code:
+                    errors += 1
+        except Exception as e:
+            print(f"❌ Run failed: {e!r}")
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    return latencies, errors
+
+
+async def run_level(runner, scenario: Scenario, concurrency: int, runs: int) -> dict:
+    """Runs `runs` sessions of `scenario` with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded():
+        async with semaphore:
+            return await _run_session(runner, scenario)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(bounded() for _ in range(runs)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for session, _ in results for latency in session]
+    return {
+        "concurrency": concurrency,
+        "sessions": runs,
+        "turns": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "throughput_turns_per_s": round(len(latencies) / elapsed, 2),
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+async def run_scenario(
+    name: str, scenario: Scenario, concurrency_levels: list[int], runs: int
+) -> dict:
+    from google.adk.runners import InMemoryRunner
+
+    root_agent = importlib.import_module(scenario.module).root_agent
+    # Agent modules may configure INFO logging; keep per-call logs out.
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    timer = StageTimer()
+    timer.attach(root_agent)
+    runner = InMemoryRunner(agent=root_agent, app_name=f"benchmark_{name}")
+
+    # Warm-up run so that lazy imports and connection setup are not measured.
+    await _run_session(runner, scenario)
+    timer.reset()
+
+    levels = []
+    for concurrency in concurrency_levels:
+        level = await run_level(runner, scenario, concurrency, runs)
+        print(
+            f"{name:<16} c={concurrency:<3} p50 {level['p50_ms']:>8.1f} ms  "
+            f"p95 {level['p95_ms']:>8.1f} ms  p99 {level['p99_ms']:>8.1f} ms  "
+            f"{level['throughput_turns_per_s']:>7.2f} turns/s  errors {level['errors']}"
+        )
+        levels.append(level)
+    return {
+        "module": scenario.module,
+        "levels": levels,
+        "stages": {agent: stats.to_dict() for agent, stats in timer.stages.items()},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenario", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS)
+    )
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--runs", type=int, default=16, help="Sessions per level.")
+    parser.add_argument("--first-token-ms", type=float, default=100.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/latest.json")
+    )
+    args = parser.parse_args(argv)
+
+    latency = LatencyProfile(args.first_token_ms, args.tokens_per_second, args.jitter)
+    with FakeLlmServer(latency=latency, seed=args.seed) as server:
+        os.environ["LLM_ENDPOINT_OVERRIDE"] = server.api_base
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        from config import get_settings
+
+        get_settings.cache_clear()
+
+        scenarios = {}
+        for name in args.scenario:
+            scenarios[name] = asyncio.run(
+                run_scenario(name, SCENARIOS[name], args.concurrency, args.runs)
+            )
+        server_stats = server.stats.to_dict()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "latency_profile": vars(latency),
+        "runs_per_level": args.runs,
+        "scenarios": scenarios,
+        "fake_server": server_stats,
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
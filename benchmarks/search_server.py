@@ -0,0 +1,92 @@
+"""Local stand-in for the Custom Search JSON API used by `HttpSearchBackend`.
+
+Serves `GET /customsearch/v1?q=<query>&num=<n>` with results derived from the
+query terms, after a configurable latency, and counts the requests it receives
+per normalized query so cache, deduplication and prefetch behavior can be
+checked:
+
+    python -m benchmarks.search_server --port 8767 --latency-ms 300
+    SEARCH_BACKEND=http SEARCH_API_BASE=http://127.0.0.1:8767 adk web
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.servers import BackgroundServer
+from tools.search_provider import query_key, query_terms
+
+
+def create_app(latency_ms: float = 300.0) -> Starlette:
+    """Builds the ASGI app; request counts per query key are in `app.state.requests`."""
+    requests = Counter()
+
+    async def search(request: Request):
+        query = request.query_params.get("q", "")
+        num = int(request.query_params.get("num", "10"))
+        terms = sorted(query_terms(query))
+        requests[query_key(frozenset(terms))] += 1
+        await asyncio.sleep(latency_ms / 1000)
+        if not terms:
+            return JSONResponse(
+                {"error": {"message": "Missing query."}}, status_code=400
+            )
+        slug = "-".join(terms)
+        items = [
+            {
+                "title": f"{' '.join(terms).title()} ({rank})",
+                "link": f"https://example.com/{slug}/{rank}",
+                "snippet": f"Result {rank} about {query}.",
+            }
+            for rank in range(1, min(num, 10) + 1)
+        ]
+        return JSONResponse({"items": items})
+
+    async def stats(_: Request):
+        return JSONResponse(dict(requests))
+
+    app = Starlette(
+        routes=[Route("/customsearch/v1", search), Route("/stats", stats)],
+    )
+    app.state.requests = requests
+    return app
+
+
+class SearchServer(BackgroundServer):
+    """Runs the stand-in search API in a background thread."""
+
+    def __init__(
+        self,
+        latency_ms: float = 300.0,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+    ):
+        super().__init__(create_app(latency_ms), host, port)
+
+    @property
+    def requests(self) -> Counter:
+        return self.app.state.requests
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    print(f"Search stand-in server on http://{args.host}:{args.port}")
+    uvicorn.run(
+        create_app(args.latency_ms), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
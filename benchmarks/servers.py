@@ -0,0 +1,62 @@
+"""In-process hosting of the local stand-in servers used by the benchmarks."""
+
+import socket
+import threading
+import time
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+
+
+def free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs an ASGI app with uvicorn in a daemon thread.
+
+    Example:
+        with BackgroundServer(app) as server:
+            httpx.get(f"{server.url}/health")
+    """
+
+    def __init__(
+        self, app: Starlette, host: str = "127.0.0.1", port: Optional[int] = None
+    ):
+        self.app = app
+        self.host = host
+        self.port = port or free_port(host)
+        self._server = uvicorn.Server(
+            uvicorn.Config(
+                app, host=host, port=self.port, log_level="warning", lifespan="off"
+            )
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"{type(self).__name__} did not start.")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,194 @@
+"""Session store benchmark: in-memory vs. ADK database vs. diff-based SQLite.
+
+Replays a planning/coding refinement loop against each session service. Every
+iteration appends a critic event (new `criticism`), a refiner event (a few
+lines of `planning_document` edited) and a coder event (a few lines of
+`generated_code` edited). Reports append latency, bytes on disk and the time
+to resume a session from a fresh service instance.
+
+Usage:
+    python -m benchmarks.session_store --sessions 20 --iterations 10 --plan-kb 40
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import (
+    BaseSessionService,
+    DatabaseSessionService,
+    InMemorySessionService,
+)
+from google.genai import types
+
+from benchmarks.runner import percentile
+from sessions.diff_session_service import DiffSessionService
+
+
+def _document(rng: random.Random, kilobytes: int, prefix: str) -> list[str]:
+    lines = []
+    while sum(map(len, lines)) < kilobytes * 1024:
+        words = " ".join(f"{prefix}{rng.randrange(10_000)}" for _ in range(10))
+        lines.append(f"- {words}\n")
+    return lines
+
+
+def _edit(rng: random.Random, lines: list[str], count: int) -> list[str]:
+    lines = list(lines)
+    for _ in range(count):
+        index = rng.randrange(len(lines))
+        lines[index] = f"- revised {rng.randrange(10**9)} {lines[index][2:]}"
+    return lines
+
+
+def _event(author: str, text: str, delta: dict) -> Event:
+    return Event(
+        author=author,
+        invocation_id="benchmark",
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=delta),
+    )
+
+
+def _disk_bytes(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.iterdir() if path.is_file())
+
+
+async def _run_store(
+    name: str,
+    make: Callable[[], BaseSessionService],
+    directory: Path,
+    sessions: int,
+    iterations: int,
+    plan_kb: int,
+    seed: int,
+) -> dict:
+    rng = random.Random(seed)
+    service = make()
+    append_ms: list[float] = []
+    session_ids = []
+    for index in range(sessions):
+        session = await service.create_session(
+            app_name="benchmark", user_id=f"user_{index}"
+        )
+        session_ids.append((session.user_id, session.id))
+        plan = _document(rng, plan_kb, "p")
+        code = _document(rng, plan_kb // 4 or 1, "c")
+        for iteration in range(iterations):
+            plan = _edit(rng, plan, 3)
+            code = _edit(rng, code, 2)
+            criticism = "".join(_document(rng, 3, "k"))
+            for event in (
+                _event("PlanCriticAgent", criticism, {"criticism": criticism}),
+                _event(
+                    "PlanRefinerAgent",
+                    "".join(plan),
+                    {"planning_document": "".join(plan), "iteration": iteration},
+                ),
+                _event(
+                    "CodeWriterAgent", "".join(code), {"generated_code": "".join(code)}
+                ),
+            ):
+                started = time.perf_counter()
+                await service.append_event(session, event)
+                append_ms.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        "store": name,
+        "events": len(append_ms),
+        "append_ms": {f"p{q}": percentile(append_ms, q) for q in (50, 95, 99)},
+        "append_total_s": round(sum(append_ms) / 1000, 3),
+    }
+    if isinstance(service, InMemorySessionService):
+        return {**result, "disk_bytes": None, "resume_ms": None}
+
+    if isinstance(service, DiffSessionService):
+        result["storage"] = service.storage_stats()
+        service.close()
+    result["disk_bytes"] = _disk_bytes(directory)
+
+    fresh = make()
+    resume_ms = []
+    for user_id, session_id in session_ids:
+        started = time.perf_counter()
+        session = await fresh.get_session(
+            app_name="benchmark", user_id=user_id, session_id=session_id
+        )
+        resume_ms.append((time.perf_counter() - started) * 1000)
+        assert session is not None and len(session.events) == iterations * 3
+    result["resume_ms"] = {f"p{q}": percentile(resume_ms, q) for q in (50, 95)}
+    if isinstance(fresh, DiffSessionService):
+        fresh.close()
+    return result
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--plan-kb", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", type=Path, default=Path(".cache/benchmarks/session_store.json")
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    root = Path(tempfile.mkdtemp(prefix="session_store_"))
+    try:
+        stores = {
+            "in_memory": lambda directory: InMemorySessionService,
+            "adk_database": lambda directory: lambda: DatabaseSessionService(
+                f"sqlite:///{directory / 'adk.sqlite3'}"
+            ),
+            "sqlite_diff": lambda directory: lambda: DiffSessionService(
+                directory / "diff.sqlite3"
+            ),
+        }
+        for name, factory in stores.items():
+            directory = root / name
+            directory.mkdir()
+            result = asyncio.run(
+                _run_store(
+                    name,
+                    factory(directory),
+                    directory,
+                    args.sessions,
+                    args.iterations,
+                    args.plan_kb,
+                    args.seed,
+                )
+            )
+            results.append(result)
+            disk = result["disk_bytes"]
+            resume = result["resume_ms"]
+            print(
+                f"{name:<13} append p50 {result['append_ms']['p50']:7.2f} ms "
+                f"p95 {result['append_ms']['p95']:7.2f} ms  "
+                f"disk {disk / 1e6 if disk is not None else float('nan'):8.2f} MB  "
+                f"resume p50 {resume['p50'] if resume else float('nan'):7.2f} ms"
+            )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(
+        json.dumps(
+            {"config": vars(args) | {"output": str(args.output)}, "results": results},
+            indent=2,
+        )
+    )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
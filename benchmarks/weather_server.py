@@ -0,0 +1,91 @@
+"""Local stand-in for the weather HTTP API used by `HttpWeatherBackend`.
+
+Serves `GET /weather?city=<name>` from a fixed table with a configurable
+latency, and counts the requests it receives so cache and coalescing behavior
+can be checked:
+
+    python -m benchmarks.weather_server --port 8766 --latency-ms 80
+    WEATHER_BACKEND=http WEATHER_API_BASE=http://127.0.0.1:8766 adk web
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.servers import BackgroundServer
+from tools.weather_provider import normalize_city
+
+CITIES = {
+    "newyork": ("New York", "sunny", 25),
+    "london": ("London", "cloudy", 15),
+    "tokyo": ("Tokyo", "light rain", 18),
+    "paris": ("Paris", "partly cloudy", 21),
+    "berlin": ("Berlin", "overcast", 12),
+    "sydney": ("Sydney", "clear", 27),
+}
+
+
+def create_app(latency_ms: float = 50.0) -> Starlette:
+    """Builds the ASGI app; request counts per city are in `app.state.requests`."""
+    requests = Counter()
+
+    async def weather(request: Request):
+        city = request.query_params.get("city", "")
+        key = normalize_city(city)
+        requests[key] += 1
+        await asyncio.sleep(latency_ms / 1000)
+        if key not in CITIES:
+            return JSONResponse({"error": f"Unknown city '{city}'."}, status_code=404)
+        name, condition, temperature = CITIES[key]
+        return JSONResponse(
+            {"city": name, "condition": condition, "temperature_c": temperature}
+        )
+
+    async def stats(_: Request):
+        return JSONResponse(dict(requests))
+
+    app = Starlette(
+        routes=[Route("/weather", weather), Route("/stats", stats)],
+    )
+    app.state.requests = requests
+    return app
+
+
+class WeatherServer(BackgroundServer):
+    """Runs the stand-in weather API in a background thread."""
+
+    def __init__(
+        self,
+        latency_ms: float = 50.0,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+    ):
+        super().__init__(create_app(latency_ms), host, port)
+
+    @property
+    def requests(self) -> Counter:
+        return self.app.state.requests
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    print(f"Weather stand-in server on http://{args.host}:{args.port}")
+    uvicorn.run(
+        create_app(args.latency_ms), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
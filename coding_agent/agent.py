@@ -1,11 +1,117 @@
-from google.adk.agents import SequentialAgent
+from typing import Any, Mapping
 
-from sub_agents.code_refactor_agent import code_refactor_agent
-from sub_agents.code_reviewer_agent import code_reviewer_agent
-from sub_agents.code_writer_agent import code_writer_agent
+from agent_registry import lazy_agents, register_agent
+from config import get_settings
 
-root_agent = SequentialAgent(
-    name="code_pipeline_agent",
-    description="Executes a sequence of code writing, reviewing, and refactoring.",
-    sub_agents=[code_writer_agent, code_reviewer_agent, code_refactor_agent],
-)
+
+def no_code_block(state: Mapping[str, Any]) -> bool:
+    """True when the writer's answer has no ```python block to review."""
+    from sessions.artifacts import resolve
+    from workflows.code_checks import extract_python
+
+    return extract_python(str(resolve(state.get("generated_code")) or "")) is None
+
+
+def clean_review(state: Mapping[str, Any]) -> bool:
+    """True when the review asks for no changes and the static checks passed."""
+    from workflows.static_check import is_clean_review
+
+    check = state.get("static_check") or {"ok": True}
+    return is_clean_review(str(state.get("review_comments") or "")) and check["ok"]
+
+
+def _candidates_stage():
+    """Returns the stage writing `CODE_CANDIDATES` drafts and keeping the best."""
+    from sub_agents.code_writer_agent import build_code_writer
+    from workflows.candidates import CodeCandidatesAgent
+
+    settings = get_settings()
+    models = settings.CODE_CANDIDATE_MODELS or [settings.MODEL_GEMINI_2_0_FLASH]
+    writers = [
+        build_code_writer(
+            f"code_writer_candidate_{index + 1}",
+            models[index % len(models)],
+            output_key=f"code_candidate_{index + 1}",
+        )
+        for index in range(settings.CODE_CANDIDATES)
+    ]
+    return CodeCandidatesAgent(
+        name="code_writer_candidates",
+        description="Writes several drafts concurrently and keeps the one with the fewest static check findings.",
+        sub_agents=writers,
+        output_key="generated_code",
+        report_key="code_candidates",
+        budget_seconds=settings.CODE_CANDIDATE_BUDGET_SECONDS,
+        accept_clean=settings.CODE_CANDIDATE_ACCEPT_CLEAN,
+        lint=settings.STATIC_CHECK_LINT,
+        doctests=settings.STATIC_CHECK_DOCTESTS,
+        check_key="static_check" if settings.STATIC_CHECK_ENABLED else None,
+        findings_key="static_findings" if settings.STATIC_CHECK_ENABLED else None,
+    )
+
+
+@register_agent("code_pipeline_agent")
+def build_code_pipeline_agent():
+    from google.adk.agents import SequentialAgent
+
+    from sub_agents.code_refactor_agent import code_refactor_agent
+    from sub_agents.code_reviewer_agent import code_reviewer_agent
+
+    settings = get_settings()
+    candidates = settings.CODE_CANDIDATES > 1
+    if candidates:
+        stages = [_candidates_stage()]
+    else:
+        from sub_agents.code_writer_agent import code_writer_agent
+
+        stages = [code_writer_agent]
+    # The candidate stage already checked the draft it selected.
+    if settings.STATIC_CHECK_ENABLED and not candidates:
+        from workflows.static_check import StaticCheckAgent
+
+        stages.append(
+            StaticCheckAgent(
+                name="code_static_check_agent",
+                description="Parses, compiles and lints the generated code without a model call.",
+                code_key="generated_code",
+                output_key="static_check",
+                findings_key="static_findings",
+                lint=settings.STATIC_CHECK_LINT,
+                doctests=settings.STATIC_CHECK_DOCTESTS,
+            )
+        )
+    stages += [code_reviewer_agent, code_refactor_agent]
+
+    from sessions.artifacts import resolve
+    from workflows.gated import Gate
+
+    # After a clean review the refactor stage would only echo the code back.
+    # Without workflow gates this is the only gate, and only with static checks.
+    gates = {}
+    if settings.WORKFLOW_GATES_ENABLED or settings.STATIC_CHECK_ENABLED:
+        gates[code_refactor_agent.name] = Gate(
+            skip_if=clean_review,
+            skip_output=lambda state: str(resolve(state.get("generated_code")) or ""),
+        )
+    if settings.WORKFLOW_GATES_ENABLED:
+        # Without code there is nothing to review or refactor.
+        gates[code_reviewer_agent.name] = Gate(stop_if=no_code_block)
+
+    description = "Executes a sequence of code writing, reviewing, and refactoring."
+    if not gates:
+        return SequentialAgent(
+            name="code_pipeline_agent", description=description, sub_agents=stages
+        )
+
+    from workflows.gated import GatedSequentialAgent
+
+    return GatedSequentialAgent(
+        name="code_pipeline_agent",
+        description=description,
+        sub_agents=stages,
+        gates=gates,
+        report_key="code_pipeline_gates",
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="code_pipeline_agent")
@@ -0,0 +1,336 @@
+"""Batch mode for the code pipeline.
+
+Reads code-generation specs as JSONL from a file or stdin, runs
+`code_pipeline_agent` (writer → reviewer → refactor) for many specs at once,
+each in its own session, and writes one JSONL result per spec as soon as it
+finishes. Input lines are either a JSON string or an object with a `spec`
+field and an optional `id` (defaults to the line number). Result lines hold
+`id`, `status` ("ok" or "error"), `refactored_code` or `error`, and timings in
+milliseconds for the whole item and for each pipeline stage. Model requests
+are made at batch priority, so with `LLM_RATE_LIMIT_ENABLED` interactive
+sessions sharing the process are admitted first.
+
+With `--resume`, results already in the output file are kept, specs whose
+result is "ok" are skipped, and new results are appended, so a crashed batch
+can be restarted with the same command. A throughput summary is printed to
+stderr at the end.
+
+Usage:
+    python -m coding_agent.batch --input specs.jsonl --output results.jsonl \\
+        --concurrency 16 --resume
+    cat specs.jsonl | python -m coding_agent.batch > results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional, TextIO
+
+from config import get_settings
+from sessions.artifacts import resolve
+from tools.stats import percentile
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class BatchItem:
+    """One input line.
+
+    Attributes:
+        id: Identifier copied to the result line.
+        spec: The code-generation request, or None when the line is invalid.
+        error: Why the line could not be parsed.
+    """
+
+    id: str
+    spec: Optional[str]
+    error: Optional[str] = None
+
+
+def parse_line(number: int, line: str) -> BatchItem:
+    """Parses an input line; `number` is its 1-based line number."""
+    try:
+        value = json.loads(line)
+    except ValueError as e:
+        return BatchItem(str(number), None, f"Invalid JSON: {e}")
+    if isinstance(value, str):
+        return BatchItem(str(number), value)
+    if isinstance(value, dict) and isinstance(value.get("spec"), str):
+        return BatchItem(str(value.get("id", number)), value["spec"])
+    return BatchItem(
+        str(value.get("id", number)) if isinstance(value, dict) else str(number),
+        None,
+        "Expected a JSON string or an object with a 'spec' string.",
+    )
+
+
+def completed_ids(path: Path) -> set[str]:
+    """Returns the ids with an "ok" result in an existing output file.
+
+    A truncated last line, as left by a crash, is ignored.
+    """
+    done = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as lines:
+        for line in lines:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(result, dict) and result.get("status") == "ok":
+                done.add(str(result.get("id")))
+    return done
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with path.open("rb") as existing:
+        existing.seek(-1, 2)
+        return existing.read(1) == b"\n"
+
+
+@dataclass
+class BatchStats:
+    """Counters and item latencies of a batch run."""
+
+    ok: int = 0
+    failed: int = 0
+    skipped: int = 0
+    item_ms: list[float] = field(default_factory=list)
+    elapsed_s: float = 0.0
+
+    def as_dict(self) -> dict:
+        processed = self.ok + self.failed
+        return {
+            "ok": self.ok,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "items_per_second": (
+                round(processed / self.elapsed_s, 2) if self.elapsed_s else None
+            ),
+            "item_ms": {
+                "p50": percentile(self.item_ms, 50),
+                "p95": percentile(self.item_ms, 95),
+                "p99": percentile(self.item_ms, 99),
+            },
+        }
+
+
+async def run_item(
+    runner: "Runner", item: BatchItem, timeout_seconds: Optional[float] = None
+) -> dict:
+    """Runs the pipeline for one spec in a fresh session and returns its result line."""
+    from google.genai import types
+
+    from llm.limiter import Priority, request_priority
+
+    started = time.perf_counter()
+    stages: dict[str, float] = {}
+    stage_started = started
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id="batch", session_id=uuid.uuid4().hex
+    )
+
+    async def run() -> None:
+        nonlocal stage_started
+        with request_priority(Priority.BATCH):
+            async for event in runner.run_async(
+                user_id=session.user_id,
+                session_id=session.id,
+                new_message=types.Content(
+                    role="user", parts=[types.Part(text=item.spec)]
+                ),
+            ):
+                if event.error_code:
+                    raise RuntimeError(
+                        f"{event.author}: {event.error_code} {event.error_message or ''}".strip()
+                    )
+                if event.partial or not event.is_final_response():
+                    continue
+                now = time.perf_counter()
+                stages[event.author] = (
+                    stages.get(event.author, 0.0) + (now - stage_started) * 1000
+                )
+                stage_started = now
+
+    result = {"id": item.id}
+    try:
+        await asyncio.wait_for(run(), timeout_seconds)
+        final = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=session.user_id, session_id=session.id
+        )
+        result.update(
+            status="ok", refactored_code=resolve(final.state.get("refactored_code"))
+        )
+    except asyncio.TimeoutError:
+        result.update(status="error", error=f"Timed out after {timeout_seconds} s")
+    except Exception as e:
+        logger.debug("Batch item %s failed", item.id, exc_info=True)
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        await runner.session_service.delete_session(
+            app_name=runner.app_name, user_id=session.user_id, session_id=session.id
+        )
+    result["timings_ms"] = {
+        "total": round((time.perf_counter() - started) * 1000, 1),
+        "stages": {name: round(ms, 1) for name, ms in stages.items()},
+    }
+    return result
+
+
+async def run_batch(
+    runner: "Runner",
+    lines: Iterator[str],
+    output: TextIO,
+    concurrency: int,
+    timeout_seconds: Optional[float] = None,
+    skip_ids: frozenset[str] = frozenset(),
+) -> BatchStats:
+    """Runs the pipeline for every spec in `lines` and streams results to `output`.
+
+    Lines are read lazily through a bounded queue, so large inputs (including
+    stdin) are never loaded as a whole.
+
+    Args:
+        runner (Runner): Runner of the code pipeline.
+        lines (Iterator[str]): JSONL input lines.
+        output (TextIO): Receives one JSON result line per processed spec.
+        concurrency (int): Maximum number of pipelines in flight.
+        timeout_seconds (float, optional): Per-spec time limit.
+        skip_ids (frozenset[str]): Ids that already have an "ok" result.
+
+    Returns:
+        BatchStats: Counters, latencies and elapsed time.
+    """
+    stats = BatchStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.perf_counter()
+
+    def write(result: dict) -> None:
+        output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        output.flush()
+
+    async def read() -> None:
+        number = 0
+        while True:
+            line = await asyncio.to_thread(next, lines, None)
+            if line is None:
+                break
+            number += 1
+            if not line.strip():
+                continue
+            item = parse_line(number, line)
+            if item.id in skip_ids:
+                stats.skipped += 1
+                continue
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(_DONE)
+
+    async def work() -> None:
+        while (item := await queue.get()) is not _DONE:
+            if item.spec is None:
+                result = {"id": item.id, "status": "error", "error": item.error}
+            else:
+                result = await run_item(runner, item, timeout_seconds)
+                stats.item_ms.append(result["timings_ms"]["total"])
+            if result["status"] == "ok":
+                stats.ok += 1
+            else:
+                stats.failed += 1
+            write(result)
+
+    await asyncio.gather(read(), *(work() for _ in range(concurrency)))
+    stats.elapsed_s = time.perf_counter() - started
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--input", type=Path, help="JSONL file of specs (default: stdin)."
+    )
+    parser.add_argument(
+        "--output", type=Path, help="JSONL file of results (default: stdout)."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.BATCH_CONCURRENCY,
+        help="Pipelines in flight (default: BATCH_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=float,
+        default=settings.BATCH_ITEM_TIMEOUT_SECONDS,
+        help="Per-spec time limit (default: BATCH_ITEM_TIMEOUT_SECONDS).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Append to --output and skip specs that already have an ok result.",
+    )
+    args = parser.parse_args(argv)
+    if args.resume and args.output is None:
+        parser.error("--resume needs --output")
+
+    from google.adk.runners import InMemoryRunner
+
+    from coding_agent.agent import root_agent
+
+    for logger_name in ("LiteLLM", "httpx"):
+        logging.getLogger(logger_name).setLevel(logging.WARNING)
+    runner = InMemoryRunner(agent=root_agent, app_name="batch")
+    skip_ids = frozenset(completed_ids(args.output)) if args.resume else frozenset()
+
+    source = args.input.open(encoding="utf-8") if args.input else sys.stdin
+    output = (
+        args.output.open("a" if args.resume else "w", encoding="utf-8")
+        if args.output
+        else sys.stdout
+    )
+    if args.resume and output.tell() and not _ends_with_newline(args.output):
+        output.write("\n")  # Terminate a line truncated by a crash.
+    try:
+        stats = asyncio.run(
+            run_batch(
+                runner,
+                iter(source),
+                output,
+                args.concurrency,
+                args.timeout_seconds,
+                skip_ids,
+            )
+        )
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            output.close()
+
+    summary = stats.as_dict()
+    print(
+        f"{summary['ok']} ok, {summary['failed']} failed, {summary['skipped']} skipped "
+        f"in {summary['elapsed_s']} s ({summary['items_per_second']} items/s, "
+        f"p50 {summary['item_ms']['p50']} ms, p95 {summary['item_ms']['p95']} ms)",
+        file=sys.stderr,
+    )
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
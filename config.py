@@ -12,6 +12,31 @@ class EnvironmentType(str, Enum):
     PRODUCTION = "production"
 
 
+class CriticMode(str, Enum):
+    SINGLE = "single"
+    PARALLEL = "parallel"
+
+
+class SessionBackendType(str, Enum):
+    MEMORY = "memory"
+    SQLITE_DIFF = "sqlite_diff"
+
+
+class ArtifactBackendType(str, Enum):
+    MEMORY = "memory"
+    FILE = "file"
+
+
+class WeatherBackendType(str, Enum):
+    MOCK = "mock"
+    HTTP = "http"
+
+
+class SearchBackendType(str, Enum):
+    BUILTIN = "builtin"
+    HTTP = "http"
+
+
 class Settings(BaseSettings):
     ENVIRONMENT: EnvironmentType = Field(
         default=EnvironmentType.DEVELOPMENT,
@@ -51,6 +76,16 @@ class Settings(BaseSettings):
         description="Base URL for Local Model Studio API",
     )
 
+    # Endpoint override settings
+    LLM_ENDPOINT_OVERRIDE: Optional[str] = Field(
+        default=None,
+        description="Send every agent's model requests to this OpenAI-compatible base URL",
+    )
+    LLM_ENDPOINT_OVERRIDE_API_KEY: str = Field(
+        default="not-needed",
+        description="API key sent to the endpoint override",
+    )
+
     # Models
     MODEL_GEMINI_2_0_FLASH: str = Field(
         default="gemini-2.0-flash",
@@ -77,6 +112,485 @@ class Settings(BaseSettings):
         description="Default Qwen3 model to use",
     )
 
+    # Model client pool settings
+    LLM_CLIENT_POOL_ENABLED: bool = Field(
+        default=False,
+        description="Share one model instance per (provider, model, base URL) and pool its HTTP connections",
+    )
+    LLM_POOL_MAX_CONNECTIONS: int = Field(
+        default=100,
+        description="Connections per provider endpoint and event loop",
+    )
+    LLM_POOL_MAX_KEEPALIVE_CONNECTIONS: int = Field(
+        default=20,
+        description="Idle connections kept open per provider endpoint and event loop",
+    )
+    LLM_POOL_KEEPALIVE_EXPIRY_SECONDS: float = Field(
+        default=60.0,
+        description="Idle time after which a kept-alive connection is closed",
+    )
+    LLM_POOL_CONNECT_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        description="Time limit for opening a connection to a provider",
+    )
+    LLM_POOL_READ_TIMEOUT_SECONDS: float = Field(
+        default=600.0,
+        description="Default time limit for a provider response",
+    )
+    LLM_POOL_HTTP2: bool = Field(
+        default=True,
+        description="Use HTTP/2 for provider connections when the 'h2' package is installed",
+    )
+
+    # Response cache settings
+    LLM_CACHE_ENABLED: bool = Field(
+        default=False,
+        description="Serve repeated model requests from the response cache",
+    )
+    LLM_CACHE_MAX_ENTRIES: int = Field(
+        default=512,
+        description="Maximum number of responses kept in the in-memory LRU tier",
+    )
+    LLM_CACHE_PATH: Optional[str] = Field(
+        default=".cache/llm_responses.sqlite3",
+        description="SQLite file for the on-disk cache tier (empty disables it)",
+    )
+    LLM_CACHE_TTL_SECONDS: Optional[float] = Field(
+        default=7 * 24 * 3600,
+        description="Time-to-live for cached responses (None keeps them forever)",
+    )
+    LLM_CACHE_EXCLUDED_AGENTS: list[str] = Field(
+        default_factory=list,
+        description="Agent names that always call the model directly",
+    )
+
+    # Prompt prefix cache settings
+    LLM_PREFIX_CACHE_ENABLED: bool = Field(
+        default=False,
+        description="Send static instructions and tool schemas first and have the provider cache them",
+    )
+    LLM_PREFIX_CACHE_MIN_TOKENS: int = Field(
+        default=1024,
+        description="Smallest prefix (estimated tokens) for which a provider cache is used",
+    )
+    LLM_PREFIX_CACHE_MIN_REQUESTS: int = Field(
+        default=2,
+        description="Requests with the same prefix before a provider cache is used",
+    )
+    LLM_PREFIX_CACHE_TTL_SECONDS: float = Field(
+        default=3600.0,
+        description="Lifetime of explicit (Gemini) prefix caches, extended while they are used",
+    )
+    LLM_PREFIX_CACHE_MAX_ENTRIES: int = Field(
+        default=32,
+        description="Prefixes tracked per model endpoint; evicted ones have their cache deleted",
+    )
+
+    # Model cascade settings
+    LLM_CASCADES: dict[str, list[str]] = Field(
+        default_factory=dict,
+        description="Per-agent models (names or MODEL_* settings) tried in order before the agent's own model",
+    )
+    LLM_CASCADE_VALIDATORS: dict[str, list[str]] = Field(
+        default_factory=dict,
+        description="Per-agent checks a cheaper model's answer must pass (tool_call, python_block, confidence)",
+    )
+    LLM_CASCADE_DEFAULT_VALIDATORS: list[str] = Field(
+        default=["tool_call", "confidence"],
+        description="Checks used for cascaded agents without an LLM_CASCADE_VALIDATORS entry",
+    )
+    LLM_CASCADE_MIN_CONFIDENCE: float = Field(
+        default=0.7,
+        description="Lowest self-reported confidence accepted from a cheaper model",
+    )
+
+    # Hedged request settings
+    LLM_HEDGES: dict[str, str] = Field(
+        default_factory=dict,
+        description="Per-agent secondary model (name or MODEL_* setting) raced against the agent's own when it is slow",
+    )
+    LLM_HEDGE_PERCENTILE: float = Field(
+        default=90,
+        description="Percentile of the primary's first-response latency used as hedge delay",
+    )
+    LLM_HEDGE_INITIAL_DELAY_MS: float = Field(
+        default=2000, description="Hedge delay until enough latencies were observed"
+    )
+    LLM_HEDGE_MIN_DELAY_MS: float = Field(
+        default=100, description="Lower bound of the hedge delay"
+    )
+    LLM_HEDGE_MAX_RATE: float = Field(
+        default=0.1, description="Largest long-run share of requests that are hedged"
+    )
+    LLM_HEDGE_MEASURE_RATE: float = Field(
+        default=0.1,
+        description="Share of races lost by the primary in which it runs to its first response to measure its latency",
+    )
+
+    # LLM rate limit settings
+    LLM_RATE_LIMIT_ENABLED: bool = Field(
+        default=False,
+        description="Send model requests through shared per-model rate limiters",
+    )
+    LLM_RATE_LIMITS: dict[str, dict[str, float]] = Field(
+        default={
+            "gemini": {"rpm": 1000, "tpm": 1000000},
+            "openai": {"rpm": 500, "tpm": 30000},
+            "anthropic": {"rpm": 50, "tpm": 40000},
+        },
+        description="Requests and tokens per minute (rpm, tpm) and optionally concurrency and max_concurrency, keyed by model name or provider",
+    )
+    LLM_CONCURRENCY_INITIAL: int = Field(
+        default=8, description="Starting concurrency limit of each model"
+    )
+    LLM_CONCURRENCY_MIN: int = Field(
+        default=1, description="Lowest concurrency limit a model is cut back to"
+    )
+    LLM_CONCURRENCY_MAX: int = Field(
+        default=64, description="Highest concurrency limit a model is raised to"
+    )
+    LLM_CONCURRENCY_LATENCY_TOLERANCE: float = Field(
+        default=3.0,
+        description="Multiple of the baseline latency treated as overload (0 disables)",
+    )
+    LLM_RATE_LIMIT_MAX_RETRIES: int = Field(
+        default=3, description="Retries of a model request rejected with a 429"
+    )
+    LLM_RATE_LIMIT_OUTPUT_TOKENS: int = Field(
+        default=512,
+        description="Output tokens reserved for requests without max_output_tokens",
+    )
+
+    # Telemetry settings
+    TELEMETRY_ENABLED: bool = Field(
+        default=False,
+        description="Record agent, model and tool spans for every registered agent",
+    )
+    TELEMETRY_JSONL_PATH: Optional[str] = Field(
+        default=".cache/telemetry/spans.jsonl",
+        description="JSONL file that receives finished spans (empty disables it)",
+    )
+    TELEMETRY_OTEL_ENABLED: bool = Field(
+        default=False,
+        description="Also export spans through the OpenTelemetry tracer provider",
+    )
+
+    # Trace recording settings
+    TRACE_RECORD_DIR: Optional[str] = Field(
+        default=None,
+        description="Directory receiving a replayable trace of every agent server session (unset disables recording)",
+    )
+
+    # Weather tool settings
+    WEATHER_BACKEND: WeatherBackendType = Field(
+        default=WeatherBackendType.MOCK,
+        description="Backend used by the weather tools",
+    )
+    WEATHER_API_BASE: Optional[str] = Field(
+        default=None,
+        description="Base URL of the weather HTTP API (WEATHER_BACKEND=http)",
+    )
+    WEATHER_HTTP_TIMEOUT_SECONDS: float = Field(
+        default=5.0,
+        description="Timeout for weather HTTP API requests",
+    )
+    WEATHER_HTTP_MAX_CONNECTIONS: int = Field(
+        default=20,
+        description="Size of the pooled weather HTTP API client",
+    )
+    WEATHER_CACHE_TTL_SECONDS: Optional[float] = Field(
+        default=600,
+        description="How long weather reports are served from the cache",
+    )
+    WEATHER_CACHE_MAX_ENTRIES: int = Field(
+        default=1024,
+        description="Maximum number of cities kept in the weather cache",
+    )
+
+    # Search tool settings
+    SEARCH_BACKEND: SearchBackendType = Field(
+        default=SearchBackendType.BUILTIN,
+        description="Search used by the planning agents: Gemini's built-in google_search or the cached search_web tool over a search HTTP API",
+    )
+    SEARCH_API_BASE: str = Field(
+        default="https://www.googleapis.com",
+        description="Base URL of the Custom Search JSON API (SEARCH_BACKEND=http)",
+    )
+    SEARCH_API_KEY: Optional[str] = Field(
+        default=None,
+        description="API key for the Custom Search JSON API",
+    )
+    SEARCH_ENGINE_ID: Optional[str] = Field(
+        default=None,
+        description="Programmable Search Engine id (cx) for the Custom Search JSON API",
+    )
+    SEARCH_RESULTS: int = Field(
+        default=5,
+        description="Results returned per search",
+    )
+    SEARCH_HTTP_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        description="Timeout for search HTTP API requests",
+    )
+    SEARCH_HTTP_MAX_CONNECTIONS: int = Field(
+        default=10,
+        description="Size of the pooled search HTTP API client",
+    )
+    SEARCH_CACHE_TTL_SECONDS: Optional[float] = Field(
+        default=3600,
+        description="How long search results are served from the cache",
+    )
+    SEARCH_CACHE_MAX_ENTRIES: int = Field(
+        default=2048,
+        description="Maximum number of queries kept in the search cache",
+    )
+    SEARCH_NEAR_DUPLICATE_THRESHOLD: float = Field(
+        default=0.8,
+        description="Term overlap (Jaccard) at which a query is answered with a cached near-duplicate's results (1 disables)",
+    )
+    SEARCH_PREFETCH_QUERIES: list[str] = Field(
+        default=[
+            "Model Context Protocol MCP servers list",
+            "Google ADK MCPToolset MCP tools",
+        ],
+        description="Queries fetched in the background when the planner starts",
+    )
+    SEARCH_PREFETCH_MAX_QUERIES: int = Field(
+        default=8,
+        description="Most queries prefetched per planner run, including ones derived from the requirements",
+    )
+
+    # MCP server pool settings
+    MCP_POOL_ENABLED: bool = Field(
+        default=True,
+        description="Serve MCP stdio tools from a pool of warm server processes",
+    )
+    MCP_POOL_SIZE: int = Field(
+        default=2,
+        description="Warm server processes kept per distinct MCP server configuration",
+    )
+    MCP_POOL_MAX_SIZE: int = Field(
+        default=4,
+        description="Most server processes per configuration while all warm ones are leased",
+    )
+    MCP_POOL_START_TIMEOUT_SECONDS: float = Field(
+        default=60.0,
+        description="Time allowed for spawning an MCP server and completing its handshake",
+    )
+    MCP_POOL_CALL_TIMEOUT_SECONDS: float = Field(
+        default=120.0,
+        description="Time allowed for one MCP tool call before its server is recycled",
+    )
+    MCP_POOL_HEALTH_CHECK_SECONDS: float = Field(
+        default=30.0,
+        description="Interval between pings of idle MCP server processes",
+    )
+    MCP_POOL_MAX_USES: Optional[int] = Field(
+        default=1000,
+        description="Tool calls after which an MCP server process is replaced",
+    )
+    MCP_POOL_MAX_AGE_SECONDS: Optional[float] = Field(
+        default=3600,
+        description="Age after which an idle MCP server process is replaced",
+    )
+    MCP_TOOL_LIST_TTL_SECONDS: Optional[float] = Field(
+        default=300,
+        description="How long an MCP server's tool listing is reused",
+    )
+
+    # Server settings
+    SERVER_HOST: str = Field(
+        default="127.0.0.1",
+        description="Interface the agent server listens on",
+    )
+    SERVER_PORT: int = Field(
+        default=8000,
+        description="Port the agent server listens on",
+    )
+    SERVER_AGENTS: Optional[list[str]] = Field(
+        default=None,
+        description='Agent packages to serve, e.g. ["coding_agent"] (default: every package with an agent.py)',
+    )
+    SERVER_MAX_CONCURRENT_RUNS: int = Field(
+        default=32,
+        description="Agent runs executed at the same time",
+    )
+    SERVER_MAX_QUEUED_RUNS: int = Field(
+        default=128,
+        description="Runs allowed to wait for a slot before new runs are rejected with 503",
+    )
+    SERVER_QUEUE_TIMEOUT_SECONDS: float = Field(
+        default=10.0,
+        description="How long a run may wait for a slot before it is rejected",
+    )
+    SERVER_STREAM_BUFFER_EVENTS: int = Field(
+        default=64,
+        description="Events buffered per stream before the agent waits for a slow client",
+    )
+    SERVER_DRAIN_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        description="How long shutdown waits for running agent runs to finish",
+    )
+
+    # Workflow gate settings
+    WORKFLOW_GATES_ENABLED: bool = Field(
+        default=True,
+        description="Skip or stop code and planning pipeline stages whose work is unnecessary, judged from session state",
+    )
+
+    # Code pipeline settings
+    STATIC_CHECK_ENABLED: bool = Field(
+        default=True,
+        description="Check generated code locally before review and skip the refactor call after a clean review",
+    )
+    STATIC_CHECK_LINT: bool = Field(
+        default=True,
+        description="Add pyflakes warnings to the static check findings (when pyflakes is installed)",
+    )
+    STATIC_CHECK_DOCTESTS: bool = Field(
+        default=False,
+        description="Execute generated code in the check worker and run its doctests",
+    )
+    STATIC_CHECK_WORKERS: int = Field(
+        default=2,
+        description="Worker processes for static checks",
+    )
+    STATIC_CHECK_TIMEOUT_SECONDS: float = Field(
+        default=5,
+        description="Time limit for checking one code block",
+    )
+    STATIC_CHECK_MEMORY_LIMIT_MB: Optional[int] = Field(
+        default=512,
+        description="Address-space limit of each static check worker",
+    )
+
+    CODE_CANDIDATES: int = Field(
+        default=1,
+        description="Code drafts written concurrently by the code pipeline; the best-scoring one is reviewed (1 = a single writer)",
+    )
+    CODE_CANDIDATE_MODELS: list[str] = Field(
+        default_factory=list,
+        description="Models the code drafts are spread over in turn; empty uses the writer's model for all",
+    )
+    CODE_CANDIDATE_BUDGET_SECONDS: Optional[float] = Field(
+        default=60,
+        description="After this long, take the best code draft scored so far",
+    )
+    CODE_CANDIDATE_ACCEPT_CLEAN: bool = Field(
+        default=True,
+        description="Take the first code draft without static check findings without waiting for the others",
+    )
+
+    # Batch settings
+    BATCH_CONCURRENCY: int = Field(
+        default=8,
+        description="Code pipelines run concurrently by `python -m coding_agent.batch`",
+    )
+    BATCH_ITEM_TIMEOUT_SECONDS: Optional[float] = Field(
+        default=300,
+        description="Time limit for one spec in batch mode",
+    )
+
+    # Session storage settings
+    SESSION_BACKEND: SessionBackendType = Field(
+        default=SessionBackendType.MEMORY,
+        description="Session service used by the agent server",
+    )
+    SESSION_DB_PATH: str = Field(
+        default=".cache/sessions.sqlite3",
+        description="SQLite file of the diff-based session store",
+    )
+    SESSION_SNAPSHOT_INTERVAL: int = Field(
+        default=20,
+        description="State versions between full state snapshots",
+    )
+    SESSION_MAX_SNAPSHOTS: int = Field(
+        default=2,
+        description="Snapshots kept per session; older state history is deleted",
+    )
+    SESSION_INLINE_DELTA_BYTES: int = Field(
+        default=1024,
+        description="Larger state delta values are stored once, as state changes, not inside events",
+    )
+
+    # Artifact store settings
+    ARTIFACT_STORE_ENABLED: bool = Field(
+        default=False,
+        description="Keep generated code and plans in the content-addressed artifact store; session state holds references",
+    )
+    ARTIFACT_STORE_BACKEND: ArtifactBackendType = Field(
+        default=ArtifactBackendType.FILE,
+        description="Where artifacts are kept",
+    )
+    ARTIFACT_STORE_DIR: str = Field(
+        default=".cache/artifacts",
+        description="Directory of the file artifact backend",
+    )
+    ARTIFACT_MIN_BYTES: int = Field(
+        default=256,
+        description="Shorter outputs stay inline in session state",
+    )
+    ARTIFACT_COMPRESSION_ENABLED: bool = Field(
+        default=True,
+        description="zlib-compress stored artifacts when that makes them smaller",
+    )
+    ARTIFACT_COMPRESSION_MIN_BYTES: int = Field(
+        default=1024,
+        description="Shorter artifacts are stored uncompressed",
+    )
+    ARTIFACT_CACHE_BYTES: int = Field(
+        default=16 * 1024 * 1024,
+        description="Size of the in-memory cache of decoded artifacts",
+    )
+
+    # Fast-path routing settings
+    FAST_PATH_ROUTER_ENABLED: bool = Field(
+        default=True,
+        description="Answer greetings and farewells in weather_agent_v2 without a model call",
+    )
+    FAST_PATH_MIN_CONFIDENCE: float = Field(
+        default=0.85,
+        description="Classifier probability required to take the fast path",
+    )
+
+    # Planning engine settings
+    PLAN_CRITIC_MODE: CriticMode = Field(
+        default=CriticMode.SINGLE,
+        description="Review plans with one critic or with parallel per-dimension critics",
+    )
+    PLANNING_LOOP_MAX_ITERATIONS: Optional[int] = Field(
+        default=5,
+        description="Maximum critique/refine iterations per planning run",
+    )
+    PLANNING_LOOP_MIN_CHANGE_RATIO: float = Field(
+        default=0.02,
+        description="Stop refining once an iteration changes less than this fraction of the plan",
+    )
+    PLANNING_LOOP_MIN_CRITICISM_NOVELTY: float = Field(
+        default=0.2,
+        description="Stop refining once less than this fraction of the criticism is new",
+    )
+    PLANNING_LOOP_MAX_SECONDS: Optional[float] = Field(
+        default=900,
+        description="Wall-clock budget for the planning refinement loop",
+    )
+    PLANNING_LOOP_MAX_TOKENS: Optional[int] = Field(
+        default=None,
+        description="Model token budget for the planning refinement loop",
+    )
+    PLANNING_CONTEXT_COMPACTION_ENABLED: bool = Field(
+        default=False,
+        description="From the second iteration on, send critics and the refiner a requirements summary and only the changed plan sections",
+    )
+    PLANNING_CONTEXT_MAX_CHANGE_RATIO: float = Field(
+        default=0.5,
+        description="Fall back to the full plan when more than this fraction of it changed since the previous review",
+    )
+    PLANNING_CONTEXT_SUMMARY_CHARS: int = Field(
+        default=4000,
+        description="Size of the requirements summary sent in compact iterations",
+    )
+
     # Other default configuration
     DEFAULT_TEMPERATURE: float = Field(
         default=0.7,
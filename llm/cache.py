@@ -0,0 +1,384 @@
+"""Response cache for model calls.
+
+`CachedLlm` sits in front of any ADK model (a `LiteLlm` instance or a plain
+Gemini model string) and replays earlier responses for identical requests.
+Requests are keyed by model name, rendered system instruction, tool schema,
+generation config and conversation contents.
+
+Two tiers are consulted in order: a bounded in-memory LRU and an optional
+SQLite file that survives restarts. Entries expire after a TTL. `CachedLlm`
+checks the memory tier on the event loop and reads the SQLite tier in a
+worker thread.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, AsyncGenerator, Optional, Union
+
+from google.adk.models import BaseLlm, LLMRegistry, LlmRequest, LlmResponse
+from pydantic import BaseModel
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Generation config fields that are covered separately or do not change the
+# model output.
+_CONFIG_KEY_EXCLUDE = {
+    "system_instruction",
+    "tools",
+    "http_options",
+    "response_schema",
+}
+
+
+@dataclass
+class CacheStats:
+    """Hit/miss counters for a `ResponseCache`, shared by event loop and workers."""
+
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    writes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def record(self, **counts: int) -> None:
+        """Adds `counts` to the counters of the same names."""
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            counts = {
+                f.name: getattr(self, f.name)
+                for f in fields(self)
+                if not f.name.startswith("_")
+            }
+            return {**counts, "hit_rate": round(self.hit_rate, 4)}
+
+
+class MemoryCacheTier:
+    """Bounded LRU of serialized responses kept in process memory."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple[str, Optional[float]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, expires_at: Optional[float]) -> int:
+        """Stores an entry and returns how many entries were evicted."""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteCacheTier:
+    """On-disk tier backed by a single SQLite file."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL
+            )""")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple[str, Optional[float]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(
+        self, key: str, model: str, value: str, expires_at: Optional[float]
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?)",
+                (key, model, value, time.time(), expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Deletes expired rows and returns how many were removed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM response_cache WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional SQLite) store for model responses."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        path: Optional[Union[str, Path]] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryCacheTier(max_entries)
+        self.disk = SqliteCacheTier(path) if path else None
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[list[LlmResponse]]:
+        """Returns the cached responses for `key`, or None on a miss."""
+        now = time.time()
+        entry = self.memory.get(key)
+        tier = "memory"
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            tier = "disk"
+        if entry is not None and entry[1] is not None and entry[1] < now:
+            self.stats.record(expirations=1)
+            self.delete(key)
+            entry = None
+        if entry is None:
+            self.stats.record(misses=1)
+            return None
+
+        value, expires_at = entry
+        if tier == "memory":
+            self.stats.record(hits=1, memory_hits=1)
+        else:
+            evictions = self.memory.set(key, value, expires_at)
+            self.stats.record(hits=1, disk_hits=1, evictions=evictions)
+        return self._responses(value)
+
+    async def get_async(self, key: str) -> Optional[list[LlmResponse]]:
+        """Like `get`, but only a memory hit is answered on the event loop.
+
+        Disk lookups and expired entries are handled by `get` in a worker
+        thread.
+        """
+        entry = self.memory.get(key)
+        if entry is not None and (entry[1] is None or entry[1] >= time.time()):
+            self.stats.record(hits=1, memory_hits=1)
+            return self._responses(entry[0])
+        if entry is None and self.disk is None:
+            self.stats.record(misses=1)
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    @staticmethod
+    def _responses(value: str) -> list[LlmResponse]:
+        return [LlmResponse.model_validate(item) for item in json.loads(value)]
+
+    def put(
+        self,
+        key: str,
+        model: str,
+        responses: list[LlmResponse],
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """Stores the responses for `key` in every tier."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.time() + ttl if ttl else None
+        value = json.dumps(
+            [r.model_dump(mode="json", exclude_none=True) for r in responses]
+        )
+        evictions = self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            self.disk.set(key, model, value, expires_at)
+        self.stats.record(writes=1, evictions=evictions)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    return repr(value)
+
+
+def _strip_call_ids(value: Any) -> Any:
+    """Drops the client-generated function call ids, which differ per run."""
+    if isinstance(value, dict):
+        value = {k: _strip_call_ids(v) for k, v in value.items()}
+        for call_key in ("function_call", "function_response"):
+            if isinstance(value.get(call_key), dict):
+                value[call_key].pop("id", None)
+        return value
+    if isinstance(value, list):
+        return [_strip_call_ids(v) for v in value]
+    return value
+
+
+def request_cache_key(llm_request: LlmRequest, model: Optional[str] = None) -> str:
+    """Builds a stable hash for a model request.
+
+    Args:
+        llm_request (LlmRequest): The request about to be sent to the model.
+        model (str, optional): Model name. Defaults to `llm_request.model`.
+
+    Returns:
+        str: Hex digest identifying the request.
+    """
+    config = llm_request.config
+    payload = {
+        "model": model or llm_request.model,
+        "instruction": config.system_instruction if config else None,
+        "tools": config.tools if config else None,
+        "response_schema": config.response_schema if config else None,
+        "config": (
+            config.model_dump(
+                mode="json", exclude_none=True, exclude=_CONFIG_KEY_EXCLUDE
+            )
+            if config
+            else None
+        ),
+        "contents": _strip_call_ids(
+            [c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents]
+        ),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=_json_default)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CachedLlm(BaseLlm):
+    """Wraps a model and serves repeated requests from a `ResponseCache`.
+
+    Attributes:
+        inner: The wrapped model that handles cache misses.
+        cache: The cache shared with other wrapped models.
+        ttl_seconds: Per-model TTL override; None uses the cache default.
+    """
+
+    inner: BaseLlm
+    cache: ResponseCache
+    ttl_seconds: Optional[float] = None
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_cache_key(llm_request, self.inner.model)
+        cached = await self.cache.get_async(key)
+        if cached is not None:
+            logger.debug("Response cache hit for %s (%s)", self.inner.model, key[:12])
+            for response in cached:
+                yield response
+            return
+
+        complete: list[LlmResponse] = []
+        failed = False
+        async for response in self.inner.generate_content_async(
+            llm_request, stream=stream
+        ):
+            if not response.partial:
+                complete.append(response)
+                failed = failed or bool(response.error_code)
+            yield response
+
+        if complete and not failed:
+            await asyncio.to_thread(
+                self.cache.put, key, self.inner.model, complete, self.ttl_seconds
+            )
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """
+    Get the process-wide response cache configured from settings.
+
+    Returns:
+        ResponseCache: The shared response cache.
+    """
+    settings = get_settings()
+    return ResponseCache(
+        max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        path=settings.LLM_CACHE_PATH or None,
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    )
+
+
+def cached_model(model: Union[str, BaseLlm], *, agent_name: str) -> Union[str, BaseLlm]:
+    """Wraps `model` with the shared response cache unless the agent opts out.
+
+    Args:
+        model (str | BaseLlm): A model name resolved through the ADK registry
+            (e.g. "gemini-2.0-flash") or a model instance such as `LiteLlm`.
+        agent_name (str): Name of the agent using the model, checked against
+            `LLM_CACHE_EXCLUDED_AGENTS`.
+
+    Returns:
+        str | BaseLlm: The cached model, or `model` unchanged when caching is off.
+    """
+    settings = get_settings()
+    if (
+        not settings.LLM_CACHE_ENABLED
+        or agent_name in settings.LLM_CACHE_EXCLUDED_AGENTS
+    ):
+        return model
+    inner = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+    return CachedLlm(model=inner.model, inner=inner, cache=get_response_cache())
@@ -0,0 +1,362 @@
+"""Model cascade: cheap models first, escalation on rejected answers.
+
+`CascadeLlm` sends a request to a list of model tiers in order, usually local
+LM Studio models followed by the agent's own hosted model. An answer from any
+tier but the last is buffered and checked by validators: a well-formed call to
+a declared tool, a parseable ```python block, or a self-reported confidence
+at or above a threshold. The first accepted answer is returned; a rejected
+answer, an error or an exception moves the request up to the next tier. The
+last tier is streamed through unchecked. Per-tier acceptance, rejection
+reasons and latencies are kept in `CascadeStats`.
+"""
+
+import ast
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from tools.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+_PYTHON_BLOCK_RE = re.compile(r"```python\s*\n(.*?)```", re.S)
+_CONFIDENCE_RE = re.compile(
+    r"^\W*confidence\W*?[:=]\s*\**\s*(\d{1,3}(?:\.\d+)?|\.\d+)\s*(%?)\W*$", re.I | re.M
+)
+# The same marker, matched within its own lines and with its line break, so
+# removing it leaves the rest of the answer as the model wrote it.
+_CONFIDENCE_LINE_RE = re.compile(
+    r"^[^\w\n]*confidence[^\w\n]*?[:=]\s*\**[^\S\n]*(?:\d{1,3}(?:\.\d+)?|\.\d+)"
+    r"[^\S\n]*%?[^\w\n]*(?:\n|\Z)",
+    re.I | re.M,
+)
+
+
+def _text(responses: list[LlmResponse]) -> str:
+    return "".join(
+        part.text or ""
+        for response in responses
+        if response.content and response.content.parts
+        for part in response.content.parts
+    )
+
+
+def _function_calls(responses: list[LlmResponse]) -> list[types.FunctionCall]:
+    return [
+        part.function_call
+        for response in responses
+        if response.content and response.content.parts
+        for part in response.content.parts
+        if part.function_call
+    ]
+
+
+class ResponseValidator:
+    """Checks a buffered answer from a lower cascade tier.
+
+    Attributes:
+        name: Name used in settings and in rejection reasons.
+    """
+
+    name = ""
+
+    def prepare(self, llm_request: LlmRequest) -> None:
+        """Adjusts a lower tier's copy of the request before it is sent."""
+
+    def check(
+        self, llm_request: LlmRequest, responses: list[LlmResponse]
+    ) -> Optional[str]:
+        """Returns a rejection reason, or None to accept the answer."""
+        return None
+
+    def finalize(self, responses: list[LlmResponse]) -> None:
+        """Cleans up an accepted answer before it is returned."""
+
+
+class ToolCallValidator(ResponseValidator):
+    """Accepts text answers and calls to declared tools with their required arguments."""
+
+    name = "tool_call"
+
+    def check(
+        self, llm_request: LlmRequest, responses: list[LlmResponse]
+    ) -> Optional[str]:
+        declarations = {
+            declaration.name: declaration
+            for tool in (llm_request.config.tools or [] if llm_request.config else [])
+            for declaration in (getattr(tool, "function_declarations", None) or [])
+        }
+        for call in _function_calls(responses):
+            declaration = declarations.get(call.name)
+            if declaration is None:
+                return f"undeclared_tool:{call.name}"
+            required = (
+                declaration.parameters.required if declaration.parameters else None
+            )
+            missing = set(required or []) - set(call.args or {})
+            if missing:
+                return f"missing_arguments:{call.name}"
+        return None
+
+
+class PythonBlockValidator(ResponseValidator):
+    """Requires text answers to contain ```python blocks that parse."""
+
+    name = "python_block"
+
+    def check(
+        self, llm_request: LlmRequest, responses: list[LlmResponse]
+    ) -> Optional[str]:
+        if _function_calls(responses):
+            return None
+        blocks = _PYTHON_BLOCK_RE.findall(_text(responses))
+        if not blocks:
+            return "no_python_block"
+        for block in blocks:
+            try:
+                ast.parse(block)
+            except SyntaxError:
+                return "python_syntax_error"
+        return None
+
+
+class ConfidenceValidator(ResponseValidator):
+    """Asks the model to rate its answer and rejects low ratings.
+
+    Attributes:
+        min_confidence: Lowest accepted self-reported confidence (0 to 1).
+    """
+
+    name = "confidence"
+    instruction = (
+        "After your answer, add a final line of the form `Confidence: <number "
+        "between 0 and 1>` that rates how confident you are that the answer is "
+        "complete and correct."
+    )
+
+    def __init__(self, min_confidence: float = 0.7):
+        self.min_confidence = min_confidence
+
+    def prepare(self, llm_request: LlmRequest) -> None:
+        llm_request.append_instructions([self.instruction])
+
+    def check(
+        self, llm_request: LlmRequest, responses: list[LlmResponse]
+    ) -> Optional[str]:
+        if _function_calls(responses):
+            return None
+        matches = _CONFIDENCE_RE.findall(_text(responses))
+        if not matches:
+            return "no_confidence"
+        value, percent = matches[-1]
+        confidence = float(value) / 100 if percent or float(value) > 1 else float(value)
+        if confidence < self.min_confidence:
+            return "low_confidence"
+        return None
+
+    def finalize(self, responses: list[LlmResponse]) -> None:
+        for response in responses:
+            for part in response.content.parts if response.content else []:
+                if part.text:
+                    part.text = _CONFIDENCE_LINE_RE.sub("", part.text)
+
+
+VALIDATORS = {
+    ToolCallValidator.name: ToolCallValidator,
+    PythonBlockValidator.name: PythonBlockValidator,
+    ConfidenceValidator.name: ConfidenceValidator,
+}
+
+
+def build_validators(
+    names: list[str], min_confidence: float = 0.7
+) -> list[ResponseValidator]:
+    """Builds validators from their names.
+
+    Raises:
+        ValueError: If a name is not in `VALIDATORS`.
+    """
+    validators = []
+    for name in names:
+        if name not in VALIDATORS:
+            raise ValueError(
+                f"Unknown cascade validator '{name}'; expected one of {sorted(VALIDATORS)}."
+            )
+        if name == ConfidenceValidator.name:
+            validators.append(ConfidenceValidator(min_confidence))
+        else:
+            validators.append(VALIDATORS[name]())
+    return validators
+
+
+@dataclass
+class TierStats:
+    """Outcomes and latencies of one cascade tier."""
+
+    model: str
+    requests: int = 0
+    accepted: int = 0
+    rejected: Counter = field(default_factory=Counter)
+    errors: int = 0
+    latency_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def as_dict(self) -> dict:
+        latencies = list(self.latency_ms)
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "accepted": self.accepted,
+            "hit_rate": (
+                round(self.accepted / self.requests, 4) if self.requests else 0.0
+            ),
+            "rejected": dict(self.rejected),
+            "errors": self.errors,
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+            },
+        }
+
+
+class CascadeStats:
+    """Per-tier statistics of a `CascadeLlm`."""
+
+    def __init__(self, tiers: list[TierStats]):
+        self.tiers = tiers
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        tier: int,
+        started: float,
+        accepted: bool,
+        reason: Optional[str] = None,
+        error: bool = False,
+    ) -> None:
+        with self._lock:
+            stats = self.tiers[tier]
+            stats.requests += 1
+            stats.latency_ms.append((time.perf_counter() - started) * 1000)
+            if accepted:
+                stats.accepted += 1
+            elif error:
+                stats.errors += 1
+            else:
+                stats.rejected[reason] += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"tiers": [tier.as_dict() for tier in self.tiers]}
+
+
+class CascadeLlm(BaseLlm):
+    """Tries model tiers in order until one gives an acceptable answer.
+
+    `model` is the name of the last tier, so ADK's model-specific handling
+    (e.g. of Gemini built-in tools) follows the agent's configured model.
+
+    Attributes:
+        tiers: Models from cheapest to most capable; the last one always answers.
+        validators: Checks an answer from a lower tier must pass.
+        stats: Per-tier outcomes and latencies.
+    """
+
+    tiers: list[BaseLlm]
+    validators: list[ResponseValidator] = []
+    stats: Optional[CascadeStats] = None
+
+    def model_post_init(self, __context) -> None:
+        if self.stats is None:
+            self.stats = CascadeStats([TierStats(tier.model) for tier in self.tiers])
+
+    async def _try_tier(
+        self, index: int, llm_request: LlmRequest
+    ) -> Optional[list[LlmResponse]]:
+        tier = self.tiers[index]
+        # Tools in `tools_dict` may hold whole agents, so only the parts a tier
+        # or a validator changes are copied.
+        request = llm_request.model_copy(
+            update={
+                "model": tier.model,
+                "contents": list(llm_request.contents),
+                "config": (
+                    llm_request.config or types.GenerateContentConfig()
+                ).model_copy(deep=True),
+            }
+        )
+        for validator in self.validators:
+            validator.prepare(request)
+
+        started = time.perf_counter()
+        try:
+            responses = [
+                response
+                async for response in tier.generate_content_async(request, stream=False)
+                if not response.partial
+            ]
+        except Exception:
+            logger.warning("Cascade tier %s failed", tier.model, exc_info=True)
+            self.stats.record(index, started, accepted=False, error=True)
+            return None
+
+        if any(response.error_code for response in responses):
+            self.stats.record(index, started, accepted=False, error=True)
+            return None
+        reason = None
+        if not _text(responses).strip() and not _function_calls(responses):
+            reason = "empty"
+        for validator in self.validators:
+            reason = reason or validator.check(request, responses)
+        if reason:
+            logger.debug("Cascade tier %s rejected: %s", tier.model, reason)
+            self.stats.record(index, started, accepted=False, reason=reason)
+            return None
+        for validator in self.validators:
+            validator.finalize(responses)
+        self.stats.record(index, started, accepted=True)
+        return responses
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        for index in range(len(self.tiers) - 1):
+            responses = await self._try_tier(index, llm_request)
+            if responses is not None:
+                for response in responses:
+                    yield response
+                return
+
+        last = len(self.tiers) - 1
+        llm_request.model = self.tiers[last].model
+        started = time.perf_counter()
+        failed = False
+        try:
+            async for response in self.tiers[last].generate_content_async(
+                llm_request, stream=stream
+            ):
+                failed = failed or bool(response.error_code)
+                yield response
+        except Exception:
+            self.stats.record(last, started, accepted=False, error=True)
+            raise
+        self.stats.record(last, started, accepted=not failed, error=failed)
+
+
+_cascades: dict[str, CascadeLlm] = {}
+
+
+def register_cascade(agent_name: str, cascade: CascadeLlm) -> None:
+    """Makes the cascade's statistics available through `cascade_stats`."""
+    _cascades[agent_name] = cascade
+
+
+def cascade_stats() -> dict[str, dict]:
+    """Returns the statistics of every registered cascade, keyed by agent name."""
+    return {name: cascade.stats.as_dict() for name, cascade in _cascades.items()}
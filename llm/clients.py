@@ -0,0 +1,355 @@
+"""Shared model instances with pooled HTTP connections.
+
+`ModelClientRegistry` hands out one model instance per (provider, model, base
+URL), so agents configured with the same model share it instead of each
+building its own. ADK resolves a Gemini model name to a new `Gemini` (and a
+new API client with its own connections) on every call, so Gemini models are
+always returned as shared `PooledGemini` instances.
+
+Underneath, every (provider, base URL) has one `ConnectionPool`: a keep-alive
+connection pool with configurable size, keep-alive expiry and timeouts, using
+HTTP/2 when the optional `h2` package is installed. It is handed to the
+provider clients: the Gemini API client, the OpenAI client litellm uses for
+OpenAI-compatible providers (OpenAI, LM Studio, the endpoint override) and
+litellm's HTTP handler for Anthropic. Other providers keep litellm's own
+clients. httpx connections belong to one event loop, so a pool keeps a
+connection pool per running loop.
+
+`ConnectionStats` counts requests, new connections, TLS handshakes and their
+setup time from httpcore's trace events; the reuse rate is the share of
+requests that found an open connection.
+"""
+
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+import time
+import weakref
+from functools import cached_property, lru_cache
+from typing import TYPE_CHECKING, Any, Optional
+
+import httpx
+from google.adk.models import BaseLlm, Gemini
+from google.genai import Client, types
+
+from config import get_settings
+from llm.limiter import provider_of
+
+if TYPE_CHECKING:
+    from google.adk.models.lite_llm import LiteLlm
+
+logger = logging.getLogger(__name__)
+
+
+def http2_available() -> bool:
+    """Returns True when the `h2` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ConnectionStats:
+    """Requests and connection setup of a `ConnectionPool`."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.connect_ms = 0.0
+        self.tls_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self, ms: float) -> None:
+        with self._lock:
+            self.connections += 1
+            self.connect_ms += ms
+
+    def record_tls(self, ms: float) -> None:
+        with self._lock:
+            self.tls_handshakes += 1
+            self.tls_ms += ms
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "reused_requests": reused,
+                "reuse_rate": (
+                    round(reused / self.requests, 4) if self.requests else 0.0
+                ),
+                "connect_ms": round(self.connect_ms, 3),
+                "tls_handshakes": self.tls_handshakes,
+                "tls_ms": round(self.tls_ms, 3),
+            }
+
+
+class _LoopTransport(httpx.AsyncBaseTransport):
+    """Sends requests through one connection pool per running event loop."""
+
+    def __init__(self, **transport_args: Any):
+        self._transport_args = transport_args
+        self._transports: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(**self._transport_args)
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class ConnectionPool:
+    """Keep-alive connections to one provider endpoint, shared by its clients.
+
+    Attributes:
+        name: "<provider> <base URL>", used in metrics.
+        http2: Whether HTTP/2 is used.
+        stats: Requests, new connections and setup time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry_seconds: float = 60.0,
+        connect_timeout_seconds: float = 10.0,
+        read_timeout_seconds: float = 600.0,
+        http2: bool = True,
+    ):
+        self.name = name
+        self.http2 = http2 and http2_available()
+        if http2 and not self.http2:
+            logger.debug("HTTP/2 needs the 'h2' package; %s uses HTTP/1.1.", name)
+        self.stats = ConnectionStats()
+        self.timeout = httpx.Timeout(
+            read_timeout_seconds, connect=connect_timeout_seconds
+        )
+        self.transport = _LoopTransport(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry_seconds,
+            ),
+            http2=self.http2,
+        )
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def client_args(self) -> dict:
+        """Returns the `httpx.AsyncClient` arguments that route through the pool."""
+        return {
+            "transport": self.transport,
+            "timeout": self.timeout,
+            "event_hooks": {"request": [self._on_request]},
+        }
+
+    def http_client(self) -> httpx.AsyncClient:
+        """Returns the pool's shared `httpx.AsyncClient`."""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.AsyncClient(**self.client_args())
+            return self._http_client
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self.stats.record_request()
+        request.extensions["trace"] = self._tracer()
+
+    def _tracer(self):
+        started: dict[str, float] = {}
+
+        async def trace(event: str, info: dict) -> None:
+            step, _, phase = event.rpartition(".")
+            if phase == "started":
+                started[step] = time.perf_counter()
+            elif phase == "complete" and step in started:
+                ms = (time.perf_counter() - started.pop(step)) * 1000
+                if step in ("connection.connect_tcp", "connection.connect_unix_socket"):
+                    self.stats.record_connection(ms)
+                elif step == "connection.start_tls":
+                    self.stats.record_tls(ms)
+
+        return trace
+
+
+class PooledGemini(Gemini):
+    """A `Gemini` model whose API client sends requests through a `ConnectionPool`.
+
+    Attributes:
+        pool: The connection pool of the Gemini API.
+    """
+
+    pool: ConnectionPool
+
+    @cached_property
+    def api_client(self) -> Client:
+        return Client(
+            http_options=types.HttpOptions(
+                headers=self._tracking_headers,
+                async_client_args=self.pool.client_args(),
+            )
+        )
+
+
+# litellm providers served through the OpenAI client.
+_OPENAI_COMPATIBLE = {"openai", "lm_studio"}
+
+
+class ModelClientRegistry:
+    """Shared model instances and connection pools, keyed by provider endpoint.
+
+    Attributes:
+        pool_args: Keyword arguments of every `ConnectionPool`.
+    """
+
+    def __init__(self, **pool_args: Any):
+        self.pool_args = pool_args
+        self._models: dict[tuple, BaseLlm] = {}
+        self._pools: dict[tuple[str, Optional[str]], ConnectionPool] = {}
+        self._lock = threading.RLock()
+
+    def pool(self, provider: str, api_base: Optional[str] = None) -> ConnectionPool:
+        """Returns the connection pool of a provider endpoint."""
+        key = (provider, api_base)
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = ConnectionPool(
+                    f"{provider} {api_base or 'default'}", **self.pool_args
+                )
+            return self._pools[key]
+
+    def _litellm_client(
+        self,
+        provider: str,
+        pool: ConnectionPool,
+        api_key: Optional[str],
+        api_base: Optional[str],
+    ) -> Optional[Any]:
+        if provider in _OPENAI_COMPATIBLE:
+            from openai import AsyncOpenAI
+
+            settings = get_settings()
+            if provider == "openai":
+                api_key = (
+                    api_key or settings.OPENAI_API_KEY or os.getenv("OPENAI_API_KEY")
+                )
+                api_base = api_base or settings.OPENAI_API_BASE
+            if not api_key and provider == "openai":
+                # Without a key the OpenAI client cannot be built; litellm
+                # reports the missing key when the model is used.
+                return None
+            return AsyncOpenAI(
+                api_key=api_key or "not-needed",
+                base_url=api_base,
+                http_client=pool.http_client(),
+            )
+        if provider == "anthropic":
+            from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+
+            handler = AsyncHTTPHandler(timeout=pool.timeout)
+            handler.client = pool.http_client()
+            return handler
+        return None
+
+    def model(
+        self,
+        model: str,
+        llm_class: Optional[type["LiteLlm"]] = None,
+        *,
+        api_base: Optional[str] = None,
+        api_key: Optional[str] = None,
+        custom_llm_provider: Optional[str] = None,
+    ) -> BaseLlm:
+        """Returns the shared instance of a model, building it on first use.
+
+        Args:
+            model (str): Model name, e.g. "gemini-2.0-flash" or "openai/gpt-4o".
+            llm_class (type[LiteLlm], optional): `LiteLlm` subclass to build
+                non-Gemini models with. Defaults to `LiteLlm`.
+            api_base (str, optional): Base URL of the provider endpoint.
+            api_key (str, optional): API key; defaults to the provider's.
+            custom_llm_provider (str, optional): litellm provider overriding
+                the one in the model name.
+
+        Returns:
+            BaseLlm: A `PooledGemini` for Gemini models, otherwise an
+                `llm_class` instance that uses the pooled client where the
+                provider supports one.
+        """
+        provider = custom_llm_provider or provider_of(model)
+        key = (provider, model, api_base)
+        with self._lock:
+            llm = self._models.get(key)
+            if llm is not None:
+                return llm
+            pool = self.pool(provider, api_base)
+            if provider == "gemini":
+                llm = PooledGemini(model=model, pool=pool)
+            else:
+                from google.adk.models.lite_llm import LiteLlm
+
+                kwargs = {
+                    name: value
+                    for name, value in (
+                        ("api_base", api_base),
+                        ("api_key", api_key),
+                        ("custom_llm_provider", custom_llm_provider),
+                    )
+                    if value is not None
+                }
+                client = self._litellm_client(provider, pool, api_key, api_base)
+                if client is not None:
+                    kwargs["client"] = client
+                llm = (llm_class or LiteLlm)(model=model, **kwargs)
+            self._models[key] = llm
+            return llm
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            pools = list(self._pools.values())
+            models = len(self._models)
+        return {
+            "models": models,
+            "pools": {
+                pool.name: {**pool.stats.as_dict(), "http2": pool.http2}
+                for pool in pools
+            },
+        }
+
+
+@lru_cache()
+def get_model_clients() -> ModelClientRegistry:
+    """
+    Get the process-wide model client registry configured from settings.
+
+    Returns:
+        ModelClientRegistry: The shared registry.
+    """
+    settings = get_settings()
+    return ModelClientRegistry(
+        max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry_seconds=settings.LLM_POOL_KEEPALIVE_EXPIRY_SECONDS,
+        connect_timeout_seconds=settings.LLM_POOL_CONNECT_TIMEOUT_SECONDS,
+        read_timeout_seconds=settings.LLM_POOL_READ_TIMEOUT_SECONDS,
+        http2=settings.LLM_POOL_HTTP2,
+    )
@@ -0,0 +1,54 @@
+"""OpenAI-compatible endpoint override.
+
+With `LLM_ENDPOINT_OVERRIDE` set, `build_model` replaces every agent's model with
+an `EndpointLlm` that sends the request to that base URL through litellm's
+OpenAI provider, e.g. the local server from `benchmarks.fake_llm_server` or an
+LM Studio instance. The configured model name is kept so that the endpoint can
+tell agents apart and ADK's model-specific checks still apply.
+"""
+
+from typing import AsyncGenerator
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.models.lite_llm import LiteLlm
+
+
+def strip_builtin_tools(llm_request: LlmRequest) -> None:
+    """Removes model built-in tools (e.g. `google_search`) from the request.
+
+    Built-in tools are executed by the Gemini API itself and have no
+    equivalent on an OpenAI-compatible endpoint; function declarations are kept.
+    """
+    config = llm_request.config
+    if config and config.tools:
+        config.tools = [tool for tool in config.tools if tool.function_declarations]
+
+
+class EndpointLlm(LiteLlm):
+    """A `LiteLlm` bound to an OpenAI-compatible base URL."""
+
+    @classmethod
+    def for_endpoint(cls, model: str, api_base: str, api_key: str) -> "EndpointLlm":
+        """Builds a model that sends requests for `model` to `api_base`.
+
+        Args:
+            model (str): The configured model name, sent to the endpoint as is.
+            api_base (str): Base URL of the endpoint, e.g. "http://127.0.0.1:8000/v1".
+            api_key (str): API key expected by the endpoint.
+
+        Returns:
+            EndpointLlm: The model.
+        """
+        return cls(
+            model=model,
+            api_base=api_base,
+            api_key=api_key,
+            custom_llm_provider="openai",
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        strip_builtin_tools(llm_request)
+        async for response in super().generate_content_async(llm_request, stream):
+            yield response
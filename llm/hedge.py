@@ -0,0 +1,307 @@
+"""Hedged requests: race a second provider when the first one is slow.
+
+`HedgedLlm` sends a request to the agent's own (primary) model. If no
+response has arrived after the hedge delay, the same request also goes to a
+secondary model, usually from another provider; whichever answers first is
+streamed to the caller and the other request is cancelled. A request that
+fails before answering leaves the race to the other model.
+
+The hedge delay adapts to the primary's recent latency: it is the configured
+percentile of its time to first response, so only the slowest requests are
+hedged. A budget caps the share of requests that may be hedged: every request
+earns `max_rate` credits and every hedge spends one.
+
+`HedgeStats` reports the first-response latency callers saw next to the
+primary's own, and the extra requests and prompt tokens that hedging cost.
+Cancelling a losing primary hides how slow it would have been, so a sample
+(`measure_rate`) of the losing primaries is left running until its first
+response and then cancelled; those latencies are weighted by the inverse of
+the sampling rate, which keeps the primary's distribution (and with it the
+hedge delay and `p99_saved_ms`) unbiased.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from llm.limiter import estimate_request_tokens
+from tools.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+def _failed(item: object) -> bool:
+    return (
+        item is _END
+        or isinstance(item, Exception)
+        or (isinstance(item, LlmResponse) and bool(item.error_code))
+    )
+
+
+class HedgeStats:
+    """Latency, hedge rate and extra spend of a `HedgedLlm`.
+
+    Attributes:
+        percentile: Percentile of the primary's latency used as hedge delay.
+        initial_delay_ms: Hedge delay until enough latencies were observed.
+        min_delay_ms: Lower bound of the hedge delay.
+        max_rate: Largest long-run share of requests that are hedged.
+        measure_rate: Share of races lost by the primary in which it still
+            runs to its first response, to measure its latency.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 90,
+        initial_delay_ms: float = 2000,
+        min_delay_ms: float = 100,
+        max_rate: float = 0.1,
+        measure_rate: float = 0.1,
+    ):
+        self.percentile = percentile
+        self.initial_delay_ms = initial_delay_ms
+        self.min_delay_ms = min_delay_ms
+        self.max_rate = max_rate
+        self.measure_rate = measure_rate
+        self.requests = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+        self.budget_exhausted = 0
+        self.extra_prompt_tokens = 0
+        self._budget = 1.0
+        self._primary_ms: deque = deque(maxlen=1000)
+        self._served_ms: deque = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def delay_seconds(self) -> float:
+        with self._lock:
+            if len(self._primary_ms) < 20:
+                return self.initial_delay_ms / 1000
+            delay = percentile(list(self._primary_ms), self.percentile)
+        return max(self.min_delay_ms, delay) / 1000
+
+    def start(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self._budget = min(
+                max(1.0, self.max_rate * 100), self._budget + self.max_rate
+            )
+
+    def try_hedge(self, prompt_tokens: int) -> bool:
+        """Spends a hedge credit; returns False when the budget is exhausted."""
+        with self._lock:
+            if self._budget < 1:
+                self.budget_exhausted += 1
+                return False
+            self._budget -= 1
+            self.hedged += 1
+            self.extra_prompt_tokens += prompt_tokens
+            return True
+
+    def record(self, served_ms: float, secondary_won: bool) -> None:
+        with self._lock:
+            self._served_ms.append(served_ms)
+            self.secondary_wins += secondary_won
+
+    def record_primary(self, primary_ms: float, weight: int = 1) -> None:
+        with self._lock:
+            self._primary_ms.extend([primary_ms] * weight)
+
+    def should_measure(self) -> bool:
+        return self.measure_rate > 0 and random.random() < self.measure_rate
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            primary = list(self._primary_ms)
+            served = list(self._served_ms)
+            requests, hedged = self.requests, self.hedged
+            result = {
+                "requests": requests,
+                "hedged": hedged,
+                "hedge_rate": round(hedged / requests, 4) if requests else 0.0,
+                "secondary_wins": self.secondary_wins,
+                "budget_exhausted": self.budget_exhausted,
+                "extra_requests": hedged,
+                "extra_prompt_tokens": self.extra_prompt_tokens,
+            }
+        primary_p99 = percentile(primary, 99)
+        served_p99 = percentile(served, 99)
+        return {
+            **result,
+            "delay_ms": round(self.delay_seconds() * 1000, 1),
+            "first_response_ms": {"p50": percentile(served, 50), "p99": served_p99},
+            "primary_first_response_ms": {
+                "p50": percentile(primary, 50),
+                "p99": primary_p99,
+            },
+            "p99_saved_ms": (
+                round(primary_p99 - served_p99, 1)
+                if primary_p99 is not None and served_p99 is not None
+                else None
+            ),
+        }
+
+
+class _Racer:
+    """Runs one model request in a task and queues what it yields."""
+
+    def __init__(self, llm: BaseLlm, llm_request: LlmRequest, stream: bool):
+        self.llm = llm
+        self.started = time.perf_counter()
+        self.first_ms: Optional[float] = None
+        self.first: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run(llm_request, stream))
+
+    def _put(self, item: object) -> None:
+        if not self.first.done():
+            self.first_ms = (time.perf_counter() - self.started) * 1000
+            self.first.set_result(item)
+        self._queue.put_nowait(item)
+
+    async def _run(self, llm_request: LlmRequest, stream: bool) -> None:
+        try:
+            async for response in self.llm.generate_content_async(
+                llm_request, stream=stream
+            ):
+                self._put(response)
+        except Exception as e:
+            self._put(e)
+        self._put(_END)
+
+    @property
+    def failed(self) -> bool:
+        return self.first.done() and _failed(self.first.result())
+
+    async def responses(self) -> AsyncGenerator[LlmResponse, None]:
+        while True:
+            item = await self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def cancel(self) -> None:
+        self.task.cancel()
+
+
+class HedgedLlm(BaseLlm):
+    """Races a secondary model against a slow primary.
+
+    `model` is the primary's name, so ADK's model-specific handling follows
+    the agent's configured model.
+
+    Attributes:
+        primary: The agent's own model.
+        secondary: Model the request is also sent to after the hedge delay; it
+            must support the agent's tools.
+        stats: Latencies, hedge rate and extra spend.
+    """
+
+    primary: BaseLlm
+    secondary: BaseLlm
+    stats: Optional[HedgeStats] = None
+
+    def model_post_init(self, __context) -> None:
+        if self.stats is None:
+            self.stats = HedgeStats()
+
+    @staticmethod
+    def _request_for(llm: BaseLlm, llm_request: LlmRequest) -> LlmRequest:
+        # Both models may change the request (e.g. strip built-in tools), so
+        # each gets its own copy of the parts they change.
+        return llm_request.model_copy(
+            update={
+                "model": llm.model,
+                "contents": list(llm_request.contents),
+                "config": (
+                    llm_request.config or types.GenerateContentConfig()
+                ).model_copy(deep=True),
+            }
+        )
+
+    def _measured(self, primary: _Racer) -> None:
+        if not primary.failed:
+            self.stats.record_primary(
+                primary.first_ms, weight=max(1, round(1 / self.stats.measure_rate))
+            )
+        primary.cancel()
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.stats.start()
+        primary = _Racer(
+            self.primary, self._request_for(self.primary, llm_request), stream
+        )
+        racers = [primary]
+        try:
+            await asyncio.wait({primary.first}, timeout=self.stats.delay_seconds())
+            if not primary.first.done() and self.stats.try_hedge(
+                estimate_request_tokens(llm_request, 0)
+            ):
+                logger.debug(
+                    "Hedging %s with %s", self.primary.model, self.secondary.model
+                )
+                racers.append(
+                    _Racer(
+                        self.secondary,
+                        self._request_for(self.secondary, llm_request),
+                        stream,
+                    )
+                )
+
+            winner = None
+            pending = list(racers)
+            while pending:
+                await asyncio.wait(
+                    {racer.first for racer in pending},
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                done = [racer for racer in pending if racer.first.done()]
+                winner = next((racer for racer in done if not racer.failed), None)
+                if winner is not None:
+                    break
+                pending = [racer for racer in pending if not racer.first.done()]
+            winner = winner or primary
+
+            served_ms = (time.perf_counter() - primary.started) * 1000
+            self.stats.record(served_ms, secondary_won=winner is not primary)
+            if winner is primary:
+                if not primary.failed:
+                    self.stats.record_primary(primary.first_ms)
+            elif not primary.first.done() and self.stats.should_measure():
+                racers.remove(primary)
+                primary.first.add_done_callback(lambda _: self._measured(primary))
+            for racer in racers:
+                if racer is not winner:
+                    racer.cancel()
+
+            async for response in winner.responses():
+                yield response
+        finally:
+            for racer in racers:
+                racer.cancel()
+
+
+_hedges: dict[str, HedgedLlm] = {}
+
+
+def register_hedge(agent_name: str, hedged: HedgedLlm) -> None:
+    """Makes the hedge's statistics available through `hedge_stats`."""
+    _hedges[agent_name] = hedged
+
+
+def hedge_stats() -> dict[str, dict]:
+    """Returns the statistics of every registered hedge, keyed by agent name."""
+    return {name: hedged.stats.as_dict() for name, hedged in _hedges.items()}
@@ -0,0 +1,573 @@
+"""Provider-aware rate limiting with adaptive concurrency.
+
+Every model built by `build_model` can be wrapped in a `RateLimitedLlm` that
+takes a permit from the `ProviderLimiter` of its model before each request.
+All agents and sessions in the process share one limiter per model, so
+concurrent sessions no longer race each other into 429s.
+
+A permit needs:
+
+* a request from the requests-per-minute token bucket and the request's
+  estimated tokens (prompt plus expected output) from the tokens-per-minute
+  bucket, both configured per provider or model in `LLM_RATE_LIMITS`; the
+  estimate is corrected with the reported usage when the response arrives;
+* a free slot under the adaptive concurrency limit. The limit grows by one
+  per limit's worth of successful requests (additive increase) and is halved
+  on a 429 or cut by 10% when latency rises far above its recent baseline
+  (multiplicative decrease), at most once per cool-down period.
+
+Waiting requests are admitted in priority order: `Priority.INTERACTIVE`
+(the default) before `Priority.BATCH`, which the batch runner sets with
+`request_priority`. A 429 also pauses admission for the provider's
+Retry-After, and the request is retried up to `max_retries` times when
+nothing was streamed yet.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from enum import IntEnum
+from functools import lru_cache
+from typing import AsyncGenerator, Iterator, Optional, Union
+
+from google.adk.models import BaseLlm, LLMRegistry, LlmRequest, LlmResponse
+from google.adk.models.lite_llm import LiteLlm
+
+from config import get_settings
+from tools.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+_THROTTLE_CODES = {"429", "RESOURCE_EXHAUSTED", "RATE_LIMIT_EXCEEDED"}
+
+
+class Priority(IntEnum):
+    """Admission priority of a model request; lower values go first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar(
+    "llm_request_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextlib.contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Runs model requests made inside the block (and its tasks) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def provider_of(model: str) -> str:
+    """Returns the provider of a model name, e.g. "openai" for "openai/gpt-4o"."""
+    if model.startswith("gemini-") or model.startswith("projects/"):
+        return "gemini"
+    return model.split("/", 1)[0] if "/" in model else model
+
+
+def estimate_request_tokens(llm_request: LlmRequest, output_tokens: int) -> int:
+    """Estimates the tokens a request uses: prompt (about four characters per
+    token) plus the expected output."""
+    config = llm_request.config
+    chars = len(str(config.system_instruction or "")) if config else 0
+    for content in llm_request.contents:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(
+                    json.dumps(part.function_response.response or {}, default=str)
+                )
+    if config and config.max_output_tokens:
+        output_tokens = config.max_output_tokens
+    return chars // 4 + output_tokens
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Returns True for the rate-limit errors raised by litellm and google-genai."""
+    if type(error).__name__ == "RateLimitError":
+        return True
+    for attribute in ("status_code", "code", "status"):
+        value = getattr(error, attribute, None)
+        if value == 429 or str(value) in _THROTTLE_CODES:
+            return True
+    return False
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Returns the Retry-After a rate-limit error carries, if any."""
+    headers = getattr(error, "litellm_response_headers", None) or getattr(
+        getattr(error, "response", None), "headers", None
+    )
+    try:
+        return float((headers or {}).get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Returns how long until `amount` units are available."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        """Returns units (or, with a negative amount, takes more)."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit driven by throttling and latency.
+
+    Attributes:
+        limit: Current limit; requests in flight may not exceed its floor.
+        latency_tolerance: A median latency over this multiple of the
+            baseline (the 10th percentile of recent latencies) counts as
+            overload; 0 disables the latency signal.
+    """
+
+    def __init__(
+        self,
+        initial: float = 8,
+        minimum: float = 1,
+        maximum: float = 64,
+        latency_tolerance: float = 3.0,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = min(max(initial, minimum), maximum)
+        self.latency_tolerance = latency_tolerance
+        self.decreases: Counter = Counter()
+        self._latencies: deque = deque(maxlen=200)
+        self._recent: deque = deque(maxlen=10)
+        self._next_decrease = 0.0
+
+    @property
+    def slots(self) -> int:
+        return max(1, math.floor(self.limit))
+
+    def _cooldown(self) -> float:
+        baseline = percentile(list(self._latencies), 50) or 1.0
+        return max(1.0, baseline)
+
+    def _decrease(self, factor: float, reason: str, now: float) -> None:
+        if now < self._next_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * factor)
+        self.decreases[reason] += 1
+        self._next_decrease = now + self._cooldown()
+
+    def on_success(self, latency: float, now: float) -> None:
+        self._latencies.append(latency)
+        self._recent.append(latency)
+        if self.latency_tolerance and len(self._latencies) >= 20:
+            baseline = percentile(list(self._latencies), 10)
+            if percentile(list(self._recent), 50) > baseline * self.latency_tolerance:
+                self._decrease(0.9, "latency", now)
+                return
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def on_throttle(self, now: float) -> None:
+        self._decrease(0.5, "throttled", now)
+
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "priority", "queued_at")
+
+    def __init__(self, future: asyncio.Future, tokens: int, priority: Priority):
+        self.future = future
+        self.tokens = tokens
+        self.priority = priority
+        self.queued_at = time.perf_counter()
+
+
+class ProviderLimiter:
+    """Admission control for one model: rate buckets, AIMD limit, priority queue.
+
+    Thread-safe; waiters are woken on their own event loop.
+
+    Attributes:
+        key: Model name the limiter is for.
+        requests: Requests-per-minute bucket, if limited.
+        tokens: Tokens-per-minute bucket, if limited.
+        concurrency: The adaptive concurrency limit.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+    ):
+        self.key = key
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.in_flight = 0
+        self._queue: list[tuple[int, int, _Waiter]] = []
+        self._order = itertools.count()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = math.inf
+        self._lock = threading.Lock()
+        self.admitted: Counter = Counter()
+        self.throttled = 0
+        self.retries = 0
+        self.max_queue_depth = 0
+        self._wait_ms: dict[Priority, deque] = {
+            priority: deque(maxlen=1000) for priority in Priority
+        }
+
+    def queue_depth(self) -> dict[str, int]:
+        with self._lock:
+            depth = Counter(
+                waiter.priority.name.lower()
+                for _, _, waiter in self._queue
+                if not waiter.future.done()
+            )
+        return {
+            priority.name.lower(): depth[priority.name.lower()] for priority in Priority
+        }
+
+    async def acquire(self, tokens: int, priority: Priority) -> None:
+        """Waits for a permit; every successful call must be paired with `release`."""
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens, priority)
+        with self._lock:
+            heapq.heappush(self._queue, (priority, next(self._order), waiter))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._pump_locked()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(tokens, None, None, throttled=False)
+            raise
+        self._wait_ms[priority].append((time.perf_counter() - waiter.queued_at) * 1000)
+
+    def _pump(self) -> None:
+        with self._lock:
+            self._timer, self._timer_at = None, math.inf
+            self._pump_locked()
+
+    def _pump_locked(self) -> None:
+        now = time.monotonic()
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= self.concurrency.slots:
+                return
+            wait = self._paused_until - now
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(waiter.tokens, now))
+            if wait > 0:
+                self._schedule(waiter.future.get_loop(), now + wait)
+                return
+            heapq.heappop(self._queue)
+            if self.requests is not None:
+                self.requests.take(1, now)
+            if self.tokens is not None:
+                self.tokens.take(waiter.tokens, now)
+            self.in_flight += 1
+            self.admitted[waiter.priority.name.lower()] += 1
+            self._grant(waiter)
+
+    def _grant(self, waiter: _Waiter) -> None:
+        loop = waiter.future.get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            waiter.future.set_result(None)
+        else:
+            loop.call_soon_threadsafe(self._resolve, waiter)
+
+    def _resolve(self, waiter: _Waiter) -> None:
+        if waiter.future.done():
+            # Cancelled between admission and wake-up: give the permit back.
+            self.release(waiter.tokens, None, None, throttled=False)
+        else:
+            waiter.future.set_result(None)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop, at: float) -> None:
+        if at >= self._timer_at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_at = at
+        delay = max(0.0, at - time.monotonic())
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._timer = loop.call_later(delay, self._pump)
+        else:
+            self._timer = None
+            loop.call_soon_threadsafe(loop.call_later, delay, self._pump)
+
+    def release(
+        self,
+        reserved_tokens: int,
+        used_tokens: Optional[int],
+        latency: Optional[float],
+        throttled: bool,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """Returns a permit and feeds the outcome to the buckets and the AIMD limit.
+
+        Args:
+            reserved_tokens (int): Tokens taken when the permit was granted.
+            used_tokens (int, optional): Tokens the provider reported, if known.
+            latency (float, optional): Seconds to the response, for successes.
+            throttled (bool): Whether the provider answered with a 429.
+            retry_after (float, optional): Seconds the provider asked to wait.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens is not None and used_tokens is not None:
+                self.tokens.give(reserved_tokens - used_tokens)
+            if throttled:
+                self.throttled += 1
+                self.concurrency.on_throttle(now)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            elif latency is not None:
+                self.concurrency.on_success(latency, now)
+            self._pump_locked()
+
+    def as_dict(self) -> dict:
+        depth = self.queue_depth()
+        with self._lock:
+            return {
+                "provider": provider_of(self.key),
+                "concurrency_limit": round(self.concurrency.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": depth,
+                "max_queue_depth": self.max_queue_depth,
+                "admitted": dict(self.admitted),
+                "throttled": self.throttled,
+                "retries": self.retries,
+                "limit_decreases": dict(self.concurrency.decreases),
+                "wait_ms": {
+                    priority.name.lower(): {
+                        "p50": percentile(list(self._wait_ms[priority]), 50),
+                        "p95": percentile(list(self._wait_ms[priority]), 95),
+                    }
+                    for priority in Priority
+                },
+            }
+
+
+class RateLimitedLlm(BaseLlm):
+    """Wraps a model and sends its requests through a `ProviderLimiter`.
+
+    Attributes:
+        inner: The wrapped model.
+        limiter: The limiter shared by every wrapper of the same model.
+        max_retries: Retries of a request answered with a 429 before anything
+            was yielded.
+        output_tokens: Output tokens reserved for requests without
+            `max_output_tokens`.
+    """
+
+    inner: BaseLlm
+    limiter: ProviderLimiter
+    max_retries: int = 3
+    output_tokens: int = 512
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        reserved = estimate_request_tokens(llm_request, self.output_tokens)
+        priority = _priority.get()
+        attempt = 0
+        while True:
+            await self.limiter.acquire(reserved, priority)
+            started = time.perf_counter()
+            latency: Optional[float] = None
+            used: Optional[int] = None
+            yielded = False
+            try:
+                async for response in self.inner.generate_content_async(
+                    llm_request, stream=stream
+                ):
+                    if latency is None:
+                        latency = time.perf_counter() - started
+                    if (
+                        response.usage_metadata
+                        and response.usage_metadata.total_token_count
+                    ):
+                        used = response.usage_metadata.total_token_count
+                    if (
+                        response.error_code
+                        and str(response.error_code) in _THROTTLE_CODES
+                    ):
+                        self.limiter.release(reserved, used, None, throttled=True)
+                        reserved = None
+                    yielded = True
+                    yield response
+            except Exception as e:
+                throttled = is_rate_limited(e)
+                retry_after = retry_after_seconds(e) if throttled else None
+                if reserved is not None:
+                    self.limiter.release(
+                        reserved,
+                        None,
+                        None,
+                        throttled=throttled,
+                        retry_after=retry_after,
+                    )
+                if not throttled or yielded or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.limiter.retries += 1
+                reserved = estimate_request_tokens(llm_request, self.output_tokens)
+                backoff = retry_after or min(30.0, 0.5 * 2**attempt)
+                logger.info(
+                    "%s rate limited; retry %d in %.1f s", self.model, attempt, backoff
+                )
+                await asyncio.sleep(backoff * random.uniform(1.0, 1.2))
+                continue
+            except BaseException:
+                if reserved is not None:
+                    self.limiter.release(reserved, None, None, throttled=False)
+                raise
+            if reserved is not None:
+                self.limiter.release(reserved, used, latency, throttled=False)
+            return
+
+
+class RateLimiterRegistry:
+    """Creates and keeps one `ProviderLimiter` per model.
+
+    Attributes:
+        limits: Limits keyed by model name or provider, e.g.
+            `{"openai": {"rpm": 500, "tpm": 30000}}`; a model's own entry
+            takes precedence over its provider's.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, dict[str, float]],
+        initial_concurrency: float = 8,
+        min_concurrency: float = 1,
+        max_concurrency: float = 64,
+        latency_tolerance: float = 3.0,
+    ):
+        self.limits = limits
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self._limiters: dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, model: str) -> ProviderLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limits = (
+                    self.limits.get(model) or self.limits.get(provider_of(model)) or {}
+                )
+                limiter = self._limiters[model] = ProviderLimiter(
+                    model,
+                    rpm=limits.get("rpm"),
+                    tpm=limits.get("tpm"),
+                    concurrency=AdaptiveConcurrency(
+                        initial=limits.get("concurrency", self.initial_concurrency),
+                        minimum=self.min_concurrency,
+                        maximum=limits.get("max_concurrency", self.max_concurrency),
+                        latency_tolerance=self.latency_tolerance,
+                    ),
+                )
+            return limiter
+
+    def as_dict(self) -> dict[str, dict]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.as_dict() for key, limiter in limiters.items()}
+
+
+@lru_cache()
+def get_rate_limiters() -> RateLimiterRegistry:
+    """
+    Get the process-wide rate limiter registry configured from settings.
+
+    Returns:
+        RateLimiterRegistry: The shared registry.
+    """
+    settings = get_settings()
+    return RateLimiterRegistry(
+        settings.LLM_RATE_LIMITS,
+        initial_concurrency=settings.LLM_CONCURRENCY_INITIAL,
+        min_concurrency=settings.LLM_CONCURRENCY_MIN,
+        max_concurrency=settings.LLM_CONCURRENCY_MAX,
+        latency_tolerance=settings.LLM_CONCURRENCY_LATENCY_TOLERANCE,
+    )
+
+
+def rate_limited_model(model: Union[str, BaseLlm]) -> Union[str, BaseLlm]:
+    """Wraps `model` with its shared limiter when rate limiting is enabled.
+
+    Args:
+        model (str | BaseLlm): A model name resolved through the ADK registry
+            or a model instance such as `LiteLlm`.
+
+    Returns:
+        str | BaseLlm: The rate-limited model, or `model` unchanged when
+            `LLM_RATE_LIMIT_ENABLED` is off.
+    """
+    settings = get_settings()
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return model
+    inner = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+    if isinstance(inner, LiteLlm):
+        # Let 429s reach the limiter instead of being retried by the provider SDK.
+        inner._additional_args.setdefault("max_retries", 0)
+    return RateLimitedLlm(
+        model=inner.model,
+        inner=inner,
+        limiter=get_rate_limiters().limiter_for(inner.model),
+        max_retries=settings.LLM_RATE_LIMIT_MAX_RETRIES,
+        output_tokens=settings.LLM_RATE_LIMIT_OUTPUT_TOKENS,
+    )
@@ -0,0 +1,174 @@
+"""Model construction for agents.
+
+`build_model` turns a model name from `config.Settings` into the value an ADK
+agent expects. Provider SDKs are imported only when a model that needs them is
+built: Gemini names stay plain strings resolved by ADK, every other provider
+goes through `LiteLlm`, which is what imports litellm. `lm_studio/` models are
+sent to `LM_STUDIO_API_BASE`. When `LLM_ENDPOINT_OVERRIDE` is set, every model
+is sent to that endpoint instead. With `LLM_CLIENT_POOL_ENABLED`, agents
+share one model instance per (provider, model, base URL) from
+`llm.clients`, with pooled connections. Agents listed in `LLM_CASCADES` get a
+`CascadeLlm` that tries the configured cheaper models before their own, and
+agents listed in `LLM_HEDGES` a `HedgedLlm` that races a secondary model
+against a slow primary. With
+`LLM_RATE_LIMIT_ENABLED`, every model (each cascade tier included) is wrapped
+in a `RateLimitedLlm` inside the response cache, so cache hits use no quota.
+With `LLM_PREFIX_CACHE_ENABLED`, every model is also wrapped in a
+`PrefixCachedLlm` (`llm.prefix_cache`) that sends the static instruction and
+tool schemas first and has the provider cache them.
+"""
+
+from typing import TYPE_CHECKING, Union
+
+from config import get_settings
+
+if TYPE_CHECKING:
+    from google.adk.models import BaseLlm
+
+
+def is_gemini_model(model: str) -> bool:
+    """Returns True for model names the ADK Gemini integration resolves natively."""
+    return model.startswith("gemini-") or model.startswith("projects/")
+
+
+def resolve_model_name(name: str) -> str:
+    """Resolves a `Settings` field name such as "MODEL_GEMMA_3_4B" to its value."""
+    if name.startswith("MODEL_"):
+        return getattr(get_settings(), name)
+    return name
+
+
+def _local_api_base(api_base: str) -> str:
+    api_base = api_base.rstrip("/")
+    return api_base if api_base.endswith("/v1") else f"{api_base}/v1"
+
+
+def _base_model(model: str) -> Union[str, "BaseLlm"]:
+    settings = get_settings()
+    clients = None
+    if settings.LLM_CLIENT_POOL_ENABLED:
+        from llm.clients import get_model_clients
+
+        clients = get_model_clients()
+
+    if settings.LLM_ENDPOINT_OVERRIDE:
+        from llm.endpoint import EndpointLlm
+
+        if clients is not None:
+            return clients.model(
+                model,
+                EndpointLlm,
+                api_base=settings.LLM_ENDPOINT_OVERRIDE,
+                api_key=settings.LLM_ENDPOINT_OVERRIDE_API_KEY,
+                custom_llm_provider="openai",
+            )
+        return EndpointLlm.for_endpoint(
+            model,
+            settings.LLM_ENDPOINT_OVERRIDE,
+            settings.LLM_ENDPOINT_OVERRIDE_API_KEY,
+        )
+
+    if is_gemini_model(model):
+        return clients.model(model) if clients is not None else model
+
+    api_base = (
+        _local_api_base(settings.LM_STUDIO_API_BASE)
+        if model.startswith("lm_studio/")
+        else None
+    )
+    if clients is not None:
+        return clients.model(model, api_base=api_base)
+
+    from google.adk.models.lite_llm import LiteLlm
+
+    if api_base:
+        return LiteLlm(model=model, api_base=api_base)
+    return LiteLlm(model=model)
+
+
+def _tier_model(model: str) -> Union[str, "BaseLlm"]:
+    """Builds one provider model with its rate limiter and prefix cache."""
+    from llm.limiter import rate_limited_model
+    from llm.prefix_cache import prefix_cached_model
+
+    return prefix_cached_model(rate_limited_model(_base_model(model)))
+
+
+def _cascade_model(model: str, agent_name: str) -> "BaseLlm":
+    from google.adk.models import LLMRegistry
+
+    from llm.cascade import CascadeLlm, build_validators, register_cascade
+
+    settings = get_settings()
+    names = [resolve_model_name(name) for name in settings.LLM_CASCADES[agent_name]]
+    tiers = []
+    for name in [name for name in names if name != model] + [model]:
+        tier = _tier_model(name)
+        tiers.append(LLMRegistry.new_llm(tier) if isinstance(tier, str) else tier)
+    cascade = CascadeLlm(
+        model=model,
+        tiers=tiers,
+        validators=build_validators(
+            settings.LLM_CASCADE_VALIDATORS.get(
+                agent_name, settings.LLM_CASCADE_DEFAULT_VALIDATORS
+            ),
+            settings.LLM_CASCADE_MIN_CONFIDENCE,
+        ),
+    )
+    register_cascade(agent_name, cascade)
+    return cascade
+
+
+def _hedged_model(primary: Union[str, "BaseLlm"], agent_name: str) -> "BaseLlm":
+    from google.adk.models import LLMRegistry
+
+    from llm.hedge import HedgedLlm, HedgeStats, register_hedge
+
+    settings = get_settings()
+    secondary = _tier_model(resolve_model_name(settings.LLM_HEDGES[agent_name]))
+    primary, secondary = (
+        LLMRegistry.new_llm(llm) if isinstance(llm, str) else llm
+        for llm in (primary, secondary)
+    )
+    hedged = HedgedLlm(
+        model=primary.model,
+        primary=primary,
+        secondary=secondary,
+        stats=HedgeStats(
+            percentile=settings.LLM_HEDGE_PERCENTILE,
+            initial_delay_ms=settings.LLM_HEDGE_INITIAL_DELAY_MS,
+            min_delay_ms=settings.LLM_HEDGE_MIN_DELAY_MS,
+            max_rate=settings.LLM_HEDGE_MAX_RATE,
+            measure_rate=settings.LLM_HEDGE_MEASURE_RATE,
+        ),
+    )
+    register_hedge(agent_name, hedged)
+    return hedged
+
+
+def build_model(model: str, *, agent_name: str) -> Union[str, "BaseLlm"]:
+    """Builds the model for an agent.
+
+    Args:
+        model (str): Model name, e.g. "gemini-2.0-flash" or "openai/gpt-4o".
+        agent_name (str): Name of the agent the model is built for.
+
+    Returns:
+        str | BaseLlm: A Gemini model name (a shared `PooledGemini` with
+            `LLM_CLIENT_POOL_ENABLED`), a `LiteLlm` instance or, for agents
+            in `LLM_CASCADES`, a `CascadeLlm` ending with `model`, raced against
+            a secondary model for agents in `LLM_HEDGES`, rate limited
+            when `LLM_RATE_LIMIT_ENABLED` is set, prefix cached when
+            `LLM_PREFIX_CACHE_ENABLED` is set and wrapped by the response
+            cache when it is enabled for the agent.
+    """
+    from llm.cache import cached_model
+
+    settings = get_settings()
+    if agent_name in settings.LLM_CASCADES:
+        llm = _cascade_model(model, agent_name)
+    else:
+        llm = _tier_model(model)
+    if agent_name in settings.LLM_HEDGES:
+        llm = _hedged_model(llm, agent_name)
+    return cached_model(llm, agent_name=agent_name)
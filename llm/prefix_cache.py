@@ -0,0 +1,728 @@
+"""Provider prompt prefix caching for static instructions and tool schemas.
+
+Most of a model request repeats on every turn of every session: the agent's
+instruction and its tool schemas. `PrefixCachedLlm` wraps a model so that this
+static prefix comes first in the request and is cached by the provider:
+
+* Parts of an instruction that change per session (documents from state) are
+  marked with `cacheable_instruction`. The wrapper moves them out of the
+  system instruction into a user message at the start of the conversation, so
+  the system instruction and tools are the same for every session.
+* Gemini models get an explicit cached content (system instruction plus tools)
+  per prefix, referenced by later requests instead of resending it.
+* Anthropic models get a `cache_control` breakpoint on the system message,
+  which caches the tools and the system prompt.
+* Other providers (OpenAI, OpenAI-compatible endpoints) cache prefixes
+  automatically and only need the static-first layout.
+
+Provider caches are only requested for prefixes of at least `min_tokens`
+(estimated) that were seen `min_requests` times, so one-off prompts do not pay
+for cache writes. Every model endpoint has a `PrefixCachePool` that tracks
+its prefixes by hash, which gives the expected hit rate even where the
+provider does not report cache use, and manages the lifetime of the explicit
+caches: they expire after `ttl_seconds` without use, are extended while in
+use, are deleted when evicted from the pool and when the pool is closed.
+
+Cached-token counts reported by the provider are written to the response's
+`usage_metadata.cached_content_token_count` (litellm providers included) and
+summed per pool with the time to first token of requests with and without a
+cache hit.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Iterator, Optional, Union
+
+from google.adk.models import BaseLlm, Gemini, LLMRegistry, LlmRequest, LlmResponse
+from google.adk.models.lite_llm import LiteLlm, LiteLLMClient
+from google.genai import types
+
+from config import get_settings
+from llm.limiter import provider_of
+
+logger = logging.getLogger(__name__)
+
+_DYNAMIC_START = "<dynamic-context>"
+_DYNAMIC_END = "</dynamic-context>"
+_DYNAMIC_RE = re.compile(
+    rf"\s*{re.escape(_DYNAMIC_START)}\n?(.*?)\n?{re.escape(_DYNAMIC_END)}\s*", re.S
+)
+
+# How long providers keep automatic and `cache_control` caches after their
+# last use; explicit caches live for the pool's `ttl_seconds`.
+_IMPLICIT_TTL_SECONDS = 300.0
+
+# Price of a cached input token relative to an uncached one.
+_CACHED_INPUT_PRICE = {"gemini": 0.25, "anthropic": 0.1, "openai": 0.5}
+
+
+def cacheable_instruction(static: str, dynamic: str = "") -> str:
+    """Builds an instruction with its static part first.
+
+    Args:
+        static (str): Text that is the same for every session.
+        dynamic (str): Text that changes per session, e.g. state placeholders.
+
+    Returns:
+        str: `static` followed by `dynamic`. With `LLM_PREFIX_CACHE_ENABLED`
+            the dynamic part is marked, so that `PrefixCachedLlm` can keep it
+            out of the cached prefix.
+    """
+    static, dynamic = static.strip(), dynamic.strip()
+    if not dynamic:
+        return static
+    if not get_settings().LLM_PREFIX_CACHE_ENABLED:
+        return f"{static}\n\n{dynamic}"
+    return f"{static}\n\n{_DYNAMIC_START}\n{dynamic}\n{_DYNAMIC_END}"
+
+
+def split_instruction(instruction: str) -> tuple[str, str]:
+    """Splits a system instruction into its static and its marked dynamic text."""
+    dynamic = [match.strip() for match in _DYNAMIC_RE.findall(instruction)]
+    static = _DYNAMIC_RE.sub("\n\n", instruction).strip()
+    return static, "\n\n".join(part for part in dynamic if part)
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates the token count of `text` (about four characters per token)."""
+    return len(text) // 4
+
+
+@dataclass
+class Prefix:
+    """The static prefix of a request.
+
+    Attributes:
+        key: Hash of the model, system instruction and tools.
+        instruction: Static system instruction.
+        tools: Tools of the request.
+        tool_config: Tool config of the request.
+        tokens: Estimated tokens of the instruction and the tool schemas.
+    """
+
+    key: str
+    instruction: str
+    tools: Optional[list[types.Tool]]
+    tool_config: Optional[types.ToolConfig]
+    tokens: int
+
+
+def split_request(llm_request: LlmRequest) -> tuple[LlmRequest, Optional[Prefix]]:
+    """Returns a copy of `llm_request` with its static prefix first.
+
+    The marked dynamic parts of the system instruction become a user message
+    before the conversation. The original request is left unchanged, since
+    hedged and cascaded requests are sent to several models.
+
+    Returns:
+        The new request and its prefix; no prefix when the request has no
+        system instruction.
+    """
+    config = llm_request.config
+    instruction = config.system_instruction if config else None
+    if not isinstance(instruction, str) or not instruction.strip():
+        return llm_request, None
+    static, dynamic = split_instruction(instruction)
+    contents = list(llm_request.contents)
+    if dynamic:
+        contents.insert(0, types.Content(role="user", parts=[types.Part(text=dynamic)]))
+    request = llm_request.model_copy(
+        update={
+            "config": config.model_copy(update={"system_instruction": static}),
+            "contents": contents,
+        }
+    )
+    tools = json.dumps(
+        [tool.model_dump(mode="json", exclude_none=True) for tool in config.tools or []]
+        + [
+            (
+                config.tool_config.model_dump(mode="json", exclude_none=True)
+                if config.tool_config
+                else None
+            )
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    key = hashlib.sha256(
+        json.dumps([llm_request.model, static, tools]).encode("utf-8")
+    ).hexdigest()
+    return request, Prefix(
+        key=key,
+        instruction=static,
+        tools=config.tools,
+        tool_config=config.tool_config,
+        tokens=estimate_tokens(static) + estimate_tokens(tools),
+    )
+
+
+@dataclass
+class PrefixEntry:
+    """A tracked prefix of a `PrefixCachePool`.
+
+    Attributes:
+        key: Hash of the prefix.
+        tokens: Estimated tokens of the prefix.
+        requests: Requests that used it while it was cached.
+        last_used: When it was last used (monotonic seconds).
+        cache_name: Name of its explicit provider cache, once created.
+        expires_at: When the explicit cache expires (monotonic seconds).
+        pending: Whether the explicit cache is being created.
+        retry_at: When creating the explicit cache may be retried after a failure.
+    """
+
+    key: str
+    tokens: int
+    requests: int = 0
+    last_used: float = 0.0
+    cache_name: Optional[str] = None
+    expires_at: float = 0.0
+    pending: bool = False
+    retry_at: float = 0.0
+
+
+class PrefixCacheStats:
+    """Expected and reported prefix cache use of a `PrefixCachePool`."""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self.requests = 0
+        self.prefix_tokens = 0
+        self.expected_hits = 0
+        self.expected_cached_tokens = 0
+        self.cached_requests = 0
+        self.caches_created = 0
+        self.caches_deleted = 0
+        self.cache_failures = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.hit_ttft_ms: list[float] = []
+        self.miss_ttft_ms: list[float] = []
+        self._lock = threading.Lock()
+
+    def record_prefix(self, tokens: int, expected_hit: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.prefix_tokens += tokens
+            if expected_hit:
+                self.expected_hits += 1
+                self.expected_cached_tokens += tokens
+
+    def record_response(
+        self,
+        prompt_tokens: Optional[int],
+        cached_tokens: Optional[int],
+        ttft_ms: Optional[float],
+    ) -> None:
+        with self._lock:
+            self.prompt_tokens += prompt_tokens or 0
+            self.cached_tokens += cached_tokens or 0
+            if ttft_ms is not None:
+                samples = self.hit_ttft_ms if cached_tokens else self.miss_ttft_ms
+                samples.append(ttft_ms)
+                del samples[:-1000]
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        def mean(values: list[float]) -> Optional[float]:
+            return round(sum(values) / len(values), 1) if values else None
+
+        with self._lock:
+            cached_share = (
+                self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+            )
+            price = _CACHED_INPUT_PRICE.get(self.provider)
+            return {
+                "requests": self.requests,
+                "expected_hits": self.expected_hits,
+                "expected_hit_rate": (
+                    round(self.expected_hits / self.requests, 4)
+                    if self.requests
+                    else 0.0
+                ),
+                "prefix_tokens": self.prefix_tokens,
+                "expected_cached_tokens": self.expected_cached_tokens,
+                "cached_requests": self.cached_requests,
+                "caches_created": self.caches_created,
+                "caches_deleted": self.caches_deleted,
+                "cache_failures": self.cache_failures,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cached_token_share": round(cached_share, 4),
+                **(
+                    {"input_cost_saved_rate": round(cached_share * (1 - price), 4)}
+                    if price is not None
+                    else {}
+                ),
+                "mean_ttft_ms_hit": mean(self.hit_ttft_ms),
+                "mean_ttft_ms_miss": mean(self.miss_ttft_ms),
+            }
+
+
+class PrefixCachePool:
+    """The tracked prefixes and explicit caches of one model endpoint.
+
+    Attributes:
+        name: "<provider> <model>", used in metrics.
+        provider: Provider of the model, e.g. "gemini".
+        ttl_seconds: Lifetime of explicit caches after their last use.
+        min_tokens: Smallest prefix the provider caches.
+        min_requests: Requests with a prefix before a provider cache is used.
+        max_entries: Prefixes tracked; the least recently used are dropped.
+        stats: Expected and reported cache use.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        provider: str,
+        ttl_seconds: float = 3600.0,
+        min_tokens: int = 1024,
+        min_requests: int = 2,
+        max_entries: int = 32,
+    ):
+        self.name = name
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.min_requests = min_requests
+        self.max_entries = max_entries
+        self.stats = PrefixCacheStats(provider)
+        self._entries: OrderedDict[str, PrefixEntry] = OrderedDict()
+        self._client: Optional[Any] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def explicit(self) -> bool:
+        """Whether the provider needs explicitly created caches."""
+        return self.provider == "gemini"
+
+    @property
+    def tracked_ttl_seconds(self) -> float:
+        return self.ttl_seconds if self.explicit else _IMPLICIT_TTL_SECONDS
+
+    def observe(self, prefix: Prefix) -> PrefixEntry:
+        """Records a request with `prefix` and returns its entry.
+
+        A request is an expected hit when its prefix was used within the
+        provider's cache lifetime and is large enough to be cached.
+        """
+        now = time.monotonic()
+        expired: list[PrefixEntry] = []
+        with self._lock:
+            entry = self._entries.get(prefix.key)
+            hit = (
+                entry is not None
+                and now - entry.last_used < self.tracked_ttl_seconds
+                and prefix.tokens >= self.min_tokens
+            )
+            if entry is None or now - entry.last_used >= self.tracked_ttl_seconds:
+                if entry is not None:
+                    expired.append(entry)
+                entry = PrefixEntry(prefix.key, prefix.tokens)
+                self._entries[prefix.key] = entry
+            entry.requests += 1
+            entry.last_used = now
+            self._entries.move_to_end(prefix.key)
+            while len(self._entries) > self.max_entries:
+                expired.append(self._entries.popitem(last=False)[1])
+        self.stats.record_prefix(prefix.tokens, hit)
+        for old in expired:
+            self._release(old)
+        return entry
+
+    def cacheable(self, entry: PrefixEntry) -> bool:
+        """Whether a provider cache should be used for `entry`."""
+        return entry.tokens >= self.min_tokens and entry.requests >= self.min_requests
+
+    def cache_name(self, entry: PrefixEntry) -> Optional[str]:
+        """Returns the explicit cache of `entry` while it is valid."""
+        if entry.cache_name and entry.expires_at > time.monotonic():
+            return entry.cache_name
+        return None
+
+    def ensure_cache(self, entry: PrefixEntry, prefix: Prefix, llm: Gemini) -> None:
+        """Creates or extends the explicit cache of `entry` in the background."""
+        now = time.monotonic()
+        with self._lock:
+            if entry.pending or now < entry.retry_at:
+                return
+            name = self.cache_name(entry)
+            if name and entry.expires_at - now > self.ttl_seconds / 2:
+                return
+            entry.pending = True
+        self._client = llm.api_client
+        if name:
+            self._spawn(self._extend(entry, name))
+        else:
+            self._spawn(self._create(entry, prefix, llm.model))
+
+    def invalidate(self, entry: PrefixEntry) -> None:
+        """Forgets the explicit cache of `entry`, e.g. after the provider
+        rejected it."""
+        with self._lock:
+            entry.cache_name = None
+            entry.expires_at = 0.0
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _ttl(self) -> str:
+        return f"{int(self.ttl_seconds)}s"
+
+    async def _create(self, entry: PrefixEntry, prefix: Prefix, model: str) -> None:
+        try:
+            cache = await self._client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=prefix.instruction,
+                    tools=prefix.tools,
+                    tool_config=prefix.tool_config,
+                    ttl=self._ttl(),
+                    display_name=f"prefix-{prefix.key[:16]}",
+                ),
+            )
+        except Exception as e:
+            logger.warning("Could not cache a prompt prefix for %s: %s", self.name, e)
+            self.stats.count("cache_failures")
+            entry.retry_at = time.monotonic() + self.ttl_seconds
+        else:
+            entry.cache_name = cache.name
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self.stats.count("caches_created")
+        finally:
+            entry.pending = False
+
+    async def _extend(self, entry: PrefixEntry, name: str) -> None:
+        try:
+            await self._client.aio.caches.update(
+                name=name, config=types.UpdateCachedContentConfig(ttl=self._ttl())
+            )
+        except Exception as e:
+            logger.debug("Could not extend prefix cache %s: %s", name, e)
+            self.invalidate(entry)
+        else:
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+        finally:
+            entry.pending = False
+
+    async def _delete(self, name: str) -> None:
+        try:
+            await self._client.aio.caches.delete(name=name)
+        except Exception as e:
+            logger.debug("Could not delete prefix cache %s: %s", name, e)
+        else:
+            self.stats.count("caches_deleted")
+
+    def _release(self, entry: PrefixEntry) -> None:
+        if entry.cache_name and self._client is not None:
+            self._spawn(self._delete(entry.cache_name))
+
+    async def close(self) -> None:
+        """Deletes the pool's explicit caches."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        names = [entry.cache_name for entry in entries if entry.cache_name]
+        if names and self._client is not None:
+            await asyncio.gather(*(self._delete(name) for name in names))
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            tracked = len(self._entries)
+            cached = sum(1 for entry in self._entries.values() if entry.cache_name)
+        return {
+            **self.stats.as_dict(),
+            "tracked_prefixes": tracked,
+            "provider_caches": cached,
+        }
+
+
+class PrefixCacheRegistry:
+    """One `PrefixCachePool` per model endpoint.
+
+    Attributes:
+        pool_args: Keyword arguments of every `PrefixCachePool`.
+    """
+
+    def __init__(self, **pool_args: Any):
+        self.pool_args = pool_args
+        self._pools: dict[tuple[str, str], PrefixCachePool] = {}
+        self._lock = threading.Lock()
+
+    def pool(self, provider: str, model: str) -> PrefixCachePool:
+        key = (provider, model)
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = PrefixCachePool(
+                    f"{provider} {model}", provider, **self.pool_args
+                )
+            return self._pools[key]
+
+    async def close(self) -> None:
+        """Deletes the explicit caches of every pool."""
+        with self._lock:
+            pools = list(self._pools.values())
+        await asyncio.gather(*(pool.close() for pool in pools))
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            pools = list(self._pools.values())
+        return {pool.name: pool.as_dict() for pool in pools}
+
+
+@lru_cache()
+def get_prefix_caches() -> PrefixCacheRegistry:
+    """
+    Get the process-wide prefix cache registry configured from settings.
+
+    Returns:
+        PrefixCacheRegistry: The shared registry.
+    """
+    settings = get_settings()
+    return PrefixCacheRegistry(
+        ttl_seconds=settings.LLM_PREFIX_CACHE_TTL_SECONDS,
+        min_tokens=settings.LLM_PREFIX_CACHE_MIN_TOKENS,
+        min_requests=settings.LLM_PREFIX_CACHE_MIN_REQUESTS,
+        max_entries=settings.LLM_PREFIX_CACHE_MAX_ENTRIES,
+    )
+
+
+class _RequestCache:
+    """Cache settings and reported usage of the request being sent."""
+
+    def __init__(self, cache_control: bool):
+        self.cache_control = cache_control
+        self.cached_tokens: Optional[int] = None
+
+    def record_usage(self, usage: Any) -> None:
+        if not usage:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None)
+        if cached is None:
+            cached = getattr(usage, "cache_read_input_tokens", None)
+        if cached is not None:
+            self.cached_tokens = cached
+
+
+_request_cache: ContextVar[Optional[_RequestCache]] = ContextVar(
+    "llm_prefix_request_cache", default=None
+)
+
+
+async def _with_request_cache(
+    responses: AsyncGenerator[LlmResponse, None], request_cache: _RequestCache
+) -> AsyncGenerator[LlmResponse, None]:
+    """Yields `responses` with `request_cache` set while each one is produced.
+
+    The variable is set and reset around every step instead of across the
+    `yield`: workflow agents resume their sub-agents in other tasks, whose
+    context a token set before the `yield` does not belong to.
+    """
+    try:
+        while True:
+            token = _request_cache.set(request_cache)
+            try:
+                response = await responses.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _request_cache.reset(token)
+            yield response
+    finally:
+        await responses.aclose()
+
+
+def with_cache_control(messages: list) -> list:
+    """Returns `messages` with a `cache_control` breakpoint on the system message."""
+    messages = list(messages)
+    for index, message in enumerate(messages):
+        if message.get("role") in ("system", "developer"):
+            content = message.get("content")
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            content = [dict(part) for part in content]
+            content[-1]["cache_control"] = {"type": "ephemeral"}
+            messages[index] = {"role": "system", "content": content}
+            break
+    return messages
+
+
+class PrefixCacheClient(LiteLLMClient):
+    """litellm client that adds `cache_control` and keeps the cached-token count.
+
+    ADK's `LiteLlm` drops the cached tokens from the usage it reports, so they
+    are taken from the litellm response here.
+    """
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        request = _request_cache.get()
+        if request is not None and request.cache_control:
+            messages = with_cache_control(messages)
+        response = await super().acompletion(model, messages, tools, **kwargs)
+        if request is not None:
+            request.record_usage(response.get("usage"))
+        return response
+
+    def completion(self, model, messages, tools, stream=False, **kwargs):
+        request = _request_cache.get()
+        if request is not None and request.cache_control:
+            messages = with_cache_control(messages)
+        response = super().completion(model, messages, tools, stream=stream, **kwargs)
+        if request is None:
+            return response
+        if not stream:
+            request.record_usage(response.get("usage"))
+            return response
+        return self._recording(response, request)
+
+    @staticmethod
+    def _recording(chunks: Iterator, request: _RequestCache) -> Iterator:
+        for chunk in chunks:
+            request.record_usage(getattr(chunk, "usage", None))
+            yield chunk
+
+
+def _provider_model(llm: BaseLlm) -> BaseLlm:
+    """Returns the provider model under wrappers such as `RateLimitedLlm`."""
+    while isinstance(getattr(llm, "inner", None), BaseLlm):
+        llm = llm.inner
+    return llm
+
+
+def _provider(llm: BaseLlm) -> str:
+    if isinstance(llm, Gemini):
+        return "gemini"
+    if isinstance(llm, LiteLlm):
+        return llm._additional_args.get("custom_llm_provider") or provider_of(llm.model)
+    return provider_of(llm.model)
+
+
+class PrefixCachedLlm(BaseLlm):
+    """Sends a model's requests with their static prefix first and cached.
+
+    Attributes:
+        inner: The wrapped model.
+        pool: The prefix cache pool of the model's endpoint.
+    """
+
+    inner: BaseLlm
+    pool: PrefixCachePool
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        request, prefix = split_request(llm_request)
+        if prefix is None:
+            async for response in self.inner.generate_content_async(
+                llm_request, stream=stream
+            ):
+                yield response
+            return
+
+        entry = self.pool.observe(prefix)
+        provider_llm = _provider_model(self.inner)
+        cacheable = self.pool.cacheable(entry)
+        cache_name = None
+        if cacheable and isinstance(provider_llm, Gemini):
+            cache_name = self.pool.cache_name(entry)
+            self.pool.ensure_cache(entry, prefix, provider_llm)
+        if cache_name:
+            config = request.config.model_copy(
+                update={
+                    "cached_content": cache_name,
+                    "system_instruction": None,
+                    "tools": None,
+                    "tool_config": None,
+                }
+            )
+            cached_request = request.model_copy(update={"config": config})
+        else:
+            cached_request = request
+        request_cache = _RequestCache(
+            cache_control=cacheable and self.pool.provider == "anthropic"
+        )
+        if cache_name or request_cache.cache_control:
+            self.pool.stats.count("cached_requests")
+
+        started = time.perf_counter()
+        ttft_ms = None
+        answered = False
+        try:
+            async for response in _with_request_cache(
+                self.inner.generate_content_async(cached_request, stream=stream),
+                request_cache,
+            ):
+                answered = True
+                ttft_ms = ttft_ms or (time.perf_counter() - started) * 1000
+                self._record(response, request_cache, ttft_ms)
+                yield response
+        except Exception as e:
+            if not cache_name or answered:
+                raise
+            # The cache expired or was deleted on the provider's side.
+            logger.debug("Prefix cache %s rejected: %s", cache_name, e)
+            self.pool.invalidate(entry)
+            async for response in _with_request_cache(
+                self.inner.generate_content_async(request, stream=stream),
+                request_cache,
+            ):
+                ttft_ms = ttft_ms or (time.perf_counter() - started) * 1000
+                self._record(response, request_cache, ttft_ms)
+                yield response
+
+    def _record(
+        self, response: LlmResponse, request_cache: _RequestCache, ttft_ms: float
+    ) -> None:
+        usage = response.usage_metadata
+        if response.partial or usage is None:
+            return
+        if usage.cached_content_token_count is None:
+            usage.cached_content_token_count = request_cache.cached_tokens
+        self.pool.stats.record_response(
+            usage.prompt_token_count, usage.cached_content_token_count, ttft_ms
+        )
+
+
+def prefix_cached_model(model: Union[str, BaseLlm]) -> Union[str, BaseLlm]:
+    """Wraps `model` with prefix caching when `LLM_PREFIX_CACHE_ENABLED` is set.
+
+    Args:
+        model (str | BaseLlm): A model name resolved through the ADK registry
+            or a model instance, possibly wrapped by `rate_limited_model`.
+
+    Returns:
+        str | BaseLlm: The wrapped model, or `model` unchanged when prefix
+            caching is off.
+    """
+    if not get_settings().LLM_PREFIX_CACHE_ENABLED:
+        return model
+    inner = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+    provider_llm = _provider_model(inner)
+    if isinstance(provider_llm, LiteLlm) and not isinstance(
+        provider_llm.llm_client, PrefixCacheClient
+    ):
+        provider_llm.llm_client = PrefixCacheClient()
+    return PrefixCachedLlm(
+        model=inner.model,
+        inner=inner,
+        pool=get_prefix_caches().pool(_provider(provider_llm), provider_llm.model),
+    )
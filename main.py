@@ -1,5 +1,22 @@
+import argparse
+
+
 def main():
-    print("Hello from ai-agents!")
+    parser = argparse.ArgumentParser(
+        description="Serve the agents over HTTP with server-sent events."
+    )
+    parser.add_argument("--host", help="Defaults to SERVER_HOST.")
+    parser.add_argument("--port", type=int, help="Defaults to SERVER_PORT.")
+    parser.add_argument(
+        "--agents",
+        nargs="+",
+        help="Agent packages to serve (default: SERVER_AGENTS or every package with an agent.py).",
+    )
+    args = parser.parse_args()
+
+    from server.app import serve
+
+    serve(host=args.host, port=args.port, apps=args.agents)
 
 
 if __name__ == "__main__":
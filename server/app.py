@@ -0,0 +1,288 @@
+"""HTTP front end of `AgentService`.
+
+Routes:
+    GET  /health                                       200, or 503 while draining
+    GET  /metrics                                      run counters and latencies,
+                                                       model cascade tier stats,
+                                                       search cache stats,
+                                                       MCP server pools
+    GET  /apps                                         served agent packages
+    POST /apps/{app}/users/{user_id}/sessions          create a session, optionally
+                                                       with {"session_id", "state"}
+    GET  /apps/{app}/users/{user_id}/sessions/{id}     read a session
+    POST /apps/{app}/run_sse                           run one turn, streamed
+
+`run_sse` takes `{"user_id", "session_id"?, "message", "stream_tokens"?}` and
+answers with server-sent events: `session` (when the session was created for
+this turn), one `event` per ADK event (partial text chunks too when
+`stream_tokens` is set), then `done`, or `error` if the run failed. Closing the
+connection cancels the run.
+"""
+
+import json
+import logging
+import sys
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from config import SearchBackendType, get_settings
+from llm.cascade import cascade_stats
+from llm.hedge import hedge_stats
+from server.service import AgentService, Run, ServiceError
+from workflows.candidates import candidate_stats
+from workflows.gated import gate_stats
+
+logger = logging.getLogger(__name__)
+
+
+def _error(error: ServiceError) -> JSONResponse:
+    headers = {}
+    if error.retry_after is not None:
+        headers["Retry-After"] = str(int(error.retry_after))
+    return JSONResponse(
+        {"error": str(error)}, status_code=error.status, headers=headers
+    )
+
+
+def _mcp_pool_stats() -> list[dict]:
+    # The pool module imports the MCP client; it is loaded by agents that use it.
+    if "tools.mcp_pool" not in sys.modules:
+        return []
+    return sys.modules["tools.mcp_pool"].mcp_pool_stats()
+
+
+def _model_client_stats() -> dict:
+    # Loaded by `build_model` once a pooled model is built.
+    if "llm.clients" not in sys.modules:
+        return {}
+    return sys.modules["llm.clients"].get_model_clients().as_dict()
+
+
+def _prefix_cache_stats() -> dict:
+    # Loaded by `build_model` once a prefix cached model is built.
+    if "llm.prefix_cache" not in sys.modules:
+        return {}
+    return sys.modules["llm.prefix_cache"].get_prefix_caches().as_dict()
+
+
+def _artifact_stats() -> dict:
+    # The store is built when the first output is saved or resolved.
+    module = sys.modules.get("sessions.artifacts")
+    if module is None or not module.get_artifact_store.cache_info().currsize:
+        return {}
+    return module.get_artifact_store().stats.as_dict()
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _stream(run: Run, created_session: bool):
+    if created_session:
+        yield _sse("session", json.dumps({"session_id": run.session_id}))
+    count = 0
+    try:
+        async for event in run.events():
+            count += 1
+            yield _sse("event", event.model_dump_json(exclude_none=True, by_alias=True))
+    except Exception as e:
+        yield _sse("error", json.dumps({"error": str(e) or type(e).__name__}))
+        return
+    yield _sse("done", json.dumps({"events": count}))
+
+
+def create_app(
+    service: Optional[AgentService] = None,
+    drain_timeout_seconds: Optional[float] = None,
+) -> Starlette:
+    """Builds the ASGI app serving `service` (default: configured from settings)."""
+    service = service or AgentService.from_settings()
+    if drain_timeout_seconds is None:
+        drain_timeout_seconds = get_settings().SERVER_DRAIN_TIMEOUT_SECONDS
+
+    async def health(_: Request):
+        if service.draining:
+            return JSONResponse({"status": "draining"}, status_code=503)
+        return JSONResponse({"status": "ok"})
+
+    async def metrics(_: Request):
+        cascades = cascade_stats()
+        hedges = hedge_stats()
+        gates = gate_stats()
+        candidates = candidate_stats()
+        search = {}
+        if get_settings().SEARCH_BACKEND == SearchBackendType.HTTP:
+            from tools.search_provider import get_search_provider
+
+            search = {"search_cache": get_search_provider().stats.as_dict()}
+        pools = _mcp_pool_stats()
+        model_clients = _model_client_stats()
+        prefix_caches = _prefix_cache_stats()
+        artifacts = _artifact_stats()
+        limits = {}
+        if get_settings().LLM_RATE_LIMIT_ENABLED:
+            from llm.limiter import get_rate_limiters
+
+            limits = {"rate_limits": get_rate_limiters().as_dict()}
+        return JSONResponse(
+            {
+                **service.status(),
+                **service.metrics.as_dict(),
+                **({"model_cascades": cascades} if cascades else {}),
+                **({"model_hedges": hedges} if hedges else {}),
+                **({"workflow_gates": gates} if gates else {}),
+                **({"code_candidates": candidates} if candidates else {}),
+                **search,
+                **({"mcp_pools": pools} if pools else {}),
+                **({"model_clients": model_clients} if model_clients else {}),
+                **({"prefix_caches": prefix_caches} if prefix_caches else {}),
+                **({"artifacts": artifacts} if artifacts else {}),
+                **limits,
+            }
+        )
+
+    async def apps(_: Request):
+        return JSONResponse({"apps": service.apps})
+
+    async def create_session(request: Request):
+        body = await request.body()
+        try:
+            options = json.loads(body) if body else {}
+        except ValueError:
+            return JSONResponse({"error": "Expected a JSON body."}, status_code=400)
+        try:
+            session = await service.create_session(
+                request.path_params["app"],
+                request.path_params["user_id"],
+                options.get("session_id"),
+                options.get("state"),
+            )
+        except ServiceError as e:
+            return _error(e)
+        return JSONResponse({"session_id": session.id}, status_code=201)
+
+    async def get_session(request: Request):
+        try:
+            session = await service.get_session(
+                request.path_params["app"],
+                request.path_params["user_id"],
+                request.path_params["session_id"],
+            )
+        except ServiceError as e:
+            return _error(e)
+        return Response(
+            session.model_dump_json(exclude_none=True, by_alias=True),
+            media_type="application/json",
+        )
+
+    async def run_sse(request: Request):
+        try:
+            body = await request.json()
+            user_id, message = body["user_id"], body["message"]
+        except (ValueError, KeyError, TypeError):
+            return JSONResponse(
+                {"error": "Expected a JSON body with 'user_id' and 'message'."},
+                status_code=400,
+            )
+        app = request.path_params["app"]
+        session_id = body.get("session_id")
+        created_session = session_id is None
+        try:
+            if created_session:
+                session_id = (await service.create_session(app, user_id)).id
+            run = await service.start_run(
+                app,
+                user_id,
+                session_id,
+                message,
+                stream_tokens=bool(body.get("stream_tokens")),
+            )
+        except ServiceError as e:
+            return _error(e)
+
+        async def release():
+            run.close()
+
+        return StreamingResponse(
+            _stream(run, created_session=created_session),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            # Releases the run even if the client left before streaming began.
+            background=BackgroundTask(release),
+        )
+
+    @asynccontextmanager
+    async def lifespan(_: Starlette):
+        yield
+        await service.drain(drain_timeout_seconds)
+        if "tools.mcp_pool" in sys.modules:
+            from tools.mcp_pool import close_mcp_pools
+
+            await close_mcp_pools()
+        if "llm.prefix_cache" in sys.modules:
+            # Explicit prefix caches are billed for storage until they expire.
+            await sys.modules["llm.prefix_cache"].get_prefix_caches().close()
+
+    app = Starlette(
+        routes=[
+            Route("/health", health),
+            Route("/metrics", metrics),
+            Route("/apps", apps),
+            Route(
+                "/apps/{app}/users/{user_id}/sessions",
+                create_session,
+                methods=["POST"],
+            ),
+            Route(
+                "/apps/{app}/users/{user_id}/sessions/{session_id}",
+                get_session,
+            ),
+            Route("/apps/{app}/run_sse", run_sse, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.service = service
+    return app
+
+
+class DrainingServer(uvicorn.Server):
+    """Uvicorn server that stops admitting runs as soon as shutdown starts.
+
+    Uvicorn then waits up to `timeout_graceful_shutdown` for open streams to
+    finish before the app's lifespan cancels whatever is left.
+    """
+
+    def __init__(self, config: uvicorn.Config, service: AgentService):
+        super().__init__(config)
+        self.service = service
+
+    def handle_exit(self, sig, frame) -> None:
+        self.service.begin_drain()
+        super().handle_exit(sig, frame)
+
+
+def serve(
+    host: Optional[str] = None,
+    port: Optional[int] = None,
+    apps: Optional[list[str]] = None,
+) -> None:
+    """Runs the agent server until interrupted."""
+    settings = get_settings()
+    service = AgentService.from_settings()
+    if apps:
+        service.apps = apps
+    config = uvicorn.Config(
+        create_app(service),
+        host=host or settings.SERVER_HOST,
+        port=port or settings.SERVER_PORT,
+        timeout_graceful_shutdown=int(settings.SERVER_DRAIN_TIMEOUT_SECONDS),
+    )
+    logger.info("Serving %s", ", ".join(service.apps))
+    DrainingServer(config, service).run()
@@ -0,0 +1,389 @@
+"""Agent runs behind admission control.
+
+`AgentService` owns one ADK `Runner` per served agent package, built on first
+use, and a session service shared by all of them. Every run goes through the
+same limits: at most `max_concurrent_runs` execute at once, at most
+`max_queued_runs` wait for a slot, and a session runs one turn at a time. A
+run hands its events to the client through a bounded queue, so a slow client
+pauses its agent instead of buffering without limit, and a run whose client
+goes away is cancelled.
+"""
+
+import asyncio
+import functools
+import importlib
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from config import get_settings
+from tools.stats import percentile
+
+if TYPE_CHECKING:
+    from google.adk.events import Event
+    from google.adk.runners import Runner
+    from google.adk.sessions import BaseSessionService, Session
+
+    from telemetry.traces import TraceRecorder
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def discover_apps(root: Path = PROJECT_ROOT) -> list[str]:
+    """Returns the packages under `root` that define an `agent.py`."""
+    return sorted(
+        path.parent.name
+        for path in root.glob("*/agent.py")
+        if (path.parent / "__init__.py").exists()
+    )
+
+
+class ServiceError(Exception):
+    """A run that cannot be started; `status` is the HTTP status to answer with."""
+
+    status = 500
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class NotFound(ServiceError):
+    status = 404
+
+
+class SessionBusy(ServiceError):
+    status = 409
+
+
+class Unavailable(ServiceError):
+    status = 503
+
+
+@dataclass
+class ServiceMetrics:
+    """Counters and recent latencies of the runs handled by an `AgentService`."""
+
+    sessions_created: int = 0
+    runs_started: int = 0
+    runs_completed: int = 0
+    runs_failed: int = 0
+    runs_cancelled: int = 0
+    runs_rejected: int = 0
+    events_streamed: int = 0
+    queue_wait_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    first_event_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    run_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def as_dict(self) -> dict:
+        summary = {
+            name: value
+            for name, value in vars(self).items()
+            if not isinstance(value, deque)
+        }
+        for name in ("queue_wait_ms", "first_event_ms", "run_ms"):
+            values = list(getattr(self, name))
+            summary[name] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+        return summary
+
+
+_DONE = object()
+
+
+class Run:
+    """One agent turn, admitted but possibly still waiting for a slot.
+
+    Iterate `events()` to execute the run; `close()` releases everything the
+    run holds and is safe to call more than once.
+    """
+
+    def __init__(
+        self,
+        service: "AgentService",
+        runner: "Runner",
+        user_id: str,
+        session_id: str,
+        message: str,
+        stream_tokens: bool,
+    ):
+        self.service = service
+        self.runner = runner
+        self.user_id = user_id
+        self.session_id = session_id
+        self.message = message
+        self.stream_tokens = stream_tokens
+        self.created = time.perf_counter()
+        self._queue: asyncio.Queue = asyncio.Queue(service.stream_buffer_events)
+        self._task: Optional[asyncio.Task] = None
+        self._has_slot = False
+        self._closed = False
+
+    @property
+    def session_key(self) -> tuple[str, str, str]:
+        return (self.runner.app_name, self.user_id, self.session_id)
+
+    async def events(self) -> AsyncIterator["Event"]:
+        """Waits for a slot, runs the agent and yields its events.
+
+        Raises:
+            Unavailable: No slot freed up within the queue timeout.
+        """
+        metrics = self.service.metrics
+        try:
+            await self._acquire()
+            metrics.queue_wait_ms.append((time.perf_counter() - self.created) * 1000)
+            metrics.runs_started += 1
+            started = time.perf_counter()
+            self._task = asyncio.create_task(self._produce())
+            first = True
+            while True:
+                item = await self._queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    metrics.runs_failed += 1
+                    raise item
+                if first:
+                    metrics.first_event_ms.append(
+                        (time.perf_counter() - started) * 1000
+                    )
+                    first = False
+                metrics.events_streamed += 1
+                yield item
+            metrics.runs_completed += 1
+            metrics.run_ms.append((time.perf_counter() - started) * 1000)
+        finally:
+            self.close()
+
+    async def _acquire(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self.service._slots.acquire(), self.service.queue_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            self.service.metrics.runs_rejected += 1
+            raise Unavailable(
+                "Timed out waiting for a free run slot.", retry_after=1
+            ) from None
+        self._has_slot = True
+        self.service._queued.discard(self)
+
+    async def _produce(self) -> None:
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+        from google.genai import types
+
+        run_config = RunConfig(
+            streaming_mode=(
+                StreamingMode.SSE if self.stream_tokens else StreamingMode.NONE
+            )
+        )
+        run_async = self.runner.run_async
+        recorder = self.service.trace_recorder
+        if recorder is not None:
+            run_async = functools.partial(recorder.run, self.runner)
+        try:
+            async for event in run_async(
+                user_id=self.user_id,
+                session_id=self.session_id,
+                new_message=types.Content(
+                    role="user", parts=[types.Part(text=self.message)]
+                ),
+                run_config=run_config,
+            ):
+                # Blocks while the client is behind by `stream_buffer_events`.
+                await self._queue.put(event)
+        except Exception as e:
+            logger.exception("Run in session %s failed", self.session_id)
+            await self._queue.put(e)
+            return
+        await self._queue.put(_DONE)
+
+    def close(self) -> None:
+        """Cancels the agent if it is still running and releases the run's slot."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            self.service.metrics.runs_cancelled += 1
+        if self._has_slot:
+            self.service._slots.release()
+            self._has_slot = False
+        self.service._release(self)
+
+
+class AgentService:
+    """Runs the served agents under shared concurrency limits.
+
+    Attributes:
+        apps: Agent package names that may be served.
+        session_service: Session storage shared by every app.
+        metrics: Run counters and latencies.
+        trace_recorder: Records every turn as a replayable trace, if set.
+    """
+
+    def __init__(
+        self,
+        apps: list[str],
+        session_service: Optional["BaseSessionService"] = None,
+        max_concurrent_runs: int = 32,
+        max_queued_runs: int = 128,
+        queue_timeout_seconds: float = 10.0,
+        stream_buffer_events: int = 64,
+        trace_recorder: Optional["TraceRecorder"] = None,
+    ):
+        if session_service is None:
+            from sessions.diff_session_service import get_session_service
+
+            session_service = get_session_service()
+        self.apps = list(apps)
+        self.session_service = session_service
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_queued_runs = max_queued_runs
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.stream_buffer_events = stream_buffer_events
+        self.metrics = ServiceMetrics()
+        self.trace_recorder = trace_recorder
+        self.draining = False
+        self._runners: dict[str, "Runner"] = {}
+        self._slots = asyncio.Semaphore(max_concurrent_runs)
+        self._queued: set[Run] = set()
+        self._active: set[Run] = set()
+        self._busy_sessions: set[tuple[str, str, str]] = set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @classmethod
+    def from_settings(cls) -> "AgentService":
+        settings = get_settings()
+        trace_recorder = None
+        if settings.TRACE_RECORD_DIR:
+            from telemetry.traces import get_trace_recorder
+
+            trace_recorder = get_trace_recorder()
+        return cls(
+            apps=settings.SERVER_AGENTS or discover_apps(),
+            max_concurrent_runs=settings.SERVER_MAX_CONCURRENT_RUNS,
+            max_queued_runs=settings.SERVER_MAX_QUEUED_RUNS,
+            queue_timeout_seconds=settings.SERVER_QUEUE_TIMEOUT_SECONDS,
+            stream_buffer_events=settings.SERVER_STREAM_BUFFER_EVENTS,
+            trace_recorder=trace_recorder,
+        )
+
+    def runner(self, app: str) -> "Runner":
+        """Returns the runner of `app`, importing its `root_agent` on first use."""
+        if app not in self.apps:
+            raise NotFound(f"Unknown app '{app}'.")
+        runner = self._runners.get(app)
+        if runner is None:
+            from google.adk.artifacts import InMemoryArtifactService
+            from google.adk.runners import Runner
+
+            root_agent = importlib.import_module(f"{app}.agent").root_agent
+            if self.trace_recorder is not None:
+                self.trace_recorder.attach(root_agent)
+            runner = Runner(
+                app_name=app,
+                agent=root_agent,
+                artifact_service=InMemoryArtifactService(),
+                session_service=self.session_service,
+            )
+            self._runners[app] = runner
+        return runner
+
+    async def create_session(
+        self,
+        app: str,
+        user_id: str,
+        session_id: Optional[str] = None,
+        state: Optional[dict] = None,
+    ) -> "Session":
+        self.runner(app)
+        session = await self.session_service.create_session(
+            app_name=app, user_id=user_id, session_id=session_id, state=state
+        )
+        self.metrics.sessions_created += 1
+        return session
+
+    async def get_session(self, app: str, user_id: str, session_id: str) -> "Session":
+        self.runner(app)
+        session = await self.session_service.get_session(
+            app_name=app, user_id=user_id, session_id=session_id
+        )
+        if session is None:
+            raise NotFound(f"Unknown session '{session_id}'.")
+        return session
+
+    async def start_run(
+        self,
+        app: str,
+        user_id: str,
+        session_id: str,
+        message: str,
+        stream_tokens: bool = False,
+    ) -> Run:
+        """Admits a run; iterate `Run.events()` to execute it.
+
+        Raises:
+            NotFound: The app or session does not exist.
+            SessionBusy: The session is already running a turn.
+            Unavailable: The server is draining or its queue is full.
+        """
+        if self.draining:
+            self.metrics.runs_rejected += 1
+            raise Unavailable("The server is shutting down.")
+        runner = self.runner(app)
+        await self.get_session(app, user_id, session_id)
+        if len(self._queued) >= self.max_queued_runs:
+            self.metrics.runs_rejected += 1
+            raise Unavailable("Too many runs are waiting.", retry_after=1)
+        run = Run(self, runner, user_id, session_id, message, stream_tokens)
+        if run.session_key in self._busy_sessions:
+            raise SessionBusy(f"Session '{session_id}' is already running a turn.")
+        self._busy_sessions.add(run.session_key)
+        self._queued.add(run)
+        self._active.add(run)
+        self._idle.clear()
+        return run
+
+    def _release(self, run: Run) -> None:
+        self._busy_sessions.discard(run.session_key)
+        self._queued.discard(run)
+        self._active.discard(run)
+        if not self._active:
+            self._idle.set()
+
+    def status(self) -> dict:
+        return {
+            "draining": self.draining,
+            "active_runs": len(self._active) - len(self._queued),
+            "queued_runs": len(self._queued),
+            "max_concurrent_runs": self.max_concurrent_runs,
+            "max_queued_runs": self.max_queued_runs,
+            "loaded_apps": sorted(self._runners),
+        }
+
+    def begin_drain(self) -> None:
+        """Stops admitting runs; runs already admitted continue."""
+        self.draining = True
+
+    async def drain(self, timeout_seconds: float) -> None:
+        """Stops admitting runs and waits for admitted runs, cancelling stragglers."""
+        self.begin_drain()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout_seconds)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Cancelling %d runs still active at shutdown", len(self._active)
+            )
+            for run in list(self._active):
+                run.close()
@@ -0,0 +1,349 @@
+"""Content-addressed store for large text values of session state.
+
+Agents with an `output_key` save whole documents (`generated_code`,
+`refactored_code`, `planning_document`) in session state, and every event that
+sets them carries another copy. `ArtifactStore` keeps each distinct text once,
+under its SHA-256 digest, and state holds a short reference
+(`artifact:sha256:<digest>`) instead. Saving a text that is already stored,
+e.g. a refactor that returns the code unchanged, only returns its reference.
+Stored texts are zlib-compressed when they are at least `compress_min_bytes`
+long and compression makes them smaller.
+
+`FileArtifactBackend` writes one file per artifact and reads it through a
+memory map; `MemoryArtifactBackend` keeps them in a dict, for tests and
+benchmarks. Decoded texts are kept in an LRU cache bounded in bytes, so
+sessions that resolve the same artifact share one string.
+
+`resolve` turns a reference back into its text and returns any other value as
+it is. `render_template` fills `{key}` and `{key?}` placeholders from state
+like ADK's instruction templating, resolving only the references the template
+uses.
+"""
+
+import contextlib
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, Mapping, Optional, Union
+
+from config import ArtifactBackendType, get_settings
+
+REF_PREFIX = "artifact:sha256:"
+_REF_RE = re.compile(re.escape(REF_PREFIX) + r"([0-9a-f]{64})")
+
+_TEXT = b"T"
+_ZLIB = b"Z"
+
+# Same placeholder syntax as ADK's instruction templates.
+_PLACEHOLDER_RE = re.compile(r"{+[^{}]*}+")
+_STATE_PREFIXES = ("app:", "user:", "temp:")
+
+
+class ArtifactNotFound(KeyError):
+    """A reference points to an artifact the store does not have."""
+
+
+def is_reference(value: Any) -> bool:
+    """Returns True when `value` is an artifact reference."""
+    return (
+        isinstance(value, str)
+        and value.startswith(REF_PREFIX)
+        and _REF_RE.fullmatch(value) is not None
+    )
+
+
+class MemoryArtifactBackend:
+    """Keeps encoded artifacts in a dict."""
+
+    def __init__(self):
+        self._blobs: dict[str, bytes] = {}
+
+    def contains(self, digest: str) -> bool:
+        return digest in self._blobs
+
+    def write(self, digest: str, blob: bytes) -> None:
+        self._blobs.setdefault(digest, blob)
+
+    @contextlib.contextmanager
+    def view(self, digest: str) -> Iterator[memoryview]:
+        try:
+            blob = self._blobs[digest]
+        except KeyError:
+            raise ArtifactNotFound(digest) from None
+        with memoryview(blob) as view:
+            yield view
+
+
+class FileArtifactBackend:
+    """Keeps encoded artifacts as files named by digest; reads them via mmap.
+
+    Attributes:
+        directory: Root directory; artifacts go to `<digest[:2]>/<digest>`.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / digest
+
+    def contains(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def write(self, digest: str, blob: bytes) -> None:
+        path = self._path(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(exist_ok=True)
+        # Write and rename, so that readers never map a partial file.
+        fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(blob)
+            os.replace(temporary, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(temporary)
+            raise
+
+    @contextlib.contextmanager
+    def view(self, digest: str) -> Iterator[memoryview]:
+        try:
+            file = open(self._path(digest), "rb")
+        except FileNotFoundError:
+            raise ArtifactNotFound(digest) from None
+        with file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                yield view
+
+
+ArtifactBackend = Union[MemoryArtifactBackend, FileArtifactBackend]
+
+
+class ArtifactStats:
+    """Saves, deduplication, compression and reads of an `ArtifactStore`."""
+
+    def __init__(self):
+        self.saves = 0
+        self.deduplicated = 0
+        self.saved_bytes = 0
+        self.new_bytes = 0
+        self.stored_bytes = 0
+        self.reads = 0
+        self.cache_hits = 0
+        self._lock = threading.Lock()
+
+    def record_save(self, size: int, stored: Optional[int]) -> None:
+        """Records a save of `size` bytes; `stored` is None for a duplicate."""
+        with self._lock:
+            self.saves += 1
+            self.saved_bytes += size
+            if stored is None:
+                self.deduplicated += 1
+            else:
+                self.new_bytes += size
+                self.stored_bytes += stored
+
+    def record_read(self, cached: bool) -> None:
+        with self._lock:
+            self.reads += 1
+            self.cache_hits += cached
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "saves": self.saves,
+                "deduplicated": self.deduplicated,
+                "dedup_rate": (
+                    round(self.deduplicated / self.saves, 4) if self.saves else 0.0
+                ),
+                "saved_bytes": self.saved_bytes,
+                "stored_bytes": self.stored_bytes,
+                "compression_ratio": (
+                    round(self.stored_bytes / self.new_bytes, 4)
+                    if self.new_bytes
+                    else 1.0
+                ),
+                "reads": self.reads,
+                "cache_hits": self.cache_hits,
+            }
+
+
+class ArtifactStore:
+    """Stores texts once by content and hands out references to them.
+
+    Attributes:
+        backend: Where encoded artifacts are kept.
+        min_bytes: `reference` keeps shorter texts inline.
+        compress: zlib-compress texts when that makes them smaller.
+        compress_min_bytes: Shorter texts are stored uncompressed.
+        cache_bytes: Size limit of the decoded text cache (UTF-8 bytes).
+        stats: Save and read counters.
+    """
+
+    def __init__(
+        self,
+        backend: ArtifactBackend,
+        min_bytes: int = 256,
+        compress: bool = True,
+        compress_min_bytes: int = 1024,
+        compression_level: int = 6,
+        cache_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.backend = backend
+        self.min_bytes = min_bytes
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self.compression_level = compression_level
+        self.cache_bytes = cache_bytes
+        self.stats = ArtifactStats()
+        self._cache: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def _remember(self, digest: str, text: str, size: int) -> None:
+        if size > self.cache_bytes:
+            return
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return
+            self._cache[digest] = (text, size)
+            self._cached_bytes += size
+            while self._cached_bytes > self.cache_bytes:
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted
+
+    def _encode(self, data: bytes) -> bytes:
+        if self.compress and len(data) >= self.compress_min_bytes:
+            compressed = zlib.compress(data, self.compression_level)
+            if len(compressed) < len(data):
+                return _ZLIB + compressed
+        return _TEXT + data
+
+    def put(self, text: str) -> str:
+        """Stores `text` unless an identical one is stored; returns its reference."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            cached = digest in self._cache
+        if cached or self.backend.contains(digest):
+            self.stats.record_save(len(data), None)
+        else:
+            blob = self._encode(data)
+            self.backend.write(digest, blob)
+            self.stats.record_save(len(data), len(blob))
+        self._remember(digest, text, len(data))
+        return REF_PREFIX + digest
+
+    def reference(self, value: Any) -> Any:
+        """Returns a reference for a text of at least `min_bytes`, else `value`."""
+        if (
+            isinstance(value, str)
+            and len(value) >= self.min_bytes
+            and not is_reference(value)
+        ):
+            return self.put(value)
+        return value
+
+    def get(self, ref: str) -> str:
+        """Returns the text of a reference.
+
+        Raises:
+            ArtifactNotFound: The store does not have the artifact.
+        """
+        match = _REF_RE.fullmatch(ref)
+        if match is None:
+            raise ValueError(f"Not an artifact reference: {ref!r}")
+        digest = match.group(1)
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                self._cache.move_to_end(digest)
+        if entry is not None:
+            self.stats.record_read(cached=True)
+            return entry[0]
+        with self.backend.view(digest) as view, view[1:] as body:
+            if view[0] == _ZLIB[0]:
+                data = zlib.decompress(body)
+            else:
+                data = bytes(body)
+        text = data.decode("utf-8")
+        self.stats.record_read(cached=False)
+        self._remember(digest, text, len(data))
+        return text
+
+
+def resolve(value: Any, store: Optional[ArtifactStore] = None) -> Any:
+    """Returns the text of an artifact reference, or any other value unchanged.
+
+    Args:
+        value (Any): A state value.
+        store (ArtifactStore, optional): Defaults to `get_artifact_store()`.
+    """
+    if not is_reference(value):
+        return value
+    return (store or get_artifact_store()).get(value)
+
+
+def _is_state_name(name: str) -> bool:
+    for prefix in _STATE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix) :]
+            break
+    return name.isidentifier()
+
+
+def render_template(
+    template: str, state: Mapping[str, Any], store: Optional[ArtifactStore] = None
+) -> str:
+    """Fills state placeholders of an instruction template, resolving references.
+
+    Follows ADK's instruction templating: `{key}` is replaced by the state
+    value (KeyError when missing), `{key?}` by the value or nothing, and
+    anything that is not a state name is left as it is.
+    """
+
+    def replace(match: re.Match) -> str:
+        name = match.group().lstrip("{").rstrip("}").strip()
+        optional = name.endswith("?")
+        name = name.removesuffix("?")
+        if not _is_state_name(name):
+            return match.group()
+        if name not in state:
+            if optional:
+                return ""
+            raise KeyError(f"Context variable not found: `{name}`.")
+        return str(resolve(state[name], store))
+
+    return _PLACEHOLDER_RE.sub(replace, template)
+
+
+@lru_cache()
+def get_artifact_store() -> ArtifactStore:
+    """
+    Get the process-wide artifact store configured from settings.
+
+    Returns:
+        ArtifactStore: The shared store.
+    """
+    settings = get_settings()
+    if settings.ARTIFACT_STORE_BACKEND == ArtifactBackendType.FILE:
+        backend = FileArtifactBackend(settings.ARTIFACT_STORE_DIR)
+    else:
+        backend = MemoryArtifactBackend()
+    return ArtifactStore(
+        backend,
+        min_bytes=settings.ARTIFACT_MIN_BYTES,
+        compress=settings.ARTIFACT_COMPRESSION_ENABLED,
+        compress_min_bytes=settings.ARTIFACT_COMPRESSION_MIN_BYTES,
+        cache_bytes=settings.ARTIFACT_CACHE_BYTES,
+    )
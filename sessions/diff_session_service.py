@@ -0,0 +1,618 @@
+"""SQLite session service that stores state changes as compressed diffs.
+
+Agents that use `output_key` rewrite whole documents (`planning_document`,
+`generated_code`, ...) on every refinement iteration. `DiffSessionService`
+keeps a version counter per session. Each event that changes session state
+records one row per changed key: the zlib-compressed line diff against the
+previous value, or the full value when that is smaller or the value is not
+text. Every `snapshot_interval` versions the full state is written as a
+snapshot. Only the newest `max_snapshots` snapshots are kept, together with the
+changes after the oldest of them, which bounds the history per session.
+Resuming a session reads the latest snapshot and applies the changes after it.
+
+Events are stored as compressed JSON. Session-scoped state delta values
+larger than `inline_delta_bytes` are already stored as state changes, so the
+stored copy of the event keeps `{"__state_ref__": {"key": ..., "version": ...}}`
+in their place. `get_session` resolves the references by replaying the kept
+history; a reference to a version older than the oldest kept snapshot can no
+longer be resolved and is returned as is, so the state deltas of events that
+old are not preserved. Events in a running invocation are unaffected.
+
+`app:` and `user:` state is stored whole per app and per user, and `temp:`
+state is never stored, as in the stock session services.
+
+SQLite calls run in worker threads (`asyncio.to_thread`) behind one lock, so
+they do not block the event loop.
+"""
+
+import asyncio
+import copy
+import itertools
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, InMemorySessionService, Session
+from google.adk.sessions.base_session_service import (
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.state import State
+
+from config import SessionBackendType, get_settings
+from sessions.diffs import apply_diff, decode, encode, make_diff
+
+logger = logging.getLogger(__name__)
+
+SET = "set"
+DIFF = "diff"
+
+SessionKey = tuple[str, str, str]
+
+_STATE_REF = "__state_ref__"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    next_seq INTEGER NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    state BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, version)
+);
+CREATE TABLE IF NOT EXISTS state_changes (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, version, key)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, seq)
+);
+CREATE TABLE IF NOT EXISTS app_state (
+    app_name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (app_name, key)
+);
+CREATE TABLE IF NOT EXISTS user_state (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (app_name, user_id, key)
+);
+"""
+
+
+@dataclass
+class _SessionState:
+    """Latest session-scoped state of a session, as stored."""
+
+    version: int
+    state: dict[str, Any]
+    snapshot_version: int
+
+
+class DiffSessionService(BaseSessionService):
+    """Session service persisting to SQLite (WAL) with diff-based state writes."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        snapshot_interval: int = 20,
+        max_snapshots: int = 2,
+        inline_delta_bytes: int = 1024,
+        cached_sessions: int = 256,
+    ):
+        """
+        Args:
+            path (Union[str, Path]): SQLite database file.
+            snapshot_interval (int): State versions between full snapshots.
+            max_snapshots (int): Snapshots kept per session; older snapshots and
+                the changes they cover are deleted.
+            inline_delta_bytes (int): State delta values up to this JSON size
+                are kept inside stored events.
+            cached_sessions (int): Sessions whose latest state is kept in memory
+                so writes need not rebuild it from the database.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.snapshot_interval = snapshot_interval
+        self.max_snapshots = max(1, max_snapshots)
+        self.inline_delta_bytes = inline_delta_bytes
+        self.cached_sessions = cached_sessions
+        self._states: OrderedDict[SessionKey, _SessionState] = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- BaseSessionService ---
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (
+            session_id.strip()
+            if session_id and session_id.strip()
+            else str(uuid.uuid4())
+        )
+        return await asyncio.to_thread(
+            self._create_session, app_name, user_id, session_id, state or {}
+        )
+
+    def _create_session(
+        self, app_name: str, user_id: str, session_id: str, state: dict[str, Any]
+    ) -> Session:
+        key = (app_name, user_id, session_id)
+        session_state, shared = self._split_state(state)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions VALUES (?, ?, ?, 0, 0, ?)", (*key, now)
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Session '{session_id}' already exists.") from None
+            self._conn.execute(
+                "INSERT INTO snapshots VALUES (?, ?, ?, 0, ?)",
+                (*key, encode(session_state)),
+            )
+            self._write_shared(app_name, user_id, shared)
+            self._remember(key, _SessionState(0, session_state, 0))
+            merged = self._merged_state(app_name, user_id, session_state)
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=merged,
+            last_update_time=now,
+        )
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(
+            self._get_session, (app_name, user_id, session_id), config
+        )
+
+    def _get_session(
+        self, key: SessionKey, config: Optional[GetSessionConfig]
+    ) -> Optional[Session]:
+        app_name, user_id, session_id = key
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT update_time FROM sessions"
+                " WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            stored = self._state(key)
+            events = self._read_events(key, config)
+            state = self._merged_state(app_name, user_id, stored.state)
+        return Session(
+            id=session_id,
+            app_name=app_name,
+            user_id=user_id,
+            state=state,
+            events=events,
+            last_update_time=row[0],
+        )
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: str
+    ) -> ListSessionsResponse:
+        rows = await asyncio.to_thread(self._list_sessions, app_name, user_id)
+        return ListSessionsResponse(
+            sessions=[
+                Session(
+                    id=session_id,
+                    app_name=app_name,
+                    user_id=user_id,
+                    last_update_time=update_time,
+                )
+                for session_id, update_time in rows
+            ]
+        )
+
+    def _list_sessions(self, app_name: str, user_id: str) -> list[tuple[str, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT session_id, update_time FROM sessions"
+                " WHERE app_name = ? AND user_id = ? ORDER BY update_time",
+                (app_name, user_id),
+            ).fetchall()
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        await asyncio.to_thread(self._delete_session, (app_name, user_id, session_id))
+
+    def _delete_session(self, key: SessionKey) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for table in ("sessions", "snapshots", "state_changes", "events"):
+                self._conn.execute(
+                    f"DELETE FROM {table}"
+                    " WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    key,
+                )
+            self._states.pop(key, None)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        delta = {}
+        if event.actions and event.actions.state_delta:
+            delta = {
+                name: value
+                for name, value in event.actions.state_delta.items()
+                if not name.startswith(State.TEMP_PREFIX)
+            }
+        session_delta, shared = self._split_state(delta)
+        # Serialized here, as the event may change once it is handed back.
+        payload = event.model_dump(mode="json", exclude_none=True)
+        await asyncio.to_thread(
+            self._append_event, key, event.timestamp, payload, session_delta, shared
+        )
+        return event
+
+    def _append_event(
+        self,
+        key: SessionKey,
+        timestamp: float,
+        payload: dict[str, Any],
+        session_delta: dict[str, Any],
+        shared: dict[str, Any],
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            try:
+                self._write_event(key, timestamp, payload, session_delta, shared)
+            except BaseException:
+                # The cached state may already hold the rolled-back changes.
+                self._states.pop(key, None)
+                raise
+
+    def _write_event(
+        self,
+        key: SessionKey,
+        timestamp: float,
+        payload: dict[str, Any],
+        session_delta: dict[str, Any],
+        shared: dict[str, Any],
+    ) -> None:
+        row = self._conn.execute(
+            "SELECT next_seq FROM sessions"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            # Deleted while the invocation was running.
+            return
+        stored = self._state(key)
+        version = self._write_changes(key, stored, session_delta)
+        self._write_shared(key[0], key[1], shared)
+        self._conn.execute(
+            "UPDATE sessions SET next_seq = ?, version = ?, update_time = ?"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (row[0] + 1, version, timestamp, *key),
+        )
+        self._conn.execute(
+            "INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+            (*key, row[0], timestamp, self._event_blob(payload, version)),
+        )
+
+    # --- statistics ---
+
+    def storage_stats(self) -> dict[str, int]:
+        """Returns row counts and stored payload bytes per table."""
+        queries = {
+            "snapshots": "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM snapshots",
+            "state_changes": "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM state_changes",
+            "events": "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM events",
+        }
+        stats = {}
+        with self._lock:
+            for table, query in queries.items():
+                rows, size = self._conn.execute(query).fetchone()
+                stats[f"{table}_rows"] = rows
+                stats[f"{table}_bytes"] = size
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- state ---
+
+    @staticmethod
+    def _split_state(state: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+        """Separates session-scoped keys from `app:`/`user:` keys, dropping `temp:`."""
+        session_state, shared = {}, {}
+        for name, value in state.items():
+            if name.startswith(State.TEMP_PREFIX):
+                continue
+            if name.startswith((State.APP_PREFIX, State.USER_PREFIX)):
+                shared[name] = value
+            else:
+                session_state[name] = value
+        return session_state, shared
+
+    def _write_shared(
+        self, app_name: str, user_id: str, shared: dict[str, Any]
+    ) -> None:
+        for name, value in shared.items():
+            if name.startswith(State.APP_PREFIX):
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO app_state VALUES (?, ?, ?)",
+                    (app_name, name.removeprefix(State.APP_PREFIX), encode(value)),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO user_state VALUES (?, ?, ?, ?)",
+                    (
+                        app_name,
+                        user_id,
+                        name.removeprefix(State.USER_PREFIX),
+                        encode(value),
+                    ),
+                )
+
+    def _merged_state(
+        self, app_name: str, user_id: str, session_state: dict[str, Any]
+    ) -> dict[str, Any]:
+        state = copy.deepcopy(session_state)
+        for name, value in self._conn.execute(
+            "SELECT key, value FROM app_state WHERE app_name = ?", (app_name,)
+        ):
+            state[State.APP_PREFIX + name] = decode(value)
+        for name, value in self._conn.execute(
+            "SELECT key, value FROM user_state WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ):
+            state[State.USER_PREFIX + name] = decode(value)
+        return state
+
+    def _remember(self, key: SessionKey, stored: _SessionState) -> None:
+        self._states[key] = stored
+        self._states.move_to_end(key)
+        while len(self._states) > self.cached_sessions:
+            self._states.popitem(last=False)
+
+    def _state(self, key: SessionKey) -> _SessionState:
+        """Returns the stored state of a session, rebuilding it on a cache miss."""
+        stored = self._states.get(key)
+        if stored is not None:
+            self._states.move_to_end(key)
+            return stored
+        snapshot_version, blob = self._conn.execute(
+            "SELECT version, state FROM snapshots"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            " ORDER BY version DESC LIMIT 1",
+            key,
+        ).fetchone()
+        state = decode(blob)
+        version = snapshot_version
+        for version, name, kind, payload in self._conn.execute(
+            "SELECT version, key, kind, payload FROM state_changes"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ? AND version > ?"
+            " ORDER BY version",
+            (*key, snapshot_version),
+        ):
+            value = decode(payload)
+            state[name] = apply_diff(state[name], value) if kind == DIFF else value
+        stored = _SessionState(version, state, snapshot_version)
+        self._remember(key, stored)
+        return stored
+
+    def _write_changes(
+        self, key: SessionKey, stored: _SessionState, delta: dict[str, Any]
+    ) -> int:
+        """Records the changed keys of `delta` as a new version; returns the version."""
+        changes = {
+            name: value
+            for name, value in delta.items()
+            if name not in stored.state or stored.state[name] != value
+        }
+        if not changes:
+            return stored.version
+        version = stored.version + 1
+        rows = []
+        for name, value in changes.items():
+            kind, payload = SET, encode(value)
+            old = stored.state.get(name)
+            if isinstance(old, str) and isinstance(value, str) and old:
+                diff = encode(make_diff(old, value))
+                if len(diff) < len(payload):
+                    kind, payload = DIFF, diff
+            rows.append((*key, version, name, kind, payload))
+        self._conn.executemany(
+            "INSERT INTO state_changes VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        stored.state.update(changes)
+        stored.version = version
+        if version - stored.snapshot_version >= self.snapshot_interval:
+            self._snapshot(key, stored)
+        return version
+
+    def _snapshot(self, key: SessionKey, stored: _SessionState) -> None:
+        self._conn.execute(
+            "INSERT INTO snapshots VALUES (?, ?, ?, ?, ?)",
+            (*key, stored.version, encode(stored.state)),
+        )
+        stored.snapshot_version = stored.version
+        kept = [
+            version
+            for (version,) in self._conn.execute(
+                "SELECT version FROM snapshots"
+                " WHERE app_name = ? AND user_id = ? AND session_id = ?"
+                " ORDER BY version DESC LIMIT ?",
+                (*key, self.max_snapshots),
+            )
+        ]
+        oldest = kept[-1]
+        self._conn.execute(
+            "DELETE FROM snapshots"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ? AND version < ?",
+            (*key, oldest),
+        )
+        self._conn.execute(
+            "DELETE FROM state_changes"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ? AND version <= ?",
+            (*key, oldest),
+        )
+
+    # --- events ---
+
+    def _event_blob(self, payload: dict[str, Any], version: int) -> bytes:
+        state_delta = payload.get("actions", {}).get("state_delta") or {}
+        for name, value in state_delta.items():
+            # Only session-scoped values are kept as versioned state changes.
+            if name.startswith(
+                (State.TEMP_PREFIX, State.APP_PREFIX, State.USER_PREFIX)
+            ):
+                continue
+            if len(json.dumps(value, default=str)) > self.inline_delta_bytes:
+                state_delta[name] = {_STATE_REF: {"key": name, "version": version}}
+        return encode(payload)
+
+    def _resolve_state_refs(
+        self, key: SessionKey, payloads: list[dict[str, Any]]
+    ) -> None:
+        """Replaces state references in stored events with the values they name.
+
+        The values are rebuilt by replaying the changes after the oldest kept
+        snapshot; references to earlier versions are left in place.
+        """
+        refs = []
+        wanted: defaultdict[int, set[str]] = defaultdict(set)
+        for payload in payloads:
+            state_delta = payload.get("actions", {}).get("state_delta") or {}
+            for name, value in state_delta.items():
+                if isinstance(value, dict) and set(value) == {_STATE_REF}:
+                    ref = value[_STATE_REF]
+                    refs.append((state_delta, name, ref["key"], ref["version"]))
+                    wanted[ref["version"]].add(ref["key"])
+        if not refs:
+            return
+
+        values: dict[tuple[str, int], Any] = {}
+
+        def capture(state: dict[str, Any], version: int) -> None:
+            for name in wanted.get(version, ()):
+                if name in state:
+                    values[(name, version)] = state[name]
+
+        version, blob = self._conn.execute(
+            "SELECT version, state FROM snapshots"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            " ORDER BY version LIMIT 1",
+            key,
+        ).fetchone()
+        state = decode(blob)
+        capture(state, version)
+        changes = self._conn.execute(
+            "SELECT version, key, kind, payload FROM state_changes"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            " AND version > ? AND version <= ? ORDER BY version",
+            (*key, version, max(wanted)),
+        )
+        for version, rows in itertools.groupby(changes, key=lambda row: row[0]):
+            for _, name, kind, payload in rows:
+                value = decode(payload)
+                state[name] = apply_diff(state[name], value) if kind == DIFF else value
+            capture(state, version)
+
+        for state_delta, name, ref_key, version in refs:
+            if (ref_key, version) in values:
+                state_delta[name] = copy.deepcopy(values[(ref_key, version)])
+
+    def _read_events(
+        self, key: SessionKey, config: Optional[GetSessionConfig]
+    ) -> list[Event]:
+        query = (
+            "SELECT payload FROM events"
+            " WHERE app_name = ? AND user_id = ? AND session_id = ?"
+        )
+        params: list[Any] = list(key)
+        if config and config.after_timestamp:
+            query += " AND timestamp >= ?"
+            params.append(config.after_timestamp)
+        if config and config.num_recent_events:
+            params.append(config.num_recent_events)
+            rows = self._conn.execute(
+                query + " ORDER BY seq DESC LIMIT ?", params
+            ).fetchall()[::-1]
+        else:
+            rows = self._conn.execute(query + " ORDER BY seq", params).fetchall()
+        payloads = [decode(payload) for (payload,) in rows]
+        self._resolve_state_refs(key, payloads)
+        return [Event.model_validate(payload) for payload in payloads]
+
+
+@lru_cache()
+def get_session_service() -> BaseSessionService:
+    """
+    Get the process-wide session service configured from settings.
+
+    Returns:
+        BaseSessionService: The shared session service.
+    """
+    settings = get_settings()
+    if settings.SESSION_BACKEND == SessionBackendType.SQLITE_DIFF:
+        return DiffSessionService(
+            settings.SESSION_DB_PATH,
+            snapshot_interval=settings.SESSION_SNAPSHOT_INTERVAL,
+            max_snapshots=settings.SESSION_MAX_SNAPSHOTS,
+            inline_delta_bytes=settings.SESSION_INLINE_DELTA_BYTES,
+        )
+    return InMemorySessionService()
@@ -0,0 +1,49 @@
+"""Line diffs of text state values and compact blob encoding.
+
+A diff is a list of operations over the lines of the old value (line endings
+kept): `[i, j]` copies old lines `i:j`, and a list of strings inserts new lines.
+Old lines that are not copied are dropped. `apply_diff(old, make_diff(old, new))`
+returns `new`.
+"""
+
+import difflib
+import json
+import zlib
+from typing import Any, Union
+
+Diff = list[Union[list[int], list[str]]]
+
+
+def make_diff(old: str, new: str) -> Diff:
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    ops: Diff = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif tag in ("replace", "insert"):
+            ops.append(new_lines[j1:j2])
+    return ops
+
+
+def apply_diff(old: str, diff: Diff) -> str:
+    old_lines = old.splitlines(keepends=True)
+    parts = []
+    for op in diff:
+        if op and isinstance(op[0], int):
+            parts.extend(old_lines[op[0] : op[1]])
+        else:
+            parts.extend(op)
+    return "".join(parts)
+
+
+def encode(value: Any, level: int = 6) -> bytes:
+    """Compresses a JSON-serializable value."""
+    return zlib.compress(
+        json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"), level
+    )
+
+
+def decode(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob))
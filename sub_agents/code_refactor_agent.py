@@ -1,15 +1,20 @@
-from google.adk.agents import Agent
-
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
 
+
 # Code Refactor Agent
 # Takes the original code and the review comments (read from state) and refactors the code.
-code_refactor_agent = None
-try:
-    code_refactor_agent = Agent(
-        model=get_settings().MODEL_GEMINI_2_0_FLASH,
+@register_agent("code_refactor_agent")
+def build_code_refactor_agent():
+    from llm.models import build_model
+    from workflows.artifacts import output_agent_class, state_instruction
+
+    return output_agent_class()(
+        model=build_model(
+            get_settings().MODEL_GEMINI_2_0_FLASH, agent_name="code_refactor_agent"
+        ),
         name="code_refactor_agent",
-        instruction="""You are a Python Code Refactoring AI.
+        instruction=state_instruction("""You are a Python Code Refactoring AI.
 Your goal is to improve the given Python code based on the provided review comments.
 
   **Original Code:**
@@ -20,6 +25,8 @@ Your goal is to improve the given Python code based on the provided review comme
   **Review Comments:**
   {review_comments}
 
+{static_findings?}
+
 **Task:**
 Carefully apply the suggestions from the review comments to refactor the original code.
 If the review comments state "No major issues found," return the original code unchanged.
@@ -28,12 +35,10 @@ Ensure the final code is complete, functional, and includes necessary imports an
 **Output:**
 Output *only* the final, refactored Python code block, enclosed in triple backticks (```python ... ```). 
 Do not add any other text before or after the code block.
-""",
+"""),
         description="Refactors code based on review comments.",
         output_key="refactored_code",  # Stores output in state['refactored_code']
     )
-    print(
-        f"✅ Agent '{code_refactor_agent.name}' created using model '{code_refactor_agent.model}'."
-    )
-except Exception as e:
-    print(f"❌ Could not create Code Refactor agent. Error: {e}")
+
+
+__getattr__ = lazy_agents(__name__, code_refactor_agent="code_refactor_agent")
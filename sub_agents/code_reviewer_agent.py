@@ -1,16 +1,22 @@
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
 
+
 # Code Reviewer Agent
 # Takes the code generated by the previous agent (read from state) and provides feedback.
-code_reviewer_agent = None
-try:
-    code_reviewer_agent = Agent(
-        model=LiteLlm(model=get_settings().MODEL_GPT_4O),
+@register_agent("code_reviewer_agent")
+def build_code_reviewer_agent():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from workflows.artifacts import state_instruction
+
+    return Agent(
+        model=build_model(
+            get_settings().MODEL_GPT_4O, agent_name="code_reviewer_agent"
+        ),
         name="code_reviewer_agent",
-        instruction="""You are an expert Python Code Reviewer.
+        instruction=state_instruction("""You are an expert Python Code Reviewer.
     Your task is to provide constructive feedback on the provided code.
 
     **Code to Review:**
@@ -18,6 +24,8 @@ try:
     {generated_code}
     ```
 
+{static_findings?}
+
 **Review Criteria:**
 1.  **Correctness:** Does the code work as intended? Are there logic errors?
 2.  **Readability:** Is the code clear and easy to understand? Follows PEP 8 style guidelines?
@@ -29,13 +37,10 @@ try:
 Provide your feedback as a concise, bulleted list. Focus on the most important points for improvement. Be critical.
 If the code is excellent and requires no changes, simply state: "No major issues found."
 Output *only* the review comments or the "No major issues" statement. DO NOT OUTPUT ANY CODE.
-""",
+"""),
         description="Reviews code and provides feedback.",
         output_key="review_comments",  # Stores output in state['review_comments']
     )
 
-    print(
-        f"✅ Agent '{code_reviewer_agent.name}' created using model '{code_reviewer_agent.model}'."
-    )
-except Exception as e:
-    print(f"❌ Could not create Code Reviewer agent. Error: {e}")
+
+__getattr__ = lazy_agents(__name__, code_reviewer_agent="code_reviewer_agent")
@@ -1,24 +1,34 @@
-from google.adk.agents import Agent
-
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
 
-# Code Writer Agent
-# Takes the initial specification (from user query) and writes code.
-code_writer_agent = None
-try:
-    code_writer_agent = Agent(
-        model=get_settings().MODEL_GEMINI_2_0_FLASH,
-        name="code_writer_agent",
+
+def build_code_writer(name: str, model: str, output_key: str):
+    """Builds a code writer agent; the pipeline's candidate writers use it too."""
+    from llm.models import build_model
+    from workflows.artifacts import output_agent_class
+
+    return output_agent_class()(
+        model=build_model(model, agent_name=name),
+        name=name,
         instruction="""You are a Python Code Generator.
 Based *only* on the user's request, write Python code that fulfills the requirement.
 Output *only* the complete Python code block, enclosed in triple backticks (```python ... ```). 
 Do not add any other text before or after the code block.
 """,
         description="Writes initial Python code based on a specification.",
-        output_key="generated_code",  # Stores output in state['generated_code']
+        output_key=output_key,
     )
-    print(
-        f"✅ Agent '{code_writer_agent.name}' created using model '{code_writer_agent.model}'."
+
+
+# Code Writer Agent
+# Takes the initial specification (from user query) and writes code.
+@register_agent("code_writer_agent")
+def build_code_writer_agent():
+    return build_code_writer(
+        "code_writer_agent",
+        get_settings().MODEL_GEMINI_2_0_FLASH,
+        output_key="generated_code",  # Stores output in state['generated_code']
     )
-except Exception as e:
-    print(f"❌ Could not create Code Writer agent. Error: {e}")
+
+
+__getattr__ = lazy_agents(__name__, code_writer_agent="code_writer_agent")
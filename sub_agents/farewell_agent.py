@@ -1,13 +1,19 @@
 # @title Define Farewell Sub-Agents
-from google.adk.agents import Agent
-
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
-from tools.greetings import say_goodbye
 
-farewell_agent = None
-try:
-    farewell_agent = Agent(
-        model=get_settings().MODEL_GEMINI_2_0_FLASH,
+
+@register_agent("farewell_agent")
+def build_farewell_agent():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from tools.greetings import say_goodbye
+
+    return Agent(
+        model=build_model(
+            get_settings().MODEL_GEMINI_2_0_FLASH, agent_name="farewell_agent"
+        ),
         name="farewell_agent",
         description="Handles simple farewells and goodbyes using the 'say_goodbye' tool.",  # Crucial for delegation
         instruction="You are the Farewell Agent. Your ONLY task is to provide a polite goodbye message. "
@@ -16,8 +22,6 @@ try:
         "Do not perform any other actions.",
         tools=[say_goodbye],
     )
-    print(
-        f"✅ Agent '{farewell_agent.name}' created using model '{farewell_agent.model}'."
-    )
-except Exception as e:
-    print(f"❌ Could not create Farewell agent. Error: {e}")
+
+
+__getattr__ = lazy_agents(__name__, farewell_agent="farewell_agent")
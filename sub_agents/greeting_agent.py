@@ -1,14 +1,19 @@
 # @title Define Greeting Sub-Agent
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
-from tools.greetings import say_hello
 
-greeting_agent = None
-try:
-    greeting_agent = Agent(
-        model=get_settings().MODEL_GEMINI_2_0_FLASH,
+
+@register_agent("greeting_agent")
+def build_greeting_agent():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from tools.greetings import say_hello
+
+    return Agent(
+        model=build_model(
+            get_settings().MODEL_GEMINI_2_0_FLASH, agent_name="greeting_agent"
+        ),
         name="greeting_agent",
         description="Handles simple greetings and hellos using the 'say_hello' tool.",  # Crucial for delegation
         instruction="You are the Greeting Agent. Your ONLY task is to provide a friendly greeting to the user. "
@@ -17,8 +22,6 @@ try:
         "Do not engage in any other conversation or tasks.",
         tools=[say_hello],
     )
-    print(
-        f"✅ Agent '{greeting_agent.name}' created using model '{greeting_agent.model}'."
-    )
-except Exception as e:
-    print(f"❌ Could not create Greeting agent. Error: {e}")
+
+
+__getattr__ = lazy_agents(__name__, greeting_agent="greeting_agent")
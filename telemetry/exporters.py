@@ -0,0 +1,93 @@
+"""Span exporters.
+
+Exporters receive every span when it starts and when it ends. `JsonlSpanExporter`
+appends finished spans to a local file; `OpenTelemetrySpanExporter` mirrors the
+span tree onto the OpenTelemetry tracer provider configured for the process, so
+any OTLP/Cloud Trace/console exporter set up there receives it.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Union
+
+from telemetry.spans import Span
+
+logger = logging.getLogger(__name__)
+
+
+class SpanExporter:
+    """Base exporter; subclasses override the hooks they need."""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends each finished span as one JSON line to `path`."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock, self.path.open("a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+class OpenTelemetrySpanExporter(SpanExporter):
+    """Creates an OpenTelemetry span for every agent, model and tool span."""
+
+    def __init__(self, tracer_name: str = "ai_agents.telemetry"):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._tracer = trace.get_tracer(tracer_name)
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span) -> None:
+        with self._lock:
+            parent = self._open.get(span.parent_id)
+        context = self._trace.set_span_in_context(parent) if parent else None
+        otel_span = self._tracer.start_span(
+            span.label,
+            context=context,
+            start_time=int(span.start * 1e9),
+            attributes={
+                "agent.kind": span.kind,
+                "agent.name": span.agent,
+                "agent.invocation_id": span.invocation_id,
+                "agent.session_id": span.session_id or "",
+            },
+        )
+        with self._lock:
+            self._open[span.span_id] = otel_span
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            otel_span = self._open.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        attributes = {
+            "gen_ai.request.model": span.model,
+            "gen_ai.usage.input_tokens": span.prompt_tokens,
+            "gen_ai.usage.output_tokens": span.completion_tokens,
+            "gen_ai.usage.cache_read.input_tokens": span.cached_tokens,
+            "agent.ttft_ms": span.ttft_ms,
+            **span.attributes,
+        }
+        for key, value in attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value)
+        if span.error:
+            otel_span.set_status(
+                self._trace.Status(self._trace.StatusCode.ERROR, span.error)
+            )
+        otel_span.end(end_time=int((span.end or span.start) * 1e9))
@@ -0,0 +1,296 @@
+"""Agent instrumentation through ADK callbacks.
+
+`Instrumentation.attach` appends before/after agent, model and tool callbacks
+to every agent in a tree. The callbacks open and close `Span`s and hand them to
+the configured exporters. Agents built through `agent_registry` are attached
+automatically when `TELEMETRY_ENABLED` is set.
+"""
+
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+from config import get_settings
+from telemetry.exporters import (
+    JsonlSpanExporter,
+    OpenTelemetrySpanExporter,
+    SpanExporter,
+)
+from telemetry.spans import AGENT, MODEL, TOOL, Span
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+
+
+def append_callback(agent: "BaseAgent", name: str, callback: Callable) -> None:
+    """Adds `callback` after the agent's existing callbacks of kind `name`.
+
+    Args:
+        agent (BaseAgent): The agent to modify.
+        name (str): Callback attribute, e.g. "before_model_callback".
+        callback (Callable): The callback to add.
+    """
+    existing = getattr(agent, name)
+    if existing is None:
+        callbacks = []
+    elif isinstance(existing, list):
+        callbacks = list(existing)
+    else:
+        callbacks = [existing]
+    setattr(agent, name, callbacks + [callback])
+
+
+def walk_agents(agent: "BaseAgent") -> Iterable["BaseAgent"]:
+    """Yields `agent`, its sub-agents and agents wrapped in `AgentTool`s, once each."""
+    from google.adk.agents import LlmAgent
+    from google.adk.tools.agent_tool import AgentTool
+
+    seen = set()
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        yield current
+        pending.extend(current.sub_agents)
+        if isinstance(current, LlmAgent):
+            pending.extend(
+                tool.agent for tool in current.tools if isinstance(tool, AgentTool)
+            )
+
+
+# The tool call running in the current task; an `AgentTool` runs its agent in a
+# new invocation inside that call.
+_current_tool_span: ContextVar[Optional[Span]] = ContextVar(
+    "current_tool_span", default=None
+)
+
+
+def _session_id(context: Any) -> Optional[str]:
+    invocation_context = getattr(context, "_invocation_context", None)
+    session = getattr(invocation_context, "session", None)
+    return getattr(session, "id", None)
+
+
+class Instrumentation:
+    """Records spans for agent runs, model calls and tool calls.
+
+    Attributes:
+        exporters: Receivers of every started and finished span.
+        recent: The most recently finished spans, newest last.
+    """
+
+    def __init__(
+        self, exporters: Optional[list[SpanExporter]] = None, keep_recent: int = 10000
+    ):
+        self.exporters = list(exporters or [])
+        self.recent: deque[Span] = deque(maxlen=keep_recent)
+        self._open: dict[tuple, Span] = {}
+        self._tool_tokens: dict[tuple, Any] = {}
+        self._attached: set[int] = set()
+        self._lock = threading.Lock()
+
+    def attach(self, agent: "BaseAgent") -> None:
+        """Instruments `agent` and every agent below it; safe to call repeatedly."""
+        from google.adk.agents import LlmAgent
+
+        for current in walk_agents(agent):
+            if id(current) in self._attached:
+                continue
+            self._attached.add(id(current))
+            append_callback(
+                current, "before_agent_callback", self._before_agent(current)
+            )
+            append_callback(current, "after_agent_callback", self._after_agent)
+            if isinstance(current, LlmAgent):
+                append_callback(current, "before_model_callback", self._before_model)
+                append_callback(current, "after_model_callback", self._after_model)
+                append_callback(current, "before_tool_callback", self._before_tool)
+                append_callback(current, "after_tool_callback", self._after_tool)
+
+    def session_spans(self, session_id: str) -> list[Span]:
+        """Returns the recent finished spans of a session, in start order."""
+        trace_ids = {s.trace_id for s in self.recent if s.session_id == session_id}
+        return sorted(
+            (s for s in self.recent if s.trace_id in trace_ids), key=lambda s: s.start
+        )
+
+    # --- span bookkeeping ---
+
+    def _start(self, key: tuple, span: Span) -> Span:
+        with self._lock:
+            self._open[key] = span
+        for exporter in self.exporters:
+            exporter.on_start(span)
+        return span
+
+    def _finish(self, key: tuple, error: Optional[str] = None) -> Optional[Span]:
+        with self._lock:
+            span = self._open.pop(key, None)
+        if span is None:
+            return None
+        span.end = span.end or time.time()
+        span.error = span.error or error
+        self.recent.append(span)
+        for exporter in self.exporters:
+            exporter.on_end(span)
+        return span
+
+    def _agent_parent(self, invocation_id: str, agent: "BaseAgent") -> Optional[Span]:
+        """Finds the span an agent run is nested in.
+
+        Within an invocation that is the parent agent when it is running,
+        otherwise the most recently started agent (the one that transferred
+        control). The first agent of an invocation started by an `AgentTool`
+        is nested in that tool's span.
+        """
+        with self._lock:
+            running = [
+                span
+                for key, span in self._open.items()
+                if key[0] == AGENT and key[1] == invocation_id
+            ]
+        parent = agent.parent_agent
+        for span in running:
+            if parent is not None and span.name == parent.name:
+                return span
+        if running:
+            return max(running, key=lambda span: span.start)
+        tool_span = _current_tool_span.get()
+        if tool_span is not None and tool_span.name == agent.name:
+            return tool_span
+        return None
+
+    # --- callbacks ---
+
+    def _before_agent(self, agent: "BaseAgent") -> Callable:
+        def callback(callback_context):
+            invocation_id = callback_context.invocation_id
+            parent = self._agent_parent(invocation_id, agent)
+            self._start(
+                (AGENT, invocation_id, agent.name),
+                Span(
+                    kind=AGENT,
+                    name=agent.name,
+                    agent=agent.name,
+                    trace_id=parent.trace_id if parent else invocation_id,
+                    invocation_id=invocation_id,
+                    session_id=(
+                        parent.session_id if parent else _session_id(callback_context)
+                    ),
+                    parent_id=parent.span_id if parent else None,
+                ),
+            )
+            return None
+
+        return callback
+
+    def _after_agent(self, callback_context):
+        invocation_id = callback_context.invocation_id
+        agent_name = callback_context.agent_name
+        # Model and tool spans whose after-callback never ran (a before-callback
+        # short-circuited or the call raised) end with their agent.
+        with self._lock:
+            unfinished = [
+                key
+                for key in self._open
+                if key[0] in (MODEL, TOOL)
+                and key[1] == invocation_id
+                and key[2] == agent_name
+            ]
+        for key in unfinished:
+            self._finish(key, error="unfinished")
+        self._finish((AGENT, invocation_id, agent_name))
+        return None
+
+    def _child_span(self, kind: str, name: str, context) -> Span:
+        with self._lock:
+            parent = self._open.get((AGENT, context.invocation_id, context.agent_name))
+        return Span(
+            kind=kind,
+            name=name,
+            agent=context.agent_name,
+            trace_id=parent.trace_id if parent else context.invocation_id,
+            invocation_id=context.invocation_id,
+            session_id=parent.session_id if parent else _session_id(context),
+            parent_id=parent.span_id if parent else None,
+        )
+
+    def _before_model(self, callback_context, llm_request):
+        span = self._child_span(MODEL, llm_request.model or "", callback_context)
+        span.model = llm_request.model
+        self._start(
+            (MODEL, callback_context.invocation_id, callback_context.agent_name), span
+        )
+        return None
+
+    def _after_model(self, callback_context, llm_response):
+        key = (MODEL, callback_context.invocation_id, callback_context.agent_name)
+        with self._lock:
+            span = self._open.get(key)
+        if span is None:
+            return None
+        now = time.time()
+        if span.ttft_ms is None:
+            span.ttft_ms = round((now - span.start) * 1000, 3)
+        usage = llm_response.usage_metadata
+        if usage:
+            span.prompt_tokens = usage.prompt_token_count
+            span.completion_tokens = usage.candidates_token_count
+            span.cached_tokens = usage.cached_content_token_count
+        if not llm_response.partial:
+            span.end = now
+            self._finish(key, error=llm_response.error_code)
+        return None
+
+    def _before_tool(self, tool, args, tool_context):
+        key = (
+            TOOL,
+            tool_context.invocation_id,
+            tool_context.agent_name,
+            tool_context.function_call_id,
+        )
+        span = self._start(key, self._child_span(TOOL, tool.name, tool_context))
+        self._tool_tokens[key] = _current_tool_span.set(span)
+        return None
+
+    def _after_tool(self, tool, args, tool_context, tool_response):
+        error = None
+        if isinstance(tool_response, dict) and tool_response.get("status") == "error":
+            error = str(tool_response.get("error_message") or "error")
+        key = (
+            TOOL,
+            tool_context.invocation_id,
+            tool_context.agent_name,
+            tool_context.function_call_id,
+        )
+        token = self._tool_tokens.pop(key, None)
+        if token is not None:
+            try:
+                _current_tool_span.reset(token)
+            except ValueError:
+                # Set in a different context, e.g. by a tool run in another task.
+                _current_tool_span.set(None)
+        self._finish(key, error=error)
+        return None
+
+
+@lru_cache()
+def get_instrumentation() -> Instrumentation:
+    """
+    Get the process-wide instrumentation configured from settings.
+
+    Returns:
+        Instrumentation: The shared instrumentation.
+    """
+    settings = get_settings()
+    exporters: list[SpanExporter] = []
+    if settings.TELEMETRY_JSONL_PATH:
+        exporters.append(JsonlSpanExporter(settings.TELEMETRY_JSONL_PATH))
+    if settings.TELEMETRY_OTEL_ENABLED:
+        exporters.append(OpenTelemetrySpanExporter())
+    return Instrumentation(exporters)
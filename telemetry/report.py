@@ -0,0 +1,169 @@
+"""Flame-graph-style summaries of recorded spans.
+
+`render_flame` prints a session's span tree with one timeline bar per span, so
+the stages that use the latency and token budget stand out. `fold_stacks`
+produces the folded-stack format read by flamegraph.pl and speedscope.
+
+Usage:
+    python -m telemetry.report                      # latest session in the JSONL file
+    python -m telemetry.report --session <id> --folded > session.folded
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from config import get_settings
+from telemetry.spans import MODEL, Span
+
+
+def load_spans(path: Path) -> list[Span]:
+    """Reads spans written by `JsonlSpanExporter`."""
+    with path.open(encoding="utf-8") as file:
+        return [Span.from_dict(json.loads(line)) for line in file if line.strip()]
+
+
+def select_session(
+    spans: Iterable[Span], session_id: Optional[str] = None
+) -> list[Span]:
+    """Returns the spans of `session_id` (default: the latest session), by start."""
+    spans = list(spans)
+    if session_id is None:
+        latest = max(spans, key=lambda span: span.start, default=None)
+        if latest is None:
+            return []
+        session_id = latest.session_id
+    trace_ids = {span.trace_id for span in spans if span.session_id == session_id}
+    return sorted(
+        (span for span in spans if span.trace_id in trace_ids),
+        key=lambda span: span.start,
+    )
+
+
+def _children(spans: list[Span]) -> tuple[list[Span], dict[str, list[Span]]]:
+    ids = {span.span_id for span in spans}
+    children = defaultdict(list)
+    roots = []
+    for span in spans:
+        if span.parent_id in ids:
+            children[span.parent_id].append(span)
+        else:
+            roots.append(span)
+    return roots, children
+
+
+def _tokens(span: Span, children: dict[str, list[Span]]) -> tuple[int, int]:
+    if span.kind == MODEL:
+        return span.prompt_tokens or 0, span.completion_tokens or 0
+    prompt = completion = 0
+    for child in children.get(span.span_id, []):
+        child_prompt, child_completion = _tokens(child, children)
+        prompt += child_prompt
+        completion += child_completion
+    return prompt, completion
+
+
+def render_flame(spans: list[Span], width: int = 40) -> str:
+    """Renders spans as an indented tree with a timeline bar per span.
+
+    Args:
+        spans (list[Span]): Spans of one session, e.g. from `select_session`.
+        width (int): Width of the timeline column in characters.
+
+    Returns:
+        str: The rendered summary.
+    """
+    spans = [span for span in spans if span.end is not None]
+    if not spans:
+        return "No spans recorded."
+    roots, children = _children(spans)
+    origin = min(span.start for span in spans)
+    total = max(span.end for span in spans) - origin or 1e-9
+    label_width = 44
+
+    prompt_total = completion_total = 0
+    for root in roots:
+        prompt, completion = _tokens(root, children)
+        prompt_total += prompt
+        completion_total += completion
+    lines = [
+        f"Session {spans[0].session_id}: {len(roots)} turn(s), "
+        f"{total:.2f} s, {prompt_total:,} prompt / {completion_total:,} completion tokens"
+    ]
+
+    def visit(span: Span, prefix: str, last: bool, depth: int) -> None:
+        branch = "" if depth == 0 else ("└─ " if last else "├─ ")
+        label = (prefix + branch + span.label)[:label_width]
+        offset = int((span.start - origin) / total * width)
+        length = max(1, round((span.end - span.start) / total * width))
+        bar = (" " * offset + "█" * length)[:width].ljust(width)
+        prompt, completion = _tokens(span, children)
+        details = []
+        if prompt or completion:
+            details.append(f"{prompt:,}→{completion:,} tok")
+        if span.cached_tokens:
+            details.append(f"{span.cached_tokens:,} cached")
+        if span.ttft_ms is not None:
+            details.append(f"ttft {span.ttft_ms:.0f} ms")
+        if span.error:
+            details.append(f"error: {span.error}")
+        lines.append(
+            f"{label:<{label_width}} {span.duration_ms:>9.1f} ms {bar} {'  '.join(details)}"
+        )
+        kids = children.get(span.span_id, [])
+        next_prefix = prefix + ("" if depth == 0 else ("   " if last else "│  "))
+        for index, child in enumerate(kids):
+            visit(child, next_prefix, index == len(kids) - 1, depth + 1)
+
+    for root in roots:
+        visit(root, "", True, 0)
+    return "\n".join(lines)
+
+
+def fold_stacks(spans: list[Span]) -> str:
+    """Returns folded stacks ("a;b;c <self time in µs>") for flame graph tools."""
+    spans = [span for span in spans if span.end is not None]
+    roots, children = _children(spans)
+    folded = defaultdict(int)
+
+    def visit(span: Span, stack: tuple[str, ...]) -> None:
+        stack = stack + (span.label.replace(";", ":"),)
+        kids = children.get(span.span_id, [])
+        child_time = sum(child.end - child.start for child in kids)
+        self_time = max(0.0, (span.end - span.start) - child_time)
+        folded[";".join(stack)] += int(self_time * 1e6)
+        for child in kids:
+            visit(child, stack)
+
+    for root in roots:
+        visit(root, ())
+    return "\n".join(f"{stack} {micros}" for stack, micros in folded.items())
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "path",
+        nargs="?",
+        type=Path,
+        default=get_settings().TELEMETRY_JSONL_PATH,
+        help="JSONL file written by the telemetry exporter.",
+    )
+    parser.add_argument("--session", help="Session id (default: latest session).")
+    parser.add_argument("--folded", action="store_true", help="Print folded stacks.")
+    parser.add_argument("--width", type=int, default=40)
+    args = parser.parse_args(argv)
+
+    if not args.path or not Path(args.path).exists():
+        print(f"❌ No span file at {args.path}.")
+        return 1
+    spans = select_session(load_spans(Path(args.path)), args.session)
+    print(fold_stacks(spans) if args.folded else render_flame(spans, args.width))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
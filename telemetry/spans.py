@@ -0,0 +1,79 @@
+"""Span records produced by the agent instrumentation.
+
+A span covers one agent run, one model call or one tool call. Spans of a user
+turn share a `trace_id` (the invocation id of the outermost agent run) and form
+a tree through `parent_id`, including agents run through an `AgentTool`.
+"""
+
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Optional
+
+AGENT = "agent"
+MODEL = "model"
+TOOL = "tool"
+
+
+def new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+@dataclass
+class Span:
+    """One timed unit of agent work.
+
+    Attributes:
+        kind: "agent", "model" or "tool".
+        name: Agent name, model name or tool name.
+        agent: Name of the agent the work belongs to.
+        start: Start time in seconds since the epoch.
+        end: End time in seconds since the epoch; None while running.
+        model: Model name for model spans.
+        prompt_tokens: Prompt tokens reported by the model.
+        completion_tokens: Completion tokens reported by the model.
+        cached_tokens: Prompt tokens the provider served from its prefix cache.
+        ttft_ms: Time to the first (possibly partial) model response.
+        error: Error code or message when the work failed or never finished.
+        attributes: Additional exporter-neutral attributes.
+    """
+
+    kind: str
+    name: str
+    agent: str
+    trace_id: str
+    invocation_id: str
+    session_id: Optional[str] = None
+    parent_id: Optional[str] = None
+    span_id: str = field(default_factory=new_span_id)
+    start: float = field(default_factory=time.time)
+    end: Optional[float] = None
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    ttft_ms: Optional[float] = None
+    error: Optional[str] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end is None:
+            return None
+        return (self.end - self.start) * 1000
+
+    @property
+    def label(self) -> str:
+        return self.name if self.kind == AGENT else f"{self.kind} {self.name}"
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["duration_ms"] = (
+            round(self.duration_ms, 3) if self.duration_ms is not None else None
+        )
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Span":
+        names = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in names})
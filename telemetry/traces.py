@@ -0,0 +1,652 @@
+"""Record agent sessions as traces and replay them without models or tools.
+
+`TraceRecorder` captures, per user turn, every model request and its final
+responses, every tool call with its arguments, result and state changes, and
+the timing of the turn's events. A session's trace is a gzip-compressed JSON
+Lines file: a header with the app and the initial session state, then one line
+per turn, appended as the turn finishes.
+
+`TraceReplayer` plays traces back through the real agent tree: each agent's
+model is replaced by a `ReplayLlm` that returns the recorded responses of that
+agent in order, and tool calls are answered from the trace by a before-tool
+callback that also reapplies the tool's recorded state changes and actions.
+Agent code, callbacks, workflow agents and the session service run as usual,
+so replays measure the framework's own cost and concurrency behaviour. Delays
+are the recorded model latencies, tool durations and think times between
+turns multiplied by `time_scale`: 1.0 replays at the original speed, 0 as fast
+as possible.
+
+Requests whose hash differs from the recorded one are counted as diverged
+but still answered in order; a call with no recorded answer left gets an
+error response. Tools that ran through an `AgentTool` are not replayed
+themselves, the calls inside the wrapped agent are. Tools with an empty
+result (such as `transfer_to_agent`) run for real, since ADK only skips a tool
+for a non-empty callback result. Toolsets such as MCP still list their tools
+from their servers.
+"""
+
+import asyncio
+import gzip
+import json
+import time
+import uuid
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Optional, Union
+
+from google.adk.models import BaseLlm, LLMRegistry, LlmRequest, LlmResponse
+
+from config import get_settings
+from telemetry.instrument import append_callback, walk_agents
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+    from google.adk.events import Event
+    from google.adk.runners import Runner
+    from google.genai import types
+
+TRACE_VERSION = 1
+
+# State changes that are not replayed: artifacts are not recorded and
+# authentication requests need a user.
+_SKIPPED_ACTIONS = {"artifact_delta", "requested_auth_configs"}
+
+
+def _plain(value: Any) -> Any:
+    """Returns `value` as JSON-compatible data."""
+
+    def default(item: Any) -> Any:
+        if hasattr(item, "model_dump"):
+            return item.model_dump(mode="json", exclude_none=True)
+        return repr(item)
+
+    return json.loads(json.dumps(value, default=default))
+
+
+@dataclass
+class ModelCall:
+    """One recorded model call of an agent.
+
+    Attributes:
+        agent: Name of the agent that made the call.
+        request: Hash of the request (`llm.cache.request_cache_key`).
+        first_ms: Time to the first, possibly partial, response.
+        ms: Time until the call finished.
+        responses: The final (non-partial) responses, as JSON.
+        error: Message of the exception the call raised, if any.
+    """
+
+    agent: str
+    request: str
+    first_ms: float
+    ms: float
+    responses: list[dict] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class ToolCall:
+    """One recorded tool call.
+
+    Attributes:
+        agent: Name of the agent that called the tool.
+        tool: Tool name.
+        args: Call arguments.
+        ms: Time the tool took.
+        result: The tool's response.
+        actions: Event actions the tool set, including its state changes.
+    """
+
+    agent: str
+    tool: str
+    args: dict
+    ms: float
+    result: Any = None
+    actions: dict = field(default_factory=dict)
+
+
+@dataclass
+class TurnTrace:
+    """One recorded user turn.
+
+    Attributes:
+        message: The user's message.
+        offset_ms: Start of the turn relative to the start of the first one.
+        ms: Duration of the turn.
+        events: `[t_ms, author, kind]` of every event of the turn.
+        models: Model calls in completion order.
+        tools: Tool calls in completion order.
+    """
+
+    message: str
+    offset_ms: float = 0.0
+    ms: float = 0.0
+    events: list[list] = field(default_factory=list)
+    models: list[ModelCall] = field(default_factory=list)
+    tools: list[ToolCall] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TurnTrace":
+        return cls(
+            **{
+                **data,
+                "models": [ModelCall(**call) for call in data.get("models", [])],
+                "tools": [ToolCall(**call) for call in data.get("tools", [])],
+            }
+        )
+
+
+@dataclass
+class SessionTrace:
+    """A recorded session: its app, initial state and turns."""
+
+    app: str
+    state: dict = field(default_factory=dict)
+    turns: list[TurnTrace] = field(default_factory=list)
+    recorded_at: float = field(default_factory=time.time)
+
+    def header(self) -> dict:
+        return {
+            "trace": TRACE_VERSION,
+            "app": self.app,
+            "state": _plain(self.state),
+            "recorded_at": self.recorded_at,
+        }
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Writes the whole trace to `path`, replacing it."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps(self.header()) + "\n")
+            for turn in self.turns:
+                file.write(json.dumps(asdict(turn)) + "\n")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "SessionTrace":
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            lines = [json.loads(line) for line in file if line.strip()]
+        if not lines or lines[0].get("trace") != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} trace.")
+        header = lines[0]
+        return cls(
+            app=header["app"],
+            state=header.get("state") or {},
+            turns=[TurnTrace.from_dict(line) for line in lines[1:]],
+            recorded_at=header.get("recorded_at", 0.0),
+        )
+
+
+def append_turn(path: Path, trace: SessionTrace, turn: TurnTrace) -> None:
+    """Appends `turn` to the trace file at `path`, creating it from `trace`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [] if path.exists() else [json.dumps(trace.header())]
+    lines.append(json.dumps(asdict(turn)))
+    # Each append is a gzip member of its own; readers see one stream.
+    with gzip.open(path, "at", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def _event_kind(event: "Event") -> str:
+    if event.partial:
+        return "partial"
+    if event.get_function_calls():
+        return "call"
+    if event.get_function_responses():
+        return "response"
+    if event.content and event.content.parts:
+        return "text"
+    return "state"
+
+
+def _agent_model(agent: "BaseAgent") -> Optional[Union[str, BaseLlm]]:
+    """Returns the model an LLM agent sets itself; None if it inherits one."""
+    from google.adk.agents import LlmAgent
+
+    if not isinstance(agent, LlmAgent) or not agent.model:
+        return None
+    return agent.model
+
+
+class _Recording:
+    """Calls recorded during one turn."""
+
+    def __init__(self, turn: TurnTrace):
+        self.turn = turn
+        self.started = time.perf_counter()
+        self.tool_started: dict[str, float] = {}
+
+
+_recording: ContextVar[Optional[_Recording]] = ContextVar("recording", default=None)
+
+
+class RecordingLlm(BaseLlm):
+    """Passes requests to the agent's model and records them during a turn.
+
+    Attributes:
+        inner: The agent's model.
+        agent_name: Name of the agent the model belongs to.
+    """
+
+    inner: BaseLlm
+    agent_name: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        recording = _recording.get()
+        if recording is None:
+            async for response in self.inner.generate_content_async(
+                llm_request, stream=stream
+            ):
+                yield response
+            return
+
+        from llm.cache import request_cache_key
+
+        call = ModelCall(
+            agent=self.agent_name,
+            request=request_cache_key(llm_request, self.model),
+            first_ms=0.0,
+            ms=0.0,
+        )
+        started = time.perf_counter()
+        # Time the caller spends between responses (e.g. running the tools of
+        # a function call) is not the model's.
+        suspended = 0.0
+        try:
+            async for response in self.inner.generate_content_async(
+                llm_request, stream=stream
+            ):
+                elapsed = time.perf_counter() - started - suspended
+                if not call.first_ms:
+                    call.first_ms = round(elapsed * 1000, 3)
+                call.ms = round(elapsed * 1000, 3)
+                if not response.partial:
+                    call.responses.append(
+                        response.model_dump(mode="json", exclude_none=True)
+                    )
+                yielded = time.perf_counter()
+                yield response
+                suspended += time.perf_counter() - yielded
+        except Exception as e:
+            call.error = repr(e)
+            raise
+        finally:
+            recording.turn.models.append(call)
+
+
+def _is_agent_tool(tool: Any) -> bool:
+    from google.adk.tools.agent_tool import AgentTool
+
+    return isinstance(tool, AgentTool)
+
+
+class TraceRecorder:
+    """Records the turns of sessions run through `run` as trace files.
+
+    Attributes:
+        directory: Traces are written to `<directory>/<app>/<session_id>.trace.jsonl.gz`.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self._attached: set[int] = set()
+
+    def attach(self, agent: "BaseAgent") -> None:
+        """Wraps the models of `agent`'s tree and adds tool callbacks; idempotent."""
+        from google.adk.agents import LlmAgent
+
+        for current in walk_agents(agent):
+            if id(current) in self._attached or not isinstance(current, LlmAgent):
+                continue
+            self._attached.add(id(current))
+            model = _agent_model(current)
+            if model is not None and not isinstance(model, RecordingLlm):
+                inner = LLMRegistry.new_llm(model) if isinstance(model, str) else model
+                current.model = RecordingLlm(
+                    model=inner.model, inner=inner, agent_name=current.name
+                )
+            append_callback(current, "before_tool_callback", self._before_tool)
+            append_callback(current, "after_tool_callback", self._after_tool)
+
+    def path_for(self, app: str, session_id: str) -> Path:
+        return self.directory / app / f"{session_id}.trace.jsonl.gz"
+
+    @staticmethod
+    def _before_tool(tool, args, tool_context):
+        recording = _recording.get()
+        if recording is not None and not _is_agent_tool(tool):
+            recording.tool_started[tool_context.function_call_id] = time.perf_counter()
+        return None
+
+    @staticmethod
+    def _after_tool(tool, args, tool_context, tool_response):
+        recording = _recording.get()
+        if recording is None:
+            return None
+        started = recording.tool_started.pop(tool_context.function_call_id, None)
+        if started is None:
+            return None
+        recording.turn.tools.append(
+            ToolCall(
+                agent=tool_context.agent_name,
+                tool=tool.name,
+                args=_plain(args),
+                ms=round((time.perf_counter() - started) * 1000, 3),
+                result=_plain(tool_response),
+                actions=_plain(
+                    tool_context.actions.model_dump(
+                        mode="json", exclude_none=True, exclude_defaults=True
+                    )
+                ),
+            )
+        )
+        return None
+
+    async def run(
+        self,
+        runner: "Runner",
+        *,
+        user_id: str,
+        session_id: str,
+        new_message: "types.Content",
+        run_config=None,
+    ) -> AsyncGenerator["Event", None]:
+        """Runs one turn through `runner.run_async` and records it.
+
+        The turn is appended to the session's trace file when it completes;
+        failed or cancelled turns are not recorded.
+        """
+        from google.adk.agents.run_config import RunConfig
+
+        path = self.path_for(runner.app_name, session_id)
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session_id
+        )
+        trace = SessionTrace(app=runner.app_name)
+        if not path.exists():
+            trace.state = dict(session.state) if session else {}
+        # The session's first event is the first turn's user message.
+        first = session.events[0].timestamp if session and session.events else None
+        turn = TurnTrace(
+            message="".join(part.text or "" for part in new_message.parts or []),
+            offset_ms=round((time.time() - first) * 1000, 3) if first else 0.0,
+        )
+        recording = _Recording(turn)
+        token = _recording.set(recording)
+        try:
+            async for event in runner.run_async(
+                user_id=user_id,
+                session_id=session_id,
+                new_message=new_message,
+                run_config=run_config or RunConfig(),
+            ):
+                elapsed = (time.perf_counter() - recording.started) * 1000
+                turn.events.append(
+                    [round(elapsed, 3), event.author, _event_kind(event)]
+                )
+                yield event
+        finally:
+            try:
+                _recording.reset(token)
+            except ValueError:
+                # Closed from another context, e.g. by the garbage collector.
+                _recording.set(None)
+        turn.ms = round((time.perf_counter() - recording.started) * 1000, 3)
+        await asyncio.to_thread(append_turn, path, trace, turn)
+
+
+@lru_cache()
+def get_trace_recorder() -> Optional[TraceRecorder]:
+    """
+    Get the process-wide trace recorder configured from settings.
+
+    Returns:
+        TraceRecorder | None: The recorder, or None when `TRACE_RECORD_DIR` is unset.
+    """
+    directory = get_settings().TRACE_RECORD_DIR
+    return TraceRecorder(directory) if directory else None
+
+
+@dataclass
+class ReplayStats:
+    """Counters of one or more replays."""
+
+    model_calls: int = 0
+    tool_calls: int = 0
+    model_misses: int = 0
+    tool_misses: int = 0
+    diverged_requests: int = 0
+    diverged_args: int = 0
+
+    def add(self, other: "ReplayStats") -> None:
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of replaying one session trace.
+
+    Attributes:
+        turn_ms: Replayed duration of every turn.
+        recorded_ms: Recorded duration of every turn.
+        events: Events of every replayed turn.
+        recorded_events: Events of every recorded turn.
+        errors: Turns that raised or produced error events.
+        stats: Calls answered from the trace, misses and divergences.
+    """
+
+    turn_ms: list[float] = field(default_factory=list)
+    recorded_ms: list[float] = field(default_factory=list)
+    events: list[int] = field(default_factory=list)
+    recorded_events: list[int] = field(default_factory=list)
+    errors: int = 0
+    stats: ReplayStats = field(default_factory=ReplayStats)
+
+
+class _Replay:
+    """Recorded calls of the turn being replayed, queued per agent and tool."""
+
+    def __init__(self, time_scale: float, stats: ReplayStats):
+        self.time_scale = time_scale
+        self.stats = stats
+        self.models: dict[str, deque[ModelCall]] = {}
+        self.tools: dict[tuple[str, str], deque[ToolCall]] = {}
+
+    def begin(self, turn: TurnTrace) -> None:
+        self.models = defaultdict(deque)
+        self.tools = defaultdict(deque)
+        for call in turn.models:
+            self.models[call.agent].append(call)
+        for call in turn.tools:
+            self.tools[(call.agent, call.tool)].append(call)
+
+    async def wait(self, ms: float) -> None:
+        if self.time_scale > 0 and ms > 0:
+            await asyncio.sleep(ms * self.time_scale / 1000)
+
+
+_replay: ContextVar[Optional[_Replay]] = ContextVar("replay", default=None)
+
+
+class ReplayLlm(BaseLlm):
+    """Answers an agent's model calls from the trace being replayed.
+
+    Attributes:
+        agent_name: Name of the agent whose recorded calls are returned.
+    """
+
+    agent_name: str
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        from llm.cache import request_cache_key
+
+        replay = _replay.get()
+        if replay is None:
+            raise RuntimeError(
+                f"No trace is being replayed for a model call of '{self.agent_name}'."
+            )
+        queue = replay.models.get(self.agent_name)
+        if not queue:
+            replay.stats.model_misses += 1
+            yield LlmResponse(
+                error_code="REPLAY_MISS",
+                error_message=f"No recorded model call left for '{self.agent_name}'.",
+            )
+            return
+        call = queue.popleft()
+        replay.stats.model_calls += 1
+        if request_cache_key(llm_request, self.model) != call.request:
+            replay.stats.diverged_requests += 1
+        await replay.wait(call.first_ms)
+        if call.error:
+            raise RuntimeError(f"Recorded model error: {call.error}")
+        for index, response in enumerate(call.responses):
+            if index == len(call.responses) - 1:
+                await replay.wait(call.ms - call.first_ms)
+            yield LlmResponse.model_validate(response)
+
+
+class TraceReplayer:
+    """Replays session traces through an agent tree."""
+
+    def __init__(self):
+        self._attached: set[int] = set()
+
+    def attach(self, agent: "BaseAgent") -> None:
+        """Replaces the models of `agent`'s tree and adds the tool callback."""
+        from google.adk.agents import LlmAgent
+
+        for current in walk_agents(agent):
+            if id(current) in self._attached or not isinstance(current, LlmAgent):
+                continue
+            self._attached.add(id(current))
+            model = _agent_model(current)
+            if model is not None:
+                if isinstance(model, RecordingLlm):
+                    model = model.inner
+                current.model = ReplayLlm(
+                    model=model if isinstance(model, str) else model.model,
+                    agent_name=current.name,
+                )
+            append_callback(current, "before_tool_callback", self._before_tool)
+
+    @staticmethod
+    async def _before_tool(tool, args, tool_context):
+        replay = _replay.get()
+        if replay is None or _is_agent_tool(tool):
+            return None
+        queue = replay.tools.get((tool_context.agent_name, tool.name))
+        if not queue:
+            replay.stats.tool_misses += 1
+            return {
+                "status": "error",
+                "error_message": f"No recorded result left for tool '{tool.name}'.",
+            }
+        call = queue.popleft()
+        replay.stats.tool_calls += 1
+        if _plain(args) != call.args:
+            replay.stats.diverged_args += 1
+        if not call.result:
+            return None
+        await replay.wait(call.ms)
+        for name, value in call.actions.items():
+            if name == "state_delta":
+                for key, item in value.items():
+                    tool_context.state[key] = item
+            elif name not in _SKIPPED_ACTIONS:
+                setattr(tool_context.actions, name, value)
+        return call.result
+
+    async def replay(
+        self,
+        runner: "Runner",
+        trace: SessionTrace,
+        time_scale: float = 0.0,
+        user_id: str = "replay",
+    ) -> ReplayResult:
+        """Replays every turn of `trace` in a new session of `runner`.
+
+        Args:
+            runner (Runner): Runner of the traced app, with this replayer
+                attached to its agent.
+            trace (SessionTrace): The trace to replay.
+            time_scale (float): Multiplier of recorded delays; 0 disables them.
+            user_id (str): User of the new session.
+
+        Returns:
+            ReplayResult: Turn durations, event counts, errors and call counters.
+        """
+        from google.genai import types
+
+        result = ReplayResult()
+        replay = _Replay(time_scale, result.stats)
+        session = await runner.session_service.create_session(
+            app_name=runner.app_name,
+            user_id=user_id,
+            session_id=uuid.uuid4().hex,
+            state=dict(trace.state),
+        )
+        token = _replay.set(replay)
+        started = time.perf_counter()
+        try:
+            for turn in trace.turns:
+                # Think time: the turn starts at its recorded offset.
+                elapsed = (time.perf_counter() - started) * 1000
+                await replay.wait(turn.offset_ms - elapsed / (time_scale or 1))
+                replay.begin(turn)
+                turn_started = time.perf_counter()
+                events = 0
+                failed = False
+                try:
+                    async for event in runner.run_async(
+                        user_id=user_id,
+                        session_id=session.id,
+                        new_message=types.Content(
+                            role="user", parts=[types.Part(text=turn.message)]
+                        ),
+                    ):
+                        events += 1
+                        failed = failed or bool(event.error_code)
+                except Exception:
+                    failed = True
+                result.turn_ms.append((time.perf_counter() - turn_started) * 1000)
+                result.recorded_ms.append(turn.ms)
+                result.events.append(events)
+                result.recorded_events.append(len(turn.events))
+                result.errors += failed
+        finally:
+            _replay.reset(token)
+        return result
+
+    async def replay_all(
+        self,
+        runner: "Runner",
+        traces: list[SessionTrace],
+        concurrency: int = 16,
+        repeat: int = 1,
+        time_scale: float = 0.0,
+    ) -> list[ReplayResult]:
+        """Replays every trace `repeat` times with at most `concurrency` at once."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index: int, trace: SessionTrace) -> ReplayResult:
+            async with semaphore:
+                return await self.replay(
+                    runner, trace, time_scale, user_id=f"replay_{index}"
+                )
+
+        jobs = [trace for _ in range(repeat) for trace in traces]
+        return list(
+            await asyncio.gather(*(one(i, trace) for i, trace in enumerate(jobs)))
+        )
@@ -1,10 +1,20 @@
-from google.adk.agents import Agent
-from google.adk.tools import google_search
-
-root_agent = Agent(
-    name="basic_search_agent",
-    model="gemini-2.0-flash-exp",
-    description="Agent to answer questions using google search",
-    instruction="you are an expert researcher. You always stick to the facts.",
-    tools=[google_search],
-)
+from agent_registry import lazy_agents, register_agent
+
+
+@register_agent("basic_search_agent")
+def build_basic_search_agent():
+    from google.adk.agents import Agent
+    from google.adk.tools import google_search
+
+    from llm.models import build_model
+
+    return Agent(
+        name="basic_search_agent",
+        model=build_model("gemini-2.0-flash-exp", agent_name="basic_search_agent"),
+        description="Agent to answer questions using google search",
+        instruction="you are an expert researcher. You always stick to the facts.",
+        tools=[google_search],
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="basic_search_agent")
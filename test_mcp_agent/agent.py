@@ -1,7 +1,7 @@
 import os
 
-from google.adk.agents import Agent
-from google.adk.tools.mcp_tool.mcp_toolset import MCPToolset, StdioServerParameters
+from agent_registry import lazy_agents, register_agent
+from config import get_settings
 
 # This is a comment added by the agent to test the edit_file tool
 
@@ -9,21 +9,36 @@ TARGET_FOLDER_PATH = os.path.join(
     os.path.dirname(os.path.abspath(__file__)), "/home/gowtham/ai-agents/ai-agents"
 )
 
-root_agent = Agent(
-    name="filesystem_assistant_agent",
-    model="gemini-2.0-flash-lite",
-    description="Help the user manage their files. You can list files, read files, etc.",
-    instruction="you are an expert researcher. You always stick to the facts.",
-    tools=[
-        MCPToolset(
-            connection_params=StdioServerParameters(
-                command="npx",
-                args=[
-                    "-y",
-                    "@modelcontextprotocol/server-filesystem",
-                    os.path.abspath(TARGET_FOLDER_PATH),
-                ],
-            ),
-        )
-    ],
-)
+
+@register_agent("filesystem_assistant_agent")
+def build_filesystem_assistant_agent():
+    from google.adk.agents import Agent
+    from google.adk.tools.mcp_tool.mcp_toolset import (
+        MCPToolset,
+        StdioServerParameters,
+    )
+
+    if get_settings().MCP_POOL_ENABLED:
+        from tools.mcp_pool import PooledMCPToolset as MCPToolset
+
+    return Agent(
+        name="filesystem_assistant_agent",
+        model="gemini-2.0-flash-lite",
+        description="Help the user manage their files. You can list files, read files, etc.",
+        instruction="you are an expert researcher. You always stick to the facts.",
+        tools=[
+            MCPToolset(
+                connection_params=StdioServerParameters(
+                    command="npx",
+                    args=[
+                        "-y",
+                        "@modelcontextprotocol/server-filesystem",
+                        os.path.abspath(TARGET_FOLDER_PATH),
+                    ],
+                ),
+            )
+        ],
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="filesystem_assistant_agent")
@@ -1,14 +1,28 @@
-from google.adk.agents import Agent
-
-from tools.time import get_current_time
-from tools.weather import get_weather
-
-root_agent = Agent(
-    name="weather_time_agent",
-    model="gemini-2.0-flash",
-    description=("Agent to answer questions about the time and weather in a city."),
-    instruction=(
-        "You are a helpful agent who can answer user questions about the time and weather in a city."
-    ),
-    tools=[get_weather, get_current_time],
-)
+from agent_registry import lazy_agents, register_agent
+
+
+@register_agent("weather_time_agent")
+def build_weather_time_agent():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from tools.time import get_current_time, get_current_time_many
+    from tools.weather import get_weather, get_weather_many
+
+    return Agent(
+        name="weather_time_agent",
+        model=build_model("gemini-2.0-flash", agent_name="weather_time_agent"),
+        description=("Agent to answer questions about the time and weather in a city."),
+        instruction=(
+            "You are a helpful agent who can answer user questions about the time and weather in a city."
+        ),
+        tools=[
+            get_weather,
+            get_weather_many,
+            get_current_time,
+            get_current_time_many,
+        ],
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="weather_time_agent")
@@ -1,14 +1,7 @@
-import asyncio
 import logging
-import os
-
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.runners import Runner
-from google.genai import types
 
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
-from tools.weather import get_weather
 
 logging.basicConfig(level=logging.INFO)
 
@@ -22,14 +15,25 @@ MODEL_GEMMA_3_4B = settings.MODEL_GEMMA_3_4B
 MODEL_QWEN3_0_6B = settings.MODEL_QWEN3_0_6B
 
 
-root_agent = Agent(
-    name="weather_agent_v1",
-    model=LiteLlm(model=MODEL_GEMMA_3_4B),
-    description="Provides weather information for specific cities.",
-    instruction="You are a helpful weather assistant. "
-    "When the user asks for the weather in a specific city, "
-    "use the 'get_weather' tool to find the information. "
-    "If the tool returns an error, inform the user politely. "
-    "If the tool is successful, present the weather report clearly.",
-    tools=[get_weather],
-)
+@register_agent("weather_agent_v1")
+def build_weather_agent_v1():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from tools.weather import get_weather, get_weather_many
+
+    return Agent(
+        name="weather_agent_v1",
+        model=build_model(MODEL_GEMMA_3_4B, agent_name="weather_agent_v1"),
+        description="Provides weather information for specific cities.",
+        instruction="You are a helpful weather assistant. "
+        "When the user asks for the weather in a specific city, "
+        "use the 'get_weather' tool to find the information. "
+        "For several cities at once, use the 'get_weather_many' tool. "
+        "If the tool returns an error, inform the user politely. "
+        "If the tool is successful, present the weather report clearly.",
+        tools=[get_weather, get_weather_many],
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="weather_agent_v1")
@@ -1,14 +1,7 @@
-import asyncio
 import logging
-import os
-
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
 
+from agent_registry import lazy_agents, register_agent
 from config import get_settings
-from sub_agents.farewell_agent import farewell_agent
-from sub_agents.greeting_agent import greeting_agent
-from tools.weather import get_weather
 
 logging.basicConfig(level=logging.INFO)
 
@@ -22,18 +15,37 @@ MODEL_GPT_4O = settings.MODEL_GPT_4O
 # MODEL_QWEN3_0_6B = settings.MODEL_QWEN3_0_6B
 
 
-root_agent = Agent(
-    name="weather_agent_v2",
-    model=LiteLlm(model=MODEL_GPT_4O),
-    description="The main coordinator agent. Handles weather requests and delegates greetings/farewells to specialists.",
-    instruction="You are the main Weather Agent coordinating a team. Your primary responsibility is to provide weather information. "
-    "Use the 'get_weather' tool ONLY for specific weather requests (e.g., 'weather in London'). "
-    "You have specialized sub-agents: "
-    "1. 'greeting_agent': Handles simple greetings like 'Hi', 'Hello'. Delegate to it for these. "
-    "2. 'farewell_agent': Handles simple farewells like 'Bye', 'See you'. Delegate to it for these. "
-    "Analyze the user's query. If it's a greeting, delegate to 'greeting_agent'. If it's a farewell, delegate to 'farewell_agent'. "
-    "If it's a weather request, handle it yourself using 'get_weather'. "
-    "For anything else, respond appropriately or state you cannot handle it.",
-    tools=[get_weather],
-    sub_agents=[greeting_agent, farewell_agent],
-)
+@register_agent("weather_agent_v2")
+def build_weather_agent_v2():
+    from google.adk.agents import Agent
+
+    from llm.models import build_model
+    from sub_agents.farewell_agent import farewell_agent
+    from sub_agents.greeting_agent import greeting_agent
+    from tools.weather import get_weather, get_weather_many
+    from workflows.routing import get_greeting_router
+
+    # Plain greetings and farewells are answered locally, skipping the
+    # coordinator and sub-agent model calls; anything else reaches the model.
+    fast_path = get_greeting_router() if settings.FAST_PATH_ROUTER_ENABLED else None
+
+    return Agent(
+        name="weather_agent_v2",
+        model=build_model(MODEL_GPT_4O, agent_name="weather_agent_v2"),
+        description="The main coordinator agent. Handles weather requests and delegates greetings/farewells to specialists.",
+        instruction="You are the main Weather Agent coordinating a team. Your primary responsibility is to provide weather information. "
+        "Use the 'get_weather' tool ONLY for specific weather requests (e.g., 'weather in London'). "
+        "When a request names several cities, use 'get_weather_many' once instead of repeated 'get_weather' calls. "
+        "You have specialized sub-agents: "
+        "1. 'greeting_agent': Handles simple greetings like 'Hi', 'Hello'. Delegate to it for these. "
+        "2. 'farewell_agent': Handles simple farewells like 'Bye', 'See you'. Delegate to it for these. "
+        "Analyze the user's query. If it's a greeting, delegate to 'greeting_agent'. If it's a farewell, delegate to 'farewell_agent'. "
+        "If it's a weather request, handle it yourself using 'get_weather'. "
+        "For anything else, respond appropriately or state you cannot handle it.",
+        tools=[get_weather, get_weather_many],
+        sub_agents=[greeting_agent, farewell_agent],
+        before_agent_callback=fast_path,
+    )
+
+
+__getattr__ = lazy_agents(__name__, root_agent="weather_agent_v2")
@@ -0,0 +1,73 @@
+"""Test doubles shared by the test modules."""
+
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+
+class RateLimitError(Exception):
+    """Named like litellm's error, which `llm.limiter` recognizes by name."""
+
+
+class FakeLlm(BaseLlm):
+    """A model that answers every request with `reply` after `delay` seconds.
+
+    Attributes:
+        reply: Text of the answer.
+        delay: Seconds before the answer.
+        error_code: Error code set on the answer.
+        rate_limited: Number of requests, from the first, that raise a
+            `RateLimitError` instead of answering.
+        calls: Requests received.
+    """
+
+    model: str = "fake-model"
+    reply: str = "ok"
+    delay: float = 0.0
+    error_code: Optional[str] = None
+    rate_limited: int = 0
+    calls: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.calls <= self.rate_limited:
+            raise RateLimitError("429 Too Many Requests")
+        if stream:
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text="o")]),
+                partial=True,
+            )
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=self.reply)]),
+            error_code=self.error_code,
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=10, total_token_count=12
+            ),
+        )
+
+
+def request(text: str = "hello", **config) -> LlmRequest:
+    """Returns a one-message request with the given generation config."""
+    return LlmRequest(
+        model="fake-model",
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+        config=types.GenerateContentConfig(**config),
+    )
+
+
+def collect(llm: BaseLlm, llm_request: LlmRequest, stream: bool = False) -> list:
+    """Runs a model request to completion and returns its responses."""
+
+    async def run() -> list:
+        return [
+            response
+            async for response in llm.generate_content_async(llm_request, stream)
+        ]
+
+    return asyncio.run(run())
@@ -0,0 +1,124 @@
+from fakes import FakeLlm, collect, request
+from google.genai import types
+
+from llm import cache
+from llm.cache import CachedLlm, ResponseCache, request_cache_key
+
+
+def _call_request(call_id: str):
+    llm_request = request("weather in London?")
+    llm_request.contents.append(
+        types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        id=call_id, name="get_weather", args={"city": "London"}
+                    )
+                )
+            ],
+        )
+    )
+    return llm_request
+
+
+def test_key_is_stable_for_identical_requests():
+    assert request_cache_key(request("hi")) == request_cache_key(request("hi"))
+
+
+def test_key_changes_with_model_contents_instruction_and_config():
+    key = request_cache_key(request("hi"))
+
+    assert request_cache_key(request("hi"), model="other-model") != key
+    assert request_cache_key(request("hello")) != key
+    assert request_cache_key(request("hi", system_instruction="Be brief.")) != key
+    assert request_cache_key(request("hi", temperature=0.5)) != key
+
+
+def test_key_ignores_call_ids_and_http_options():
+    assert request_cache_key(_call_request("call-1")) == request_cache_key(
+        _call_request("call-2")
+    )
+    assert request_cache_key(
+        request("hi", http_options=types.HttpOptions(timeout=5))
+    ) == request_cache_key(request("hi"))
+
+
+def test_repeated_request_is_served_from_the_cache():
+    inner = FakeLlm(reply="sunny")
+    llm = CachedLlm(model=inner.model, inner=inner, cache=ResponseCache())
+
+    first = collect(llm, request())
+    second = collect(llm, request())
+
+    assert inner.calls == 1
+    assert [r.content.parts[0].text for r in second] == ["sunny"]
+    assert first[0].content == second[0].content
+    assert llm.cache.stats.as_dict()["memory_hits"] == 1
+
+
+def test_only_complete_successful_responses_are_cached():
+    failing = FakeLlm(error_code="500")
+    llm = CachedLlm(model=failing.model, inner=failing, cache=ResponseCache())
+    collect(llm, request())
+    collect(llm, request())
+    assert failing.calls == 2
+
+    streaming = FakeLlm(reply="sunny")
+    llm = CachedLlm(model=streaming.model, inner=streaming, cache=ResponseCache())
+    collect(llm, request(), stream=True)
+    replay = collect(llm, request(), stream=True)
+    assert streaming.calls == 1
+    assert [r.partial for r in replay] == [None]
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    inner = FakeLlm()
+    llm = CachedLlm(model=inner.model, inner=inner, cache=ResponseCache(ttl_seconds=60))
+
+    collect(llm, request())
+    now[0] += 59
+    collect(llm, request())
+    assert inner.calls == 1
+
+    now[0] += 2
+    collect(llm, request())
+    assert inner.calls == 2
+    assert llm.cache.stats.expirations == 1
+
+
+def test_per_model_ttl_overrides_the_cache_default(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    inner = FakeLlm()
+    llm = CachedLlm(
+        model=inner.model,
+        inner=inner,
+        cache=ResponseCache(ttl_seconds=3600),
+        ttl_seconds=10,
+    )
+
+    collect(llm, request())
+    now[0] += 11
+    collect(llm, request())
+
+    assert inner.calls == 2
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = tmp_path / "responses.sqlite3"
+    inner = FakeLlm(reply="sunny")
+    collect(
+        CachedLlm(model=inner.model, inner=inner, cache=ResponseCache(path=path)),
+        request(),
+    )
+
+    restarted = ResponseCache(path=path)
+    llm = CachedLlm(model=inner.model, inner=inner, cache=restarted)
+    responses = collect(llm, request())
+
+    assert inner.calls == 1
+    assert responses[0].content.parts[0].text == "sunny"
+    assert restarted.stats.disk_hits == 1
@@ -0,0 +1,42 @@
+from workflows.code_checks import check_source
+
+SLOW_DOCTEST = '''
+def spin():
+    """
+    >>> spin()
+    >>> 1 + 1
+    2
+    """
+    while True:
+        pass
+'''
+
+
+def _checks(findings: list[dict]) -> list[str]:
+    return [finding["check"] for finding in findings]
+
+
+def test_syntax_error_is_reported_with_its_line():
+    findings = check_source("def f(:\n    pass\n", lint=False)
+
+    assert _checks(findings) == ["syntax"]
+    assert findings[0]["line"] == 1
+
+
+def test_failing_doctest_is_reported():
+    source = (
+        'def add(a, b):\n    """\n    >>> add(1, 2)\n    4\n    """\n    return a + b\n'
+    )
+
+    findings = check_source(source, lint=False, doctests=True)
+
+    assert _checks(findings) == ["doctest"]
+    assert "1 of 1" in findings[0]["message"]
+
+
+def test_deadline_inside_a_doctest_is_a_timeout():
+    findings = check_source(
+        SLOW_DOCTEST, lint=False, doctests=True, timeout_seconds=0.2
+    )
+
+    assert _checks(findings) == ["timeout"]
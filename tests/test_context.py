@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+
+import pytest
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from workflows.context import IncrementalContext, merge_sections
+
+PLAN = (
+    "# Overview\nA weather agent.\n"
+    "# Tools\nAn MCP weather server.\n"
+    "# Errors\nRetry once.\n"
+    "# Testing\nAsk for three cities.\n"
+)
+
+
+@dataclass
+class FakeCallbackContext:
+    state: dict = field(default_factory=dict)
+    invocation_id: str = "invocation"
+    agent_name: str = "agent"
+
+
+def _context() -> IncrementalContext:
+    return IncrementalContext(
+        document_key="plan",
+        reference_key="requirements",
+        feedback_key="criticism",
+        document_context_key="plan_context",
+        reference_context_key="requirements_context",
+        max_change_ratio=0.5,
+    )
+
+
+def _response(text: str) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)])
+    )
+
+
+def _refine(context: IncrementalContext, ctx: FakeCallbackContext, reply: str) -> str:
+    """Runs one critique/refine iteration and returns the saved refiner answer."""
+    context.before_review(ctx)
+    context.after_review(ctx)
+    context.before_refine(ctx)
+    response = _response(reply)
+    context.merge_revision(ctx, response)
+    return response.content.parts[0].text
+
+
+@pytest.fixture
+def second_iteration():
+    """A context and state after one full iteration and a small plan change."""
+    context = _context()
+    ctx = FakeCallbackContext(
+        state={"plan": PLAN, "requirements": "Answer weather questions."}
+    )
+    ctx.state["plan"] = _refine(context, ctx, PLAN)
+    ctx.state["plan"] = PLAN.replace("Retry once.", "Retry twice.")
+    return context, ctx
+
+
+def test_first_iteration_keeps_the_full_answer():
+    context = _context()
+    ctx = FakeCallbackContext(state={"plan": PLAN, "requirements": "r"})
+
+    assert _refine(context, ctx, "# Tools\nOnly this.\n") == "# Tools\nOnly this.\n"
+    assert ctx.state["context_state"]["refine_mode"] == "full"
+
+
+def test_compact_fragment_is_spliced_into_the_full_plan(second_iteration):
+    context, ctx = second_iteration
+
+    saved = _refine(context, ctx, "Revised:\n# Tools\nA cached MCP weather server.\n")
+
+    assert ctx.state["context_state"]["refine_mode"] == "compact"
+    assert saved == (
+        "# Overview\nA weather agent.\n"
+        "# Tools\nA cached MCP weather server.\n"
+        "# Errors\nRetry twice.\n"
+        "# Testing\nAsk for three cities.\n"
+    )
+    assert ctx.state["context_report"]["iterations"][-1]["merged"] is True
+
+
+def test_unknown_or_renamed_sections_are_appended(second_iteration):
+    context, ctx = second_iteration
+
+    saved = _refine(context, ctx, "# Error Handling\nRetry with backoff.\n")
+
+    assert saved.startswith(PLAN.replace("Retry once.", "Retry twice."))
+    assert saved.endswith("# Error Handling\nRetry with backoff.\n")
+
+
+def test_fragment_without_sections_keeps_the_plan(second_iteration):
+    context, ctx = second_iteration
+    plan = ctx.state["plan"]
+
+    saved = _refine(context, ctx, "Looks good, I changed nothing.")
+
+    assert saved == plan
+    report = ctx.state["context_report"]
+    assert report["iterations"][-1]["merged"] is False
+    assert report["merge_failures"] == 1
+
+
+def test_large_change_falls_back_to_full_context():
+    context = _context()
+    ctx = FakeCallbackContext(state={"plan": PLAN, "requirements": "r"})
+    _refine(context, ctx, PLAN)
+    rewritten = "".join(
+        f"# Section {n}\nCompletely new text for section {n}.\n" for n in range(4)
+    )
+    ctx.state["plan"] = rewritten
+
+    saved = _refine(context, ctx, "# Tools\nOnly this.\n")
+
+    entry = ctx.state["context_report"]["iterations"][-1]
+    assert (entry["mode"], entry["reason"]) == ("full", "large_change")
+    assert ctx.state["plan_context"] == rewritten
+    assert saved == "# Tools\nOnly this.\n"
+
+
+def test_merge_sections_replaces_by_title():
+    assert merge_sections(PLAN, "no headings") is None
+    merged = merge_sections(PLAN, "# testing\nNone.\n")
+    assert merged.endswith("# testing\nNone.\n")
+    assert merged.count("Testing") == 0
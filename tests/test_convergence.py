@@ -0,0 +1,146 @@
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from workflows.convergence import (
+    ConvergenceLoopAgent,
+    document_change_ratio,
+    feedback_novelty,
+)
+
+
+class Reviser(BaseAgent):
+    """Writes the next of `versions` to state on every run."""
+
+    versions: list[str]
+    escalate_at: int = 0
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        runs = ctx.session.state.get("runs", 0) + 1
+        version = self.versions[min(runs, len(self.versions)) - 1]
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            actions=EventActions(
+                state_delta={"doc": version, "feedback": version, "runs": runs},
+                escalate=runs == self.escalate_at or None,
+            ),
+        )
+
+
+def _run(loop: ConvergenceLoopAgent) -> tuple[list[Event], dict]:
+    async def run():
+        runner = InMemoryRunner(agent=loop, app_name="test")
+        session = await runner.session_service.create_session(
+            app_name="test", user_id="user", state={"doc": ""}
+        )
+        message = types.Content(role="user", parts=[types.Part(text="go")])
+        events = [
+            event
+            async for event in runner.run_async(
+                user_id="user", session_id=session.id, new_message=message
+            )
+        ]
+        session = await runner.session_service.get_session(
+            app_name="test", user_id="user", session_id=session.id
+        )
+        return events, session.state
+
+    return asyncio.run(run())
+
+
+def _loop(versions: list[str], **settings) -> ConvergenceLoopAgent:
+    return ConvergenceLoopAgent(
+        name="loop",
+        sub_agents=[Reviser(name="reviser", versions=versions)],
+        document_key="doc",
+        **settings,
+    )
+
+
+def test_document_change_ratio():
+    assert document_change_ratio("a\nb", "a\nb") == 0.0
+    assert document_change_ratio("a\nb", "x\ny") == 1.0
+    assert document_change_ratio("a\nb\nc\nd", "a\nb\nc\nx") == pytest.approx(0.25)
+
+
+def test_feedback_novelty_ignores_bullets_case_and_spacing():
+    seen: set[str] = set()
+
+    assert feedback_novelty("- Add tests\n- Fix typo", seen) == 1.0
+    assert feedback_novelty("1. add  tests\n* New point", seen) == 0.5
+    assert feedback_novelty("", seen) == 0.0
+
+
+@pytest.mark.parametrize(
+    "arguments, reason",
+    [
+        ((1, 9.0, 0, 1.0, None), "time_budget"),
+        ((1, 0.0, 900, 1.0, None), "token_budget"),
+        ((1, 0.0, 0, 0.01, 0.0), "converged"),
+        ((2, 0.0, 0, 1.0, 0.1), "stale_feedback"),
+        ((3, 0.0, 0, 1.0, 1.0), "max_iterations"),
+        ((2, 0.0, 0, 1.0, None), None),
+    ],
+)
+def test_stop_reasons_are_checked_in_order(arguments, reason):
+    loop = _loop(
+        ["v"],
+        max_iterations=3,
+        max_seconds=5,
+        max_tokens=500,
+        min_change_ratio=0.05,
+        min_feedback_novelty=0.2,
+    )
+
+    assert loop._stop_reason(*arguments) == reason
+
+
+def test_loop_stops_once_the_document_converges():
+    events, state = _run(_loop(["one", "two", "two"], min_change_ratio=0.05))
+
+    report = state["loop_report"]
+    assert report["stop_reason"] == "converged"
+    assert report["iterations"] == 3
+    assert [entry["document_change"] for entry in report["history"]] == [1, 1, 0]
+    # The final event only records the report; the document stays in state.
+    assert events[-1].content is None
+    assert events[-1].actions.escalate
+    assert state["doc"] == "two"
+
+
+def test_loop_stops_on_stale_feedback():
+    loop = ConvergenceLoopAgent(
+        name="loop",
+        sub_agents=[Reviser(name="reviser", versions=["a\nb", "a\nb\nc", "b\nc"])],
+        document_key="doc",
+        feedback_key="feedback",
+        min_feedback_novelty=0.5,
+    )
+
+    _, state = _run(loop)
+
+    assert state["loop_report"]["stop_reason"] == "stale_feedback"
+    assert state["loop_report"]["iterations"] == 2
+
+
+def test_escalating_sub_agent_ends_the_loop():
+    loop = ConvergenceLoopAgent(
+        name="loop",
+        sub_agents=[Reviser(name="reviser", versions=["a", "b", "c"], escalate_at=2)],
+        document_key="doc",
+        max_iterations=5,
+    )
+
+    _, state = _run(loop)
+
+    assert state["loop_report"]["stop_reason"] == "escalated_by:reviser"
+    assert state["loop_report"]["iterations"] == 2
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from google.adk.events import Event, EventActions
+
+from sessions.diff_session_service import DiffSessionService
+
+
+def _plan(version: int) -> str:
+    return "".join(
+        f"Step {line}: {'revised' if line == version else 'draft'}\n"
+        for line in range(40)
+    )
+
+
+async def _append(service: DiffSessionService, session, **state_delta) -> None:
+    await service.append_event(
+        session,
+        Event(
+            author="agent",
+            invocation_id="invocation",
+            actions=EventActions(state_delta=state_delta),
+        ),
+    )
+
+
+async def _get(service: DiffSessionService, session):
+    return await service.get_session(
+        app_name=session.app_name, user_id=session.user_id, session_id=session.id
+    )
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "sessions.sqlite3"
+
+
+def test_state_round_trips_through_diffs_and_snapshots(path):
+    async def run():
+        service = DiffSessionService(path, snapshot_interval=3, max_snapshots=2)
+        session = await service.create_session(
+            app_name="app", user_id="user", state={"request": "plan it"}
+        )
+        for version in range(10):
+            await _append(
+                service, session, plan=_plan(version), iteration=version, temp_x=1
+            )
+        cached = await _get(service, session)
+        # A second service on the same file rebuilds the state from storage.
+        reopened = await _get(DiffSessionService(path), session)
+        return cached, reopened
+
+    cached, reopened = asyncio.run(run())
+
+    expected = {"request": "plan it", "plan": _plan(9), "iteration": 9, "temp_x": 1}
+    assert cached.state == expected
+    assert reopened.state == expected
+    assert len(reopened.events) == 10
+
+
+def test_history_is_bounded_by_max_snapshots(path):
+    async def run():
+        service = DiffSessionService(path, snapshot_interval=2, max_snapshots=2)
+        session = await service.create_session(app_name="app", user_id="user")
+        for version in range(20):
+            await _append(service, session, plan=_plan(version))
+        return service.storage_stats(), await _get(DiffSessionService(path), session)
+
+    stats, reopened = asyncio.run(run())
+
+    assert stats["snapshots_rows"] == 2
+    assert stats["state_changes_rows"] == 2
+    assert reopened.state["plan"] == _plan(19)
+
+
+def test_shared_state_is_stored_per_app_and_user_and_temp_is_dropped(path):
+    async def run():
+        service = DiffSessionService(path)
+        first = await service.create_session(
+            app_name="app", user_id="user", state={"app:theme": "dark"}
+        )
+        await _append(service, first, **{"user:name": "Sam", "temp:scratch": "x"})
+        second = await service.create_session(app_name="app", user_id="user")
+        other_user = await service.create_session(app_name="app", user_id="other")
+        return (
+            await _get(service, first),
+            await _get(service, second),
+            await _get(service, other_user),
+        )
+
+    first, second, other_user = asyncio.run(run())
+
+    assert first.state == {"app:theme": "dark", "user:name": "Sam"}
+    assert second.state == {"app:theme": "dark", "user:name": "Sam"}
+    assert other_user.state == {"app:theme": "dark"}
+
+
+def test_large_event_deltas_are_restored_from_the_kept_history(path):
+    async def run():
+        service = DiffSessionService(
+            path, snapshot_interval=3, max_snapshots=2, inline_delta_bytes=100
+        )
+        session = await service.create_session(app_name="app", user_id="user")
+        for version in range(12):
+            await _append(service, session, plan=_plan(version))
+        return await _get(DiffSessionService(path), session)
+
+    session = asyncio.run(run())
+
+    deltas = [event.actions.state_delta["plan"] for event in session.events]
+    # Snapshots are kept at versions 9 and 12: later events are restored,
+    # earlier ones keep their reference.
+    assert deltas[8:] == [_plan(version) for version in range(8, 12)]
+    assert all("__state_ref__" in delta for delta in deltas[:8])
+
+
+def test_create_get_and_delete(path):
+    async def run():
+        service = DiffSessionService(path)
+        session = await service.create_session(
+            app_name="app", user_id="user", session_id="s1"
+        )
+        with pytest.raises(ValueError):
+            await service.create_session(
+                app_name="app", user_id="user", session_id="s1"
+            )
+        listed = await service.list_sessions(app_name="app", user_id="user")
+        await service.delete_session(app_name="app", user_id="user", session_id="s1")
+        return session, listed, await _get(service, session)
+
+    session, listed, deleted = asyncio.run(run())
+
+    assert [s.id for s in listed.sessions] == [session.id]
+    assert deleted is None
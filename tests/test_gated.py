@@ -0,0 +1,229 @@
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent, SequentialAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from workflows.gated import (
+    FINGERPRINTS_KEY,
+    Gate,
+    GatedSequentialAgent,
+    count_model_agents,
+    gate_stats,
+    state_fingerprint,
+)
+
+
+class Stage(BaseAgent):
+    """Writes "<name> output" to `output_key` and counts its runs in state."""
+
+    output_key: Optional[str] = None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        runs_key = f"{self.name}_runs"
+        delta = {runs_key: ctx.session.state.get(runs_key, 0) + 1}
+        if self.output_key:
+            delta[self.output_key] = f"{self.name} output"
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            content=types.Content(role="model", parts=[types.Part(text=self.name)]),
+            actions=EventActions(state_delta=delta),
+        )
+
+
+class Session:
+    """Runs an agent repeatedly in one in-memory session."""
+
+    def __init__(self, agent: BaseAgent, **state):
+        self.runner = InMemoryRunner(agent=agent, app_name="test")
+        self.session = asyncio.run(
+            self.runner.session_service.create_session(
+                app_name="test", user_id="user", state=state
+            )
+        )
+
+    def run(self, text: str = "go") -> list[Event]:
+        async def run():
+            message = types.Content(role="user", parts=[types.Part(text=text)])
+            return [
+                event
+                async for event in self.runner.run_async(
+                    user_id="user", session_id=self.session.id, new_message=message
+                )
+            ]
+
+        return asyncio.run(run())
+
+    def update(self, **state) -> None:
+        asyncio.run(
+            self.runner.session_service.append_event(
+                self.session,
+                Event(author="user", actions=EventActions(state_delta=state)),
+            )
+        )
+
+    @property
+    def state(self) -> dict:
+        return asyncio.run(
+            self.runner.session_service.get_session(
+                app_name="test", user_id="user", session_id=self.session.id
+            )
+        ).state
+
+
+def _authors(events: list[Event]) -> list[str]:
+    return [event.author for event in events if event.content]
+
+
+def _decisions(events: list[Event]) -> list[tuple[str, str]]:
+    return [
+        (
+            event.custom_metadata["gate"]["stage"],
+            event.custom_metadata["gate"]["action"],
+        )
+        for event in events
+        if event.custom_metadata and "gate" in event.custom_metadata
+    ]
+
+
+def test_state_fingerprint():
+    state = {"a": {"x": 1, "y": 2}, "b": "text"}
+
+    assert state_fingerprint(state, ("a", "b")) == state_fingerprint(
+        {"b": "text", "a": {"y": 2, "x": 1}}, ("a", "b")
+    )
+    assert state_fingerprint(state, ("a",)) != state_fingerprint(state, ("a", "b"))
+    assert state_fingerprint(state, ("a",), "hi") != state_fingerprint(state, ("a",))
+
+
+def test_count_model_agents():
+    tree = SequentialAgent(
+        name="tree",
+        sub_agents=[
+            LlmAgent(name="first", model="fake-model"),
+            Stage(name="plain"),
+            SequentialAgent(
+                name="inner", sub_agents=[LlmAgent(name="second", model="fake-model")]
+            ),
+        ],
+    )
+
+    assert count_model_agents(tree) == 2
+
+
+def test_skipped_stage_writes_its_stand_in_answer():
+    agent = GatedSequentialAgent(
+        name="skip_pipeline",
+        sub_agents=[Stage(name="draft", output_key="draft"), Stage(name="review")],
+        gates={
+            "draft": Gate(
+                skip_if=lambda state: state.get("cached"),
+                skip_output=lambda state: "cached draft",
+                reason="cached",
+            )
+        },
+        report_key="gates",
+    )
+    session = Session(agent, cached=True)
+
+    events = session.run()
+
+    assert _authors(events) == ["skip_pipeline", "review"]
+    assert events[0].content.parts[0].text == "cached draft"
+    assert events[0].custom_metadata["gate"] == {
+        "stage": "draft",
+        "action": "skipped",
+        "reason": "cached",
+    }
+    state = session.state
+    assert state["draft"] == "cached draft"
+    assert "draft_runs" not in state
+    assert state["gates"] == {"draft": {"action": "skipped", "reason": "cached"}}
+
+
+def test_stop_gate_ends_the_pipeline_and_counts_saved_calls():
+    agent = GatedSequentialAgent(
+        name="stop_pipeline",
+        sub_agents=[
+            Stage(name="draft"),
+            LlmAgent(name="review", model="fake-model"),
+            LlmAgent(name="refactor", model="fake-model"),
+        ],
+        gates={"review": Gate(stop_if=lambda state: True, reason="nothing to do")},
+    )
+
+    events = Session(agent).run()
+
+    assert _authors(events) == ["draft"]
+    assert events[-1].custom_metadata["gate"]["action"] == "stopped"
+    stats = gate_stats()["stop_pipeline"]
+    assert stats["stages"] == {"review": {"stopped": 1}}
+    assert stats["model_calls_saved"] == 2
+
+
+def test_branch_runs_another_sub_agent_in_place_of_the_stage():
+    agent = GatedSequentialAgent(
+        name="branch_pipeline",
+        sub_agents=[Stage(name="full"), Stage(name="quick"), Stage(name="finish")],
+        gates={
+            "full": Gate(
+                branch=lambda state: "quick" if state.get("small") else None,
+                branches=("quick",),
+            )
+        },
+    )
+
+    events = Session(agent, small=True).run()
+    assert _authors(events) == ["quick", "finish"]
+    assert _decisions(events) == [("full", "branched")]
+    # A branch target never runs as a stage of its own.
+    assert _authors(Session(agent, small=False).run()) == ["full", "finish"]
+
+
+def test_unchanged_stage_is_skipped_until_its_inputs_change():
+    agent = GatedSequentialAgent(
+        name="unchanged_pipeline",
+        sub_agents=[
+            Stage(name="plan", output_key="plan"),
+            Stage(name="code", output_key="code"),
+        ],
+        gates={
+            "plan": Gate(unchanged=("request",)),
+            "code": Gate(unchanged=("plan",)),
+        },
+    )
+    session = Session(agent, request="weather agent")
+
+    assert _authors(session.run()) == ["plan", "code"]
+    assert set(session.state[FINGERPRINTS_KEY]) == {"plan", "code"}
+    events = session.run()
+    assert _authors(events) == []
+    assert _decisions(events) == [("plan", "skipped"), ("code", "skipped")]
+    assert _authors(session.run("another message")) == ["plan", "code"]
+
+    session.update(request="news agent")
+    # "code" reads an unchanged plan, but its fingerprint was dropped when
+    # "plan" ran again.
+    assert _authors(session.run("another message")) == ["plan", "code"]
+    assert (session.state["plan_runs"], session.state["code_runs"]) == (3, 3)
+
+
+def test_unfinished_stage_is_not_skipped():
+    agent = GatedSequentialAgent(
+        name="unfinished_pipeline",
+        sub_agents=[Stage(name="plan", output_key="plan")],
+        gates={"plan": Gate(unchanged=("request",), done_key="plan_done")},
+    )
+    session = Session(agent, request="weather agent")
+
+    session.run()
+
+    # The stage never set `done_key`, so the next run repeats it.
+    assert session.state["plan_done"] is None
+    assert _authors(session.run()) == ["plan"]
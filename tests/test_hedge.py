@@ -0,0 +1,80 @@
+import time
+
+import pytest
+from fakes import FakeLlm, collect, request
+
+from llm.hedge import HedgedLlm, HedgeStats
+
+
+def _hedged(primary: FakeLlm, secondary: FakeLlm) -> HedgedLlm:
+    return HedgedLlm(
+        model=primary.model,
+        primary=primary,
+        secondary=secondary,
+        stats=HedgeStats(initial_delay_ms=20, measure_rate=0),
+    )
+
+
+def test_delay_follows_the_primary_latency_percentile():
+    stats = HedgeStats(percentile=90, initial_delay_ms=2000, min_delay_ms=100)
+    assert stats.delay_seconds() == 2.0
+
+    for latency_ms in range(10, 210, 10):
+        stats.record_primary(latency_ms)
+    assert stats.delay_seconds() == pytest.approx(0.19)
+
+    fast = HedgeStats(min_delay_ms=100)
+    fast.record_primary(5, weight=20)
+    assert fast.delay_seconds() == pytest.approx(0.1)
+
+
+def test_budget_caps_the_share_of_hedged_requests():
+    stats = HedgeStats(max_rate=0.25)
+
+    for _ in range(100):
+        stats.start()
+        stats.try_hedge(prompt_tokens=10)
+
+    # One initial credit plus 0.25 per request.
+    assert stats.hedged == 26
+    assert stats.budget_exhausted == 74
+    assert stats.extra_prompt_tokens == 260
+    assert stats.as_dict()["hedge_rate"] == 0.26
+
+
+def test_slow_primary_is_beaten_by_the_secondary():
+    primary = FakeLlm(reply="primary", delay=1.0)
+    secondary = FakeLlm(model="other-model", reply="secondary")
+    llm = _hedged(primary, secondary)
+
+    started = time.perf_counter()
+    responses = collect(llm, request())
+
+    assert time.perf_counter() - started < 0.5
+    assert [r.content.parts[0].text for r in responses] == ["secondary"]
+    stats = llm.stats.as_dict()
+    assert (stats["hedged"], stats["secondary_wins"]) == (1, 1)
+
+
+def test_fast_primary_is_not_hedged():
+    primary = FakeLlm(reply="primary")
+    secondary = FakeLlm(model="other-model", reply="secondary")
+    llm = _hedged(primary, secondary)
+
+    responses = collect(llm, request())
+
+    assert [r.content.parts[0].text for r in responses] == ["primary"]
+    assert secondary.calls == 0
+    assert llm.stats.hedged == 0
+
+
+def test_primary_failing_after_the_hedge_leaves_the_race_to_the_secondary():
+    primary = FakeLlm(delay=0.1, error_code="500")
+    secondary = FakeLlm(model="other-model", reply="secondary", delay=0.2)
+    llm = _hedged(primary, secondary)
+
+    responses = collect(llm, request())
+
+    assert [r.content.parts[0].text for r in responses] == ["secondary"]
+    assert responses[0].error_code is None
+    assert llm.stats.secondary_wins == 1
@@ -0,0 +1,156 @@
+import asyncio
+import time
+
+import pytest
+from fakes import FakeLlm, RateLimitError, collect, request
+
+from llm import limiter
+from llm.limiter import (
+    AdaptiveConcurrency,
+    Priority,
+    ProviderLimiter,
+    RateLimitedLlm,
+    TokenBucket,
+    estimate_request_tokens,
+    is_rate_limited,
+    provider_of,
+)
+
+
+class HttpError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(status_code)
+        self.status_code = status_code
+
+
+def test_provider_of():
+    assert provider_of("gemini-2.0-flash") == "gemini"
+    assert provider_of("openai/gpt-4o") == "openai"
+    assert provider_of("gpt-4o") == "gpt-4o"
+
+
+def test_estimate_request_tokens():
+    assert estimate_request_tokens(request("x" * 400), output_tokens=512) == 612
+    assert estimate_request_tokens(request("x" * 400, max_output_tokens=50), 512) == 150
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(RateLimitError())
+    assert is_rate_limited(HttpError(429))
+    assert not is_rate_limited(HttpError(500))
+    assert not is_rate_limited(ValueError())
+
+
+def test_token_bucket_refills_per_minute():
+    bucket = TokenBucket(per_minute=60)
+    now = time.monotonic()
+
+    bucket.take(60, now)
+
+    assert bucket.wait_time(30, now) == pytest.approx(30, abs=0.1)
+    assert bucket.wait_time(1, now + 1) == 0.0
+    # Amounts over the capacity only wait for a full bucket.
+    assert bucket.wait_time(600, now + 1) == pytest.approx(59, abs=0.1)
+    bucket.give(1000)
+    assert bucket.level == 60
+
+
+def test_concurrency_grows_additively_and_halves_once_per_cooldown():
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, latency_tolerance=0)
+
+    concurrency.on_success(0.1, now=0.0)
+    assert concurrency.limit == pytest.approx(4.25)
+
+    concurrency.on_throttle(now=10.0)
+    concurrency.on_throttle(now=10.5)
+    assert concurrency.limit == pytest.approx(2.125)
+
+    for now in (12.0, 14.0, 16.0):
+        concurrency.on_throttle(now)
+    assert concurrency.limit == 1
+    assert concurrency.slots == 1
+    assert concurrency.decreases == {"throttled": 4}
+
+
+def test_concurrency_backs_off_when_latency_rises():
+    concurrency = AdaptiveConcurrency(initial=10, latency_tolerance=3.0)
+    for now in range(20):
+        concurrency.on_success(0.1, now=float(now))
+    grown = concurrency.limit
+
+    for now in range(20, 30):
+        concurrency.on_success(1.0, now=float(now) * 10)
+
+    assert concurrency.limit < grown
+    assert concurrency.decreases["latency"] >= 1
+
+
+def test_waiting_requests_are_admitted_in_priority_order():
+    async def run():
+        provider = ProviderLimiter(
+            "fake-model", concurrency=AdaptiveConcurrency(initial=1, maximum=1)
+        )
+        await provider.acquire(1, Priority.INTERACTIVE)
+        admitted = []
+
+        async def acquire(name: str, priority: Priority) -> None:
+            await provider.acquire(1, priority)
+            admitted.append(name)
+
+        tasks = [
+            asyncio.create_task(acquire("batch", Priority.BATCH)),
+            asyncio.create_task(acquire("interactive", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        depth = provider.queue_depth()
+        for _ in tasks:
+            provider.release(1, None, 0.01, throttled=False)
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        return depth, admitted, provider
+
+    depth, admitted, provider = asyncio.run(run())
+
+    assert depth == {"interactive": 1, "batch": 1}
+    assert admitted == ["interactive", "batch"]
+    assert provider.in_flight == 1
+
+
+def test_token_budget_is_corrected_with_reported_usage():
+    async def run():
+        provider = ProviderLimiter("fake-model", tpm=600)
+        await provider.acquire(600, Priority.INTERACTIVE)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(provider.acquire(100, Priority.INTERACTIVE), 0.05)
+        provider.release(600, 200, 0.01, throttled=False)
+        await asyncio.wait_for(provider.acquire(100, Priority.INTERACTIVE), 0.05)
+
+    asyncio.run(run())
+
+
+def test_rate_limited_requests_are_retried(monkeypatch):
+    monkeypatch.setattr(limiter.random, "uniform", lambda a, b: 0.0)
+    inner = FakeLlm(reply="sunny", rate_limited=2)
+    provider = ProviderLimiter("fake-model")
+    llm = RateLimitedLlm(model=inner.model, inner=inner, limiter=provider)
+
+    responses = collect(llm, request())
+
+    assert [r.content.parts[0].text for r in responses] == ["sunny"]
+    assert inner.calls == 3
+    assert (provider.throttled, provider.retries, provider.in_flight) == (2, 2, 0)
+
+
+def test_retries_are_bounded(monkeypatch):
+    monkeypatch.setattr(limiter.random, "uniform", lambda a, b: 0.0)
+    inner = FakeLlm(rate_limited=5)
+    provider = ProviderLimiter("fake-model")
+    llm = RateLimitedLlm(
+        model=inner.model, inner=inner, limiter=provider, max_retries=1
+    )
+
+    with pytest.raises(RateLimitError):
+        collect(llm, request())
+
+    assert inner.calls == 2
+    assert provider.in_flight == 0
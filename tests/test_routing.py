@@ -0,0 +1,53 @@
+import pytest
+
+from workflows.routing import FAREWELL, GREETING, OTHER, FastPathRouter
+
+
+@pytest.fixture
+def router() -> FastPathRouter:
+    return FastPathRouter(
+        handlers={
+            GREETING: lambda intent: f"Hello, {intent.name or 'there'}!",
+            FAREWELL: lambda intent: "Goodbye!",
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "text, reply",
+    [
+        ("hello", "Hello, there!"),
+        ("hey there!", "Hello, there!"),
+        ("hi, my name is sam", "Hello, Sam!"),
+        ("ok thanks, bye", "Goodbye!"),
+    ],
+)
+def test_trivial_turns_are_answered_locally(router, text, reply):
+    assert router.route(text) == reply
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "hi I'm hungry",
+        "hello I am stuck",
+        "hi it's raining in London",
+        "what's the weather in Tokyo",
+    ],
+)
+def test_other_turns_go_to_the_agent(router, text):
+    intent = router.classify(text)
+    assert intent.name is None
+    assert router.route(text) is None
+
+
+def test_stats_count_routed_and_fallback_turns(router):
+    router.route("hello")
+    router.route("what's the weather in Tokyo")
+
+    assert router.stats.as_dict()["routed"] == {GREETING: 1}
+    assert router.stats.fallbacks == 1
+    assert (
+        router.classify("tell me a story about dragons and knights please").label
+        == OTHER
+    )
@@ -0,0 +1,117 @@
+import asyncio
+
+from tools.search_provider import SearchBackend, SearchProvider, query_key, query_terms
+
+
+class FakeBackend(SearchBackend):
+    """Answers every query with one result after `delay` seconds."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.queries: list[str] = []
+
+    async def search(self, query: str, num_results: int) -> dict:
+        self.queries.append(query)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return {"status": "error", "error_message": "unavailable"}
+        return {
+            "status": "success",
+            "results": [{"title": query, "url": "https://example.com", "snippet": ""}],
+        }
+
+
+def _search(provider: SearchProvider, *queries: str) -> list[dict]:
+    async def run():
+        return [await provider.search(query) for query in queries]
+
+    return asyncio.run(run())
+
+
+def test_query_terms_normalize_case_stopwords_and_plurals():
+    assert query_terms("How to use MCP Servers?") == {"mcp", "server"}
+    assert query_terms("class address news") == {"class", "address", "new"}
+    assert query_terms("what is it") == {"what", "is", "it"}
+    assert query_key(query_terms("servers mcp")) == "mcp server"
+
+
+def test_different_wordings_share_one_backend_call():
+    backend = FakeBackend()
+    provider = SearchProvider(backend)
+
+    first, second = _search(provider, "How to use MCP servers?", "mcp server")
+
+    assert backend.queries == ["How to use MCP servers?"]
+    assert "cached_query" not in first
+    assert second["cached_query"] == "How to use MCP servers?"
+    assert second["results"] == first["results"]
+    assert provider.stats.exact_hits == 1
+
+
+def test_near_duplicates_are_answered_above_the_threshold():
+    backend = FakeBackend()
+    provider = SearchProvider(backend, near_duplicate_threshold=0.8)
+
+    _search(
+        provider,
+        "python mcp server weather tutorial",
+        # Five of six terms in common: 0.83.
+        "python mcp server weather tutorial example",
+        # Two of four terms in common: 0.5.
+        "mcp server news",
+    )
+
+    assert backend.queries == [
+        "python mcp server weather tutorial",
+        "mcp server news",
+    ]
+    assert provider.stats.near_hits == 1
+
+
+def test_threshold_of_one_disables_near_duplicates():
+    backend = FakeBackend()
+    provider = SearchProvider(backend, near_duplicate_threshold=1)
+
+    _search(provider, "mcp server weather tutorial", "mcp server weather tutorials x")
+
+    assert len(backend.queries) == 2
+
+
+def test_errors_are_not_cached():
+    backend = FakeBackend(fail=True)
+    provider = SearchProvider(backend)
+
+    responses = _search(provider, "mcp server", "mcp server")
+
+    assert [response["status"] for response in responses] == ["error", "error"]
+    assert len(backend.queries) == 2
+    assert provider.stats.backend_errors == 2
+    assert _search(provider, "?")[0]["error_message"] == "The search query is empty."
+
+
+def test_concurrent_searches_are_coalesced():
+    backend = FakeBackend(delay=0.05)
+    provider = SearchProvider(backend)
+
+    async def run():
+        return await asyncio.gather(*(provider.search("mcp server") for _ in range(5)))
+
+    responses = asyncio.run(run())
+
+    assert len(backend.queries) == 1
+    assert all(response["status"] == "success" for response in responses)
+    assert provider.stats.coalesced == 4
+
+
+def test_prefetch_warms_the_cache():
+    backend = FakeBackend()
+    provider = SearchProvider(backend)
+
+    sent = asyncio.run(provider.prefetch(["mcp server", "MCP servers", "adk agents"]))
+    _search(provider, "mcp server", "adk agent")
+
+    assert sent == 2
+    assert len(backend.queries) == 2
+    assert provider.stats.exact_hits == 2
+    assert provider.stats.searches == 2
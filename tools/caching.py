@@ -0,0 +1,132 @@
+"""Caching helpers shared by tools that call external services.
+
+`TTLCache` is a bounded LRU whose entries expire after a time-to-live.
+`RequestCoalescer` lets concurrent coroutines asking for the same key share a
+single in-flight lookup instead of each calling the backend.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class CacheStats:
+    """Counters for a `TTLCache` and the lookups coalesced in front of it."""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "hit_rate": round(self.hit_rate, 4)}
+
+
+class TTLCache(Generic[T]):
+    """Bounded LRU mapping whose entries expire `ttl_seconds` after being set."""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float]):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: OrderedDict[Hashable, tuple[T, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: T, ttl_seconds: Optional[float] = None) -> None:
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def keys(self) -> list[Hashable]:
+        """Returns the keys of the unexpired entries, without counting lookups."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                key
+                for key, (_, expires_at) in self._entries.items()
+                if expires_at is None or expires_at > now
+            ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RequestCoalescer:
+    """Shares one in-flight lookup among concurrent callers with the same key.
+
+    In-flight lookups are tracked per event loop, so one instance can be used
+    from several loops (e.g. one per worker thread).
+    """
+
+    def __init__(self):
+        self._inflight: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[Hashable, asyncio.Future]
+        ] = weakref.WeakKeyDictionary()
+
+    async def run(
+        self, key: Hashable, load: Callable[[], Awaitable[Any]]
+    ) -> tuple[Any, bool]:
+        """Awaits `load()` unless a lookup for `key` is already in flight.
+
+        Returns:
+            tuple[Any, bool]: The result and whether it came from another
+                caller's in-flight lookup.
+        """
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        future = inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = asyncio.ensure_future(load())
+        inflight[key] = future
+        try:
+            return await asyncio.shield(future), False
+        finally:
+            if future.done() and inflight.get(key) is future:
+                del inflight[key]
+            elif not future.done():
+                # The first caller was cancelled; drop the entry when the
+                # shared lookup finishes.
+                future.add_done_callback(
+                    lambda done: (
+                        inflight.pop(key, None) if inflight.get(key) is done else None
+                    )
+                )
@@ -18,6 +18,3 @@ def say_goodbye() -> str:
     """Provides a simple farewell message to conclude the conversation."""
     print(f"--- Tool: say_goodbye called ---")
     return "Goodbye! Have a great day."
-
-
-print("Greeting and Farewell tools defined.")
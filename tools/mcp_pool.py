@@ -0,0 +1,557 @@
+"""Warm process pool for MCP stdio servers.
+
+`MCPToolset` spawns its server (e.g. `npx -y @modelcontextprotocol/server-...`),
+performs the MCP handshake and lists the tools again for every toolset
+instance, so the first tool call of a session waits for all of that.
+`MCPServerPool` keeps `size` handshaken server processes per distinct
+`StdioServerParameters` and leases one per tool call; while every warm process
+is leased, extra ones are started up to `max_size`. The tool listing is
+fetched once and reused for `tool_list_ttl_seconds`. Idle processes are
+pinged every `health_check_seconds`; dead, unresponsive, worn (`max_uses`) or
+old (`max_age_seconds`) processes are replaced, and a process whose call fails
+at the transport level is replaced instead of being leased again.
+
+`PooledMCPToolset` is a drop-in replacement for `MCPToolset` with stdio
+connection parameters. Pools are kept per event loop, because MCP sessions
+cannot be shared across loops; `close_mcp_pools` shuts down those of the
+running loop.
+"""
+
+import asyncio
+import logging
+import sys
+import time
+import weakref
+from collections import Counter, deque
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import AsyncIterator, Optional, TextIO, Union
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import BaseTool, ToolContext
+from google.adk.tools.base_toolset import BaseToolset, ToolPredicate
+from google.adk.tools.openapi_tool.openapi_spec_parser.rest_api_tool import (
+    to_gemini_schema,
+)
+from google.genai import types
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import Tool as McpTool
+
+from config import get_settings
+from tools.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_TIMEOUT = 408
+
+
+def server_label(params: StdioServerParameters) -> str:
+    """Returns a readable name for a server configuration."""
+    return " ".join([params.command, *params.args])
+
+
+class _Worker:
+    """One MCP server process and its client session.
+
+    The session is entered and exited in a dedicated task, because the stdio
+    transport's cancel scopes must be left by the task that entered them.
+    """
+
+    def __init__(self, params: StdioServerParameters, errlog: TextIO):
+        self.params = params
+        self.errlog = errlog
+        self.session: Optional[ClientSession] = None
+        self.started_at = time.monotonic()
+        self.uses = 0
+        self._ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self._task.done()
+
+    async def start(self, timeout_seconds: float) -> None:
+        self._task = asyncio.create_task(self._serve())
+        try:
+            await asyncio.wait_for(asyncio.shield(self._ready), timeout_seconds)
+        except BaseException:
+            await self.stop()
+            raise
+        self.started_at = time.monotonic()
+
+    async def _serve(self) -> None:
+        try:
+            async with stdio_client(self.params, errlog=self.errlog) as streams:
+                async with ClientSession(*streams) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set_result(None)
+                    await self._stop.wait()
+        except Exception as e:
+            if not self._ready.done():
+                self._ready.set_exception(e)
+            else:
+                logger.debug("MCP server %s exited", server_label(self.params))
+        finally:
+            self.session = None
+            if not self._ready.done():
+                self._ready.cancel()
+
+    async def ping(self, timeout_seconds: float) -> bool:
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout_seconds)
+        except Exception:
+            return False
+        return True
+
+    async def stop(self, timeout_seconds: float = 5) -> None:
+        self._stop.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self._task.cancel()
+            with suppress(BaseException):
+                await self._task
+
+
+@dataclass
+class PoolStats:
+    """Counters and latencies of an `MCPServerPool`."""
+
+    spawned: int = 0
+    spawn_failures: int = 0
+    leases: int = 0
+    waited_leases: int = 0
+    recycled: Counter = field(default_factory=Counter)
+    health_checks: int = 0
+    tool_list_hits: int = 0
+    tool_list_misses: int = 0
+    spawn_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    lease_wait_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def as_dict(self) -> dict:
+        spawn_ms, lease_wait_ms = list(self.spawn_ms), list(self.lease_wait_ms)
+        return {
+            "spawned": self.spawned,
+            "spawn_failures": self.spawn_failures,
+            "leases": self.leases,
+            "waited_leases": self.waited_leases,
+            "recycled": dict(self.recycled),
+            "health_checks": self.health_checks,
+            "tool_list_hits": self.tool_list_hits,
+            "tool_list_misses": self.tool_list_misses,
+            "spawn_ms": {
+                "p50": percentile(spawn_ms, 50),
+                "p95": percentile(spawn_ms, 95),
+            },
+            "lease_wait_ms": {
+                "p50": percentile(lease_wait_ms, 50),
+                "p95": percentile(lease_wait_ms, 95),
+            },
+        }
+
+
+class MCPServerPool:
+    """Warm, handshaken processes of one MCP stdio server.
+
+    Attributes:
+        params: How to start the server.
+        size: Processes kept warm.
+        max_size: Most processes while every warm one is leased.
+        start_timeout_seconds: Time allowed for spawn and handshake.
+        call_timeout_seconds: Time allowed for one request on a leased session.
+        health_check_seconds: Interval between pings of idle processes.
+        max_uses: Leases after which a process is replaced.
+        max_age_seconds: Age after which an idle process is replaced.
+        tool_list_ttl_seconds: How long the tool listing is reused.
+    """
+
+    def __init__(
+        self,
+        params: StdioServerParameters,
+        size: int = 2,
+        max_size: int = 4,
+        start_timeout_seconds: float = 60,
+        call_timeout_seconds: float = 120,
+        health_check_seconds: float = 30,
+        max_uses: Optional[int] = 1000,
+        max_age_seconds: Optional[float] = 3600,
+        tool_list_ttl_seconds: Optional[float] = 300,
+        errlog: TextIO = sys.stderr,
+    ):
+        self.params = params
+        self.size = size
+        self.max_size = max(max_size, size, 1)
+        self.start_timeout_seconds = start_timeout_seconds
+        self.call_timeout_seconds = call_timeout_seconds
+        self.health_check_seconds = health_check_seconds
+        self.max_uses = max_uses
+        self.max_age_seconds = max_age_seconds
+        self.tool_list_ttl_seconds = tool_list_ttl_seconds
+        self.errlog = errlog
+        self.stats = PoolStats()
+        self._workers: set[_Worker] = set()
+        self._idle: deque[_Worker] = deque()
+        self._starting = 0
+        self._changed = asyncio.Condition()
+        self._tools: Optional[list[McpTool]] = None
+        self._tools_at = 0.0
+        self._tools_lock = asyncio.Lock()
+        self._maintenance: Optional[asyncio.Task] = None
+        self._background: set[asyncio.Task] = set()
+        self._closed = False
+
+    def start(self) -> None:
+        """Starts warming up `size` processes and the health checks."""
+        if self._maintenance is None and not self._closed:
+            self._maintenance = asyncio.create_task(self._maintain())
+
+    async def warm_up(self) -> int:
+        """Starts the pool and waits until its warm processes have started.
+
+        Returns:
+            int: The number of running processes.
+        """
+        self.start()
+        await self._top_up()
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._starting)
+        return len(self._workers)
+
+    def _in_background(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _spawn(self) -> Optional[_Worker]:
+        """Starts a process; the caller has already counted it in `_starting`."""
+        started = time.perf_counter()
+        worker = _Worker(self.params, self.errlog)
+        try:
+            await worker.start(self.start_timeout_seconds)
+        except Exception as e:
+            self.stats.spawn_failures += 1
+            logger.warning(
+                "Could not start MCP server %s: %s", server_label(self.params), e
+            )
+            return None
+        finally:
+            self._starting -= 1
+        self.stats.spawned += 1
+        self.stats.spawn_ms.append((time.perf_counter() - started) * 1000)
+        if self._closed:
+            await worker.stop()
+            return None
+        self._workers.add(worker)
+        return worker
+
+    async def _top_up(self) -> None:
+        missing = self.size - len(self._workers) - self._starting
+        if missing <= 0 or self._closed:
+            return
+        self._starting += missing
+        workers = await asyncio.gather(*(self._spawn() for _ in range(missing)))
+        async with self._changed:
+            self._idle.extend(worker for worker in workers if worker is not None)
+            # Waiters also wake up when a spawn failed, to try one themselves.
+            self._changed.notify_all()
+
+    def _retire(self, worker: _Worker, reason: str) -> None:
+        self._workers.discard(worker)
+        self.stats.recycled[reason] += 1
+        self._in_background(worker.stop())
+
+    def _worn_out(self, worker: _Worker) -> Optional[str]:
+        if not worker.alive:
+            return "dead"
+        if self.max_uses and worker.uses >= self.max_uses:
+            return "max_uses"
+        if (
+            self.max_age_seconds
+            and time.monotonic() - worker.started_at > self.max_age_seconds
+        ):
+            return "max_age"
+        return None
+
+    async def _acquire(self) -> _Worker:
+        self.start()
+        started = time.perf_counter()
+        waited = False
+        async with self._changed:
+            while True:
+                if self._closed:
+                    raise RuntimeError("The MCP server pool is closed.")
+                while self._idle:
+                    worker = self._idle.popleft()
+                    reason = self._worn_out(worker)
+                    if reason:
+                        self._retire(worker, reason)
+                        self._in_background(self._top_up())
+                        continue
+                    self.stats.leases += 1
+                    self.stats.waited_leases += waited
+                    self.stats.lease_wait_ms.append(
+                        (time.perf_counter() - started) * 1000
+                    )
+                    return worker
+                # Wait for processes that are already starting before adding more.
+                if not self._starting and len(self._workers) < self.max_size:
+                    self._starting += 1
+                    break
+                waited = True
+                await self._changed.wait()
+
+        worker = await self._spawn()
+        if worker is None:
+            async with self._changed:
+                self._changed.notify_all()
+            raise RuntimeError(
+                f"Could not start MCP server '{server_label(self.params)}'."
+            )
+        self.stats.leases += 1
+        self.stats.waited_leases += 1
+        self.stats.lease_wait_ms.append((time.perf_counter() - started) * 1000)
+        return worker
+
+    async def _release(self, worker: _Worker, broken: bool) -> None:
+        worker.uses += 1
+        async with self._changed:
+            if broken or self._closed or not worker.alive:
+                self._retire(worker, "failed" if broken else "dead")
+                if not self._closed:
+                    self._in_background(self._top_up())
+            else:
+                self._idle.append(worker)
+            self._changed.notify()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[ClientSession]:
+        """Lends a warm server's session for the duration of the block.
+
+        A process whose request fails at the transport level or times out is
+        replaced rather than returned to the pool.
+        """
+        worker = await self._acquire()
+        broken = False
+        try:
+            yield worker.session
+        except McpError as e:
+            broken = e.error.code == _REQUEST_TIMEOUT
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            broken = True
+            raise
+        finally:
+            await asyncio.shield(self._release(worker, broken))
+
+    async def list_tools(self) -> list[McpTool]:
+        """Returns the server's tools, from the cached listing when fresh."""
+
+        def fresh() -> bool:
+            return self._tools is not None and (
+                self.tool_list_ttl_seconds is None
+                or time.monotonic() - self._tools_at < self.tool_list_ttl_seconds
+            )
+
+        if fresh():
+            self.stats.tool_list_hits += 1
+            return self._tools
+        async with self._tools_lock:
+            if fresh():
+                self.stats.tool_list_hits += 1
+                return self._tools
+            self.stats.tool_list_misses += 1
+            async with self.lease() as session:
+                result = await session.list_tools()
+            self._tools, self._tools_at = result.tools, time.monotonic()
+            return self._tools
+
+    async def call_tool(self, name: str, arguments: Optional[dict] = None):
+        """Calls a tool on a leased server process."""
+        async with self.lease() as session:
+            return await session.call_tool(
+                name,
+                arguments=arguments,
+                read_timeout_seconds=timedelta(seconds=self.call_timeout_seconds),
+            )
+
+    async def _health_check(self) -> None:
+        idle = list(self._idle)
+        healthy = await asyncio.gather(
+            *(worker.ping(min(self.health_check_seconds, 10)) for worker in idle)
+        )
+        self.stats.health_checks += len(idle)
+        async with self._changed:
+            for worker, ok in zip(idle, healthy):
+                reason = "unhealthy" if not ok else self._worn_out(worker)
+                if reason and worker in self._idle:
+                    self._idle.remove(worker)
+                    self._retire(worker, reason)
+            # Processes started for a burst are stopped once they sit idle.
+            while len(self._idle) > self.size and len(self._workers) > self.size:
+                self._retire(self._idle.popleft(), "surplus")
+
+    async def _maintain(self) -> None:
+        while not self._closed:
+            try:
+                await self._top_up()
+                await asyncio.sleep(self.health_check_seconds)
+                await self._health_check()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("MCP pool maintenance failed", exc_info=True)
+
+    async def close(self) -> None:
+        """Stops every process; leases that are in use end with their block."""
+        self._closed = True
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._maintenance
+        async with self._changed:
+            workers = list(self._workers)
+            self._workers.clear()
+            self._idle.clear()
+            self._changed.notify_all()
+        await asyncio.gather(
+            *(worker.stop() for worker in workers),
+            *self._background,
+            return_exceptions=True,
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "server": server_label(self.params),
+            "processes": len(self._workers),
+            "idle": len(self._idle),
+            "starting": self._starting,
+            **self.stats.as_dict(),
+        }
+
+
+_pools: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, MCPServerPool]
+] = weakref.WeakKeyDictionary()
+
+
+def get_mcp_pool(
+    params: StdioServerParameters, errlog: TextIO = sys.stderr
+) -> MCPServerPool:
+    """
+    Get the running event loop's pool for a server configuration.
+
+    Args:
+        params (StdioServerParameters): How to start the server.
+        errlog (TextIO): Receives the servers' stderr.
+
+    Returns:
+        MCPServerPool: The pool, created and started from settings on first use.
+    """
+    pools = _pools.setdefault(asyncio.get_running_loop(), {})
+    key = params.model_dump_json()
+    pool = pools.get(key)
+    if pool is None:
+        settings = get_settings()
+        pool = pools[key] = MCPServerPool(
+            params,
+            size=settings.MCP_POOL_SIZE,
+            max_size=settings.MCP_POOL_MAX_SIZE,
+            start_timeout_seconds=settings.MCP_POOL_START_TIMEOUT_SECONDS,
+            call_timeout_seconds=settings.MCP_POOL_CALL_TIMEOUT_SECONDS,
+            health_check_seconds=settings.MCP_POOL_HEALTH_CHECK_SECONDS,
+            max_uses=settings.MCP_POOL_MAX_USES,
+            max_age_seconds=settings.MCP_POOL_MAX_AGE_SECONDS,
+            tool_list_ttl_seconds=settings.MCP_TOOL_LIST_TTL_SECONDS,
+            errlog=errlog,
+        )
+        pool.start()
+    return pool
+
+
+async def close_mcp_pools(params: Optional[StdioServerParameters] = None) -> None:
+    """Closes the running loop's pools, or only the one for `params`."""
+    pools = _pools.get(asyncio.get_running_loop(), {})
+    keys = [params.model_dump_json()] if params is not None else list(pools)
+    closing = [pools.pop(key) for key in keys if key in pools]
+    await asyncio.gather(*(pool.close() for pool in closing))
+
+
+def mcp_pool_stats() -> list[dict]:
+    """Returns the state and statistics of every open pool."""
+    return [
+        pool.as_dict() for pools in list(_pools.values()) for pool in pools.values()
+    ]
+
+
+class PooledMCPTool(BaseTool):
+    """An MCP tool whose calls run on a leased process of an `MCPServerPool`."""
+
+    def __init__(self, mcp_tool: McpTool, pool: MCPServerPool):
+        super().__init__(name=mcp_tool.name, description=mcp_tool.description or "")
+        self._mcp_tool = mcp_tool
+        self._pool = pool
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=to_gemini_schema(self._mcp_tool.inputSchema),
+        )
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        return await self._pool.call_tool(self.name, args)
+
+
+class PooledMCPToolset(BaseToolset):
+    """Drop-in replacement for `MCPToolset` backed by a shared `MCPServerPool`.
+
+    Toolsets with equal connection parameters share one pool per event loop.
+    """
+
+    def __init__(
+        self,
+        *,
+        connection_params: StdioServerParameters,
+        tool_filter: Optional[Union[ToolPredicate, list[str]]] = None,
+        errlog: TextIO = sys.stderr,
+    ):
+        self._connection_params = connection_params
+        self.tool_filter = tool_filter
+        self._errlog = errlog
+        self._listing: Optional[list[McpTool]] = None
+        self._tools: list[PooledMCPTool] = []
+
+    def _is_selected(
+        self, tool: BaseTool, readonly_context: Optional[ReadonlyContext]
+    ) -> bool:
+        if self.tool_filter is None:
+            return True
+        if isinstance(self.tool_filter, ToolPredicate):
+            return self.tool_filter(tool, readonly_context)
+        return tool.name in self.tool_filter
+
+    async def get_tools(
+        self, readonly_context: Optional[ReadonlyContext] = None
+    ) -> list[BaseTool]:
+        pool = get_mcp_pool(self._connection_params, self._errlog)
+        listing = await pool.list_tools()
+        if listing is not self._listing:
+            self._listing = listing
+            self._tools = [PooledMCPTool(tool, pool) for tool in listing]
+        return [
+            tool for tool in self._tools if self._is_selected(tool, readonly_context)
+        ]
+
+    async def close(self) -> None:
+        await close_mcp_pools(self._connection_params)
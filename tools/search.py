@@ -0,0 +1,19 @@
+# @title Define the search_web Tool
+from tools.search_provider import get_search_provider
+
+
+async def search_web(query: str) -> dict:
+    """Searches the web with Google and returns the top results.
+
+    Args:
+        query (str): What to search for (e.g., "MCP server for GitHub issues").
+
+    Returns:
+        dict: A dictionary containing the search results.
+              Includes a 'status' key ('success' or 'error').
+              If 'success', includes a 'results' key with a list of results,
+              each with 'title', 'url' and 'snippet'.
+              If 'error', includes an 'error_message' key.
+    """
+    print(f"--- Tool: search_web called for query: {query} ---")
+    return await get_search_provider().search(query)
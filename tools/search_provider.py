@@ -0,0 +1,381 @@
+"""Web search behind a shared, deduplicating cache.
+
+`SearchProvider` normalizes queries to their sorted set of significant terms
+("How to use MCP servers?" and "mcp server use" share one key), serves
+repeated queries from a TTL cache shared by every agent and session in the
+process, answers near-duplicates (term overlap at or above a threshold) from
+the closest cached query, and coalesces concurrent searches for the same key
+into one backend call. `prefetch` warms the cache with likely queries in
+parallel. `SearchStats` counts exact and near-duplicate hits and the backend
+latency they saved.
+
+`HttpSearchBackend` calls the Custom Search JSON API,
+`GET {SEARCH_API_BASE}/customsearch/v1?key=...&cx=...&q=<query>&num=<n>`, with
+a pooled `httpx.AsyncClient`; `benchmarks.search_server` is a local stand-in
+for it.
+"""
+
+import asyncio
+import logging
+import re
+import time
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
+from config import get_settings
+from tools.caching import RequestCoalescer, TTLCache
+
+logger = logging.getLogger(__name__)
+
+_TERM_RE = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    """a about an and any are as at be best by can do does for from how i in is it
+    of on or should that the their this to use using what when where which with""".split()
+)
+
+
+def query_terms(query: str) -> frozenset[str]:
+    """Returns the significant terms of a query, lower-cased and singularized.
+
+    Stopwords are dropped unless the query consists only of stopwords.
+    """
+    words = _TERM_RE.findall(query.casefold())
+    terms = [word for word in words if word not in STOPWORDS] or words
+    return frozenset(
+        term[:-1] if len(term) > 3 and term.endswith("s") and term[-2] != "s" else term
+        for term in terms
+    )
+
+
+def query_key(terms: frozenset[str]) -> str:
+    """Returns the cache key of a set of query terms."""
+    return " ".join(sorted(terms))
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b)
+
+
+class SearchBackend(ABC):
+    """Source of web search results."""
+
+    @abstractmethod
+    async def search(self, query: str, num_results: int) -> dict:
+        """Returns a dict with 'status' and 'results' or 'error_message'.
+
+        Each result is a dict with 'title', 'url' and 'snippet'.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpSearchBackend(SearchBackend):
+    """Calls the Custom Search JSON API through a pooled async client.
+
+    One client (and connection pool) is kept per event loop, because httpx
+    connections cannot be shared across loops.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        engine_id: Optional[str] = None,
+        timeout_seconds: float = 10.0,
+        max_connections: int = 10,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.engine_id = engine_id
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def search(self, query: str, num_results: int) -> dict:
+        params = {"q": query, "num": min(num_results, 10)}
+        if self.api_key:
+            params["key"] = self.api_key
+        if self.engine_id:
+            params["cx"] = self.engine_id
+        try:
+            response = await self.client().get("/customsearch/v1", params=params)
+        except httpx.HTTPError as e:
+            logger.warning("Search for %r failed: %s", query, e)
+            return {
+                "status": "error",
+                "error_message": "The search service is unavailable.",
+            }
+        if response.is_error:
+            return {
+                "status": "error",
+                "error_message": f"The search service failed ({response.status_code}).",
+            }
+        return {
+            "status": "success",
+            "results": [
+                {
+                    "title": item.get("title", ""),
+                    "url": item.get("link", ""),
+                    "snippet": item.get("snippet", ""),
+                }
+                for item in response.json().get("items", [])
+            ],
+        }
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+@dataclass
+class SearchStats:
+    """Counters of a `SearchProvider`.
+
+    `saved_ms` adds up, for every hit and coalesced search, how long the
+    backend took to produce the results that were reused.
+    """
+
+    searches: int = 0
+    exact_hits: int = 0
+    near_hits: int = 0
+    coalesced: int = 0
+    backend_calls: int = 0
+    backend_errors: int = 0
+    prefetched: int = 0
+    backend_ms: float = 0.0
+    saved_ms: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.exact_hits + self.near_hits + self.coalesced
+        return hits / self.searches if self.searches else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "searches": self.searches,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hit_rate, 4),
+            "backend_calls": self.backend_calls,
+            "backend_errors": self.backend_errors,
+            "prefetched": self.prefetched,
+            "backend_ms": round(self.backend_ms, 1),
+            "saved_ms": round(self.saved_ms, 1),
+        }
+
+
+@dataclass(frozen=True)
+class _Entry:
+    query: str
+    results: list[dict]
+    fetch_ms: float
+
+
+class SearchProvider:
+    """Cached, deduplicating, coalescing front of a `SearchBackend`.
+
+    Only successful searches are cached; errors are retried on the next search.
+
+    Attributes:
+        backend: Source of results.
+        num_results: Results requested per search.
+        near_duplicate_threshold: Term overlap (Jaccard) at which a cached
+            query answers another one; 1 only reuses identical term sets.
+    """
+
+    def __init__(
+        self,
+        backend: SearchBackend,
+        num_results: int = 5,
+        ttl_seconds: Optional[float] = 3600,
+        max_entries: int = 2048,
+        near_duplicate_threshold: float = 0.8,
+    ):
+        self.backend = backend
+        self.num_results = num_results
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.stats = SearchStats()
+        self.cache: TTLCache[_Entry] = TTLCache(max_entries, ttl_seconds)
+        self._coalescer = RequestCoalescer()
+        # Term index of the cached keys, for near-duplicate lookups. Keys of
+        # evicted or expired entries are dropped when they are next probed.
+        self._terms: dict[str, frozenset[str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        self._background: set[asyncio.Task] = set()
+
+    def _index(self, key: str, terms: frozenset[str]) -> None:
+        if key in self._terms:
+            return
+        if len(self._terms) >= 2 * self.cache.max_entries:
+            self._prune()
+        self._terms[key] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(key)
+
+    def _unindex(self, key: str) -> None:
+        for term in self._terms.pop(key, ()):
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+
+    def _prune(self) -> None:
+        live = set(self.cache.keys())
+        for key in [key for key in self._terms if key not in live]:
+            self._unindex(key)
+
+    def _near_duplicate(self, terms: frozenset[str]) -> Optional[_Entry]:
+        if self.near_duplicate_threshold >= 1:
+            return None
+        candidates = set().union(*(self._postings.get(term, ()) for term in terms))
+        scored = sorted(
+            (
+                (_jaccard(terms, self._terms[key]), key)
+                for key in candidates
+                if key in self._terms
+            ),
+            reverse=True,
+        )
+        for score, key in scored:
+            if score < self.near_duplicate_threshold:
+                break
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry
+            self._unindex(key)
+        return None
+
+    async def _fetch(self, key: str, terms: frozenset[str], query: str) -> dict:
+        async def load() -> tuple[dict, float]:
+            started = time.perf_counter()
+            response = await self.backend.search(query, self.num_results)
+            fetch_ms = (time.perf_counter() - started) * 1000
+            self.stats.backend_calls += 1
+            self.stats.backend_ms += fetch_ms
+            if response.get("status") == "success":
+                self.cache.set(key, _Entry(query, response["results"], fetch_ms))
+                self._index(key, terms)
+            else:
+                self.stats.backend_errors += 1
+            return response, fetch_ms
+
+        (response, fetch_ms), coalesced = await self._coalescer.run(key, load)
+        if coalesced:
+            self.stats.coalesced += 1
+            self.stats.saved_ms += fetch_ms
+        return response
+
+    async def search(self, query: str) -> dict:
+        """Searches the web, from the cache when possible.
+
+        Returns:
+            dict: 'status', 'query' and 'results' (or 'error_message'); when the
+            results were cached for a different wording, 'cached_query' holds it.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return {"status": "error", "error_message": "The search query is empty."}
+        self.stats.searches += 1
+        key = query_key(terms)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.stats.exact_hits += 1
+        else:
+            entry = self._near_duplicate(terms)
+            if entry is not None:
+                self.stats.near_hits += 1
+        if entry is None:
+            response = await self._fetch(key, terms, query)
+            return {"query": query, **response}
+
+        self.stats.saved_ms += entry.fetch_ms
+        response = {"status": "success", "query": query, "results": entry.results}
+        if entry.query != query:
+            response["cached_query"] = entry.query
+        return response
+
+    async def prefetch(self, queries: list[str]) -> int:
+        """Fetches the queries that are not cached yet, concurrently.
+
+        Prefetches are not counted as searches; later searches they answer
+        count as hits.
+
+        Returns:
+            int: The number of queries sent to the backend.
+        """
+        pending = {}
+        for query in queries:
+            terms = query_terms(query)
+            key = query_key(terms)
+            if key and key not in pending and self.cache.get(key) is None:
+                pending[key] = (terms, query)
+        await asyncio.gather(
+            *(self._fetch(key, terms, query) for key, (terms, query) in pending.items())
+        )
+        self.stats.prefetched += len(pending)
+        return len(pending)
+
+    def prefetch_in_background(self, queries: list[str]) -> asyncio.Task:
+        """Starts `prefetch` without waiting for it; failures are only logged."""
+        task = asyncio.get_running_loop().create_task(self.prefetch(queries))
+        self._background.add(task)
+
+        def done(finished: asyncio.Task) -> None:
+            self._background.discard(finished)
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.warning("Search prefetch failed: %s", finished.exception())
+
+        task.add_done_callback(done)
+        return task
+
+
+@lru_cache()
+def get_search_provider() -> SearchProvider:
+    """
+    Get the process-wide search provider configured from settings.
+
+    Returns:
+        SearchProvider: The shared provider.
+    """
+    settings = get_settings()
+    backend = HttpSearchBackend(
+        settings.SEARCH_API_BASE,
+        api_key=settings.SEARCH_API_KEY,
+        engine_id=settings.SEARCH_ENGINE_ID,
+        timeout_seconds=settings.SEARCH_HTTP_TIMEOUT_SECONDS,
+        max_connections=settings.SEARCH_HTTP_MAX_CONNECTIONS,
+    )
+    return SearchProvider(
+        backend,
+        num_results=settings.SEARCH_RESULTS,
+        ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+        max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+        near_duplicate_threshold=settings.SEARCH_NEAR_DUPLICATE_THRESHOLD,
+    )
@@ -0,0 +1,15 @@
+"""Statistics helpers shared by the runtime metrics."""
+
+from typing import Optional
+
+
+def percentile(values: list[float], q: float) -> Optional[float]:
+    """Returns the nearest-rank `q`-th percentile (0-100) of `values`.
+
+    Returns:
+        Optional[float]: The percentile, or None when `values` is empty.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
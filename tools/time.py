@@ -1,5 +1,19 @@
 import datetime
-from zoneinfo import ZoneInfo
+
+from tools.timezones import get_timezone_index, get_zone
+
+
+def _time_report(city: str, now: datetime.datetime) -> dict:
+    match = get_timezone_index().lookup(city)
+    if match is None:
+        return {
+            "status": "error",
+            "error_message": (f"Sorry, I don't have timezone information for {city}."),
+        }
+
+    local = now.astimezone(get_zone(match.zone))
+    report = f'The current time in {match.name} is {local.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
+    return {"status": "success", "report": report}
 
 
 def get_current_time(city: str) -> dict:
@@ -11,16 +25,24 @@ def get_current_time(city: str) -> dict:
     Returns:
         dict: status and result or error msg.
     """
+    return _time_report(city, datetime.datetime.now(datetime.timezone.utc))
 
-    if city.lower() == "new york":
-        tz_identifier = "America/New_York"
-    else:
-        return {
-            "status": "error",
-            "error_message": (f"Sorry, I don't have timezone information for {city}."),
-        }
 
-    tz = ZoneInfo(tz_identifier)
-    now = datetime.datetime.now(tz)
-    report = f'The current time in {city} is {now.strftime("%Y-%m-%d %H:%M:%S %Z%z")}'
-    return {"status": "success", "report": report}
+def get_current_time_many(cities: list[str]) -> dict:
+    """Returns the current time in several cities in one call.
+
+    Use this instead of calling 'get_current_time' once per city when the user
+    asks about more than one city.
+
+    Args:
+        cities (list[str]): The names of the cities (e.g., ["London", "Tokyo"]).
+
+    Returns:
+        dict: status ('success' if at least one city was found, otherwise
+              'error') and 'reports', mapping each requested city to the same
+              result as 'get_current_time'.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    reports = {city: _time_report(city, now) for city in cities}
+    found = any(report["status"] == "success" for report in reports.values())
+    return {"status": "success" if found else "error", "reports": reports}
@@ -0,0 +1,166 @@
+"""City to IANA time zone lookup.
+
+`TimezoneIndex` maps normalized city names to zones. The shared index is built
+on first use from `tools/data/cities.tsv` plus the city part of every zone in
+`zoneinfo.available_timezones()` ("America/New_York" -> "New York"), so
+importing this module costs nothing.
+
+A lookup tries, in order: the exact normalized name, the shortest indexed name
+starting with the query, and a close spelling among names with the same first
+letter. Each step is a dict lookup, a binary search over the sorted names or a
+`difflib` comparison against one bucket, which keeps lookups well under a
+millisecond with thousands of names.
+"""
+
+import difflib
+import unicodedata
+import zoneinfo
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+GAZETTEER_PATH = Path(__file__).parent / "data" / "cities.tsv"
+
+# Areas of current zone names. Legacy aliases such as "US/Eastern" or
+# "Canada/Atlantic" are still resolvable by full name but do not add cities.
+ZONE_AREAS = frozenset(
+    {
+        "Africa",
+        "America",
+        "Antarctica",
+        "Asia",
+        "Atlantic",
+        "Europe",
+        "Indian",
+        "Pacific",
+    }
+)
+
+# Queries shorter than this only match exactly; "la" should not mean "Lagos".
+MIN_PREFIX_LENGTH = 3
+FUZZY_CUTOFF = 0.8
+
+
+def normalize_name(name: str) -> str:
+    """Returns the index key of a city name, e.g. "São Paulo" -> "saopaulo"."""
+    decomposed = unicodedata.normalize("NFKD", name.casefold())
+    return "".join(char for char in decomposed if char.isalnum())
+
+
+def zone_city(zone: str) -> str:
+    """Returns the city part of a zone name, e.g. "America/St_Johns" -> "St Johns"."""
+    return zone.rsplit("/", 1)[-1].replace("_", " ")
+
+
+@dataclass(frozen=True)
+class CityMatch:
+    """A resolved city.
+
+    Attributes:
+        name: The indexed display name, e.g. "New York".
+        zone: The IANA zone, e.g. "America/New_York".
+        match: How the query matched: "exact", "prefix" or "fuzzy".
+    """
+
+    name: str
+    zone: str
+    match: str
+
+
+class TimezoneIndex:
+    """Lookup of IANA zones by city name."""
+
+    def __init__(self, entries: Iterable[tuple[str, str]]):
+        """
+        Args:
+            entries (Iterable[tuple[str, str]]): (city name, zone) pairs. For
+                names that normalize to the same key, the first pair wins.
+        """
+        self._entries: dict[str, tuple[str, str]] = {}
+        for name, zone in entries:
+            self._entries.setdefault(normalize_name(name), (name, zone))
+        self._keys = sorted(self._entries)
+        self._buckets: dict[str, list[str]] = defaultdict(list)
+        for key in self._keys:
+            self._buckets[key[0]].append(key)
+
+    @classmethod
+    def load(cls, path: Path = GAZETTEER_PATH) -> "TimezoneIndex":
+        """Builds the index from a gazetteer file and the installed zone names."""
+        entries = []
+        with path.open(encoding="utf-8") as file:
+            for line in file:
+                if line.strip() and not line.startswith("#"):
+                    name, zone = line.rstrip("\n").split("\t")
+                    entries.append((name, zone))
+        zones = sorted(zoneinfo.available_timezones())
+        entries.extend(
+            (zone_city(zone), zone)
+            for zone in zones
+            if zone.split("/", 1)[0] in ZONE_AREAS
+        )
+        entries.extend((zone, zone) for zone in zones)
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, city: str) -> Optional[CityMatch]:
+        """Resolves a city name (or a zone name) to its zone.
+
+        A trailing qualifier such as ", USA" is ignored if the full name is
+        not found.
+
+        Returns:
+            Optional[CityMatch]: The match, or None if nothing is close enough.
+        """
+        key = normalize_name(city)
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry is not None:
+            return CityMatch(*entry, match="exact")
+        if "," in city:
+            match = self.lookup(city.split(",", 1)[0])
+            if match is not None:
+                return match
+        return self._approximate(key)
+
+    def _approximate(self, key: str) -> Optional[CityMatch]:
+        if len(key) >= MIN_PREFIX_LENGTH:
+            start = bisect_left(self._keys, key)
+            best = None
+            for candidate in self._keys[start:]:
+                if not candidate.startswith(key):
+                    break
+                if best is None or len(candidate) < len(best):
+                    best = candidate
+            if best is not None:
+                return CityMatch(*self._entries[best], match="prefix")
+
+        close = difflib.get_close_matches(
+            key, self._buckets.get(key[0], ()), n=1, cutoff=FUZZY_CUTOFF
+        )
+        if close:
+            return CityMatch(*self._entries[close[0]], match="fuzzy")
+        return None
+
+
+@lru_cache()
+def get_timezone_index() -> TimezoneIndex:
+    """
+    Get the process-wide city index, building it on first use.
+
+    Returns:
+        TimezoneIndex: The shared index.
+    """
+    return TimezoneIndex.load()
+
+
+@lru_cache(maxsize=None)
+def get_zone(zone: str) -> zoneinfo.ZoneInfo:
+    """Returns a cached `ZoneInfo` for an IANA zone name."""
+    return zoneinfo.ZoneInfo(zone)
@@ -1,5 +1,8 @@
 # @title Define the get_weather Tool
-def get_weather(city: str) -> dict:
+from tools.weather_provider import get_weather_provider
+
+
+async def get_weather(city: str) -> dict:
     """Retrieves the current weather report for a specified city.
 
     Args:
@@ -12,28 +15,25 @@ def get_weather(city: str) -> dict:
               If 'error', includes an 'error_message' key.
     """
     print(f"--- Tool: get_weather called for city: {city} ---")  # Log tool execution
-    city_normalized = city.lower().replace(" ", "")  # Basic normalization
-
-    # Mock weather data
-    mock_weather_db = {
-        "newyork": {
-            "status": "success",
-            "report": "The weather in New York is sunny with a temperature of 25°C.",
-        },
-        "london": {
-            "status": "success",
-            "report": "It's cloudy in London with a temperature of 15°C.",
-        },
-        "tokyo": {
-            "status": "success",
-            "report": "Tokyo is experiencing light rain and a temperature of 18°C.",
-        },
-    }
-
-    if city_normalized in mock_weather_db:
-        return mock_weather_db[city_normalized]
-    else:
-        return {
-            "status": "error",
-            "error_message": f"Sorry, I don't have weather information for '{city}'.",
-        }
+    return await get_weather_provider().get(city)
+
+
+async def get_weather_many(cities: list[str]) -> dict:
+    """Retrieves the current weather reports for several cities in one call.
+
+    Use this instead of calling 'get_weather' once per city when the user asks
+    about more than one city.
+
+    Args:
+        cities (list[str]): The names of the cities (e.g., ["London", "Tokyo"]).
+
+    Returns:
+        dict: A dictionary with a 'status' key ('success' if at least one city
+              was found, otherwise 'error') and a 'reports' key mapping each
+              requested city to its weather information, which has the same
+              shape as the result of 'get_weather'.
+    """
+    print(f"--- Tool: get_weather_many called for cities: {cities} ---")
+    reports = await get_weather_provider().get_many(cities)
+    found = any(report["status"] == "success" for report in reports.values())
+    return {"status": "success" if found else "error", "reports": reports}
@@ -0,0 +1,206 @@
+"""Weather lookups behind a pluggable backend.
+
+`WeatherProvider` normalizes city names, serves repeated lookups from a TTL
+cache and coalesces concurrent lookups of the same city into one backend call.
+Two backends are available, selected with `WEATHER_BACKEND`:
+
+* `MockWeatherBackend` answers from a fixed table (the default).
+* `HttpWeatherBackend` calls `GET {WEATHER_API_BASE}/weather?city=<name>` with
+  a pooled `httpx.AsyncClient`; the endpoint returns
+  `{"city": ..., "condition": ..., "temperature_c": ...}` or a 404.
+  `benchmarks.weather_server` is a local stand-in for it.
+"""
+
+import asyncio
+import logging
+import weakref
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
+from config import WeatherBackendType, get_settings
+from tools.caching import CacheStats, RequestCoalescer, TTLCache
+
+logger = logging.getLogger(__name__)
+
+MOCK_WEATHER = {
+    "newyork": {
+        "status": "success",
+        "report": "The weather in New York is sunny with a temperature of 25°C.",
+    },
+    "london": {
+        "status": "success",
+        "report": "It's cloudy in London with a temperature of 15°C.",
+    },
+    "tokyo": {
+        "status": "success",
+        "report": "Tokyo is experiencing light rain and a temperature of 18°C.",
+    },
+}
+
+
+def normalize_city(city: str) -> str:
+    """Returns the cache and lookup key for a city name, e.g. "New York" -> "newyork"."""
+    return "".join(city.lower().split())
+
+
+def not_found(city: str) -> dict:
+    return {
+        "status": "error",
+        "error_message": f"Sorry, I don't have weather information for '{city}'.",
+    }
+
+
+class WeatherBackend(ABC):
+    """Source of weather reports."""
+
+    @abstractmethod
+    async def fetch(self, city: str) -> dict:
+        """Returns a report dict with 'status' and 'report' or 'error_message'."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MockWeatherBackend(WeatherBackend):
+    """Answers from `MOCK_WEATHER`."""
+
+    async def fetch(self, city: str) -> dict:
+        return MOCK_WEATHER.get(normalize_city(city)) or not_found(city)
+
+
+class HttpWeatherBackend(WeatherBackend):
+    """Calls a weather HTTP API through a pooled async client.
+
+    One client (and connection pool) is kept per event loop, because httpx
+    connections cannot be shared across loops.
+    """
+
+    def __init__(
+        self, base_url: str, timeout_seconds: float = 5.0, max_connections: int = 20
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._clients[loop] = client
+        return client
+
+    async def fetch(self, city: str) -> dict:
+        try:
+            response = await self.client().get("/weather", params={"city": city})
+        except httpx.HTTPError as e:
+            logger.warning("Weather lookup for %s failed: %s", city, e)
+            return {
+                "status": "error",
+                "error_message": f"The weather service is unavailable for '{city}'.",
+            }
+        if response.status_code == 404:
+            return not_found(city)
+        if response.is_error:
+            return {
+                "status": "error",
+                "error_message": f"The weather service failed for '{city}' ({response.status_code}).",
+            }
+        data = response.json()
+        return {
+            "status": "success",
+            "report": (
+                f"The weather in {data.get('city', city)} is {data['condition']} "
+                f"with a temperature of {data['temperature_c']:g}°C."
+            ),
+        }
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+class WeatherProvider:
+    """Cached, coalescing front of a `WeatherBackend`.
+
+    Only successful reports are cached; errors are retried on the next lookup.
+    """
+
+    def __init__(
+        self,
+        backend: WeatherBackend,
+        ttl_seconds: Optional[float] = 600,
+        max_entries: int = 1024,
+    ):
+        self.backend = backend
+        self.cache: TTLCache[dict] = TTLCache(max_entries, ttl_seconds)
+        self._coalescer = RequestCoalescer()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.cache.stats
+
+    async def get(self, city: str) -> dict:
+        key = normalize_city(city)
+        if not key:
+            return not_found(city)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def load() -> dict:
+            report = await self.backend.fetch(city)
+            if report.get("status") == "success":
+                self.cache.set(key, report)
+            return report
+
+        report, coalesced = await self._coalescer.run(key, load)
+        if coalesced:
+            self.cache.stats.coalesced += 1
+        return report
+
+    async def get_many(self, cities: list[str]) -> dict[str, dict]:
+        """Looks up several cities concurrently; duplicates are fetched once."""
+        reports = await asyncio.gather(*(self.get(city) for city in cities))
+        return dict(zip(cities, reports))
+
+
+@lru_cache()
+def get_weather_provider() -> WeatherProvider:
+    """
+    Get the process-wide weather provider configured from settings.
+
+    Returns:
+        WeatherProvider: The shared provider.
+    """
+    settings = get_settings()
+    if settings.WEATHER_BACKEND == WeatherBackendType.HTTP:
+        if not settings.WEATHER_API_BASE:
+            raise ValueError("WEATHER_API_BASE is required when WEATHER_BACKEND=http.")
+        backend = HttpWeatherBackend(
+            settings.WEATHER_API_BASE,
+            timeout_seconds=settings.WEATHER_HTTP_TIMEOUT_SECONDS,
+            max_connections=settings.WEATHER_HTTP_MAX_CONNECTIONS,
+        )
+    else:
+        backend = MockWeatherBackend()
+    return WeatherProvider(
+        backend,
+        ttl_seconds=settings.WEATHER_CACHE_TTL_SECONDS,
+        max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+    )
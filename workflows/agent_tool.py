@@ -0,0 +1,41 @@
+"""`AgentTool` that answers with a state key its agent wrote.
+
+ADK's `AgentTool` returns the text of the last event of the wrapped agent's
+run. Workflow agents such as `ConvergenceLoopAgent` end with a bookkeeping
+event, and repeating their document in it would add a second copy to the
+session history. `StateResultAgentTool` instead returns the value the run
+wrote to `result_key`, and falls back to the last event's text when the run
+did not write it (e.g. a gated pipeline that stopped early).
+"""
+
+from typing import Any
+
+from google.adk.tools.agent_tool import AgentTool
+from google.adk.tools.tool_context import ToolContext
+
+from sessions.artifacts import resolve
+
+
+class StateResultAgentTool(AgentTool):
+    """An `AgentTool` whose result is the agent's `result_key` state value.
+
+    Args:
+        agent: The agent to run.
+        result_key: State key holding the run's result.
+    """
+
+    def __init__(self, agent, result_key: str, skip_summarization: bool = False):
+        super().__init__(agent=agent, skip_summarization=skip_summarization)
+        self.result_key = result_key
+
+    async def run_async(
+        self, *, args: dict[str, Any], tool_context: ToolContext
+    ) -> Any:
+        result = await super().run_async(args=args, tool_context=tool_context)
+        # The tool context is new per call, so its delta holds only this run's
+        # state changes.
+        if self.result_key in tool_context.actions.state_delta:
+            value = resolve(tool_context.actions.state_delta[self.result_key])
+            if value:
+                return str(value)
+        return result
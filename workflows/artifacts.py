@@ -0,0 +1,63 @@
+"""Agents whose outputs live in the artifact store instead of session state.
+
+`ArtifactOutputAgent` is an `LlmAgent` that saves its answer to
+`output_key` as an artifact reference (see `sessions.artifacts`), so state and
+the event's state delta carry a short reference instead of the document.
+Agents that read such a key build their instruction with `state_instruction`,
+which resolves the references a template uses when the instruction is
+rendered. `output_agent_class` and `state_instruction` fall back to plain
+ADK behavior when `ARTIFACT_STORE_ENABLED` is off.
+"""
+
+from typing import Any, AsyncGenerator, Callable, Union
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event
+
+from config import get_settings
+from sessions.artifacts import get_artifact_store, render_template
+
+
+class ArtifactOutputAgent(LlmAgent):
+    """An `LlmAgent` that saves its `output_key` value as an artifact reference."""
+
+    def state_value(self, text: Any) -> Any:
+        """Returns what is written to state for the answer `text`."""
+        return get_artifact_store().reference(text)
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        async for event in super()._run_async_impl(ctx):
+            delta = event.actions.state_delta
+            if self.output_key and self.output_key in delta:
+                delta[self.output_key] = self.state_value(delta[self.output_key])
+            yield event
+
+
+def output_agent_class() -> type[LlmAgent]:
+    """Returns the agent class for agents whose output may be an artifact."""
+    if get_settings().ARTIFACT_STORE_ENABLED:
+        return ArtifactOutputAgent
+    return LlmAgent
+
+
+def state_instruction(template: str) -> Union[str, Callable[[ReadonlyContext], str]]:
+    """Returns an instruction that resolves artifact references in `template`.
+
+    Args:
+        template (str): Instruction with ADK `{key}` placeholders.
+
+    Returns:
+        The template itself when the artifact store is disabled, otherwise an
+        instruction provider that renders it from session state.
+    """
+    if not get_settings().ARTIFACT_STORE_ENABLED:
+        return template
+
+    def instruction(context: ReadonlyContext) -> str:
+        return render_template(template, context.state)
+
+    return instruction
@@ -0,0 +1,291 @@
+"""Concurrent code drafts scored locally, of which the best one goes on.
+
+`CodeCandidatesAgent` is a `ParallelAgent` over code writer agents, each with
+its own `output_key` and branch. Every draft is checked in the static check
+pool as soon as it arrives (`workflows.static_check.check_code`: parsing,
+compiling, pyflakes and optionally doctests) and ranked by its errors, then
+its warnings, then its arrival. The run ends when
+
+* a draft has no findings at all and `accept_clean` is set ("clean"),
+* `budget_seconds` have passed and at least one draft was scored ("budget";
+  without one it waits for the first), or
+* every writer has finished ("all_finished").
+
+Writers still running are then cancelled. The selected draft is written to
+`output_key` and repeated as this agent's answer, so later stages see the
+same conversation as after a single writer: the drafts themselves are kept in
+state only, without their content in the event log. A writer that fails is
+recorded and ignored unless every writer fails. With `check_key` and
+`findings_key` set, the selected draft's check is written like
+`StaticCheckAgent` does, so the pipeline does not need to check it again.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Optional
+
+from google.adk.agents import ParallelAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import PrivateAttr
+
+from sessions.artifacts import resolve
+from workflows.code_checks import Finding
+from workflows.static_check import check_code, check_report, format_findings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Candidate:
+    """One writer's draft and its check.
+
+    Attributes:
+        agent: Name of the writer agent.
+        value: The draft's state value (text or artifact reference).
+        finished_ms: When the draft arrived, since the run started.
+        findings: Check findings; None until the draft is scored.
+        check_ms: How long the check took.
+        error: Why the writer failed, if it did.
+    """
+
+    agent: str
+    value: Any = None
+    finished_ms: Optional[float] = None
+    findings: Optional[list[Finding]] = None
+    check_ms: float = 0.0
+    error: Optional[str] = None
+
+    def count(self, severity: str) -> int:
+        return sum(finding.severity == severity for finding in self.findings or [])
+
+    def rank(self) -> tuple:
+        return (self.count("error"), self.count("warning"), self.finished_ms)
+
+    def status(self) -> str:
+        if self.error is not None:
+            return "failed"
+        if self.findings is not None:
+            return "scored"
+        return "draft_only" if self.value is not None else "cancelled"
+
+
+class CandidateStats:
+    """Selections and time to an accepted draft of a `CodeCandidatesAgent`."""
+
+    def __init__(self):
+        self.runs = 0
+        self.reasons: Counter = Counter()
+        self.drafts_scored = 0
+        self.writers_cancelled = 0
+        self.accept_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(
+        self, reason: str, accept_ms: float, scored: int, cancelled: int
+    ) -> None:
+        with self._lock:
+            self.runs += 1
+            self.reasons[reason] += 1
+            self.accept_ms += accept_ms
+            self.drafts_scored += scored
+            self.writers_cancelled += cancelled
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "reasons": dict(self.reasons),
+                "mean_accept_ms": (
+                    round(self.accept_ms / self.runs, 1) if self.runs else 0.0
+                ),
+                "drafts_scored": self.drafts_scored,
+                "writers_cancelled": self.writers_cancelled,
+            }
+
+
+_candidate_stats: dict[str, CandidateStats] = {}
+
+
+def candidate_stats() -> dict[str, dict]:
+    """Returns the statistics of every candidate agent, keyed by agent name."""
+    return {name: stats.as_dict() for name, stats in _candidate_stats.items()}
+
+
+class CodeCandidatesAgent(ParallelAgent):
+    """Runs code writers concurrently and keeps the best-scoring draft.
+
+    Attributes:
+        output_key: State key receiving the selected draft.
+        report_key: State key receiving the selection report, if set.
+        budget_seconds: Take the best scored draft after this long; None waits
+            for every writer.
+        accept_clean: Take the first draft without findings immediately.
+        lint: Count pyflakes warnings when pyflakes is installed.
+        doctests: Execute drafts and run their doctests.
+        check_key: State key receiving the selected draft's check, if set.
+        findings_key: State key receiving its findings as reviewer text, if set.
+    """
+
+    output_key: str
+    report_key: Optional[str] = None
+    budget_seconds: Optional[float] = None
+    accept_clean: bool = True
+    lint: bool = True
+    doctests: bool = False
+    check_key: Optional[str] = None
+    findings_key: Optional[str] = None
+
+    _stats: CandidateStats = PrivateAttr()
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        self._stats = _candidate_stats.setdefault(self.name, CandidateStats())
+
+    async def _score(self, candidate: Candidate) -> None:
+        started = time.perf_counter()
+        candidate.findings = await check_code(
+            candidate.value, lint=self.lint, doctests=self.doctests
+        )
+        candidate.check_ms = (time.perf_counter() - started) * 1000
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        started = time.monotonic()
+        # Like `ParallelAgent`, but without changing the caller's branch; each
+        # writer's run adds its own name to it.
+        branch = f"{ctx.branch}.{self.name}" if ctx.branch else self.name
+        branch_ctx = ctx.model_copy(update={"branch": branch})
+        runs = [agent.run_async(branch_ctx) for agent in self.sub_agents]
+        candidates = [Candidate(agent.name) for agent in self.sub_agents]
+        failures: list[Exception] = []
+        next_events = {
+            asyncio.ensure_future(run.__anext__()): index
+            for index, run in enumerate(runs)
+        }
+        scoring: dict[asyncio.Future, int] = {}
+        reason = None
+        try:
+            while next_events or scoring:
+                scored = any(c.findings is not None for c in candidates)
+                timeout = None
+                if scored and self.budget_seconds is not None:
+                    timeout = started + self.budget_seconds - time.monotonic()
+                    if timeout <= 0:
+                        reason = "budget"
+                        break
+                done, _ = await asyncio.wait(
+                    [*next_events, *scoring],
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task in scoring:
+                        task.result()
+                        candidate = candidates[scoring.pop(task)]
+                        if self.accept_clean and not candidate.findings:
+                            reason = "clean"
+                        continue
+                    index = next_events.pop(task)
+                    try:
+                        event = task.result()
+                    except StopAsyncIteration:
+                        continue
+                    except Exception as e:
+                        logger.warning("Code candidate %s failed: %s", index, e)
+                        candidates[index].error = f"{type(e).__name__}: {e}"
+                        failures.append(e)
+                        continue
+                    key = self.sub_agents[index].output_key
+                    if key and key in event.actions.state_delta:
+                        candidate = candidates[index]
+                        candidate.value = event.actions.state_delta[key]
+                        candidate.finished_ms = (time.monotonic() - started) * 1000
+                        scoring[asyncio.ensure_future(self._score(candidate))] = index
+                        # Drafts stay out of the conversation; the selected
+                        # one is repeated as this agent's answer.
+                        event = event.model_copy(update={"content": None})
+                    yield event
+                    next_events[asyncio.ensure_future(runs[index].__anext__())] = index
+                if reason is not None:
+                    break
+        finally:
+            pending = [*next_events, *scoring]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for run in runs:
+                await run.aclose()
+
+        ranked = sorted(
+            (c for c in candidates if c.findings is not None), key=Candidate.rank
+        )
+        if not ranked and failures and len(failures) == len(candidates):
+            raise failures[0]
+        accept_ms = (time.monotonic() - started) * 1000
+        self._stats.record(
+            reason or "all_finished",
+            accept_ms,
+            scored=len(ranked),
+            cancelled=sum(c.status() == "cancelled" for c in candidates),
+        )
+        yield self._selection_event(
+            ctx, ranked[0] if ranked else None, candidates, reason, accept_ms
+        )
+
+    def _selection_event(
+        self,
+        ctx: InvocationContext,
+        selected: Optional[Candidate],
+        candidates: list[Candidate],
+        reason: Optional[str],
+        accept_ms: float,
+    ) -> Event:
+        report = {
+            "selected": selected.agent if selected else None,
+            "reason": reason or "all_finished",
+            "time_to_accept_ms": round(accept_ms, 1),
+            "candidates": [
+                {
+                    "agent": c.agent,
+                    "status": c.status(),
+                    "finished_ms": (
+                        round(c.finished_ms, 1) if c.finished_ms is not None else None
+                    ),
+                    "errors": c.count("error") if c.findings is not None else None,
+                    "warnings": (
+                        c.count("warning") if c.findings is not None else None
+                    ),
+                    **({"error": c.error} if c.error else {}),
+                }
+                for c in candidates
+            ],
+        }
+        delta: dict[str, Any] = {}
+        if self.report_key:
+            delta[self.report_key] = report
+        content = None
+        if selected is not None:
+            delta[self.output_key] = selected.value
+            if self.check_key:
+                delta[self.check_key] = check_report(
+                    selected.findings, selected.check_ms
+                )
+            if self.findings_key:
+                delta[self.findings_key] = format_findings(selected.findings)
+            content = types.Content(
+                role="model", parts=[types.Part(text=str(resolve(selected.value)))]
+            )
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=content,
+            actions=EventActions(state_delta=delta),
+        )
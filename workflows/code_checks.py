@@ -0,0 +1,261 @@
+"""Static checks of generated Python code in a worker process pool.
+
+`check_source` parses and compiles a code block, lints it with pyflakes when
+that package is installed and, if asked, executes it and runs its doctests.
+It only uses the standard library so that worker processes start quickly.
+`CodeCheckPool` runs it in spawned worker processes with a memory limit and a
+per-check time limit; a worker that does not return in time is killed and the
+pool is rebuilt. Executing generated code is opt-in: the worker process is a
+crash and resource boundary, not a security sandbox.
+"""
+
+import ast
+import asyncio
+import concurrent.futures
+import contextlib
+import doctest
+import io
+import logging
+import multiprocessing
+import re
+import signal
+import sys
+import threading
+import types
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_PYTHON_BLOCK_RE = re.compile(r"```(?:python|py)?[ \t]*\n(.*?)```", re.S)
+_MODULE_NAME = "generated_code"
+
+
+@dataclass(frozen=True)
+class Finding:
+    """One problem found by a static check.
+
+    Attributes:
+        check: "extract", "syntax", "compile", "lint", "runtime", "doctest",
+            "timeout" or "crash".
+        severity: "error" or "warning".
+        message: Human-readable description.
+        line: 1-based line in the code block, when known.
+    """
+
+    check: str
+    severity: str
+    message: str
+    line: Optional[int] = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def extract_python(text: str) -> Optional[str]:
+    """Returns the first fenced Python block of `text`, or None."""
+    match = _PYTHON_BLOCK_RE.search(text)
+    return match.group(1) if match else None
+
+
+def _lint(tree: ast.AST) -> list[Finding]:
+    try:
+        from pyflakes.checker import Checker
+    except ImportError:
+        return []
+    checker = Checker(tree, filename=_MODULE_NAME)
+    return [
+        Finding(
+            "lint", "warning", message.message % message.message_args, message.lineno
+        )
+        for message in sorted(checker.messages, key=lambda m: m.lineno)
+    ]
+
+
+class _Deadline(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def _deadline(seconds: float):
+    def expire(signum, frame):
+        raise _Deadline()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class _DocTestRunner(doctest.DocTestRunner):
+    """A `DocTestRunner` that lets a `_Deadline` end the run.
+
+    `DocTestRunner` records any exception raised by an example as a failure and
+    moves on to the next example, which would run without a time limit.
+    """
+
+    def report_unexpected_exception(self, out, test, example, exc_info):
+        if isinstance(exc_info[1], _Deadline):
+            raise exc_info[1]
+        super().report_unexpected_exception(out, test, example, exc_info)
+
+
+def _run_doctests(code: types.CodeType, timeout_seconds: float) -> list[Finding]:
+    module = types.ModuleType(_MODULE_NAME)
+    sys.modules[_MODULE_NAME] = module
+    output = io.StringIO()
+    try:
+        with _deadline(timeout_seconds), contextlib.redirect_stdout(output):
+            try:
+                exec(code, module.__dict__)
+            except _Deadline:
+                raise
+            except BaseException as e:
+                return [Finding("runtime", "error", f"{type(e).__name__}: {e}")]
+            runner = _DocTestRunner(verbose=False)
+            report = io.StringIO()
+            for test in doctest.DocTestFinder().find(module, _MODULE_NAME):
+                runner.run(test, out=report.write)
+    except _Deadline:
+        return [
+            Finding("timeout", "error", f"Execution took over {timeout_seconds} s.")
+        ]
+    finally:
+        sys.modules.pop(_MODULE_NAME, None)
+    if runner.failures:
+        return [
+            Finding(
+                "doctest",
+                "error",
+                f"{runner.failures} of {runner.tries} doctest examples failed:\n"
+                + report.getvalue()[-2000:],
+            )
+        ]
+    return []
+
+
+def check_source(
+    source: str, lint: bool = True, doctests: bool = False, timeout_seconds: float = 5
+) -> list[dict]:
+    """Checks a Python code block; runs inside a worker process.
+
+    Args:
+        source (str): The code, without Markdown fences.
+        lint (bool): Report pyflakes warnings when pyflakes is installed.
+        doctests (bool): Execute the code and run its doctests.
+        timeout_seconds (float): Time limit for executing the code.
+
+    Returns:
+        list[dict]: The findings, as `Finding.as_dict()`.
+    """
+    try:
+        tree = ast.parse(source, filename=_MODULE_NAME)
+    except SyntaxError as e:
+        return [Finding("syntax", "error", e.msg, e.lineno).as_dict()]
+    try:
+        code = compile(tree, _MODULE_NAME, "exec")
+    except (SyntaxError, ValueError) as e:
+        return [
+            Finding("compile", "error", str(e), getattr(e, "lineno", None)).as_dict()
+        ]
+    findings = _lint(tree) if lint else []
+    if doctests:
+        findings += _run_doctests(code, timeout_seconds)
+    return [finding.as_dict() for finding in findings]
+
+
+def _limit_memory(memory_limit_mb: Optional[int]) -> None:
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+class CodeCheckPool:
+    """Runs `check_source` in spawned worker processes.
+
+    Attributes:
+        max_workers: Worker processes.
+        timeout_seconds: Time limit for one check.
+        memory_limit_mb: Address-space limit of each worker.
+        fresh_workers: Use a new process for every check (set when generated
+            code is executed, so that one check cannot affect the next).
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        timeout_seconds: float = 5,
+        memory_limit_mb: Optional[int] = 512,
+        fresh_workers: bool = False,
+    ):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.fresh_workers = fresh_workers
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_limit_memory,
+                    initargs=(self.memory_limit_mb,),
+                    max_tasks_per_child=1 if self.fresh_workers else None,
+                )
+            return self._pool
+
+    def _discard(self, pool: concurrent.futures.ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        # A hung worker never picks up the shutdown sentinel, so stop it first.
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def check(
+        self, source: str, lint: bool = True, doctests: bool = False
+    ) -> list[Finding]:
+        """Checks `source` in a worker process.
+
+        Returns:
+            list[Finding]: The findings; a "timeout" or "crash" finding when the
+            worker did not answer.
+        """
+        pool = self._executor()
+        future = asyncio.get_running_loop().run_in_executor(
+            pool, check_source, source, lint, doctests, self.timeout_seconds
+        )
+        try:
+            # The worker enforces the limit itself; the margin covers start-up.
+            results = await asyncio.wait_for(future, self.timeout_seconds + 5)
+        except asyncio.TimeoutError:
+            self._discard(pool)
+            return [
+                Finding(
+                    "timeout", "error", f"Check took over {self.timeout_seconds} s."
+                )
+            ]
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.warning("Static check worker crashed; restarting the pool")
+            self._discard(pool)
+            return [Finding("crash", "error", "The check worker process crashed.")]
+        return [Finding(**result) for result in results]
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,380 @@
+"""Incremental critic/refiner context for refinement loops.
+
+Every critique/refine iteration used to put the full reference document
+(e.g. `requirements_document`) and the full refined document
+(`planning_document`) into the critic's and the refiner's instructions.
+`IncrementalContext` writes what those agents should see into two state keys
+instead. The first review gets the full documents. From the second iteration
+on the reference is replaced by a stable extractive summary, and the document
+by only the sections that changed since the previous review. When too much of
+the document changed, or it has no section headings, both agents fall back to
+the full context. The refiner then answers with just the sections it revised,
+and those are spliced back into the full document before `output_key` saves
+it. Estimated token savings are recorded per iteration in session state.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+from google.genai import types
+
+from sessions.artifacts import resolve
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models import LlmResponse
+
+# Markdown headings, top-level numbered bold items ("1.  **Tools:**") and bold
+# lines on their own start a new section.
+_HEADING_RE = re.compile(r"^(?:#{1,6}\s+\S|\d+\.\s+\*\*|\*\*[^*\n]+\*\*:?\s*$)")
+_TITLE_MARKUP_RE = re.compile(r"^[#\s\d\.\)]*|\*+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximates the token count of `text` (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+@dataclass(frozen=True)
+class Section:
+    """A headed section of a document.
+
+    Attributes:
+        key: Normalized title, unique within the document.
+        title: Heading text without markup; empty for text before the first heading.
+        text: The section's lines, heading included.
+    """
+
+    key: str
+    title: str
+    text: str
+
+
+def _title(heading: str) -> str:
+    title = _TITLE_MARKUP_RE.sub("", heading.strip()).split(":", 1)[0]
+    return " ".join(title.split())[:80]
+
+
+def split_sections(document: str) -> list[Section]:
+    """Splits a document into sections at its heading lines."""
+    sections: list[Section] = []
+    counts: dict[str, int] = {}
+    title, lines = "", []
+
+    def flush() -> None:
+        base = title.casefold()
+        counts[base] = counts.get(base, 0) + 1
+        key = base if counts[base] == 1 else f"{base}#{counts[base]}"
+        sections.append(Section(key, title, "".join(lines)))
+
+    for line in document.splitlines(keepends=True):
+        if _HEADING_RE.match(line):
+            if lines:
+                flush()
+            title, lines = _title(line), [line]
+        else:
+            lines.append(line)
+    if lines:
+        flush()
+    return sections
+
+
+def _joined(sections: list[Section]) -> str:
+    return "".join(
+        section.text if section.text.endswith("\n") else section.text + "\n"
+        for section in sections
+    )
+
+
+def merge_sections(document: str, revision: str) -> Optional[str]:
+    """Replaces the sections of `document` that `revision` contains.
+
+    Sections of `revision` are matched to sections of `document` by title;
+    unmatched ones are appended. Text before the first heading of `revision`
+    (e.g. "Here are the revised sections:") is dropped.
+
+    Returns:
+        Optional[str]: The merged document, or None when `revision` has no
+        headed sections.
+    """
+    revised = {s.key: s for s in split_sections(revision) if s.title}
+    if not revised:
+        return None
+    merged = [revised.pop(s.key, s) for s in split_sections(document)]
+    merged.extend(revised.values())
+    return _joined(merged)
+
+
+@lru_cache(maxsize=32)
+def summarize_document(text: str, max_chars: int) -> str:
+    """Returns an extractive summary of `text` of at most about `max_chars`.
+
+    Keeps the first sentence of every non-empty line, in order, until the
+    budget is used. The result only depends on its arguments, so repeated
+    calls return the same string and prompt prefixes stay cacheable.
+    """
+    if len(text) <= max_chars:
+        return text
+    kept, size = [], 0
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        sentence = _SENTENCE_END_RE.split(stripped, 1)[0][:200]
+        indent = line[: len(line) - len(line.lstrip())]
+        if size + len(indent) + len(sentence) + 1 > max_chars:
+            break
+        kept.append(indent + sentence)
+        size += len(indent) + len(sentence) + 1
+    return "\n".join(kept)
+
+
+class IncrementalContext:
+    """Builds compact instruction context for a critic and a refiner.
+
+    Wire it into a loop with `before_review`/`after_review` as the critic
+    stage's before/after agent callbacks, `before_refine` as the refiner's
+    before agent callback and `merge_revision` as its after model callback.
+    The agents' instructions read `{<reference_context_key>}` and
+    `{<document_context_key>}` instead of the full documents.
+
+    Attributes:
+        document_key: State key of the document refined by the loop.
+        reference_key: State key of the document it is checked against.
+        feedback_key: State key of the critic's feedback.
+        document_context_key: State key receiving the document context.
+        reference_context_key: State key receiving the reference context.
+        max_change_ratio: Send the full document when more than this fraction
+            of it (by characters) changed since the previous review.
+        summary_chars: Size of the reference summary.
+        state_key: State key for review bookkeeping.
+        report_key: State key receiving per-iteration token savings.
+    """
+
+    def __init__(
+        self,
+        document_key: str,
+        reference_key: str,
+        feedback_key: str,
+        document_context_key: str,
+        reference_context_key: str,
+        max_change_ratio: float = 0.5,
+        summary_chars: int = 4000,
+        state_key: str = "context_state",
+        report_key: str = "context_report",
+    ):
+        self.document_key = document_key
+        self.reference_key = reference_key
+        self.feedback_key = feedback_key
+        self.document_context_key = document_context_key
+        self.reference_context_key = reference_context_key
+        self.max_change_ratio = max_change_ratio
+        self.summary_chars = summary_chars
+        self.state_key = state_key
+        self.report_key = report_key
+
+    def _bookkeeping(self, callback_context: "CallbackContext") -> dict:
+        book = callback_context.state.get(self.state_key) or {}
+        if book.get("invocation_id") != callback_context.invocation_id:
+            # A new run of the loop starts again from the full context.
+            book = {
+                "invocation_id": callback_context.invocation_id,
+                "reviews": 0,
+                "reviewed": None,
+                "previous": None,
+                "refine_mode": None,
+            }
+            callback_context.state[self.report_key] = {
+                "iterations": [],
+                "full_tokens": 0,
+                "sent_tokens": 0,
+                "saved_tokens": 0,
+            }
+        return book
+
+    def _reference_summary(self, reference: str) -> str:
+        summary = summarize_document(reference, self.summary_chars)
+        if summary == reference:
+            return reference
+        return (
+            f"[Summary of the '{self.reference_key}' "
+            f"({estimate_tokens(summary):,} of {estimate_tokens(reference):,} "
+            "estimated tokens). The full document was part of the first review.]\n"
+            f"{summary}"
+        )
+
+    def _document_view(
+        self,
+        sections: list[Section],
+        changed: list[Section],
+        removed: list[str],
+        feedback: Optional[str],
+    ) -> str:
+        shown = {s.key for s in changed}
+        lines = [
+            f"[Incremental view of the '{self.document_key}': {len(changed)} of "
+            f"{len(sections)} sections changed since the previous review and are "
+            "shown in full below."
+        ]
+        unchanged = [s.title for s in sections if s.key not in shown and s.title]
+        if unchanged:
+            lines.append(
+                "Unchanged since the previous review: "
+                + "; ".join(f'"{title}"' for title in unchanged)
+                + "."
+            )
+        if removed:
+            lines.append(
+                "Removed since the previous review: "
+                + "; ".join(f'"{title}"' for title in removed)
+                + "."
+            )
+        referenced = []
+        if feedback is not None:
+            # The refiner also needs the unchanged sections the feedback is about.
+            lowered = feedback.casefold()
+            referenced = [
+                s
+                for s in sections
+                if s.key not in shown
+                and len(s.title) >= 4
+                and s.title.casefold() in lowered
+            ]
+            lines.append(
+                "Output ONLY the sections you revise or add, each starting with "
+                "its original heading line; sections you do not output are kept "
+                "unchanged."
+            )
+        lines[-1] += "]"
+        parts = ["\n".join(lines), "\n\n", _joined(changed)]
+        if referenced:
+            parts += [
+                f"\n[Unchanged sections referenced by the '{self.feedback_key}':]\n",
+                _joined(referenced),
+            ]
+        if not changed and not referenced:
+            parts.append("(No section changed.)\n")
+        return "".join(parts)
+
+    def _write_context(
+        self,
+        callback_context: "CallbackContext",
+        baseline: Optional[str],
+        iteration: int,
+        refining: bool,
+    ) -> str:
+        state = callback_context.state
+        document = str(resolve(state.get(self.document_key)) or "")
+        reference = str(resolve(state.get(self.reference_key)) or "")
+        sections = split_sections(document)
+        entry = {"iteration": iteration, "agent": callback_context.agent_name}
+
+        mode, reason = "full", None
+        if baseline is None:
+            reason = "first_review"
+        elif len(sections) < 2:
+            reason = "unstructured"
+        else:
+            old = {s.key: s for s in split_sections(str(resolve(baseline)))}
+            changed = [s for s in sections if s.key not in old or old[s.key] != s]
+            ratio = sum(len(s.text) for s in changed) / max(len(document), 1)
+            entry["change_ratio"] = round(ratio, 4)
+            if ratio > self.max_change_ratio:
+                reason = "large_change"
+            else:
+                mode, reason = "compact", "incremental"
+                current = {s.key for s in sections}
+                removed = [s.title for s in old.values() if s.key not in current]
+                feedback = str(state.get(self.feedback_key) or "") if refining else None
+                document_context = self._document_view(
+                    sections, changed, removed, feedback
+                )
+                reference_context = self._reference_summary(reference)
+                entry["sections"] = f"{len(changed)}/{len(sections)}"
+        if mode == "full":
+            document_context, reference_context = document, reference
+
+        full = estimate_tokens(document) + estimate_tokens(reference)
+        sent = estimate_tokens(document_context) + estimate_tokens(reference_context)
+        entry.update(
+            mode=mode,
+            reason=reason,
+            full_tokens=full,
+            sent_tokens=sent,
+            saved_tokens=full - sent,
+        )
+        report = dict(state.get(self.report_key) or {})
+        report["iterations"] = list(report.get("iterations", [])) + [entry]
+        for key in ("full_tokens", "sent_tokens", "saved_tokens"):
+            report[key] = report.get(key, 0) + entry[key]
+        state[self.report_key] = report
+        if mode == "full":
+            # Artifact references stay references; the agents' instructions
+            # resolve them when they are rendered.
+            document_context = state.get(self.document_key) or ""
+            reference_context = state.get(self.reference_key) or ""
+        state[self.document_context_key] = document_context
+        state[self.reference_context_key] = reference_context
+        return mode
+
+    def before_review(self, callback_context: "CallbackContext") -> None:
+        """Writes the critic's context: changes since the previous review."""
+        book = self._bookkeeping(callback_context)
+        self._write_context(
+            callback_context, book["reviewed"], book["reviews"] + 1, refining=False
+        )
+        callback_context.state[self.state_key] = book
+
+    def after_review(self, callback_context: "CallbackContext") -> None:
+        """Records the document the critic just reviewed as the new baseline."""
+        book = dict(self._bookkeeping(callback_context))
+        book.update(
+            reviews=book["reviews"] + 1,
+            previous=book["reviewed"],
+            reviewed=callback_context.state.get(self.document_key) or "",
+        )
+        callback_context.state[self.state_key] = book
+
+    def before_refine(self, callback_context: "CallbackContext") -> None:
+        """Writes the refiner's context: the critic's view plus referenced sections."""
+        book = dict(self._bookkeeping(callback_context))
+        book["refine_mode"] = self._write_context(
+            callback_context, book["previous"], book["reviews"], refining=True
+        )
+        callback_context.state[self.state_key] = book
+
+    def merge_revision(
+        self, callback_context: "CallbackContext", llm_response: "LlmResponse"
+    ) -> None:
+        """Splices a compact-mode refiner answer back into the full document.
+
+        The response is edited in place, so later after model callbacks still
+        run and `output_key` saves the complete document. An answer without
+        headed sections cannot be spliced; it is replaced by the unchanged
+        document, and the iteration is marked `"merged": False` in the report.
+        """
+        content = llm_response.content
+        if llm_response.partial or not content or not content.parts:
+            return None
+        if any(part.function_call for part in content.parts):
+            return None
+        book = callback_context.state.get(self.state_key) or {}
+        if book.get("refine_mode") != "compact":
+            return None
+        revision = "".join(part.text or "" for part in content.parts)
+        document = str(resolve(callback_context.state.get(self.document_key)) or "")
+        merged = merge_sections(document, revision)
+        state = callback_context.state
+        report = dict(state.get(self.report_key) or {})
+        iterations = list(report.get("iterations", []))
+        if iterations:
+            iterations[-1] = dict(iterations[-1], merged=merged is not None)
+            report["iterations"] = iterations
+        if merged is None:
+            report["merge_failures"] = report.get("merge_failures", 0) + 1
+        state[self.report_key] = report
+        content.parts = [types.Part(text=merged if merged is not None else document)]
+        return None
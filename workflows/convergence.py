@@ -0,0 +1,189 @@
+"""Loop agent that stops once its output stops changing.
+
+`ConvergenceLoopAgent` behaves like ADK's `LoopAgent`, but after every
+iteration it diffs the watched document against its value before the
+iteration and measures how much of the latest feedback is new. The loop ends
+with an escalation when the document has converged, the feedback has gone
+stale, or an iteration, wall-clock or token budget is used up. The reason is
+written to session state so every run records why it stopped. The final event
+carries only that state change (and the escalation), so the document is not
+repeated in the session history; callers read it from state (see
+`workflows.agent_tool.StateResultAgentTool`).
+"""
+
+import difflib
+import re
+import time
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import LoopAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from sessions.artifacts import resolve
+
+_BULLET_RE = re.compile(r"^[\s\-\*\d\.\)#>]+")
+
+
+def document_change_ratio(before: str, after: str) -> float:
+    """Returns the fraction of lines that differ between two document versions.
+
+    Args:
+        before (str): The document at the start of the iteration.
+        after (str): The document at the end of the iteration.
+
+    Returns:
+        float: 0.0 for identical documents, up to 1.0 for completely rewritten ones.
+    """
+    if before == after:
+        return 0.0
+    matcher = difflib.SequenceMatcher(
+        None, before.splitlines(), after.splitlines(), autojunk=False
+    )
+    return 1.0 - matcher.ratio()
+
+
+def _feedback_points(text: str) -> set[str]:
+    points = set()
+    for line in text.splitlines():
+        point = " ".join(_BULLET_RE.sub("", line).lower().split())
+        if point:
+            points.add(point)
+    return points
+
+
+def feedback_novelty(text: str, seen: set[str]) -> float:
+    """Returns the fraction of feedback points not seen in earlier iterations.
+
+    Points are the normalized non-empty lines of the feedback. `seen` is
+    updated in place with the points of `text`.
+    """
+    points = _feedback_points(text)
+    if not points:
+        return 0.0
+    novelty = len(points - seen) / len(points)
+    seen.update(points)
+    return novelty
+
+
+class ConvergenceLoopAgent(LoopAgent):
+    """A `LoopAgent` that ends when its watched document converges.
+
+    Attributes:
+        document_key: State key holding the document refined by the loop.
+        feedback_key: State key holding the feedback produced each iteration.
+        min_change_ratio: Stop when an iteration changes less than this
+            fraction of the document's lines.
+        min_feedback_novelty: Stop when less than this fraction of the feedback
+            is new (checked from the second iteration on).
+        max_seconds: Wall-clock budget for the whole loop.
+        max_tokens: Total model token budget for the whole loop.
+        report_key: State key that receives the stop reason and per-iteration
+            statistics.
+    """
+
+    document_key: str
+    feedback_key: Optional[str] = None
+    min_change_ratio: float = 0.0
+    min_feedback_novelty: float = 0.0
+    max_seconds: Optional[float] = None
+    max_tokens: Optional[int] = None
+    report_key: str = "loop_report"
+
+    def _stop_reason(
+        self,
+        iteration: int,
+        elapsed: float,
+        tokens: int,
+        change: float,
+        novelty: Optional[float],
+    ) -> Optional[str]:
+        if self.max_seconds and elapsed >= self.max_seconds:
+            return "time_budget"
+        if self.max_tokens and tokens >= self.max_tokens:
+            return "token_budget"
+        if change < self.min_change_ratio:
+            return "converged"
+        if novelty is not None and novelty < self.min_feedback_novelty:
+            return "stale_feedback"
+        if self.max_iterations and iteration >= self.max_iterations:
+            return "max_iterations"
+        return None
+
+    def _report_event(
+        self, ctx: InvocationContext, report: dict, escalate: bool
+    ) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                escalate=escalate or None,
+                state_delta={self.report_key: report},
+            ),
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        started = time.monotonic()
+        tokens = 0
+        seen_feedback: set[str] = set()
+        history = []
+        report = {"stop_reason": None, "iterations": 0, "history": history}
+
+        while True:
+            before = str(resolve(ctx.session.state.get(self.document_key)) or "")
+            iteration_tokens = 0
+            for sub_agent in self.sub_agents:
+                async for event in sub_agent.run_async(ctx):
+                    usage = event.usage_metadata
+                    if not event.partial and usage and usage.total_token_count:
+                        iteration_tokens += usage.total_token_count
+                    yield event
+                    if event.actions.escalate:
+                        # A sub-agent (e.g. via exit_loop) already ended the loop.
+                        report.update(
+                            stop_reason=f"escalated_by:{event.author}",
+                            iterations=len(history) + 1,
+                            elapsed_seconds=round(time.monotonic() - started, 3),
+                            tokens=tokens + iteration_tokens,
+                        )
+                        yield self._report_event(ctx, report, escalate=False)
+                        return
+            tokens += iteration_tokens
+
+            after = str(resolve(ctx.session.state.get(self.document_key)) or "")
+            change = document_change_ratio(before, after)
+            novelty = None
+            if self.feedback_key:
+                feedback = str(ctx.session.state.get(self.feedback_key) or "")
+                novelty = feedback_novelty(feedback, seen_feedback)
+            history.append(
+                {
+                    "iteration": len(history) + 1,
+                    "document_change": round(change, 4),
+                    "feedback_novelty": (
+                        round(novelty, 4) if novelty is not None else None
+                    ),
+                    "tokens": iteration_tokens,
+                }
+            )
+
+            elapsed = time.monotonic() - started
+            reason = self._stop_reason(
+                len(history),
+                elapsed,
+                tokens,
+                change,
+                novelty if len(history) > 1 else None,
+            )
+            if reason:
+                report.update(
+                    stop_reason=reason,
+                    iterations=len(history),
+                    elapsed_seconds=round(elapsed, 3),
+                    tokens=tokens,
+                )
+                yield self._report_event(ctx, report, escalate=True)
+                return
@@ -0,0 +1,315 @@
+"""Sequential workflow whose stages are gated by predicates over session state.
+
+`GatedSequentialAgent` runs its sub-agents in order like ADK's
+`SequentialAgent`, but before a stage with a `Gate` it evaluates cheap Python
+predicates over the session state and may
+
+* skip the stage (`skip_if`, or `unchanged` when the invocation's message
+  and the stage's inputs are the same as when it last completed),
+* stop the pipeline before the stage (`stop_if`), or
+* run another sub-agent in its place (`branch`).
+
+When a stage runs, the fingerprints of the stages after it are dropped, as
+their inputs may change.
+
+Every decision is emitted as an event authored by the gated agent, with the
+decision in `custom_metadata["gate"]`; a skipped stage can also be given a
+stand-in answer (`skip_output`) that is written to its `output_key` (as an
+artifact reference for an `ArtifactOutputAgent`), so later stages and the
+caller see the same state as after a real run. `GateStats` counts decisions
+per stage and the model calls saved, estimated as one per LLM agent in the
+skipped stages (a lower bound for loops and tool calls).
+"""
+
+import hashlib
+import json
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Mapping, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from pydantic import PrivateAttr
+
+from workflows.artifacts import ArtifactOutputAgent
+
+StatePredicate = Callable[[Mapping[str, Any]], bool]
+
+FINGERPRINTS_KEY = "gate_fingerprints"
+
+
+@dataclass(frozen=True)
+class Gate:
+    """Decides from session state how one stage of a `GatedSequentialAgent` runs.
+
+    Predicates are checked in the order `stop_if`, `skip_if`, `unchanged`,
+    `branch`.
+
+    Attributes:
+        stop_if: Ends the pipeline before the stage when it returns True.
+        skip_if: Skips the stage when it returns True.
+        unchanged: State keys the stage reads; the stage is skipped when
+            they and the invocation's user message are the same as when it
+            last ran and `done_key` is set. Their fingerprint is written
+            before the stage runs, together with clearing `done_key`.
+        done_key: State key the stage sets when it completes; defaults to
+            its `output_key`.
+        branch: Returns the name of a sub-agent to run in place of the stage,
+            or None to run the stage itself.
+        branches: Names of the sub-agents `branch` may return; they only run
+            as branches, not as stages of their own.
+        skip_output: Builds the stage's answer when it is skipped; it is the
+            skip event's text and is written to the stage's `output_key`.
+        reason: Describes the gate in events; defaults to the predicate's name.
+    """
+
+    stop_if: Optional[StatePredicate] = None
+    skip_if: Optional[StatePredicate] = None
+    unchanged: tuple[str, ...] = ()
+    done_key: Optional[str] = None
+    branch: Optional[Callable[[Mapping[str, Any]], Optional[str]]] = None
+    branches: tuple[str, ...] = ()
+    skip_output: Optional[Callable[[Mapping[str, Any]], str]] = None
+    reason: Optional[str] = None
+
+    def describe(self, predicate: Optional[Callable]) -> str:
+        return self.reason or getattr(predicate, "__name__", "predicate")
+
+
+def state_fingerprint(
+    state: Mapping[str, Any], keys: tuple[str, ...], message: str = ""
+) -> str:
+    """Returns a hash of a message and the values of `keys` in `state`."""
+    payload = json.dumps(
+        [message, *(state.get(key) for key in keys)], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def count_model_agents(agent: BaseAgent) -> int:
+    """Returns the number of LLM agents in an agent tree."""
+    own = 1 if isinstance(agent, LlmAgent) else 0
+    return own + sum(count_model_agents(sub_agent) for sub_agent in agent.sub_agents)
+
+
+class GateStats:
+    """Decisions per stage and model calls saved by a `GatedSequentialAgent`."""
+
+    def __init__(self):
+        self.runs = 0
+        self.model_calls_saved = 0
+        self.stages: defaultdict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, action: str, model_calls_saved: int = 0) -> None:
+        with self._lock:
+            self.stages[stage][action] += 1
+            self.model_calls_saved += model_calls_saved
+
+    def start_run(self) -> None:
+        with self._lock:
+            self.runs += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "model_calls_saved": self.model_calls_saved,
+                "model_calls_saved_per_run": (
+                    round(self.model_calls_saved / self.runs, 3) if self.runs else 0.0
+                ),
+                "stages": {
+                    stage: dict(counts) for stage, counts in self.stages.items()
+                },
+            }
+
+
+_gate_stats: dict[str, GateStats] = {}
+
+
+def gate_stats() -> dict[str, dict]:
+    """Returns the statistics of every gated workflow, keyed by agent name."""
+    return {name: stats.as_dict() for name, stats in _gate_stats.items()}
+
+
+class GatedSequentialAgent(BaseAgent):
+    """Runs sub-agents in order, skipping, stopping or branching on state.
+
+    Attributes:
+        gates: Gates keyed by the name of the stage they control; stages
+            without a gate always run.
+        report_key: State key receiving `{stage: {"action", "reason"}}` for the
+            stages skipped, stopped or branched in the run, if set.
+    """
+
+    gates: dict[str, Gate] = {}
+    report_key: Optional[str] = None
+
+    _stats: GateStats = PrivateAttr()
+
+    def model_post_init(self, __context) -> None:
+        super().model_post_init(__context)
+        self._stats = _gate_stats.setdefault(self.name, GateStats())
+
+    def _decision_event(
+        self,
+        ctx: InvocationContext,
+        stage: BaseAgent,
+        action: str,
+        reason: str,
+        report: dict,
+        text: Optional[str] = None,
+        state_delta: Optional[dict] = None,
+    ) -> Event:
+        report[stage.name] = {"action": action, "reason": reason}
+        delta = dict(state_delta or {})
+        if self.report_key:
+            delta[self.report_key] = dict(report)
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=(
+                types.Content(role="model", parts=[types.Part(text=text)])
+                if text is not None
+                else None
+            ),
+            custom_metadata={
+                "gate": {"stage": stage.name, "action": action, "reason": reason}
+            },
+            actions=EventActions(state_delta=delta),
+        )
+
+    @staticmethod
+    def _message(ctx: InvocationContext) -> str:
+        content = ctx.user_content
+        if not content or not content.parts:
+            return ""
+        return "".join(part.text or "" for part in content.parts)
+
+    @staticmethod
+    def _done_key(gate: Gate, stage: BaseAgent) -> Optional[str]:
+        return gate.done_key or getattr(stage, "output_key", None)
+
+    def _skip_reason(
+        self, gate: Gate, stage: BaseAgent, state: Mapping, fingerprint: str
+    ) -> Optional[str]:
+        if gate.skip_if is not None and gate.skip_if(state):
+            return gate.describe(gate.skip_if)
+        if gate.unchanged:
+            done_key = self._done_key(gate, stage)
+            last = (state.get(FINGERPRINTS_KEY) or {}).get(stage.name)
+            if last == fingerprint and done_key and state.get(done_key) is not None:
+                return "inputs unchanged: " + ", ".join(gate.unchanged)
+        return None
+
+    def _before_run(
+        self,
+        gate: Gate,
+        stage: BaseAgent,
+        fingerprint: str,
+        later_stages: list[BaseAgent],
+        state: Mapping,
+    ) -> dict:
+        fingerprints = dict(state.get(FINGERPRINTS_KEY) or {})
+        # Later stages may read what this one writes, so their fingerprints
+        # no longer describe their inputs.
+        stale = [agent.name for agent in later_stages if agent.name in fingerprints]
+        for name in stale:
+            del fingerprints[name]
+        delta = {}
+        if gate.unchanged:
+            # Written before the run: an interrupted run leaves `done_key`
+            # unset, so it is not mistaken for a completed one.
+            fingerprints[stage.name] = fingerprint
+            done_key = self._done_key(gate, stage)
+            if done_key:
+                delta[done_key] = None
+        if gate.unchanged or stale:
+            delta[FINGERPRINTS_KEY] = fingerprints
+        return delta
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        self._stats.start_run()
+        branch_targets = {
+            name for gate in self.gates.values() for name in gate.branches
+        }
+        state = ctx.session.state
+        report: dict = {}
+        stages = [
+            agent for agent in self.sub_agents if agent.name not in branch_targets
+        ]
+        for index, stage in enumerate(stages):
+            gate = self.gates.get(stage.name) or Gate()
+            if gate.stop_if is not None and gate.stop_if(state):
+                saved = sum(count_model_agents(agent) for agent in stages[index:])
+                self._stats.record(stage.name, "stopped", saved)
+                yield self._decision_event(
+                    ctx, stage, "stopped", gate.describe(gate.stop_if), report
+                )
+                break
+
+            fingerprint = (
+                state_fingerprint(state, gate.unchanged, self._message(ctx))
+                if gate.unchanged
+                else ""
+            )
+            reason = self._skip_reason(gate, stage, state, fingerprint)
+            if reason is not None:
+                self._stats.record(stage.name, "skipped", count_model_agents(stage))
+                text = gate.skip_output(state) if gate.skip_output else None
+                output_key = getattr(stage, "output_key", None)
+                value = (
+                    stage.state_value(text)
+                    if isinstance(stage, ArtifactOutputAgent)
+                    else text
+                )
+                yield self._decision_event(
+                    ctx,
+                    stage,
+                    "skipped",
+                    reason,
+                    report,
+                    text=text,
+                    state_delta=(
+                        {output_key: value} if text is not None and output_key else None
+                    ),
+                )
+                continue
+
+            target = stage
+            if gate.branch is not None:
+                name = gate.branch(state)
+                if name is not None and name != stage.name:
+                    target = self.find_sub_agent(name)
+                    if target is None:
+                        raise ValueError(f"{self.name}: no sub-agent named '{name}'.")
+                    saved = count_model_agents(stage) - count_model_agents(target)
+                    self._stats.record(stage.name, "branched", max(0, saved))
+                    yield self._decision_event(
+                        ctx,
+                        stage,
+                        "branched",
+                        f"{gate.describe(gate.branch)} -> {name}",
+                        report,
+                    )
+            if target is stage and stage.name in self.gates:
+                self._stats.record(stage.name, "ran")
+
+            delta = self._before_run(
+                gate, stage, fingerprint, stages[index + 1 :], state
+            )
+            if delta:
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author=self.name,
+                    branch=ctx.branch,
+                    actions=EventActions(state_delta=delta),
+                )
+            async for event in target.run_async(ctx):
+                yield event
@@ -0,0 +1,92 @@
+"""Deterministic merge of parallel critic outputs.
+
+`ParallelAgent` branches each write their own `output_key`. `CritiqueMergeAgent`
+runs after the fan-out and folds those keys, in a fixed order, into a single
+state key without calling a model. A critic that left its key empty counts as
+a finding, not as a clean review, and `clear_sections` drops the previous
+iteration's critiques before the fan-out so stale ones are never merged.
+"""
+
+import re
+from typing import TYPE_CHECKING, AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+
+# Narrow critics are told to answer exactly this when their dimension is clean.
+NO_CHANGES_NEEDED = "No changes are needed."
+
+_NO_CHANGES_RE = re.compile(r"\W*no\s+changes\s+(?:are\s+)?needed\W*", re.IGNORECASE)
+
+
+def is_no_changes_needed(text: str) -> bool:
+    """Returns True when a critique only says no changes are needed.
+
+    An empty critique is not a clean review: the critic failed to answer.
+    """
+    return bool(_NO_CHANGES_RE.fullmatch(text.strip()))
+
+
+class CritiqueMergeAgent(BaseAgent):
+    """Folds several critique state keys into one critique.
+
+    Attributes:
+        sections: Ordered mapping of source state key to section title.
+        output_key: State key that receives the merged critique.
+    """
+
+    sections: dict[str, str]
+    output_key: str
+
+    def merge(self, state: dict) -> str:
+        """Builds the merged critique from the current session state.
+
+        Sections whose critic reported no issues are listed by title only. When
+        every section is clean the result states that no changes are needed, so
+        downstream agents see the same signal a single critic would give. A
+        missing or empty critique is reported as a finding of its section.
+        """
+        findings = []
+        clean = []
+        for key, title in self.sections.items():
+            text = str(state.get(key) or "").strip()
+            if not text:
+                findings.append(
+                    f"## {title}\nThe review of this dimension produced no "
+                    "output; re-check the plan against its criteria."
+                )
+            elif is_no_changes_needed(text):
+                clean.append(title)
+            else:
+                findings.append(f"## {title}\n{text}")
+
+        if not findings:
+            return f"{NO_CHANGES_NEEDED} Every review dimension passed: {', '.join(clean)}."
+        if clean:
+            findings.append(f"## Dimensions without findings\n{', '.join(clean)}")
+        return "\n\n".join(findings)
+
+    def clear_sections(self, callback_context: "CallbackContext") -> None:
+        """Drops the critiques of an earlier iteration from session state.
+
+        Use it as a before agent callback of the stage that runs the critics.
+        """
+        for key in self.sections:
+            if callback_context.state.get(key) is not None:
+                callback_context.state[key] = None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={self.output_key: self.merge(ctx.session.state)}
+            ),
+        )
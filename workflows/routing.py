@@ -0,0 +1,266 @@
+"""Local fast path for trivial turns.
+
+`FastPathRouter` is a `before_agent_callback` that classifies the user's
+message without a model. Whole-message patterns are tried first; otherwise a
+small naive Bayes classifier over word tokens scores the message. When the
+intent is a greeting or farewell with enough confidence, the router calls the
+matching handler (e.g. the `say_hello` tool) and returns its text as the
+agent's reply, which ends the invocation before any model call. Everything
+else falls through to the agent.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional
+
+from google.genai import types
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+GREETING = "greeting"
+FAREWELL = "farewell"
+OTHER = "other"
+
+# Only "my name is" reliably introduces a name ("hi I'm hungry" does not), so
+# greetings with "I'm ..." go through the classifier like any other message.
+_NAME = r"(?:[\s,.!]+my name is\s+(?P<name>[a-z][\w'-]*))?"
+_GREETING_RE = re.compile(
+    r"(?:hi|hello|hey|hiya|howdy|greetings|yo|good\s+(?:morning|afternoon|evening))"
+    r"(?:\s+there)?" + _NAME + r"[\s.!]*",
+    re.IGNORECASE,
+)
+_FAREWELL_RE = re.compile(
+    r"(?:(?:ok(?:ay)?|thanks|thank you|cheers)[\s,.!]+)*"
+    r"(?:bye(?:\s+bye)?|goodbye|good\s+bye|see\s+(?:you|ya)(?:\s+(?:later|soon))?"
+    r"|farewell|good\s*night|take care|cya)"
+    r"(?:[\s,.!]+(?:thanks|thank you|for now))*[\s.!]*",
+    re.IGNORECASE,
+)
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+TRAINING_EXAMPLES = {
+    GREETING: [
+        "hi",
+        "hello",
+        "hey there",
+        "hello there friend",
+        "hi I'm Alex",
+        "hey my name is Sam",
+        "good morning",
+        "good evening everyone",
+        "hiya",
+        "hello again",
+        "hi how are you",
+        "hey hello",
+    ],
+    FAREWELL: [
+        "bye",
+        "goodbye",
+        "thanks bye",
+        "see you later",
+        "see you soon",
+        "that's all bye",
+        "ok thanks goodbye",
+        "talk to you later",
+        "have a nice day bye",
+        "good night",
+        "I'm done thanks bye",
+        "catch you later",
+    ],
+    OTHER: [
+        "what's the weather in London",
+        "weather in Tokyo please",
+        "hi what's the weather in New York",
+        "hello can you tell me the weather in Paris",
+        "is it raining in London",
+        "how hot is it in Tokyo",
+        "and in London and Tokyo",
+        "what time is it in New York",
+        "bye the way what is the temperature",
+        "thanks what about tomorrow",
+        "can you help me with something",
+        "tell me a joke",
+    ],
+}
+
+
+@dataclass(frozen=True)
+class Intent:
+    """A classified user message.
+
+    Attributes:
+        label: GREETING, FAREWELL or OTHER.
+        confidence: Probability of the label, 1.0 for a pattern match.
+        stage: "pattern", "classifier" or "length" (too long to be trivial).
+        name: The user's name, if the message gives it.
+    """
+
+    label: str
+    confidence: float
+    stage: str
+    name: Optional[str] = None
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word tokens with add-one smoothing.
+
+    Tokens the classifier has never seen carry no evidence for any label, so the
+    confidence is scaled by the share of known tokens: a message that is mostly
+    new words is not confidently trivial.
+    """
+
+    def __init__(self, examples: dict[str, list[str]]):
+        self.labels = list(examples)
+        self._counts = {label: Counter() for label in self.labels}
+        for label, texts in examples.items():
+            for text in texts:
+                self._counts[label].update(tokenize(text))
+        self._vocabulary = set().union(*self._counts.values())
+        self._totals = {
+            label: sum(self._counts[label].values()) for label in self.labels
+        }
+        total_examples = sum(len(texts) for texts in examples.values())
+        self._priors = {
+            label: math.log(len(texts) / total_examples)
+            for label, texts in examples.items()
+        }
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """Returns the most likely label and its coverage-scaled probability."""
+        tokens = tokenize(text)
+        if not tokens:
+            return OTHER, 0.0
+        known = [token for token in tokens if token in self._vocabulary]
+        vocabulary_size = len(self._vocabulary)
+        scores = {}
+        for label in self.labels:
+            denominator = self._totals[label] + vocabulary_size
+            scores[label] = self._priors[label] + sum(
+                math.log((self._counts[label][token] + 1) / denominator)
+                for token in known
+            )
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, (1 / normalizer) * (len(known) / len(tokens))
+
+
+@dataclass
+class RouterStats:
+    """Counts of turns the router answered and turns left to the agent."""
+
+    turns: int = 0
+    routed: Counter = field(default_factory=Counter)
+    by_stage: Counter = field(default_factory=Counter)
+    fallbacks: int = 0
+
+    @property
+    def skip_rate(self) -> float:
+        """Share of turns that skipped the model."""
+        return sum(self.routed.values()) / self.turns if self.turns else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "routed": dict(self.routed),
+            "by_stage": dict(self.by_stage),
+            "fallbacks": self.fallbacks,
+            "skip_rate": round(self.skip_rate, 4),
+        }
+
+
+class FastPathRouter:
+    """Answers greeting and farewell turns without a model call.
+
+    Attributes:
+        handlers: Reply builder per routed label.
+        min_confidence: Classifier probability required to route a turn.
+        max_tokens: Longer messages always go to the agent.
+        stats: Routing counters.
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, Callable[[Intent], str]],
+        min_confidence: float = 0.85,
+        max_tokens: int = 8,
+        classifier: Optional[NaiveBayesClassifier] = None,
+    ):
+        self.handlers = handlers
+        self.min_confidence = min_confidence
+        self.max_tokens = max_tokens
+        self.classifier = classifier or NaiveBayesClassifier(TRAINING_EXAMPLES)
+        self.stats = RouterStats()
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> Intent:
+        text = text.strip()
+        match = _GREETING_RE.fullmatch(text)
+        if match:
+            name = match.group("name")
+            return Intent(GREETING, 1.0, "pattern", name.capitalize() if name else None)
+        if _FAREWELL_RE.fullmatch(text):
+            return Intent(FAREWELL, 1.0, "pattern")
+        if len(tokenize(text)) > self.max_tokens:
+            return Intent(OTHER, 1.0, "length")
+        label, confidence = self.classifier.predict(text)
+        return Intent(label, confidence, "classifier")
+
+    def route(self, text: str) -> Optional[str]:
+        """Returns the fast-path reply for `text`, or None to use the agent."""
+        intent = self.classify(text)
+        handler = self.handlers.get(intent.label)
+        routed = handler is not None and intent.confidence >= self.min_confidence
+        with self._lock:
+            self.stats.turns += 1
+            if routed:
+                self.stats.routed[intent.label] += 1
+                self.stats.by_stage[intent.stage] += 1
+            else:
+                self.stats.fallbacks += 1
+        if not routed:
+            return None
+        logger.debug(
+            "Fast path: %s (%s, %.2f)", intent.label, intent.stage, intent.confidence
+        )
+        return handler(intent)
+
+    def __call__(self, callback_context) -> Optional[types.Content]:
+        user_content = callback_context.user_content
+        if user_content is None or not user_content.parts:
+            return None
+        text = "".join(part.text or "" for part in user_content.parts)
+        reply = self.route(text) if text.strip() else None
+        if reply is None:
+            return None
+        return types.Content(role="model", parts=[types.Part(text=reply)])
+
+
+@lru_cache()
+def get_greeting_router() -> FastPathRouter:
+    """
+    Get the process-wide router that answers greetings and farewells with the
+    `say_hello` and `say_goodbye` tools.
+
+    Returns:
+        FastPathRouter: The shared router.
+    """
+    from tools.greetings import say_goodbye, say_hello
+
+    return FastPathRouter(
+        handlers={
+            GREETING: lambda intent: say_hello(intent.name or "there"),
+            FAREWELL: lambda intent: say_goodbye(),
+        },
+        min_confidence=get_settings().FAST_PATH_MIN_CONFIDENCE,
+    )
@@ -0,0 +1,130 @@
+"""Non-LLM stages of the code pipeline.
+
+`StaticCheckAgent` extracts the fenced Python block from a state key, checks it
+in a `CodeCheckPool` worker (`check_code`) and writes the findings to state,
+both as data and as a short text the reviewer's instruction includes.
+`is_clean_review` recognizes reviews that ask for no changes.
+"""
+
+import re
+import time
+from functools import lru_cache
+from typing import Any, AsyncGenerator
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from config import get_settings
+from sessions.artifacts import resolve
+from workflows.code_checks import CodeCheckPool, Finding, extract_python
+
+_CLEAN_REVIEW_RE = re.compile(r"\W*no\s+major\s+issues(?:\s+found)?\W*", re.I)
+
+
+def is_clean_review(text: str) -> bool:
+    """Returns True when a review only says that no major issues were found."""
+    return bool(_CLEAN_REVIEW_RE.fullmatch(text.strip()))
+
+
+def format_findings(findings: list[Finding]) -> str:
+    """Renders findings as the text shown to the reviewer."""
+    if not findings:
+        return (
+            "**Static Checks:** the code parses and compiles; "
+            "no static issues were found."
+        )
+    lines = [
+        "**Static Check Findings** (from the parser, compiler and linter; "
+        "treat errors as confirmed and include them in your review):"
+    ]
+    for finding in findings:
+        where = f" (line {finding.line})" if finding.line else ""
+        lines.append(
+            f"- [{finding.severity}] {finding.check}{where}: {finding.message}"
+        )
+    return "\n".join(lines)
+
+
+@lru_cache()
+def get_code_check_pool() -> CodeCheckPool:
+    """
+    Get the process-wide static check pool configured from settings.
+
+    Returns:
+        CodeCheckPool: The shared pool.
+    """
+    settings = get_settings()
+    return CodeCheckPool(
+        max_workers=settings.STATIC_CHECK_WORKERS,
+        timeout_seconds=settings.STATIC_CHECK_TIMEOUT_SECONDS,
+        memory_limit_mb=settings.STATIC_CHECK_MEMORY_LIMIT_MB,
+        fresh_workers=settings.STATIC_CHECK_DOCTESTS,
+    )
+
+
+async def check_code(
+    text: Any, lint: bool = True, doctests: bool = False
+) -> list[Finding]:
+    """Checks the fenced Python block of a state value in the shared pool.
+
+    Args:
+        text (Any): Markdown with a ```python block, or an artifact reference.
+        lint (bool): Report pyflakes warnings when pyflakes is installed.
+        doctests (bool): Execute the code and run its doctests.
+
+    Returns:
+        list[Finding]: The findings; an "extract" error when there is no block.
+    """
+    source = extract_python(str(resolve(text) or ""))
+    if source is None:
+        return [Finding("extract", "error", "No ```python code block was found.")]
+    return await get_code_check_pool().check(source, lint=lint, doctests=doctests)
+
+
+def check_report(findings: list[Finding], elapsed_ms: float) -> dict:
+    """Returns the `{"ok", "findings", "elapsed_ms"}` state value of a check."""
+    return {
+        "ok": not any(finding.severity == "error" for finding in findings),
+        "findings": [finding.as_dict() for finding in findings],
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
+
+
+class StaticCheckAgent(BaseAgent):
+    """Checks generated code without a model call.
+
+    Attributes:
+        code_key: State key holding the generated code (Markdown with a
+            ```python block).
+        output_key: State key receiving `{"ok", "findings", "elapsed_ms"}`.
+        findings_key: State key receiving the findings as reviewer text.
+        lint: Report pyflakes warnings when pyflakes is installed.
+        doctests: Execute the code and run its doctests.
+    """
+
+    code_key: str
+    output_key: str
+    findings_key: str
+    lint: bool = True
+    doctests: bool = False
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        findings = await check_code(
+            ctx.session.state.get(self.code_key), lint=self.lint, doctests=self.doctests
+        )
+        report = check_report(findings, (time.perf_counter() - started) * 1000)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={
+                    self.output_key: report,
+                    self.findings_key: format_findings(findings),
+                }
+            ),
+        )